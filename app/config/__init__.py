@@ -0,0 +1,4 @@
+# Djangoの起動時にCeleryアプリを読み込み、@shared_task がこのアプリを使うようにする
+from .celery import app as celery_app
+
+__all__ = ('celery_app',)
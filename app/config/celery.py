@@ -0,0 +1,43 @@
+"""
+Celery設定
+
+校正・グレイプらしさ評価などBedrockを呼び出す長時間処理をWebワーカーから切り離し、
+別プロセスのCeleryワーカーで実行する。設定は Django settings の CELERY_ 接頭辞の値を使用する。
+
+起動例:
+    celery -A config worker -Q proofreading,grapecheck --concurrency 2
+"""
+import logging
+import os
+
+from celery import Celery
+
+logger = logging.getLogger(__name__)
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+app = Celery('config')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
+
+
+@app.on_after_configure.connect
+def create_local_data_dirs(sender, **kwargs):
+    """
+    ファイルベースのブローカー・結果バックエンドを使う場合に保存先ディレクトリを作成する
+
+    settings の読み込み時ではなく、Celeryを実際に使うプロセス（ワーカー・タスクを投入するWebワーカー）で
+    設定が確定した時点に一度だけ実行する。作成できない場合（読み取り専用のファイルシステムなど）は警告にとどめる。
+    """
+    directories = []
+    if sender.conf.broker_url and sender.conf.broker_url.startswith('filesystem://'):
+        options = sender.conf.broker_transport_options or {}
+        directories += [options.get(key) for key in ('data_folder_in', 'data_folder_out', 'processed_folder', 'control_folder')]
+    if sender.conf.result_backend and sender.conf.result_backend.startswith('file://'):
+        directories.append(sender.conf.result_backend[len('file://'):])
+
+    for directory in filter(None, directories):
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError as e:
+            logger.warning(f"⚠️ Celeryのデータディレクトリを作成できません: {directory}: {str(e)}")
@@ -341,3 +341,144 @@ CACHES = {
 
 # Chatwork通知用ルームID（.envまたは環境変数から取得、なければデフォルト値）
 CHATWORK_ROOM_ID = os.environ.get("CHATWORK_ROOM_ID", "372584775")
+
+# 校正AI: 校正結果キャッシュ（DBに保存し全ワーカーで共有、LRU + TTL）
+PROOFREAD_CACHE_ENABLED = env.bool("PROOFREAD_CACHE_ENABLED", default=True)
+PROOFREAD_CACHE_MAX_ENTRIES = env.int("PROOFREAD_CACHE_MAX_ENTRIES", default=500)
+PROOFREAD_CACHE_TTL = env.int("PROOFREAD_CACHE_TTL", default=86400)  # 24時間
+
+# 校正AI: 辞書照合器（他ワーカーでの辞書更新を確認する間隔・事前適用）
+PROOFREAD_DICTIONARY_CHECK_INTERVAL = env.int("PROOFREAD_DICTIONARY_CHECK_INTERVAL", default=30)
+# 辞書ルールで決まる修正をモデル呼び出し前にローカルで確定する（モデルには処理済みと伝える）
+PROOFREAD_DICTIONARY_PREPASS = env.bool("PROOFREAD_DICTIONARY_PREPASS", default=False)
+# 原稿に出現する社内辞書・矛盾チェック項目だけをプロンプトに入れる際のトークン上限（0で無効）
+PROOFREAD_PROMPT_DICTIONARY_TOKENS = env.int("PROOFREAD_PROMPT_DICTIONARY_TOKENS", default=1000)
+# 矛盾検出データと数値・日付の組み込みチェックでモデルを待たずに矛盾を検出する
+PROOFREAD_LOCAL_INCONSISTENCY = env.bool("PROOFREAD_LOCAL_INCONSISTENCY", default=False)
+# Bedrockのusageによる実測トークン数を記録し、文字種別のトークン推定器を較正する
+PROOFREAD_TOKEN_USAGE_RECORDING = env.bool("PROOFREAD_TOKEN_USAGE_RECORDING", default=True)
+PROOFREAD_TOKEN_CALIBRATION_SAMPLES = env.int("PROOFREAD_TOKEN_CALIBRATION_SAMPLES", default=500)
+PROOFREAD_TOKEN_CALIBRATION_MIN_SAMPLES = env.int("PROOFREAD_TOKEN_CALIBRATION_MIN_SAMPLES", default=20)
+PROOFREAD_TOKEN_CALIBRATION_INTERVAL = env.int("PROOFREAD_TOKEN_CALIBRATION_INTERVAL", default=300)
+# 原稿の長さと実測の出力比率からリクエストごとに max_tokens・読み取りタイムアウトを決める
+PROOFREAD_ADAPTIVE_SIZING = env.bool("PROOFREAD_ADAPTIVE_SIZING", default=True)
+PROOFREAD_MAX_TOKENS_MARGIN = env.float("PROOFREAD_MAX_TOKENS_MARGIN", default=1.5)
+PROOFREAD_MAX_TOKENS_FLOOR = env.int("PROOFREAD_MAX_TOKENS_FLOOR", default=1024)
+PROOFREAD_TIMEOUT_MARGIN = env.float("PROOFREAD_TIMEOUT_MARGIN", default=2.0)
+# 出力が max_tokens の上限に収まらない見込みの原稿は自動で分割校正にする
+PROOFREAD_AUTO_CHUNK = env.bool("PROOFREAD_AUTO_CHUNK", default=True)
+
+# 校正AI: モデル（推論プロファイル）ごとのサーキットブレーカーとフォールバック
+PROOFREAD_BREAKER_ENABLED = env.bool("PROOFREAD_BREAKER_ENABLED", default=True)
+PROOFREAD_BREAKER_WINDOW = env.int("PROOFREAD_BREAKER_WINDOW", default=20)
+PROOFREAD_BREAKER_MIN_CALLS = env.int("PROOFREAD_BREAKER_MIN_CALLS", default=5)
+PROOFREAD_BREAKER_FAILURE_RATE = env.float("PROOFREAD_BREAKER_FAILURE_RATE", default=0.5)
+# この秒数を超えた呼び出しも失敗として数える（0で無効）
+PROOFREAD_BREAKER_SLOW_CALL_SECONDS = env.int("PROOFREAD_BREAKER_SLOW_CALL_SECONDS", default=120)
+PROOFREAD_BREAKER_COOLDOWN = env.int("PROOFREAD_BREAKER_COOLDOWN", default=30)
+PROOFREAD_BREAKER_HALF_OPEN_PROBES = env.int("PROOFREAD_BREAKER_HALF_OPEN_PROBES", default=1)
+
+# 校正AI: Bedrock呼び出しの同時実行数制限（スロットリングに応じてAIMDで調整、ジッター付きバックオフで再試行）
+PROOFREAD_RATE_LIMIT_ENABLED = env.bool("PROOFREAD_RATE_LIMIT_ENABLED", default=True)
+PROOFREAD_RATE_LIMIT_INITIAL_CONCURRENCY = env.int("PROOFREAD_RATE_LIMIT_INITIAL_CONCURRENCY", default=4)
+PROOFREAD_RATE_LIMIT_MIN_CONCURRENCY = env.int("PROOFREAD_RATE_LIMIT_MIN_CONCURRENCY", default=1)
+PROOFREAD_RATE_LIMIT_MAX_CONCURRENCY = env.int("PROOFREAD_RATE_LIMIT_MAX_CONCURRENCY", default=16)
+PROOFREAD_RATE_LIMIT_DECREASE_FACTOR = env.float("PROOFREAD_RATE_LIMIT_DECREASE_FACTOR", default=0.5)
+PROOFREAD_RATE_LIMIT_DECREASE_COOLDOWN = env.float("PROOFREAD_RATE_LIMIT_DECREASE_COOLDOWN", default=2.0)
+# 1秒あたりのリクエスト数の上限（0で無効、アカウントのRPMクォータ÷60を目安に設定）
+PROOFREAD_RATE_LIMIT_REQUESTS_PER_SECOND = env.float("PROOFREAD_RATE_LIMIT_REQUESTS_PER_SECOND", default=0.0)
+PROOFREAD_RATE_LIMIT_BURST = env.int("PROOFREAD_RATE_LIMIT_BURST", default=0)
+PROOFREAD_RATE_LIMIT_ACQUIRE_TIMEOUT = env.int("PROOFREAD_RATE_LIMIT_ACQUIRE_TIMEOUT", default=300)
+PROOFREAD_RATE_LIMIT_MAX_RETRIES = env.int("PROOFREAD_RATE_LIMIT_MAX_RETRIES", default=4)
+PROOFREAD_RATE_LIMIT_BACKOFF_BASE = env.float("PROOFREAD_RATE_LIMIT_BACKOFF_BASE", default=1.0)
+PROOFREAD_RATE_LIMIT_BACKOFF_CAP = env.float("PROOFREAD_RATE_LIMIT_BACKOFF_CAP", default=30.0)
+# ワーカー間で上限を共有する（CACHES がRedis・Memcachedなどワーカー間で共有される場合のみ有効）
+PROOFREAD_RATE_LIMIT_SHARED = env.bool("PROOFREAD_RATE_LIMIT_SHARED", default=False)
+PROOFREAD_RATE_LIMIT_CACHE = env("PROOFREAD_RATE_LIMIT_CACHE", default="default")
+PROOFREAD_RATE_LIMIT_SHARED_TTL = env.int("PROOFREAD_RATE_LIMIT_SHARED_TTL", default=600)
+
+# 校正AI: 差分校正（incremental=true の校正で、ユーザーの前回の結果を段落単位で再利用する）
+PROOFREAD_INCREMENTAL_ENABLED = env.bool("PROOFREAD_INCREMENTAL_ENABLED", default=True)
+PROOFREAD_INCREMENTAL_MAX_CHANGE_RATIO = env.float("PROOFREAD_INCREMENTAL_MAX_CHANGE_RATIO", default=0.5)  # これを超えて変更された場合は全文を校正
+PROOFREAD_INCREMENTAL_MAX_AGE = env.int("PROOFREAD_INCREMENTAL_MAX_AGE", default=86400)  # 再利用する前回の結果の有効期間（秒）
+
+# 校正AI: 同じ原稿・設定の校正が同時に実行された場合は1回のモデル呼び出しにまとめる
+# SHARED の場合は実行中の校正のロック表で他のワーカーの実行も待つ（結果は校正結果キャッシュで受け取る）
+PROOFREAD_SINGLE_FLIGHT_ENABLED = env.bool("PROOFREAD_SINGLE_FLIGHT_ENABLED", default=True)
+PROOFREAD_SINGLE_FLIGHT_SHARED = env.bool("PROOFREAD_SINGLE_FLIGHT_SHARED", default=True)
+PROOFREAD_SINGLE_FLIGHT_LOCK_TTL = env.int("PROOFREAD_SINGLE_FLIGHT_LOCK_TTL", default=900)  # 異常終了したワーカーのロックの有効期限（秒）
+PROOFREAD_SINGLE_FLIGHT_POLL_INTERVAL = env.float("PROOFREAD_SINGLE_FLIGHT_POLL_INTERVAL", default=0.2)
+
+# 校正AI: ASGIサーバー用の非同期ビュー（校正・非同期校正・状況確認）とasyncioのBedrockクライアント
+# 非同期校正のジョブはイベントループ上で実行するため、ASGIサーバー（start.sh の SERVER_MODE=asgi）でのみ有効にする
+PROOFREAD_ASYNC_VIEWS = env.bool("PROOFREAD_ASYNC_VIEWS", default=False)
+PROOFREAD_ASYNC_MAX_CONNECTIONS = env.int("PROOFREAD_ASYNC_MAX_CONNECTIONS", default=200)
+PROOFREAD_ASYNC_TASK_WORKERS = env.int("PROOFREAD_ASYNC_TASK_WORKERS", default=100)
+PROOFREAD_ASYNC_TASK_QUEUE_SIZE = env.int("PROOFREAD_ASYNC_TASK_QUEUE_SIZE", default=500)
+# bedrock-runtime のエンドポイント（空の場合はリージョンの既定、負荷試験で偽のエンドポイントに向ける場合に指定）
+BEDROCK_ENDPOINT_URL = env("BEDROCK_ENDPOINT_URL", default="")
+
+# 校正AI: 段落分割による並列校正
+PROOFREAD_CHUNK_MAX_TOKENS = env.int("PROOFREAD_CHUNK_MAX_TOKENS", default=3000)
+PROOFREAD_CHUNK_WORKERS = env.int("PROOFREAD_CHUNK_WORKERS", default=4)
+# 段落単位の校正結果キャッシュ（定型文の段落はモデルに送らない、PROOFREAD_CACHE_ENABLED が無効なら使わない）
+PROOFREAD_PARAGRAPH_CACHE_ENABLED = env.bool("PROOFREAD_PARAGRAPH_CACHE_ENABLED", default=True)
+PROOFREAD_PARAGRAPH_CACHE_MAX_ENTRIES = env.int("PROOFREAD_PARAGRAPH_CACHE_MAX_ENTRIES", default=5000)
+PROOFREAD_PARAGRAPH_CACHE_TTL = env.int("PROOFREAD_PARAGRAPH_CACHE_TTL", default=604800)  # 7日間
+
+# 校正AI: 2段階校正（辞書・ルールとスクリーニング用モデルで段落を選び、選んだ段落だけをプライマリモデルで校正する）
+# ENABLED は校正要求で use_cascade を指定しない場合の既定値
+PROOFREAD_CASCADE_ENABLED = env.bool("PROOFREAD_CASCADE_ENABLED", default=False)
+# スクリーニング用モデル（空の場合は辞書・ルールだけでスクリーニング）
+PROOFREAD_CASCADE_SCREEN_MODEL_ID = env("PROOFREAD_CASCADE_SCREEN_MODEL_ID", default="anthropic.claude-3-haiku-20240307-v1:0")
+PROOFREAD_CASCADE_SCREEN_INPUT_PRICE_PER_1K_TOKENS = env.float("PROOFREAD_CASCADE_SCREEN_INPUT_PRICE_PER_1K_TOKENS", default=0.00025)
+PROOFREAD_CASCADE_SCREEN_OUTPUT_PRICE_PER_1K_TOKENS = env.float("PROOFREAD_CASCADE_SCREEN_OUTPUT_PRICE_PER_1K_TOKENS", default=0.00125)
+PROOFREAD_CASCADE_SCREEN_TIMEOUT = env.int("PROOFREAD_CASCADE_SCREEN_TIMEOUT", default=60)
+PROOFREAD_CASCADE_ESCALATION_THRESHOLD = env.float("PROOFREAD_CASCADE_ESCALATION_THRESHOLD", default=0.5)  # このスコア以上の段落をプライマリモデルで校正
+# 辞書の事前適用（PROOFREAD_DICTIONARY_PREPASS）が無効の場合に辞書語句を含む段落に加えるスコア
+PROOFREAD_CASCADE_DICTIONARY_SCORE = env.float("PROOFREAD_CASCADE_DICTIONARY_SCORE", default=0.3)
+PROOFREAD_CASCADE_MAX_ESCALATION_RATIO = env.float("PROOFREAD_CASCADE_MAX_ESCALATION_RATIO", default=0.6)  # これを超える文字数を校正する場合は全文を校正
+
+# 校正AI: カテゴリー別の並列校正（矛盾・誤字・辞書・言い回しを別々の小さなプロンプトで同時に校正して結合する）
+# ENABLED は校正要求で use_category_passes を指定しない場合の既定値
+PROOFREAD_CATEGORY_PASSES_ENABLED = env.bool("PROOFREAD_CATEGORY_PASSES_ENABLED", default=False)
+# 実行するカテゴリー（カンマ区切り、同じ箇所への指摘が食い違う場合は先に書いたカテゴリーを採用する）
+PROOFREAD_CATEGORY_PASSES = env("PROOFREAD_CATEGORY_PASSES", default="inconsistency,typo,dict,tone")
+
+# 校正AI: 非同期校正ジョブの実行器（プロセスごとのワーカー数と待ち行列の上限）
+PROOFREAD_ASYNC_WORKERS = env.int("PROOFREAD_ASYNC_WORKERS", default=2)
+PROOFREAD_ASYNC_QUEUE_SIZE = env.int("PROOFREAD_ASYNC_QUEUE_SIZE", default=10)
+PROOFREAD_JOB_TTL = env.int("PROOFREAD_JOB_TTL", default=3600)  # ジョブ状況・結果の保持期間（秒）
+
+# Celery（校正・グレイプらしさ評価をWebワーカーとは別プロセスで実行する）
+# ブローカー・結果バックエンドの既定値はローカルファイル。本番ではRedisなど共有のものを指定する
+# （ローカルファイルの保存先ディレクトリは config/celery.py で Celery の設定読み込み時に作成する）
+CELERY_DATA_DIR = Path(env("CELERY_DATA_DIR", default=str(BASE_DIR / "celery")))
+CELERY_BROKER_URL = env("CELERY_BROKER_URL", default="filesystem://")
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "data_folder_in": str(CELERY_DATA_DIR / "broker"),
+    "data_folder_out": str(CELERY_DATA_DIR / "broker"),
+    "processed_folder": str(CELERY_DATA_DIR / "processed"),
+    "control_folder": str(CELERY_DATA_DIR / "control"),
+    "store_processed": False,
+}
+CELERY_RESULT_BACKEND = env("CELERY_RESULT_BACKEND", default=f"file://{CELERY_DATA_DIR / 'results'}")
+CELERY_RESULT_EXPIRES = env.int("CELERY_RESULT_EXPIRES", default=86400)
+CELERY_TASK_SERIALIZER = "json"
+CELERY_RESULT_SERIALIZER = "json"
+CELERY_ACCEPT_CONTENT = ["json"]
+CELERY_TASK_ACKS_LATE = True  # ワーカーが落ちた場合は別のワーカーで再実行する
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1  # 長時間タスクを1件ずつ取得する
+CELERY_TASK_TIME_LIMIT = env.int("CELERY_TASK_TIME_LIMIT", default=900)
+CELERY_TASK_ROUTES = {
+    "proofreading_ai.tasks.*": {"queue": "proofreading"},
+    "grapecheck.tasks.*": {"queue": "grapecheck"},
+}
+CELERY_TASK_ALWAYS_EAGER = env.bool("CELERY_TASK_ALWAYS_EAGER", default=False)
+CELERY_TASK_STORE_EAGER_RESULT = True
+
+# Celeryワーカーで実行するか（Falseの場合は従来どおりWebワーカー内で実行する）
+PROOFREAD_USE_CELERY = env.bool("PROOFREAD_USE_CELERY", default=False)
+GRAPECHECK_USE_CELERY = env.bool("GRAPECHECK_USE_CELERY", default=False)
+PROOFREAD_TASK_MAX_RETRIES = env.int("PROOFREAD_TASK_MAX_RETRIES", default=3)
+GRAPECHECK_TASK_MAX_RETRIES = env.int("GRAPECHECK_TASK_MAX_RETRIES", default=3)
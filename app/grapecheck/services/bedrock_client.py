@@ -1,4 +1,6 @@
 import json
+import os
+import threading
 import boto3
 import logging
 from botocore.exceptions import ClientError
@@ -123,4 +125,49 @@ class BedrockClient:
         except (json.JSONDecodeError, IndexError, KeyError) as e:
             logger.error(f"レスポンス解析エラー: {str(e)}")
             logger.debug(f"生のレスポンス: {response}")
-            raise ValueError("APIレスポンスの解析に失敗しました") 
\ No newline at end of file
+            raise ValueError("APIレスポンスの解析に失敗しました")
+
+
+# プロセス内で共有するクライアント（リージョンごとに1インスタンス）
+_shared_clients = {}
+_shared_clients_pid = None
+_shared_clients_lock = threading.Lock()
+
+
+def get_bedrock_client(region_name=None):
+    """
+    プロセス内で共有するBedrockClientを取得する（遅延初期化・スレッドセーフ）
+    
+    Args:
+        region_name (str, optional): AWS リージョン名。デフォルトはNone（環境変数から取得）
+        
+    Returns:
+        BedrockClient: 共有クライアント
+    """
+    global _shared_clients_pid
+    
+    pid = os.getpid()
+    if _shared_clients_pid == pid:
+        client = _shared_clients.get(region_name)
+        if client is not None:
+            return client
+    
+    with _shared_clients_lock:
+        if _shared_clients_pid != pid:
+            # fork後は親プロセスのクライアントを破棄して作り直す
+            _shared_clients.clear()
+            _shared_clients_pid = pid
+        client = _shared_clients.get(region_name)
+        if client is None:
+            client = BedrockClient(region_name=region_name)
+            _shared_clients[region_name] = client
+        return client
+
+
+def reset_bedrock_client():
+    """共有クライアントを破棄する（設定変更時やテスト用）"""
+    global _shared_clients_pid
+    
+    with _shared_clients_lock:
+        _shared_clients.clear()
+        _shared_clients_pid = None
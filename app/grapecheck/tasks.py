@@ -0,0 +1,69 @@
+import logging
+
+from celery import shared_task
+from django.conf import settings
+
+from .models import Category, GrapeCheck
+from .services.bedrock_client import get_bedrock_client
+
+logger = logging.getLogger(__name__)
+
+
+def run_grape_check(text, category_id):
+    """
+    グレイプらしさを評価して結果を保存する
+
+    Args:
+        text: 評価対象のテキスト
+        category_id: カテゴリID（サブカテゴリの場合は親カテゴリ名と合わせて評価する）
+
+    Returns:
+        保存したGrapeCheck
+    """
+    category = Category.objects.get(id=category_id)
+    parent_category = category
+    subcategory = None
+
+    if category.parent:
+        parent_category = category.parent
+        subcategory = category.name
+
+    client = get_bedrock_client(region_name=getattr(settings, 'AWS_REGION', None))
+    result = client.evaluate_grape_style(text, parent_category.name, subcategory)
+
+    # 評価結果を保存
+    return GrapeCheck.objects.create(
+        category=category,
+        content_text=text,
+        total_score=result['total_score'],
+        writing_style_score=result['writing_style_score'],
+        structure_score=result['structure_score'],
+        keyword_score=result['keyword_score'],
+        improvement_suggestions=result['improvement_suggestions']
+    )
+
+
+@shared_task(bind=True, max_retries=getattr(settings, 'GRAPECHECK_TASK_MAX_RETRIES', 3))
+def grape_check_task(self, text, category_id):
+    """
+    グレイプらしさ評価をCeleryワーカーで実行する
+
+    Args:
+        text: 評価対象のテキスト
+        category_id: カテゴリID
+
+    Returns:
+        {'check_id': 保存したGrapeCheckのID}
+    """
+    try:
+        check_result = run_grape_check(text, category_id)
+    except Category.DoesNotExist:
+        raise
+    except Exception as e:
+        if self.request.retries < self.max_retries:
+            countdown = 5 * (2 ** self.request.retries)
+            logger.warning(f"評価タスク再試行 ({self.request.retries + 1}/{self.max_retries}, {countdown}秒後): {str(e)}")
+            raise self.retry(exc=e, countdown=countdown)
+        logger.error(f"評価タスク失敗: {str(e)}")
+        raise
+    return {'check_id': check_result.id}
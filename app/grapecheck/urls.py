@@ -20,6 +20,10 @@ urlpatterns = [
     # メインフォーム
     path('', auth_class_decorator(views.GrapeCheckFormView).as_view(), name='form'),
     
+    # 評価待ち（Celeryタスクの完了を待つ）
+    path('pending/<str:task_id>/', auth_class_decorator(views.GrapeCheckPendingView).as_view(), name='pending'),
+    path('pending/<str:task_id>/status/', auth_class_decorator(views.GrapeCheckTaskStatusView).as_view(), name='task_status'),
+    
     # 結果表示
     path('results/<int:pk>/', auth_class_decorator(views.GrapeCheckResultView).as_view(), name='results'),
     
@@ -1,19 +1,37 @@
 from django.shortcuts import render, redirect
-from django.views.generic import FormView, DetailView, ListView
-from django.http import JsonResponse
+from django.views.generic import FormView, DetailView, ListView, TemplateView, View
+from django.http import Http404, JsonResponse
 from django.contrib import messages
 from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.urls import reverse
+from celery.result import AsyncResult
 
 from .models import Category, GrapeCheck
 from .forms import GrapeCheckForm
-from .services.bedrock_client import BedrockClient
+from .tasks import grape_check_task, run_grape_check
 
 import logging
 import json
 
 logger = logging.getLogger(__name__)
 
+# セッションに保持する投入済みタスクIDの上限（古いものから捨てる）
+MAX_SESSION_TASK_IDS = 20
+
+
+def remember_task(request, task_id):
+    """投入したタスクIDを投入したユーザーのセッションに記録する"""
+    task_ids = request.session.get('grape_check_task_ids', [])
+    request.session['grape_check_task_ids'] = (task_ids + [task_id])[-MAX_SESSION_TASK_IDS:]
+
+
+def ensure_own_task(request, task_id):
+    """このセッションで投入していないタスクIDは404にする"""
+    if task_id not in request.session.get('grape_check_task_ids', []):
+        raise Http404('指定された評価処理が見つかりません')
+
+
 class GrapeCheckFormView(LoginRequiredMixin, FormView):
     """グレイプらしさチェックフォームビュー"""
     template_name = 'grapecheck/check_form.html'
@@ -27,30 +45,16 @@ class GrapeCheckFormView(LoginRequiredMixin, FormView):
 
     def form_valid(self, form):
         text = form.cleaned_data['content_text']
-        category_id = form.cleaned_data['category']
-        
-        category = Category.objects.get(id=category_id)
-        parent_category = category
-        subcategory = None
+        category_id = form.cleaned_data['category'].id
         
-        if category.parent:
-            parent_category = category.parent
-            subcategory = category.name
+        # Celeryワーカーで実行する場合は待機ページへ移動する
+        if getattr(settings, 'GRAPECHECK_USE_CELERY', False):
+            task = grape_check_task.delay(text, category_id)
+            remember_task(self.request, task.id)
+            return redirect('grapecheck:pending', task_id=task.id)
         
         try:
-            client = BedrockClient(region_name=getattr(settings, 'AWS_REGION', None))
-            result = client.evaluate_grape_style(text, parent_category.name, subcategory)
-            
-            # 評価結果を保存
-            check_result = GrapeCheck.objects.create(
-                category=category,
-                content_text=text,
-                total_score=result['total_score'],
-                writing_style_score=result['writing_style_score'],
-                structure_score=result['structure_score'],
-                keyword_score=result['keyword_score'],
-                improvement_suggestions=result['improvement_suggestions']
-            )
+            check_result = run_grape_check(text, category_id)
             
             # セッションに結果IDを保存
             self.request.session['check_result_id'] = check_result.id
@@ -62,6 +66,39 @@ class GrapeCheckFormView(LoginRequiredMixin, FormView):
             return self.form_invalid(form)
 
 
+class GrapeCheckPendingView(LoginRequiredMixin, TemplateView):
+    """グレイプらしさチェック待機ビュー（Celeryタスクの完了をポーリングする）"""
+    template_name = 'grapecheck/check_pending.html'
+
+    def get(self, request, *args, **kwargs):
+        ensure_own_task(request, kwargs['task_id'])
+        return super().get(request, *args, **kwargs)
+
+
+class GrapeCheckTaskStatusView(LoginRequiredMixin, View):
+    """グレイプらしさチェックタスクの状況を返すビュー"""
+
+    def get(self, request, task_id):
+        ensure_own_task(request, task_id)
+        task = AsyncResult(task_id)
+        
+        if task.successful():
+            check_id = task.result['check_id']
+            request.session['check_result_id'] = check_id
+            return JsonResponse({
+                'status': 'completed',
+                'redirect_url': reverse('grapecheck:results', kwargs={'pk': check_id})
+            })
+        
+        if task.failed():
+            return JsonResponse({
+                'status': 'error',
+                'error': f"評価処理中にエラーが発生しました: {task.result}"
+            })
+        
+        return JsonResponse({'status': 'processing'})
+
+
 class GrapeCheckResultView(LoginRequiredMixin, DetailView):
     """グレイプらしさチェック結果ビュー"""
     model = GrapeCheck
@@ -1,15 +1,16 @@
 from django.contrib import admin
 from .models import (
     ProofreadingRequest, ProofreadingResult, ReplacementDictionary,
-    CorrectionV2, CompanyDictionary, InconsistencyData
+    CorrectionV2, CompanyDictionary, InconsistencyData, ProofreadingCacheEntry,
+    ProofreadingJob, ProofreadingInFlight, TokenUsageRecord
 )
 
 
 @admin.register(ProofreadingRequest)
 class ProofreadingRequestAdmin(admin.ModelAdmin):
-    list_display = ('id', 'created_at')
+    list_display = ('id', 'user', 'created_at')
     list_filter = ('created_at',)
-    search_fields = ('original_text',)
+    search_fields = ('original_text', 'user__username')
     readonly_fields = ('created_at',)
 
 
@@ -135,4 +136,42 @@ class InconsistencyDataAdmin(admin.ModelAdmin):
     def set_high_severity(self, request, queryset):
         updated = queryset.update(severity='high')
         self.message_user(request, f'{updated}件の矛盾検出データを高重要度に設定しました。')
-    set_high_severity.short_description = '選択した矛盾検出データを高重要度に設定' 
\ No newline at end of file
+    set_high_severity.short_description = '選択した矛盾検出データを高重要度に設定'
+
+
+@admin.register(ProofreadingCacheEntry)
+class ProofreadingCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ('cache_key', 'namespace', 'hit_count', 'created_at', 'last_accessed_at', 'expires_at')
+    list_filter = ('namespace', 'created_at')
+    search_fields = ('cache_key',)
+    readonly_fields = ('cache_key', 'namespace', 'payload', 'hit_count', 'created_at', 'last_accessed_at', 'expires_at')
+    ordering = ('-last_accessed_at',)
+
+
+@admin.register(ProofreadingJob)
+class ProofreadingJobAdmin(admin.ModelAdmin):
+    list_display = ('job_id', 'status', 'progress', 'created_at', 'updated_at', 'expires_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('job_id', 'dedupe_key')
+    readonly_fields = ('job_id', 'status', 'progress', 'result', 'error', 'dedupe_key', 'created_at', 'updated_at',
+                       'expires_at')
+    ordering = ('-created_at',)
+
+
+@admin.register(ProofreadingInFlight)
+class ProofreadingInFlightAdmin(admin.ModelAdmin):
+    list_display = ('key', 'owner', 'created_at', 'expires_at')
+    search_fields = ('key', 'owner')
+    readonly_fields = ('key', 'owner', 'created_at', 'expires_at')
+    ordering = ('-created_at',)
+
+
+@admin.register(TokenUsageRecord)
+class TokenUsageRecordAdmin(admin.ModelAdmin):
+    list_display = ('id', 'mode', 'model_id', 'input_tokens', 'output_tokens', 'estimated_input_tokens',
+                    'estimated_output_tokens', 'latency', 'estimated_cost', 'created_at')
+    list_filter = ('mode', 'model_id', 'created_at')
+    readonly_fields = ('mode', 'model_id', 'original_length', 'input_tokens', 'output_tokens', 'estimated_input_tokens',
+                       'estimated_output_tokens', 'input_characters', 'output_characters', 'latency',
+                       'estimated_cost', 'created_at')
+    ordering = ('-created_at',)
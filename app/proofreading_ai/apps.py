@@ -4,4 +4,8 @@ from django.apps import AppConfig
 class ProofreadingAiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'proofreading_ai'
-    verbose_name = '校正AI' 
\ No newline at end of file
+    verbose_name = '校正AI'
+
+    def ready(self):
+        # 辞書の更新を照合器・キャッシュキーに反映するためのシグナルを登録
+        from proofreading_ai import signals  # noqa: F401
@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-17 07:42
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proofreading_ai', '0003_inconsistencydata_alter_correctionv2_category_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProofreadingCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('namespace', models.CharField(default='result', max_length=32, verbose_name='名前空間')),
+                ('cache_key', models.CharField(max_length=64, unique=True, verbose_name='キャッシュキー')),
+                ('payload', models.JSONField(verbose_name='キャッシュ内容')),
+                ('hit_count', models.IntegerField(default=0, verbose_name='ヒット数')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='作成日時')),
+                ('last_accessed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='最終アクセス日時')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='有効期限')),
+            ],
+            options={
+                'verbose_name': '校正結果キャッシュ',
+                'verbose_name_plural': '校正結果キャッシュ',
+                'indexes': [models.Index(fields=['namespace', 'last_accessed_at'], name='proofread_cache_lru_idx')],
+            },
+        ),
+    ]
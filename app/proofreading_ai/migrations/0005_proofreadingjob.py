@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-17 07:48
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proofreading_ai', '0004_proofreadingcacheentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProofreadingJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_id', models.CharField(max_length=36, unique=True, verbose_name='ジョブID')),
+                ('status', models.CharField(choices=[('queued', '待機中'), ('running', '処理中'), ('completed', '完了'), ('error', 'エラー')], default='queued', max_length=16, verbose_name='状態')),
+                ('progress', models.IntegerField(default=0, verbose_name='進捗（%）')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='結果')),
+                ('error', models.TextField(blank=True, verbose_name='エラー内容')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='作成日時')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新日時')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='有効期限')),
+            ],
+            options={
+                'verbose_name': '非同期校正ジョブ',
+                'verbose_name_plural': '非同期校正ジョブ',
+                'indexes': [models.Index(fields=['status', 'created_at'], name='proofread_job_queue_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2 on 2026-10-17 08:21
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proofreading_ai', '0005_proofreadingjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenUsageRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mode', models.CharField(max_length=32, verbose_name='校正モード')),
+                ('model_id', models.CharField(max_length=255, verbose_name='モデルID')),
+                ('original_length', models.IntegerField(default=0, verbose_name='原文の文字数')),
+                ('input_tokens', models.IntegerField(verbose_name='入力トークン数')),
+                ('output_tokens', models.IntegerField(verbose_name='出力トークン数')),
+                ('estimated_input_tokens', models.IntegerField(default=0, verbose_name='推定入力トークン数')),
+                ('estimated_output_tokens', models.IntegerField(default=0, verbose_name='推定出力トークン数')),
+                ('input_characters', models.JSONField(default=dict, verbose_name='入力の文字種別文字数')),
+                ('output_characters', models.JSONField(default=dict, verbose_name='出力の文字種別文字数')),
+                ('latency', models.FloatField(default=0, verbose_name='処理時間(秒)')),
+                ('estimated_cost', models.FloatField(default=0, verbose_name='推定コスト(円)')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='作成日時')),
+            ],
+            options={
+                'verbose_name': 'トークン使用量',
+                'verbose_name_plural': 'トークン使用量',
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-17 08:44
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proofreading_ai', '0006_tokenusagerecord'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProofreadingInFlight',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True, verbose_name='校正キー')),
+                ('owner', models.CharField(max_length=128, verbose_name='実行者')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='開始日時')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='有効期限')),
+            ],
+            options={
+                'verbose_name': '実行中の校正',
+                'verbose_name_plural': '実行中の校正',
+            },
+        ),
+        migrations.AddField(
+            model_name='proofreadingjob',
+            name='dedupe_key',
+            field=models.CharField(blank=True, db_index=True, max_length=64, verbose_name='重複判定キー'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-17 08:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proofreading_ai', '0007_proofreadinginflight'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='proofreadingrequest',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='proofreading_requests', to=settings.AUTH_USER_MODEL, verbose_name='ユーザー'),
+        ),
+        migrations.AddField(
+            model_name='proofreadingresult',
+            name='config_key',
+            field=models.CharField(blank=True, max_length=64, verbose_name='校正設定キー'),
+        ),
+        migrations.AddField(
+            model_name='proofreadingresult',
+            name='corrections',
+            field=models.JSONField(blank=True, default=list, verbose_name='修正箇所'),
+        ),
+        migrations.AddIndex(
+            model_name='proofreadingrequest',
+            index=models.Index(fields=['user', 'created_at'], name='proofread_request_user_idx'),
+        ),
+    ]
@@ -1,15 +1,21 @@
+from django.contrib.auth.models import User
 from django.db import models
 from django.utils import timezone
 
 
 class ProofreadingRequest(models.Model):
     """校正リクエストモデル"""
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                             related_name='proofreading_requests', verbose_name='ユーザー')
     original_text = models.TextField('原文')
     created_at = models.DateTimeField('作成日時', default=timezone.now)
     
     class Meta:
         verbose_name = '校正リクエスト'
         verbose_name_plural = '校正リクエスト'
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='proofread_request_user_idx'),
+        ]
         
     def __str__(self):
         return f"校正リクエスト {self.id}: {self.created_at.strftime('%Y-%m-%d %H:%M')}"
@@ -19,6 +25,8 @@ class ProofreadingResult(models.Model):
     """校正結果モデル"""
     request = models.ForeignKey(ProofreadingRequest, on_delete=models.CASCADE, related_name='results')
     corrected_text = models.TextField('校正後テキスト')
+    corrections = models.JSONField('修正箇所', default=list, blank=True)  # 原文内の位置（position）付き
+    config_key = models.CharField('校正設定キー', max_length=64, blank=True)  # 差分校正で再利用できる設定かの判定用
     completion_time = models.FloatField('処理時間(秒)', null=True, blank=True)
     created_at = models.DateTimeField('作成日時', default=timezone.now)
     
@@ -188,4 +196,93 @@ class InconsistencyData(models.Model):
         """誤りパターンをリストで返す"""
         if self.incorrect_patterns:
             return [pattern.strip() for pattern in self.incorrect_patterns.split(',') if pattern.strip()]
-        return [] 
\ No newline at end of file
+        return [] 
+
+
+class ProofreadingCacheEntry(models.Model):
+    """校正結果キャッシュモデル（全ワーカー・全タスクで共有）"""
+    namespace = models.CharField('名前空間', max_length=32, default='result')
+    cache_key = models.CharField('キャッシュキー', max_length=64, unique=True)
+    payload = models.JSONField('キャッシュ内容')
+    hit_count = models.IntegerField('ヒット数', default=0)
+    created_at = models.DateTimeField('作成日時', default=timezone.now)
+    last_accessed_at = models.DateTimeField('最終アクセス日時', default=timezone.now)
+    expires_at = models.DateTimeField('有効期限', db_index=True)
+    
+    class Meta:
+        verbose_name = '校正結果キャッシュ'
+        verbose_name_plural = '校正結果キャッシュ'
+        indexes = [
+            models.Index(fields=['namespace', 'last_accessed_at'], name='proofread_cache_lru_idx'),
+        ]
+        
+    def __str__(self):
+        return f"{self.namespace}:{self.cache_key[:12]} (ヒット {self.hit_count}回)"
+
+
+class ProofreadingJob(models.Model):
+    """非同期校正ジョブモデル（全ワーカー・全タスクから状況を参照する）"""
+    STATUS_CHOICES = [
+        ('queued', '待機中'),
+        ('running', '処理中'),
+        ('completed', '完了'),
+        ('error', 'エラー'),
+    ]
+    
+    job_id = models.CharField('ジョブID', max_length=36, unique=True)
+    status = models.CharField('状態', max_length=16, choices=STATUS_CHOICES, default='queued')
+    progress = models.IntegerField('進捗（%）', default=0)
+    result = models.JSONField('結果', null=True, blank=True)
+    error = models.TextField('エラー内容', blank=True)
+    dedupe_key = models.CharField('重複判定キー', max_length=64, blank=True, db_index=True)
+    created_at = models.DateTimeField('作成日時', default=timezone.now)
+    updated_at = models.DateTimeField('更新日時', auto_now=True)
+    expires_at = models.DateTimeField('有効期限', db_index=True)
+    
+    class Meta:
+        verbose_name = '非同期校正ジョブ'
+        verbose_name_plural = '非同期校正ジョブ'
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='proofread_job_queue_idx'),
+        ]
+        
+    def __str__(self):
+        return f"{self.job_id} ({self.get_status_display()})"
+
+
+class ProofreadingInFlight(models.Model):
+    """実行中の校正のロック表（同じ原稿・設定の校正を全ワーカーで1回にまとめる）"""
+    key = models.CharField('校正キー', max_length=64, unique=True)
+    owner = models.CharField('実行者', max_length=128)
+    created_at = models.DateTimeField('開始日時', default=timezone.now)
+    expires_at = models.DateTimeField('有効期限', db_index=True)
+    
+    class Meta:
+        verbose_name = '実行中の校正'
+        verbose_name_plural = '実行中の校正'
+        
+    def __str__(self):
+        return f"{self.key[:12]} ({self.owner})"
+
+
+class TokenUsageRecord(models.Model):
+    """トークン使用量の実測記録（Bedrockのusageによる、推定器の較正とレポートに使う）"""
+    mode = models.CharField('校正モード', max_length=32)
+    model_id = models.CharField('モデルID', max_length=255)
+    original_length = models.IntegerField('原文の文字数', default=0)
+    input_tokens = models.IntegerField('入力トークン数')
+    output_tokens = models.IntegerField('出力トークン数')
+    estimated_input_tokens = models.IntegerField('推定入力トークン数', default=0)
+    estimated_output_tokens = models.IntegerField('推定出力トークン数', default=0)
+    input_characters = models.JSONField('入力の文字種別文字数', default=dict)
+    output_characters = models.JSONField('出力の文字種別文字数', default=dict)
+    latency = models.FloatField('処理時間(秒)', default=0)
+    estimated_cost = models.FloatField('推定コスト(円)', default=0)
+    created_at = models.DateTimeField('作成日時', default=timezone.now, db_index=True)
+    
+    class Meta:
+        verbose_name = 'トークン使用量'
+        verbose_name_plural = 'トークン使用量'
+        
+    def __str__(self):
+        return f"{self.mode} {self.input_tokens}+{self.output_tokens}トークン ({self.created_at.strftime('%Y-%m-%d %H:%M')})"
@@ -0,0 +1,427 @@
+import asyncio
+import io
+import json
+import logging
+import time
+import weakref
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import aiohttp
+import boto3
+from asgiref.sync import sync_to_async
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
+from botocore.exceptions import ClientError, EndpointConnectionError, ReadTimeoutError
+from django.conf import settings
+from yarl import URL
+
+from proofreading_ai.services.bedrock_client import BedrockClient, get_bedrock_client
+from proofreading_ai.services.circuit_breaker import (
+    AttemptTimer, CircuitOpenError, get_circuit_breaker, is_circuit_breaker_enabled, is_model_failure
+)
+from proofreading_ai.services.dictionary_prepass import DictionaryPrepass
+from proofreading_ai.services.rate_limiter import call_with_rate_limit_async
+from proofreading_ai.services.single_flight import (
+    get_shared_flight_lock, get_single_flight, is_shared_flight_enabled, is_single_flight_enabled, run_shared_async
+)
+
+logger = logging.getLogger(__name__)
+
+# HTTPステータスだけでエラー種別が分からない場合の対応
+STATUS_ERROR_CODES = {
+    400: 'ValidationException',
+    403: 'AccessDeniedException',
+    404: 'ResourceNotFoundException',
+    429: 'ThrottlingException',
+    503: 'ServiceUnavailableException',
+}
+
+
+class AsyncBedrockRuntime:
+    """
+    asyncio で bedrock-runtime の InvokeModel を呼び出すクライアント
+
+    HTTP通信は aiohttp のコネクションプール（keep-alive・接続の生存確認・チャンク転送に対応）に任せ、
+    リクエストには botocore の SigV4 署名を付ける。
+    呼び出し中はスレッドを占有しないため、1プロセスで多数の校正を同時に待てる。
+    セッションはイベントループに結び付くため、イベントループごとに1インスタンスを使う（get_async_bedrock_runtime）。
+    """
+
+    def __init__(self, region: str, endpoint_url: Optional[str] = None, credentials=None,
+                 max_connections: int = 200, connect_timeout: float = 60):
+        """
+        Args:
+            region: AWSリージョン
+            endpoint_url: エンドポイント（省略時は https://bedrock-runtime.{region}.amazonaws.com）
+            credentials: botocore の認証情報（省略時は boto3 の既定の解決順で取得）
+            max_connections: 同時に開く接続数の上限
+            connect_timeout: 接続タイムアウト（秒）
+        """
+        self.region = region
+        self.endpoint_url = (endpoint_url or f'https://bedrock-runtime.{region}.amazonaws.com').rstrip('/')
+        self._credentials = credentials
+        self._frozen_credentials = None
+        self._credentials_lock: Optional[asyncio.Lock] = None
+        self.max_connections = max_connections
+        self.connect_timeout = connect_timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.requests_sent = 0
+        self.connections_opened = 0
+
+    def _resolve_credentials(self):
+        """認証情報を解決・更新して固定値を返す（ファイル・メタデータサービスへのアクセスがあるためスレッドで呼ぶ）"""
+        if self._credentials is None:
+            self._credentials = boto3.Session().get_credentials()
+            if self._credentials is None:
+                raise RuntimeError('AWS認証情報が見つかりません')
+        return self._credentials.get_frozen_credentials()
+
+    def _credentials_refresh_needed(self) -> bool:
+        # 一時認証情報（RefreshableCredentials）は期限が近づいたら取り直す。静的な認証情報は取り直さない
+        refresh_needed = getattr(self._credentials, 'refresh_needed', None)
+        return callable(refresh_needed) and refresh_needed()
+
+    async def _get_frozen_credentials(self):
+        """
+        署名に使う認証情報を返す
+
+        解決・更新はイベントループを止めないようにスレッドで行い、固定値を期限が近づくまでキャッシュする。
+        """
+        if self._frozen_credentials is None or self._credentials_refresh_needed():
+            if self._credentials_lock is None:
+                self._credentials_lock = asyncio.Lock()
+            async with self._credentials_lock:
+                if self._frozen_credentials is None or self._credentials_refresh_needed():
+                    self._frozen_credentials = await asyncio.to_thread(self._resolve_credentials)
+        return self._frozen_credentials
+
+    def _signed_headers(self, url: str, body: bytes, content_type: str, credentials) -> Dict[str, str]:
+        request = AWSRequest(method='POST', url=url, data=body, headers={
+            'Content-Type': content_type,
+            'Accept': 'application/json',
+        })
+        SigV4Auth(credentials, 'bedrock', self.region).add_auth(request)
+        return dict(request.headers.items())
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            trace_config = aiohttp.TraceConfig()
+            trace_config.on_connection_create_end.append(self._on_connection_created)
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                trace_configs=[trace_config],
+            )
+        return self._session
+
+    async def _on_connection_created(self, session, context, params) -> None:
+        self.connections_opened += 1
+
+    async def invoke_model(self, modelId: str, body: str, contentType: str = 'application/json',
+                           read_timeout: float = 600) -> Dict:
+        """
+        InvokeModel を呼び出す（boto3 の invoke_model と同じ形の戻り値）
+
+        Args:
+            modelId: モデルID・推論プロファイルARN
+            body: リクエストボディ（JSON文字列）
+            contentType: リクエストのContent-Type
+            read_timeout: 応答を待つ最大秒数
+
+        Returns:
+            {'body': レスポンスボディのファイルライクオブジェクト}
+
+        Raises:
+            ClientError: エラー応答の場合（コードは x-amzn-ErrorType から取得）
+            ReadTimeoutError: read_timeout 秒以内に応答がない場合
+            EndpointConnectionError: 接続できない場合
+        """
+        url = f'{self.endpoint_url}/model/{quote(modelId, safe="")}/invoke'
+        payload = body.encode('utf-8') if isinstance(body, str) else body
+        headers = self._signed_headers(url, payload, contentType, await self._get_frozen_credentials())
+        timeout = aiohttp.ClientTimeout(total=None, connect=self.connect_timeout, sock_read=read_timeout)
+
+        try:
+            # 署名済みのURLをそのまま送る（aiohttp にパスを正規化させない）
+            async with self._get_session().post(URL(url, encoded=True), data=payload, headers=headers,
+                                                timeout=timeout) as response:
+                status = response.status
+                response_headers = {name.lower(): value for name, value in response.headers.items()}
+                response_body = await response.read()
+        except (aiohttp.ServerTimeoutError, asyncio.TimeoutError):
+            raise ReadTimeoutError(endpoint_url=url)
+        except aiohttp.ClientError as e:
+            raise EndpointConnectionError(endpoint_url=url, error=e)
+        self.requests_sent += 1
+
+        if status >= 300:
+            raise self._client_error(status, response_headers, response_body)
+        return {'body': io.BytesIO(response_body), 'ResponseMetadata': {'HTTPStatusCode': status}}
+
+    @staticmethod
+    def _client_error(status: int, headers: Dict[str, str], body: bytes) -> ClientError:
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError:
+            payload = {}
+        code = (headers.get('x-amzn-errortype') or payload.get('__type') or '').split(':')[0].split('#')[-1]
+        code = code or STATUS_ERROR_CODES.get(status, 'InternalServerException')
+        message = payload.get('message') or payload.get('Message') or body.decode('utf-8', 'replace')[:500]
+        return ClientError({
+            'Error': {'Code': code, 'Message': message},
+            'ResponseMetadata': {'HTTPStatusCode': status, 'HTTPHeaders': headers},
+        }, 'InvokeModel')
+
+    async def close(self) -> None:
+        """セッションと使い回している接続を閉じる"""
+        session, self._session = self._session, None
+        if session is not None:
+            await session.close()
+
+    def stats(self) -> Dict:
+        return {
+            'endpoint_url': self.endpoint_url,
+            'max_connections': self.max_connections,
+            'connections_opened': self.connections_opened,
+            'requests_sent': self.requests_sent,
+        }
+
+
+class AsyncProofreader:
+    """
+    BedrockClient の校正処理の asyncio 版（JSONモード・分割校正）
+
+    プロンプトの組み立て・キャッシュ・使用量の記録などの前後処理（DBを使う短い処理）は BedrockClient の
+    同期メソッドを sync_to_async で呼び、モデルの応答待ちだけを AsyncBedrockRuntime でイベントループ上で待つ。
+    前後処理は同時に受け付けた校正どうしで1本のスレッドを取り合わないよう thread_sensitive=False で実行する。
+    サーキットブレーカー・フォールバック・同時実行数リミッターは同期版と同じ共有インスタンスを使う。
+    """
+
+    def __init__(self, client: BedrockClient, runtime: AsyncBedrockRuntime):
+        """
+        Args:
+            client: 前後処理に使うBedrockClient
+            runtime: モデル呼び出しに使うAsyncBedrockRuntime
+        """
+        self.client = client
+        self.runtime = runtime
+
+    async def proofread_text(self, text: str, use_json_mode: bool = True, use_simple_prompt: bool = False,
+                             use_cache: bool = True, use_chunked: bool = False, use_cascade: bool = False,
+                             use_category_passes: bool = False) -> Dict:
+        """
+        テキストの校正を実行（引数と戻り値は BedrockClient.proofread_text と同じ）
+
+        テキストモードと2段階校正は非同期版がないため、スレッドで同期版を実行する。
+        """
+        if not use_json_mode:
+            return await sync_to_async(self.client.proofread_text, thread_sensitive=False)(
+                text, use_json_mode=False, use_simple_prompt=use_simple_prompt, use_cache=use_cache
+            )
+
+        job = await sync_to_async(self.client._start_proofread, thread_sensitive=False)(
+            text, use_json_mode, use_simple_prompt, use_cache, use_chunked, use_cascade, use_category_passes
+        )
+        if "cached" in job:
+            return job["cached"]
+
+        if not is_single_flight_enabled():
+            return await self._run_proofread(job, use_simple_prompt)
+
+        # 同期版の呼び出しとも同じキーでまとめる
+        result, shared = await get_single_flight().do_async(
+            job["flight_key"], lambda: self._run_proofread_shared(job, use_simple_prompt)
+        )
+        return self.client._coalesced_result(result) if shared else result
+
+    async def _run_proofread(self, job: Dict, use_simple_prompt: bool) -> Dict:
+        if job["base_mode"] == "cascade":
+            result = await sync_to_async(self.client.proofread_text_cascade, thread_sensitive=False)(
+                job["text"], use_simple_prompt, prepass=job["prepass"],
+                local_inconsistencies=job["local_inconsistencies"], use_cache=job["use_cache"]
+            )
+        elif job["base_mode"] == "category":
+            result = await self._proofread_by_category(job["text"], job["prepass"])
+        elif job["base_mode"] == "chunked":
+            result = await self._proofread_chunked(job["text"], use_simple_prompt, job["prepass"], job["use_cache"])
+        else:
+            result = await self._proofread_json(job["text"], use_simple_prompt, job["prepass"])
+        return await sync_to_async(self.client._finish_proofread, thread_sensitive=False)(job, result)
+
+    async def _run_proofread_shared(self, job: Dict, use_simple_prompt: bool) -> Dict:
+        if not job["cache_key"] or not is_shared_flight_enabled():
+            return await self._run_proofread(job, use_simple_prompt)
+
+        wait_start = time.time()
+        result, _ = await run_shared_async(
+            get_shared_flight_lock(), job["flight_key"],
+            run=lambda: self._run_proofread(job, use_simple_prompt),
+            lookup=lambda: self.client._peek_cached_result(job["cache_key"], wait_start),
+            poll_interval=getattr(settings, 'PROOFREAD_SINGLE_FLIGHT_POLL_INTERVAL', 0.2)
+        )
+        return result
+
+    async def _proofread_json(self, text: str, use_simple_prompt: bool,
+                              prepass: Optional[DictionaryPrepass]) -> Dict:
+        try:
+            request = await sync_to_async(self.client._prepare_json_request, thread_sensitive=False)(
+                text, use_simple_prompt, prepass
+            )
+            start_time = time.time()
+            response_body, model_id = await self._invoke_with_plan(request["body"], request["plan"], "json")
+            processing_time = time.time() - start_time
+            logger.info(f"AWS Bedrock API呼び出し完了（非同期） - 処理時間: {processing_time:.2f}秒")
+            return await sync_to_async(self.client._finish_json_request, thread_sensitive=False)(
+                text, request, response_body, model_id, processing_time
+            )
+        except Exception as e:
+            return self.client._json_error_result(text, e)
+
+    async def _proofread_chunked(self, text: str, use_simple_prompt: bool,
+                                 prepass: Optional[DictionaryPrepass], use_cache: bool = True) -> Dict:
+        start_time = time.time()
+        max_chunk_tokens = getattr(settings, "PROOFREAD_CHUNK_MAX_TOKENS", 3000)
+        max_workers = getattr(settings, "PROOFREAD_CHUNK_WORKERS", 4)
+        plan = await sync_to_async(self.client._plan_chunks, thread_sensitive=False)(
+            text, max_chunk_tokens, use_simple_prompt, use_cache
+        )
+        chunks = plan["chunks"]
+        logger.info(f"🧩 分割校正開始（非同期） - チャンク数: {len(chunks)}, キャッシュ済み段落: {len(plan['cached'])}, "
+                    f"同時実行数: {min(max_workers, len(chunks))}")
+
+        if len(chunks) <= 1 and not plan["cached"]:
+            result = await self._proofread_json(text, use_simple_prompt, prepass)
+            result["chunk_count"] = len(chunks)
+            await sync_to_async(self.client._store_paragraph_results, thread_sensitive=False)(plan, chunks, [result])
+            return result
+
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def proofread_chunk(chunk: Dict) -> Dict:
+            async with semaphore:
+                return await self._proofread_json(chunk["text"], use_simple_prompt, prepass)
+
+        chunk_results = list(await asyncio.gather(*(proofread_chunk(chunk) for chunk in chunks)))
+        await sync_to_async(self.client._store_paragraph_results, thread_sensitive=False)(plan, chunks, chunk_results)
+        return self.client._merge_chunk_results(text, chunks, chunk_results, start_time, plan["cached"])
+
+    async def _proofread_by_category(self, text: str, prepass: Optional[DictionaryPrepass]) -> Dict:
+        start_time = time.time()
+        requests = await sync_to_async(self.client._prepare_category_requests, thread_sensitive=False)(text, prepass)
+        if not requests:
+            return await self._proofread_json(text, False, prepass)
+        logger.info(f"🗂️ カテゴリー別校正開始（非同期） - カテゴリー: {', '.join(category for category, _ in requests)}")
+
+        async def proofread_category(category: str, request: Dict) -> Dict:
+            try:
+                started = time.time()
+                response_body, model_id = await self._invoke_with_plan(request["body"], request["plan"], "category")
+                return await sync_to_async(self.client._finish_category_request, thread_sensitive=False)(
+                    text, category, request, response_body, model_id, time.time() - started
+                )
+            except Exception as e:
+                return self.client._category_error_result(category, e)
+
+        results = list(await asyncio.gather(*(proofread_category(*item) for item in requests)))
+        return self.client._merge_category_results(text, requests, results, start_time)
+
+    async def _invoke_with_plan(self, body: Dict, plan: Dict, mode: str) -> Tuple[Dict, str]:
+        """BedrockClient._invoke_with_plan の asyncio 版"""
+        async def invoke(read_timeout: int, request_body: Dict) -> Tuple[Dict, str]:
+            async def call(model_id: str) -> Dict:
+                response = await self.runtime.invoke_model(
+                    modelId=model_id,
+                    body=json.dumps(request_body),
+                    contentType="application/json",
+                    read_timeout=read_timeout
+                )
+                return json.loads(response["body"].read())
+            return await self._call_model(call)
+
+        response_body, model_id = await invoke(plan["read_timeout"], body)
+        retry_body = self.client._truncation_retry_body(body, response_body, mode)
+        if retry_body is not None:
+            response_body, model_id = await invoke(self.client.api_timeout, retry_body)
+        return response_body, model_id
+
+    async def _call_model(self, invoke: Callable[[str], Awaitable[Any]]) -> Tuple[Any, str]:
+        """BedrockClient._call_model の asyncio 版（サーキットブレーカーとリミッターを通して呼び出す）"""
+        if not is_circuit_breaker_enabled():
+            model_id = self.client.model_id
+            return await call_with_rate_limit_async(model_id, lambda: invoke(model_id)), model_id
+
+        last_error = None
+        for model_id in self.client._model_candidates():
+            breaker = get_circuit_breaker(model_id)
+            if not breaker.allow_request():
+                logger.warning(f"🚧 サーキットが開いているため {model_id} を使用しません")
+                last_error = last_error or CircuitOpenError(model_id, breaker.retry_after())
+                continue
+            timer = AttemptTimer()
+            try:
+                result = await call_with_rate_limit_async(
+                    model_id, lambda: timer.call_async(lambda: invoke(model_id))
+                )
+            except Exception as e:
+                if not is_model_failure(e):
+                    breaker.release()
+                    raise
+                logger.warning(f"⚠️ モデル呼び出し失敗: {model_id} ({type(e).__name__}: {str(e)})")
+                if breaker.record_failure(timer.seconds, f"{type(e).__name__}: {str(e)}"):
+                    await sync_to_async(self.client._notify_circuit_open, thread_sensitive=False)(breaker)
+                last_error = e
+                continue
+            if breaker.record_success(timer.seconds):
+                await sync_to_async(self.client._notify_circuit_open, thread_sensitive=False)(breaker)
+            if model_id != self.client.model_id:
+                logger.info(f"🔄 フォールバックモデルで呼び出しました: {model_id}")
+            return result, model_id
+        raise last_error
+
+
+# イベントループごとに共有するランタイム（セッションはイベントループに結び付くため）
+_runtimes: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncBedrockRuntime]" = weakref.WeakKeyDictionary()
+
+
+def get_async_bedrock_runtime(region: str) -> AsyncBedrockRuntime:
+    """
+    実行中のイベントループで共有するAsyncBedrockRuntimeを取得する
+
+    Args:
+        region: AWSリージョン
+
+    Returns:
+        共有AsyncBedrockRuntimeインスタンス
+    """
+    loop = asyncio.get_running_loop()
+    runtime = _runtimes.get(loop)
+    if runtime is None:
+        runtime = AsyncBedrockRuntime(
+            region,
+            endpoint_url=getattr(settings, 'BEDROCK_ENDPOINT_URL', '') or None,
+            max_connections=getattr(settings, 'PROOFREAD_ASYNC_MAX_CONNECTIONS', 200),
+        )
+        _runtimes[loop] = runtime
+        logger.info(f"🧩 非同期Bedrockランタイムを作成します ({runtime.endpoint_url})")
+    return runtime
+
+
+async def get_async_proofreader() -> AsyncProofreader:
+    """
+    共有BedrockClientと実行中のイベントループのランタイムを使うAsyncProofreaderを取得する
+
+    Returns:
+        AsyncProofreaderインスタンス
+    """
+    client = await sync_to_async(get_bedrock_client)()
+    return AsyncProofreader(client, get_async_bedrock_runtime(client._aws_region))
+
+
+def async_runtime_stats() -> List[Dict]:
+    """すべてのイベントループのランタイムの統計を返す"""
+    return [runtime.stats() for runtime in list(_runtimes.values())]
+
+
+def reset_async_bedrock_runtimes() -> None:
+    """共有ランタイムを破棄する（セッションは各イベントループの終了時に閉じられる）"""
+    _runtimes.clear()
@@ -1,13 +1,51 @@
 import boto3
 from botocore.config import Config
+import copy
+import hashlib
 import json
 import os
 import time
-from typing import Dict, Any, Tuple, List
+from typing import Dict, Any, Tuple, List, Iterator, Callable, Optional
 import logging
 import re
+import threading
 import traceback
-from proofreading_ai.utils import protect_html_tags_advanced, restore_html_tags_advanced
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from proofreading_ai.utils import (
+    protect_html_tags_advanced, restore_html_tags_advanced, restore_placeholder_corrections,
+    protect_html_segments, restore_html_segments, locate_segment_corrections
+)
+from proofreading_ai.services.stream_parser import CorrectionStreamParser
+from proofreading_ai.services.dictionary_matcher import DictionaryMatcher, get_dictionary_matcher, get_dictionary_version
+from proofreading_ai.services.dictionary_prepass import DictionaryPrepass, is_dictionary_prepass_enabled
+from proofreading_ai.services.token_estimator import get_token_estimator, record_token_usage
+from proofreading_ai.services.circuit_breaker import (
+    AttemptTimer, CircuitOpenError, get_circuit_breaker, is_circuit_breaker_enabled, is_model_failure
+)
+from proofreading_ai.services.rate_limiter import botocore_retry_config, call_with_rate_limit
+from proofreading_ai.services.request_sizing import MODE_OUTPUT_LIMITS, is_adaptive_sizing_enabled, plan_request
+from proofreading_ai.services.inconsistency_detector import (
+    detect_inconsistencies, is_local_inconsistency_enabled, merge_local_inconsistencies
+)
+from proofreading_ai.services.prompt_builder import build_dictionary_prompt_section
+from proofreading_ai.services.result_cache import ProofreadResultCache
+from proofreading_ai.services.single_flight import (
+    get_shared_flight_lock, get_single_flight, is_shared_flight_enabled, is_single_flight_enabled, run_shared
+)
+from proofreading_ai.services.chunking import split_into_chunks, merge_chunk_corrections
+from proofreading_ai.services.incremental import apply_corrections, plan_incremental, remap_reused_corrections
+from proofreading_ai.services.cascade import (
+    SCREENING_TOOL, build_screening_prompt, get_cascade_metrics, get_dictionary_score, get_escalation_threshold,
+    parse_screening_result, screen_locally
+)
+from proofreading_ai.services.category_passes import (
+    CATEGORY_TOOL, DICTIONARY_SECTION_CATEGORIES, build_category_prompt, category_prompt_version, get_pass_categories,
+    merge_category_corrections
+)
+from proofreading_ai.services.paragraph_cache import (
+    build_novel_chunks, from_paragraph_corrections, split_cacheable_paragraphs, to_paragraph_corrections
+)
 
 # チャットワーク通知サービスをインポート
 try:
@@ -19,12 +57,22 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# compact方式のHTMLタグ保護で、プロンプトに付けるマーカーの説明
+COMPACT_MARKER_NOTICE = (
+    "\n\n※ 原文中の <#数字> はHTMLタグをまとめた記号です。"
+    "変更・削除・移動せず、そのまま出力してください。"
+)
+
 class BedrockClient:
     """AWS Bedrockサービスのクライアントクラス - Claude Sonnet 4 アプリケーション推論プロファイル対応"""
     
-    def __init__(self):
+    def __init__(self, bedrock_runtime=None, bedrock=None):
         """
         Bedrockクライアントの初期化（詳細デバッグ対応）
+        
+        Args:
+            bedrock_runtime: 使用するbedrock-runtimeクライアント（省略時はboto3で作成。テスト時はモックを注入）
+            bedrock: 使用するbedrockコントロールプレーンクライアント（省略時はboto3で作成）
         """
         try:
             logger.info("🔧 BedrockClient初期化開始")
@@ -33,41 +81,44 @@ class BedrockClient:
             aws_region = os.environ.get("AWS_REGION", "ap-northeast-1")
             logger.info(f"🌏 AWSリージョン: {aws_region}")
             
-            # AWS認証情報の確認
-            try:
-                import boto3
-                session = boto3.Session()
-                credentials = session.get_credentials()
-                if credentials:
-                    logger.info(f"🔑 AWS認証情報: 利用可能")
-                    logger.info(f"   - アクセスキーID: {credentials.access_key[:8]}...")
-                    logger.info(f"   - トークン: {'あり' if credentials.token else 'なし'}")
-                else:
-                    logger.warning("⚠️ AWS認証情報が見つかりません")
-            except Exception as cred_error:
-                logger.warning(f"⚠️ AWS認証情報確認エラー: {str(cred_error)}")
+            # AWS認証情報の確認（クライアント注入時はスキップ）
+            if bedrock_runtime is None:
+                self._log_aws_credentials()
             
             # Claude 4対応のタイムアウト設定
             # 長時間処理に対応するため大幅に延長
             timeout_config = Config(
                 read_timeout=600,     # 10分
                 connect_timeout=60,   # 1分
-                retries={'max_attempts': 3}
+                retries=botocore_retry_config()
             )
             
-            # Bedrockクライアントの作成
-            self.bedrock_runtime = boto3.client(
-                service_name="bedrock-runtime",
-                region_name=aws_region,
-                config=timeout_config
-            )
-            # コントロールプレーン用のBedrockクライアントも作成
-            self.bedrock = boto3.client(
-                service_name="bedrock",
-                region_name=aws_region,
-                config=timeout_config
-            )
-            logger.info(f"✅ Bedrockランタイムクライアント作成完了")
+            # リクエストごとの読み取りタイムアウト用に、段階値ごとのランタイムクライアントを使い回す
+            self._aws_region = aws_region
+            self._base_read_timeout = timeout_config.read_timeout
+            self._runtime_injected = bedrock_runtime is not None
+            self._runtime_clients = {}
+            self._runtime_clients_lock = threading.Lock()
+            
+            if bedrock_runtime is not None:
+                # 注入されたクライアントを使用（モック・テスト用）
+                self.bedrock_runtime = bedrock_runtime
+                self.bedrock = bedrock
+                logger.info("✅ 注入されたBedrockランタイムクライアントを使用")
+            else:
+                # Bedrockクライアントの作成
+                self.bedrock_runtime = boto3.client(
+                    service_name="bedrock-runtime",
+                    region_name=aws_region,
+                    config=timeout_config
+                )
+                # コントロールプレーン用のBedrockクライアントも作成
+                self.bedrock = boto3.client(
+                    service_name="bedrock",
+                    region_name=aws_region,
+                    config=timeout_config
+                )
+                logger.info(f"✅ Bedrockランタイムクライアント作成完了")
             
             # アプリケーション推論プロファイル使用（校正AI専用）
             # コスト追跡とメトリクス監視が可能
@@ -77,18 +128,20 @@ class BedrockClient:
             self.model_id = "arn:aws:bedrock:ap-northeast-1:026090540679:inference-profile/apac.anthropic.claude-sonnet-4-20250514-v1:0"
             
             # フォールバック: Claude 3.5 Sonnet（動作確認済み）
-            self.fallback_model_id = "anthropic.claude-3-5-sonnet-20240620-v1:0"
+            # プライマリのサーキットが開いている間はこちらに切り替える
+            self.fallback_model_id = os.environ.get("BEDROCK_FALLBACK_MODEL_ID", "anthropic.claude-3-5-sonnet-20240620-v1:0")
             
             logger.info(f"🎯 プライマリモデル: {self.model_id}")
             logger.info(f"🔄 フォールバックモデル: {self.fallback_model_id}")
             
             # モデルアクセス権限の事前確認
-            try:
-                logger.info("🔍 モデルアクセス権限確認開始")
-                self._check_model_access()
-                logger.info("✅ モデルアクセス権限確認完了")
-            except Exception as access_error:
-                logger.warning(f"⚠️ モデルアクセス権限確認エラー: {str(access_error)}")
+            if self.bedrock is not None:
+                try:
+                    logger.info("🔍 モデルアクセス権限確認開始")
+                    self._check_model_access()
+                    logger.info("✅ モデルアクセス権限確認完了")
+                except Exception as access_error:
+                    logger.warning(f"⚠️ モデルアクセス権限確認エラー: {str(access_error)}")
             
             # トークンあたりの価格設定（Claude Sonnet 4）
             self.input_price_per_1k_tokens = float(os.environ.get("INPUT_PRICE_PER_1K_TOKENS", 0.003))
@@ -100,6 +153,12 @@ class BedrockClient:
             logger.info(f"   - 出力: ${self.output_price_per_1k_tokens}/1000トークン")
             logger.info(f"   - 為替レート: {self.yen_per_dollar}円/USD")
             
+            # 2段階校正のスクリーニング用モデル（空の場合は辞書・ルールだけでスクリーニング）
+            self.screen_model_id = getattr(settings, "PROOFREAD_CASCADE_SCREEN_MODEL_ID", "")
+            self.screen_input_price_per_1k_tokens = getattr(settings, "PROOFREAD_CASCADE_SCREEN_INPUT_PRICE_PER_1K_TOKENS", 0.00025)
+            self.screen_output_price_per_1k_tokens = getattr(settings, "PROOFREAD_CASCADE_SCREEN_OUTPUT_PRICE_PER_1K_TOKENS", 0.00125)
+            logger.info(f"🔎 スクリーニング用モデル: {self.screen_model_id or 'なし（辞書・ルールのみ）'}")
+            
             # アプリケーション推論プロファイル情報
             self.profile_info = {
                 "name": "proofreading-ai-claude-sonnet-4",
@@ -118,6 +177,10 @@ class BedrockClient:
             self.api_timeout = int(os.environ.get("BEDROCK_API_TIMEOUT", 600))  # デフォルト10分（大容量テキスト校正対応）
             logger.info(f"⏰ APIタイムアウト: {self.api_timeout}秒")
             
+            # HTMLタグ保護方式（legacy: タグ名・属性も校正対象 / compact: テキスト部分のみ送信）
+            self.html_protection = os.environ.get("BEDROCK_HTML_PROTECTION", "legacy")
+            logger.info(f"🏷️ HTMLタグ保護方式: {self.html_protection}")
+            
             # プロンプトファイルのパスを設定
             base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
             self.prompt_path = os.environ.get(
@@ -136,6 +199,23 @@ class BedrockClient:
                 logger.warning(f"⚠️ プロンプトファイルが見つかりません: {self.prompt_path}")
                 self.default_prompt = self._get_default_prompt()
                 logger.info(f"✅ デフォルトプロンプト使用: {len(self.default_prompt)}文字")
+            
+            # プロンプトのバージョン（キャッシュキーに使用）
+            self.prompt_version = hashlib.sha256(self.default_prompt.encode("utf-8")).hexdigest()[:12]
+            
+            # 校正結果キャッシュ（全ワーカー共有）
+            self.result_cache = ProofreadResultCache()
+            logger.info(f"🗃️ 校正結果キャッシュ: {'有効' if self.result_cache.enabled else '無効'} (プロンプト版: {self.prompt_version})")
+            
+            # 段落単位の校正結果キャッシュ（定型文の段落を分割校正でモデルに送らない）
+            self.paragraph_cache = ProofreadResultCache(
+                'paragraph',
+                max_entries=getattr(settings, "PROOFREAD_PARAGRAPH_CACHE_MAX_ENTRIES", 5000),
+                ttl=getattr(settings, "PROOFREAD_PARAGRAPH_CACHE_TTL", 604800)
+            )
+            self.paragraph_cache.enabled = (
+                self.result_cache.enabled and getattr(settings, "PROOFREAD_PARAGRAPH_CACHE_ENABLED", True)
+            )
                 
             logger.info("🎉 BedrockClient初期化完了")
             
@@ -165,6 +245,22 @@ class BedrockClient:
             
             raise e
 
+    def _log_aws_credentials(self):
+        """
+        AWS認証情報の状況をログ出力する
+        """
+        try:
+            session = boto3.Session()
+            credentials = session.get_credentials()
+            if credentials:
+                logger.info(f"🔑 AWS認証情報: 利用可能")
+                logger.info(f"   - アクセスキーID: {credentials.access_key[:8]}...")
+                logger.info(f"   - トークン: {'あり' if credentials.token else 'なし'}")
+            else:
+                logger.warning("⚠️ AWS認証情報が見つかりません")
+        except Exception as cred_error:
+            logger.warning(f"⚠️ AWS認証情報確認エラー: {str(cred_error)}")
+
     def _check_model_access(self):
         """
         モデルアクセス権限を事前確認する
@@ -230,34 +326,233 @@ class BedrockClient:
 
     def count_tokens(self, text: str) -> int:
         """
-        トークン数を概算する簡易的な方法
-        実際のトークン化アルゴリズムとは異なる場合があります
+        トークン数を推定する
+        （文字種ごとの係数による推定。係数は記録済みの実測トークン数で較正される）
         
         Args:
             text: トークン数を計算するテキスト
             
         Returns:
-            概算トークン数
+            推定トークン数
+        """
+        return get_token_estimator().estimate(text)
+    
+    def _account_usage(self, mode: str, prompt: str, output_text: str, usage: Dict,
+                       estimated_input_tokens: int, processing_time: float, original_length: int,
+                       model_id: Optional[str] = None) -> Tuple[int, int, float]:
+        """
+        レスポンスのusageから実測トークン数を確定し、記録する
+        （usageが無い場合は推定値を使い、記録はしない）
+        
+        Args:
+            mode: 校正モード
+            prompt: 送信したプロンプト
+            output_text: モデルの出力（Tool Useの場合は入力JSON）
+            usage: レスポンスのusage
+            estimated_input_tokens: 送信前の推定入力トークン数
+            processing_time: 処理時間（秒）
+            original_length: 原文の文字数
+            model_id: 実際に呼び出したモデルID（省略時はプライマリモデル）
+            
+        Returns:
+            (入力トークン数, 出力トークン数, 推定コスト)
         """
-        # 日本語は文字あたり約1.5トークンと概算
-        return int(len(text) * 1.5)
+        estimated_output_tokens = self.count_tokens(output_text)
+        input_tokens = usage.get("input_tokens") or estimated_input_tokens
+        output_tokens = usage.get("output_tokens") or estimated_output_tokens
+        total_cost = self.calculate_cost(input_tokens, output_tokens, model_id)
+        logger.info(
+            f"📏 トークン数: 入力 {input_tokens}（推定 {estimated_input_tokens}）, "
+            f"出力 {output_tokens}（推定 {estimated_output_tokens}）"
+        )
+        logger.info(f"💰 推定コスト: {total_cost:.2f}円")
+        if usage.get("input_tokens") and usage.get("output_tokens"):
+            record_token_usage(
+                mode=mode,
+                model_id=model_id or self.model_id,
+                prompt=prompt,
+                output_text=output_text,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                estimated_input_tokens=estimated_input_tokens,
+                estimated_output_tokens=estimated_output_tokens,
+                latency=processing_time,
+                estimated_cost=total_cost,
+                original_length=original_length,
+            )
+        return input_tokens, output_tokens, total_cost
     
-    def calculate_cost(self, input_tokens: int, output_tokens: int) -> float:
+    def calculate_cost(self, input_tokens: int, output_tokens: int, model_id: Optional[str] = None) -> float:
         """
         コストを計算する
         
         Args:
             input_tokens: 入力トークン数
             output_tokens: 出力トークン数
+            model_id: 呼び出したモデルID（スクリーニング用モデルの場合はその価格で計算）
             
         Returns:
             日本円でのコスト
         """
-        input_cost = (input_tokens / 1000) * self.input_price_per_1k_tokens
-        output_cost = (output_tokens / 1000) * self.output_price_per_1k_tokens
+        if model_id and model_id == self.screen_model_id:
+            input_price, output_price = self.screen_input_price_per_1k_tokens, self.screen_output_price_per_1k_tokens
+        else:
+            input_price, output_price = self.input_price_per_1k_tokens, self.output_price_per_1k_tokens
+        input_cost = (input_tokens / 1000) * input_price
+        output_cost = (output_tokens / 1000) * output_price
         return (input_cost + output_cost) * self.yen_per_dollar
     
-    def proofread_text(self, text: str, use_json_mode: bool = True, use_simple_prompt: bool = False) -> Dict:
+    def _runtime_for_timeout(self, read_timeout: int):
+        """
+        指定の読み取りタイムアウトを持つbedrock-runtimeクライアントを返す
+        （botocoreは呼び出しごとにタイムアウトを変えられないため、段階値ごとにクライアントを作って使い回す）
+        
+        Args:
+            read_timeout: 読み取りタイムアウト（秒）
+            
+        Returns:
+            bedrock-runtimeクライアント（注入されたクライアントの場合はそのまま）
+        """
+        if self._runtime_injected or read_timeout >= self._base_read_timeout:
+            return self.bedrock_runtime
+        with self._runtime_clients_lock:
+            runtime = self._runtime_clients.get(read_timeout)
+            if runtime is None:
+                runtime = boto3.client(
+                    service_name="bedrock-runtime",
+                    region_name=self._aws_region,
+                    config=Config(
+                        read_timeout=read_timeout,
+                        connect_timeout=min(60, read_timeout),
+                        retries=botocore_retry_config()
+                    )
+                )
+                self._runtime_clients[read_timeout] = runtime
+                logger.info(f"⏰ 読み取りタイムアウト{read_timeout}秒のランタイムクライアントを作成")
+            return runtime
+    
+    def _model_candidates(self) -> List[str]:
+        """呼び出しを試すモデルIDを優先順に返す（プライマリ、フォールバック）"""
+        candidates = [self.model_id]
+        if self.fallback_model_id and self.fallback_model_id != self.model_id:
+            candidates.append(self.fallback_model_id)
+        return candidates
+    
+    def _call_model(self, invoke: Callable[[str], Any], candidates: Optional[List[str]] = None) -> Tuple[Any, str]:
+        """
+        サーキットブレーカーとモデルごとの同時実行数リミッターを通してモデルを呼び出す
+        
+        スロットリングはリミッターが待って再試行し、それでも失敗した場合や
+        プライマリモデルのサーキットが開いている場合は、フォールバックモデルで呼び出す。
+        
+        Args:
+            invoke: モデルIDを受け取って呼び出しを行う関数
+            candidates: 呼び出しを試すモデルID（省略時はプライマリ、フォールバックの順）
+            
+        Returns:
+            (invoke の戻り値, 実際に呼び出したモデルID)
+        """
+        candidates = candidates or self._model_candidates()
+        if not is_circuit_breaker_enabled():
+            return call_with_rate_limit(candidates[0], lambda: invoke(candidates[0])), candidates[0]
+        
+        last_error = None
+        for model_id in candidates:
+            breaker = get_circuit_breaker(model_id)
+            if not breaker.allow_request():
+                logger.warning(f"🚧 サーキットが開いているため {model_id} を使用しません")
+                last_error = last_error or CircuitOpenError(model_id, breaker.retry_after())
+                continue
+            # サーキットの遅延はモデル呼び出しの各試行だけで測る（リミッターの待ち時間を含めない）
+            timer = AttemptTimer()
+            try:
+                result = call_with_rate_limit(model_id, lambda: timer.call(lambda: invoke(model_id)))
+            except Exception as e:
+                if not is_model_failure(e):
+                    # リクエスト内容の誤り・このプロセスの混雑はモデルを替えても解決しない
+                    breaker.release()
+                    raise
+                logger.warning(f"⚠️ モデル呼び出し失敗: {model_id} ({type(e).__name__}: {str(e)})")
+                if breaker.record_failure(timer.seconds, f"{type(e).__name__}: {str(e)}"):
+                    self._notify_circuit_open(breaker)
+                last_error = e
+                continue
+            if breaker.record_success(timer.seconds):
+                self._notify_circuit_open(breaker)
+            if model_id != candidates[0]:
+                logger.info(f"🔄 フォールバックモデルで呼び出しました: {model_id}")
+            return result, model_id
+        raise last_error
+    
+    def _notify_circuit_open(self, breaker) -> None:
+        """サーキットが開いたことをChatworkに通知する（遮断ごとに1回）"""
+        if not (CHATWORK_AVAILABLE and ChatworkNotificationService):
+            return
+        try:
+            chatwork_service = ChatworkNotificationService()
+            if chatwork_service.is_configured():
+                chatwork_service.send_error_notification(
+                    error_type="BEDROCK_CIRCUIT_OPEN",
+                    error_message=f"Bedrockモデルのサーキットを遮断しました: {breaker.name}",
+                    context=breaker.metrics()
+                )
+        except Exception as notification_error:
+            logger.error(f"❌ Chatwork API エラー通知送信失敗: {str(notification_error)}")
+    
+    def _invoke_with_plan(self, body: Dict, plan: Dict, mode: str) -> Tuple[Dict, str]:
+        """
+        リクエストごとに決めた max_tokens・タイムアウトでモデルを呼び出す
+        
+        出力が max_tokens で打ち切られた場合は、モードの上限まで広げて1回だけ再実行する。
+        
+        Args:
+            body: APIリクエストボディ（max_tokens は plan の値を設定済み）
+            plan: plan_request の結果
+            mode: 校正モード（json / text）
+            
+        Returns:
+            (レスポンスボディ, 実際に呼び出したモデルID)
+        """
+        def invoke(read_timeout: int, request_body: Dict) -> Tuple[Dict, str]:
+            def call(model_id: str) -> Dict:
+                response = self._runtime_for_timeout(read_timeout).invoke_model(
+                    modelId=model_id,
+                    body=json.dumps(request_body),
+                    contentType="application/json"
+                )
+                return json.loads(response["body"].read())
+            return self._call_model(call)
+        
+        response_body, model_id = invoke(plan["read_timeout"], body)
+        
+        retry_body = self._truncation_retry_body(body, response_body, mode)
+        if retry_body is not None:
+            response_body, model_id = invoke(self.api_timeout, retry_body)
+        return response_body, model_id
+    
+    def _truncation_retry_body(self, body: Dict, response_body: Dict, mode: str) -> Optional[Dict]:
+        """
+        出力が max_tokens で打ち切られた場合に、モードの上限まで広げた再実行用のリクエストボディを返す
+        
+        Returns:
+            再実行用のリクエストボディ（再実行が不要な場合はNone）
+        """
+        limit = MODE_OUTPUT_LIMITS[mode]
+        if response_body.get("stop_reason") == "max_tokens" and body["max_tokens"] < limit:
+            logger.warning(f"⚠️ 出力がmax_tokens({body['max_tokens']})で打ち切られたため上限{limit}で再実行します")
+            return dict(body, max_tokens=limit)
+        return None
+    
+    def _needs_chunking(self, text: str) -> bool:
+        """1回の呼び出しでは出力がmax_tokensの上限に収まらない見込みかどうか"""
+        if not is_adaptive_sizing_enabled() or not getattr(settings, "PROOFREAD_AUTO_CHUNK", True):
+            return False
+        plan = plan_request("json", len(text), 0, self.api_timeout)
+        return not plan["fits"]
+    
+    def proofread_text(self, text: str, use_json_mode: bool = True, use_simple_prompt: bool = False,
+                       use_cache: bool = True, use_chunked: bool = False, use_cascade: bool = False,
+                       use_category_passes: bool = False) -> Dict:
         """
         テキストの校正を実行
         
@@ -265,70 +560,1185 @@ class BedrockClient:
             text: 校正対象のテキスト
             use_json_mode: JSONモード（Tool Use）を使用するか
             use_simple_prompt: シンプルプロンプト（高速処理）を使用するか
+            use_cache: 校正結果キャッシュを使用するか
+            use_chunked: 段落単位に分割して並列校正するか（JSONモードのみ）
+            use_cascade: スクリーニングで選んだ段落だけをフル校正する2段階校正にするか（JSONモードのみ）
+            use_category_passes: カテゴリーごとの校正を並列に実行して結合するか（JSONモードのみ）
             
         Returns:
             校正結果の辞書
         """
-        logger.info(f"校正開始 - 文字数: {len(text)}文字, JSONモード: {use_json_mode}, シンプルプロンプト: {use_simple_prompt}")
+        job = self._start_proofread(text, use_json_mode, use_simple_prompt, use_cache, use_chunked, use_cascade,
+                                    use_category_passes)
+        if "cached" in job:
+            return job["cached"]
+        
+        if not is_single_flight_enabled():
+            return self._run_proofread(job, use_simple_prompt)
         
-        if use_json_mode:
-            return self._proofread_with_json_mode(text, use_simple_prompt)
+        # 同じ原稿・設定の校正が実行中なら、モデルを呼ばずにその結果を共有する
+        result, shared = get_single_flight().do(
+            job["flight_key"], lambda: self._run_proofread_shared(job, use_simple_prompt)
+        )
+        return self._coalesced_result(result) if shared else result
+    
+    def _run_proofread(self, job: Dict, use_simple_prompt: bool) -> Dict:
+        """モデルによる校正を実行し、共通の後処理を行う"""
+        text = job["text"]
+        if job["base_mode"] == "cascade":
+            result = self.proofread_text_cascade(text, use_simple_prompt, prepass=job["prepass"],
+                                                 local_inconsistencies=job["local_inconsistencies"],
+                                                 use_cache=job["use_cache"])
+        elif job["base_mode"] == "category":
+            result = self.proofread_text_by_category(text, prepass=job["prepass"])
+        elif job["base_mode"] == "chunked":
+            result = self.proofread_text_chunked(text, use_simple_prompt, prepass=job["prepass"],
+                                                 use_cache=job["use_cache"])
+        elif job["base_mode"] == "json":
+            result = self._proofread_with_json_mode(text, use_simple_prompt, prepass=job["prepass"])
         else:
-            return self._proofread_with_text_mode(text, use_simple_prompt)
+            result = self._proofread_with_text_mode(text, use_simple_prompt, prepass=job["prepass"])
+        
+        return self._finish_proofread(job, result)
+    
+    def _run_proofread_shared(self, job: Dict, use_simple_prompt: bool) -> Dict:
+        """
+        他のワーカーで同じ校正が実行中ならその完了を待って結果を受け取り、なければ校正を実行する
+        （結果は校正結果キャッシュで受け渡すため、キャッシュを使う場合のみワーカーをまたいでまとめる）
+        """
+        if not job["cache_key"] or not is_shared_flight_enabled():
+            return self._run_proofread(job, use_simple_prompt)
+        
+        wait_start = time.time()
+        result, _ = run_shared(
+            get_shared_flight_lock(), job["flight_key"],
+            run=lambda: self._run_proofread(job, use_simple_prompt),
+            lookup=lambda: self._peek_cached_result(job["cache_key"], wait_start),
+            poll_interval=getattr(settings, "PROOFREAD_SINGLE_FLIGHT_POLL_INTERVAL", 0.2)
+        )
+        return result
+    
+    def _peek_cached_result(self, cache_key: str, wait_start: float) -> Optional[Dict]:
+        """他のワーカーが保存した校正結果をキャッシュから取り出す（ない場合はNone）"""
+        cached = self.result_cache.peek(cache_key)
+        if cached is None:
+            return None
+        logger.info(f"🔗 他のワーカーの校正結果を共有: {cache_key[:12]}")
+        return dict(self._cache_hit_result(cached, wait_start), coalesced=True)
+    
+    def _cache_hit_result(self, cached: Dict, lookup_start: float) -> Dict:
+        """キャッシュから取り出した結果に、今回の処理時間と使用量0を設定する"""
+        return dict(
+            cached,
+            processing_time=time.time() - lookup_start,
+            original_processing_time=cached.get("processing_time", 0),
+            input_tokens=0,
+            output_tokens=0,
+            estimated_cost=0,
+            cache_hit=True
+        )
+    
+    @staticmethod
+    def _coalesced_result(result: Dict) -> Dict:
+        """
+        実行中の同じ校正に合流した呼び出しに返す結果
+        （呼び出し元ごとに書き換えられるよう複製し、モデルを呼んでいないため使用量は0にする）
+        """
+        return dict(
+            copy.deepcopy(result),
+            input_tokens=0,
+            output_tokens=0,
+            estimated_cost=0,
+            coalesced=True
+        )
+    
+    def _proofread_mode(self, use_json_mode: bool, use_simple_prompt: bool, use_chunked: bool,
+                        use_cascade: bool, use_category_passes: bool) -> Tuple[str, str]:
+        """
+        校正の方式と、結果を使い回せるかの判定に使うモード文字列を決める
+        
+        Returns:
+            (方式（cascade / category / chunked / json / text）, 方式と設定を含むモード文字列)
+        """
+        if use_cascade and use_json_mode:
+            base_mode = "cascade"
+        elif use_category_passes and use_json_mode:
+            base_mode = "category"
+        elif use_chunked and use_json_mode:
+            base_mode = "chunked"
+        else:
+            base_mode = "json" if use_json_mode else "text"
+        mode = base_mode + (":simple" if use_simple_prompt else "")
+        if base_mode == "cascade":
+            # スクリーニングの設定が違う結果は使い回さない
+            mode += (f":{self.screen_model_id}:{get_escalation_threshold()}:{get_dictionary_score()}"
+                     f":{self._max_escalation_ratio()}")
+        elif base_mode == "category":
+            # カテゴリー別のプロンプトと実行するカテゴリー（優先順）が違う結果は使い回さない
+            mode += f":{category_prompt_version()}:{','.join(get_pass_categories())}"
+        return base_mode, mode
+    
+    def _start_proofread(self, text: str, use_json_mode: bool, use_simple_prompt: bool,
+                         use_cache: bool, use_chunked: bool, use_cascade: bool = False,
+                         use_category_passes: bool = False) -> Dict:
+        """
+        モデル呼び出し前の共通処理（モード決定・キャッシュ参照・辞書の事前適用・ローカル矛盾検出）
+        
+        同期版 proofread_text と非同期版（AsyncProofreader）の両方から呼ばれる。
+        
+        Returns:
+            text, mode, base_mode, cache_key, use_cache, flight_key, prepass, local_inconsistencies を持つ辞書
+            （キャッシュヒット時は cached に結果を持つ）
+        """
+        if (use_json_mode and not use_chunked and not use_cascade and not use_category_passes
+                and self._needs_chunking(text)):
+            # 出力が上限に収まらない長さの原稿は分割校正に切り替える
+            logger.info(f"🧩 出力が上限を超える見込みのため分割校正に切り替えます - 文字数: {len(text)}文字")
+            use_chunked = True
+        
+        logger.info(f"校正開始 - 文字数: {len(text)}文字, JSONモード: {use_json_mode}, シンプルプロンプト: {use_simple_prompt}, 分割: {use_chunked}, 2段階: {use_cascade}, カテゴリー別: {use_category_passes}")
+        
+        base_mode, mode = self._proofread_mode(use_json_mode, use_simple_prompt, use_chunked, use_cascade,
+                                               use_category_passes)
+        
+        cache_key = None
+        if use_cache and self.result_cache.enabled:
+            lookup_start = time.time()
+            cache_key = self._make_result_cache_key(text, mode)
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"⚡ 校正結果キャッシュヒット: {cache_key[:12]}")
+                return {"cached": self._cache_hit_result(cached, lookup_start)}
+        
+        # 辞書ルールで機械的に決まる修正はモデルに任せずローカルで確定する
+        return {
+            "text": text,
+            "mode": mode,
+            "base_mode": base_mode,
+            "cache_key": cache_key,
+            "use_cache": use_cache,
+            "flight_key": self._make_flight_key(text, mode) if is_single_flight_enabled() else None,
+            "prepass": DictionaryPrepass(text) if is_dictionary_prepass_enabled() else None,
+            "local_inconsistencies": self._detect_local_inconsistencies(text),
+        }
+    
+    def _finish_proofread(self, job: Dict, result: Dict) -> Dict:
+        """
+        モデル呼び出し後の共通処理（ローカルで確定した修正箇所の結合・キャッシュ保存）
+        
+        Args:
+            job: _start_proofread の戻り値
+            result: モデルによる校正結果
+            
+        Returns:
+            校正結果の辞書
+        """
+        prepass = job["prepass"]
+        local_inconsistencies = job["local_inconsistencies"]
+        if prepass is not None and "error" not in result:
+            result = prepass.merge_into(result)
+        if local_inconsistencies and "error" not in result:
+            result = merge_local_inconsistencies(result, local_inconsistencies)
+        
+        # エラー結果・フォールバックモデルの結果はキャッシュしない
+        if job["cache_key"] and "error" not in result and not result.get("fallback_used"):
+            self.result_cache.set(job["cache_key"], result)
+        return result
+    
+    def _protect_html(self, text: str) -> Tuple[str, Callable[[str, List[Dict]], Tuple[str, List[Dict]]]]:
+        """
+        設定された方式でHTMLタグを保護する
+        
+        Args:
+            text: 元テキスト
+            
+        Returns:
+            保護後のテキストと、モデル出力（と修正箇所）からHTMLを復元する関数
+            （復元する関数は復元後のテキストと修正箇所を返す。修正箇所のプレースホルダー・マーカーも
+            元のタグに戻し、compact方式ではオフセット対応表で元テキスト基準の 'position' を付ける）
+        """
+        if self.html_protection == "compact":
+            protected_text, tag_runs, offset_map = protect_html_segments(text)
+            return protected_text, lambda corrected, corrections: (
+                restore_html_segments(corrected, tag_runs),
+                locate_segment_corrections(protected_text, tag_runs, offset_map, corrections)
+            )
+        
+        protected_text, placeholders, html_tag_info = protect_html_tags_advanced(text)
+        return protected_text, lambda corrected, corrections: (
+            restore_html_tags_advanced(corrected, placeholders, html_tag_info, corrections),
+            restore_placeholder_corrections(corrections, placeholders, html_tag_info)
+        )
+    
+    def _build_prompt(self, protected_text: str, notice: str = "") -> str:
+        """
+        保護後のテキストをプロンプトに埋め込む
+        （原稿に関係する社内辞書・矛盾チェック項目を加え、compact方式ではマーカーの説明を、
+        辞書の事前適用時は処理済み語句の説明を付ける）
+        """
+        prompt = self.default_prompt.replace("{原文}", protected_text)
+        prompt += build_dictionary_prompt_section(protected_text, self.count_tokens)
+        if self.html_protection == "compact":
+            prompt += COMPACT_MARKER_NOTICE
+        return prompt + notice
+    
+    def _make_result_cache_key(self, text: str, mode: str) -> str:
+        """
+        校正結果キャッシュのキーを生成する
+        （原文、HTML保護方式、プロンプト版、モデルID、モード、辞書版のハッシュ。
+        保護後のテキストは原文と保護方式で決まるため、キャッシュ参照のためにHTML保護はしない）
+        """
+        return self.result_cache.make_key(
+            text, self.prompt_version, self.model_id, mode, self.html_protection, get_dictionary_version(),
+            is_dictionary_prepass_enabled(), is_local_inconsistency_enabled()
+        )
+    
+    def _make_flight_key(self, text: str, mode: str) -> str:
+        """
+        実行中の同じ校正をまとめるキーを生成する
+        （キャッシュキーと違いHTMLタグを含む原文そのものを使う。まとめた結果は原文の位置までそのまま返すため）
+        """
+        return self.result_cache.make_key(
+            "flight", text, self.prompt_version, self.model_id, mode, self.html_protection, get_dictionary_version(),
+            is_dictionary_prepass_enabled(), is_local_inconsistency_enabled()
+        )
+    
+    def _detect_local_inconsistencies(self, text: str) -> List[Dict]:
+        """
+        矛盾検出データと数値・日付の組み込みチェックでローカルに矛盾を検出する
+        
+        Args:
+            text: 校正対象のテキスト
+            
+        Returns:
+            inconsistency カテゴリーの修正箇所のリスト（無効時・失敗時は空リスト）
+        """
+        if not is_local_inconsistency_enabled():
+            return []
+        try:
+            return detect_inconsistencies(text)
+        except Exception as e:
+            # 検出に失敗してもモデルによる校正は続行する
+            logger.warning(f"⚠️ ローカル矛盾検出に失敗: {str(e)}")
+            return []
     
-    def _proofread_with_json_mode(self, text: str, use_simple_prompt: bool = False) -> Dict:
+    def _proofread_with_json_mode(self, text: str, use_simple_prompt: bool = False,
+                                  prepass: Optional[DictionaryPrepass] = None) -> Dict:
         """
         JSONモード（Tool Use）で校正を実行
+        
+        prepass を指定した場合は、辞書ルールで処理済みの語句をプロンプトで伝える
+        （修正箇所の結合は呼び出し側で行う）。
         """
         try:
-            # HTMLタグ保護
-            protected_text, placeholders, html_tag_info = protect_html_tags_advanced(text)
+            request = self._prepare_json_request(text, use_simple_prompt, prepass)
             
-            # プロンプト選択
-            if use_simple_prompt:
-                prompt = self.default_prompt.replace("{原文}", protected_text)
-                logger.info("🚀 高速処理モード: デフォルトプロンプト使用")
+            # API呼び出し
+            logger.info("AWS Bedrock API呼び出し開始（JSON Mode）")
+            start_time = time.time()
+            
+            response_body, model_id = self._invoke_with_plan(request["body"], request["plan"], "json")
+            
+            processing_time = time.time() - start_time
+            logger.info(f"AWS Bedrock API呼び出し完了 - 処理時間: {processing_time:.2f}秒")
+            
+            return self._finish_json_request(text, request, response_body, model_id, processing_time)
+            
+        except Exception as e:
+            return self._json_error_result(text, e)
+    
+    def _prepare_json_request(self, text: str, use_simple_prompt: bool = False,
+                              prepass: Optional[DictionaryPrepass] = None) -> Dict:
+        """
+        JSONモードのリクエストを組み立てる（プロンプト・max_tokens とタイムアウトの決定）
+        
+        Returns:
+            body, plan, prompt, input_tokens, predicted_time, restore_html を持つ辞書
+        """
+        # HTMLタグ保護
+        protected_text, restore_html = self._protect_html(text)
+        notice = prepass.prompt_notice(text) if prepass is not None else ""
+        
+        # プロンプト選択
+        if use_simple_prompt:
+            prompt = self._build_prompt(protected_text, notice)
+            logger.info("🚀 高速処理モード: デフォルトプロンプト使用")
+        else:
+            prompt = self._build_prompt(protected_text, notice)
+            logger.info("🎯 標準処理モード: デフォルトプロンプト使用")
+        
+        # 入力トークン数と処理時間を推定
+        estimator = get_token_estimator()
+        input_tokens = estimator.estimate(prompt)
+        predicted_time = estimator.predict_latency(input_tokens, estimator.estimate(protected_text))
+        logger.info(f"📏 入力トークン数（推定）: {input_tokens}, ⏱️ 予測処理時間: {predicted_time:.1f}秒")
+        
+        # 原稿の長さと実測の出力比率から max_tokens とタイムアウトを決める
+        plan = plan_request("json", len(text), input_tokens, self.api_timeout, estimator)
+        logger.info(f"📐 max_tokens: {plan['max_tokens']}, 読み取りタイムアウト: {plan['read_timeout']}秒")
+        
+        # Tool Use設定
+        tools = [{
+            "name": "proofreading_result",
+            "description": "校正結果をJSON形式で出力するツール",
+            "input_schema": {
+                "type": "object",
+                "properties": {
+                    "corrected_text": {
+                        "type": "string",
+                        "description": "校正後のHTML込みテキスト全文"
+                    },
+                    "corrections": {
+                        "type": "array",
+                        "description": "修正箇所のリスト",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "line_number": {
+                                    "type": "integer",
+                                    "description": "修正箇所の行番号"
+                                },
+                                "original": {
+                                    "type": "string",
+                                    "description": "修正前のテキスト"
+                                },
+                                "corrected": {
+                                    "type": "string",
+                                    "description": "修正後のテキスト"
+                                },
+                                "reason": {
+                                    "type": "string",
+                                    "description": "修正理由の説明"
+                                },
+                                "category": {
+                                    "type": "string",
+                                    "enum": ["tone", "typo", "dict", "inconsistency"],
+                                    "description": "修正カテゴリー: tone=言い回し, typo=誤字修正, dict=辞書ルール, inconsistency=矛盾チェック"
+                                }
+                            },
+                            "required": ["line_number", "original", "corrected", "reason", "category"]
+                        }
+                    }
+                },
+                "required": ["corrected_text", "corrections"]
+            }
+        }]
+        
+        # APIリクエストボディ
+        body = {
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": plan["max_tokens"],
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "tools": tools,
+            "tool_choice": {"type": "tool", "name": "proofreading_result"}
+        }
+        
+        return {
+            "body": body,
+            "plan": plan,
+            "prompt": prompt,
+            "input_tokens": input_tokens,
+            "predicted_time": predicted_time,
+            "restore_html": restore_html,
+        }
+    
+    def _finish_json_request(self, text: str, request: Dict, response_body: Dict, model_id: str,
+                             processing_time: float) -> Dict:
+        """
+        JSONモードのレスポンスから校正結果を組み立てる（Tool Use結果の抽出・使用量の記録・HTMLタグ復元）
+        
+        Args:
+            text: 校正対象のテキスト
+            request: _prepare_json_request の戻り値
+            response_body: モデルのレスポンスボディ
+            model_id: 実際に呼び出したモデルID
+            processing_time: モデル呼び出しにかかった秒数
+            
+        Returns:
+            校正結果の辞書
+        """
+        # レスポンス解析
+        logger.info(f"APIレスポンス: {json.dumps(response_body, ensure_ascii=False, indent=2)}")
+        
+        # Tool Use結果の抽出
+        if "content" not in response_body or not response_body["content"]:
+            raise ValueError("APIレスポンスにcontentが含まれていません")
+        
+        tool_use_content = None
+        for content_block in response_body["content"]:
+            if content_block.get("type") == "tool_use":
+                tool_use_content = content_block.get("input", {})
+                break
+        
+        if not tool_use_content:
+            raise ValueError("Tool Useの結果が見つかりません")
+        
+        # HTMLタグ復元
+        corrected_text = tool_use_content.get("corrected_text", "")
+        corrections = tool_use_content.get("corrections", [])
+        
+        # 実測トークン数とコスト
+        input_tokens, output_tokens, total_cost = self._account_usage(
+            "json", request["prompt"], json.dumps(tool_use_content, ensure_ascii=False), response_body.get("usage", {}),
+            request["input_tokens"], processing_time, len(text), model_id
+        )
+        
+        # プレースホルダーからHTMLタグを復元（4つの引数を正しく渡す）
+        final_text, corrections = request["restore_html"](corrected_text, corrections)
+        
+        return {
+            "corrected_text": final_text,
+            "corrections": corrections,
+            "processing_time": processing_time,
+            "original_length": len(text),
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "estimated_cost": total_cost,
+            "predicted_processing_time": request["predicted_time"],
+            "model_id": model_id,
+            "fallback_used": model_id != self.model_id,
+            "mode": "json"
+        }
+    
+    def _json_error_result(self, text: str, error: Exception) -> Dict:
+        """JSONモードの校正に失敗した場合の結果を返す"""
+        error_msg = f"校正処理中にエラーが発生しました: {str(error)}"
+        logger.error(f"{error_msg}\n{traceback.format_exc()}")
+        return {
+            "error": error_msg,
+            "corrected_text": text,
+            "corrections": [],
+            "processing_time": 0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "estimated_cost": 0,
+            "mode": "json"
+        }
+    
+    def proofread_text_chunked(self, text: str, use_simple_prompt: bool = False,
+                               max_chunk_tokens: int = None, max_workers: int = None,
+                               prepass: Optional[DictionaryPrepass] = None, use_cache: bool = True) -> Dict:
+        """
+        テキストを段落境界でチャンクに分割し、並列に校正して結合する
+        
+        処理時間は記事全体の長さではなく最も遅いチャンクに比例する。
+        段落単位のキャッシュにある段落（SNS埋め込みのキャプション・クレジット・定型の締めの段落など）は
+        モデルに送らず、キャッシュした修正箇所を使う。
+        
+        Args:
+            text: 校正対象のテキスト
+            use_simple_prompt: シンプルプロンプト（高速処理）を使用するか
+            max_chunk_tokens: 1チャンクあたりの最大トークン数（省略時は settings.PROOFREAD_CHUNK_MAX_TOKENS）
+            max_workers: 同時実行数（省略時は settings.PROOFREAD_CHUNK_WORKERS）
+            prepass: 辞書の事前適用結果（各チャンクのプロンプトに処理済み語句を伝える）
+            use_cache: 段落単位のキャッシュを使用するか
+            
+        Returns:
+            校正結果の辞書（修正箇所の行番号・文字位置は元テキスト基準）
+        """
+        start_time = time.time()
+        max_chunk_tokens = max_chunk_tokens or getattr(settings, "PROOFREAD_CHUNK_MAX_TOKENS", 3000)
+        max_workers = max_workers or getattr(settings, "PROOFREAD_CHUNK_WORKERS", 4)
+        
+        plan = self._plan_chunks(text, max_chunk_tokens, use_simple_prompt, use_cache)
+        chunks = plan["chunks"]
+        logger.info(f"🧩 分割校正開始 - チャンク数: {len(chunks)}, キャッシュ済み段落: {len(plan['cached'])}, "
+                    f"同時実行数: {min(max_workers, len(chunks))}")
+        
+        if len(chunks) <= 1 and not plan["cached"]:
+            result = self._proofread_with_json_mode(text, use_simple_prompt, prepass=prepass)
+            result["chunk_count"] = len(chunks)
+            self._store_paragraph_results(plan, chunks, [result])
+            return result
+        
+        chunk_results = []
+        if chunks:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks)), thread_name_prefix="proofread-chunk") as executor:
+                chunk_results = list(executor.map(
+                    lambda chunk: self._proofread_with_json_mode(chunk["text"], use_simple_prompt, prepass=prepass),
+                    chunks
+                ))
+        
+        self._store_paragraph_results(plan, chunks, chunk_results)
+        return self._merge_chunk_results(text, chunks, chunk_results, start_time, plan["cached"])
+    
+    def _make_paragraph_cache_key(self, body: str, use_simple_prompt: bool) -> str:
+        """段落単位のキャッシュのキーを生成する（正規化した段落本文、プロンプト版、モデルID、辞書版などのハッシュ）"""
+        return self.paragraph_cache.make_key(
+            body, self.prompt_version, self.model_id, use_simple_prompt, self.html_protection,
+            get_dictionary_version(), is_dictionary_prepass_enabled()
+        )
+    
+    def _plan_chunks(self, text: str, max_chunk_tokens: int, use_simple_prompt: bool, use_cache: bool) -> Dict:
+        """
+        分割校正のチャンクを決める（段落単位のキャッシュにある段落と空白だけの段落はモデルに送らない）
+        
+        同期版の proofread_text_chunked と非同期版（AsyncProofreader）の両方から呼ばれる。
+        
+        Returns:
+            {
+                "chunks": モデルに送るチャンク,
+                "cached": [(段落, 元テキスト基準の修正箇所)]（モデルに送らない段落）,
+                "paragraphs": 段落リスト, "keys": {段落番号: キャッシュキー}（キャッシュを使わない場合は空）,
+            }
+        """
+        if not (use_cache and self.paragraph_cache.enabled):
+            return {
+                "chunks": split_into_chunks(text, max_chunk_tokens, self.count_tokens),
+                "cached": [],
+                "paragraphs": [],
+                "keys": {},
+            }
+        
+        paragraphs = split_cacheable_paragraphs(text)
+        keys = {
+            index: self._make_paragraph_cache_key(paragraph["body"], use_simple_prompt)
+            for index, paragraph in enumerate(paragraphs) if paragraph["body"]
+        }
+        found = self.paragraph_cache.get_many(keys.values())
+        
+        cached = []
+        novel = []
+        for index, paragraph in enumerate(paragraphs):
+            key = keys.get(index)
+            if key is None:
+                cached.append((paragraph, []))
+            elif key in found:
+                cached.append((paragraph, from_paragraph_corrections(found[key]["corrections"], paragraph)))
             else:
-                prompt = self.default_prompt.replace("{原文}", protected_text)
-                logger.info("🎯 標準処理モード: デフォルトプロンプト使用")
+                novel.append(index)
+        
+        if len(novel) == len(paragraphs):
+            # キャッシュにある段落がなければ通常の分割と同じチャンクにする
+            chunks = split_into_chunks(text, max_chunk_tokens, self.count_tokens)
+        else:
+            chunks = build_novel_chunks(text, paragraphs, novel, max_chunk_tokens, self.count_tokens)
+            logger.info(f"♻️ 段落キャッシュヒット: {len(found)}段落（モデルに送る段落: {len(novel)}/{len(paragraphs)}）")
+        return {"chunks": chunks, "cached": cached, "paragraphs": paragraphs, "keys": keys}
+    
+    def _store_paragraph_results(self, plan: Dict, chunks: List[Dict], chunk_results: List[Dict]) -> None:
+        """
+        モデルで校正した段落の修正箇所を段落単位のキャッシュに保存する
+        （失敗・フォールバックモデルのチャンクと、位置の分からない修正箇所を含むチャンクの段落は保存しない）
+        """
+        if not plan["keys"]:
+            return
+        
+        located = []
+        for chunk, chunk_result in zip(chunks, chunk_results):
+            corrections = merge_chunk_corrections([chunk], [chunk_result.get("corrections", [])])
+            usable = (
+                "error" not in chunk_result and not chunk_result.get("fallback_used")
+                and all(correction["position"] is not None for correction in corrections)
+            )
+            located.append((chunk, corrections, usable))
+        
+        items = {}
+        for index, paragraph in enumerate(plan["paragraphs"]):
+            # 長い段落は複数のチャンクにまたがるため、重なるチャンクがすべて使える場合だけ保存する
+            overlapping = [
+                (corrections, usable) for chunk, corrections, usable in located
+                if chunk["start"] < paragraph["end"] and paragraph["start"] < chunk["end"]
+            ]
+            if index not in plan["keys"] or not overlapping or not all(usable for _, usable in overlapping):
+                continue
+            inside = [
+                correction for corrections, _ in overlapping for correction in corrections
+                if paragraph["start"] <= correction["position"] < paragraph["end"]
+            ]
+            items[plan["keys"][index]] = {"corrections": to_paragraph_corrections(inside, paragraph)}
+        self.paragraph_cache.set_many(items)
+    
+    def _merge_chunk_results(self, text: str, chunks: List[Dict], chunk_results: List[Dict], start_time: float,
+                             cached: Optional[List[Tuple[Dict, List[Dict]]]] = None) -> Dict:
+        """
+        チャンクごとの校正結果を結合する（失敗したチャンクは原文のまま）
+        
+        Args:
+            text: 校正対象のテキスト全体
+            chunks: split_into_chunks の結果
+            chunk_results: チャンクごとの校正結果（chunks と同じ順）
+            start_time: 分割校正の開始時刻
+            cached: モデルに送らなかった段落と、その元テキスト基準の修正箇所（_plan_chunks の cached）
+            
+        Returns:
+            校正結果の辞書（修正箇所の行番号・文字位置は元テキスト基準）
+        """
+        cached = cached or []
+        chunk_errors = []
+        for chunk, chunk_result in zip(chunks, chunk_results):
+            if "error" in chunk_result:
+                # 失敗したチャンクは原文のまま結合する
+                chunk_errors.append({"index": chunk["index"], "error": chunk_result["error"]})
+                chunk_result["corrected_text"] = chunk["text"]
+        
+        if chunks and len(chunk_errors) == len(chunks):
+            error_msg = chunk_errors[0]["error"]
+            logger.error(f"❌ 全チャンクの校正に失敗しました: {error_msg}")
+            return {
+                "error": error_msg,
+                "corrected_text": text,
+                "corrections": [],
+                "processing_time": time.time() - start_time,
+                "input_tokens": 0,
+                "output_tokens": 0,
+                "estimated_cost": 0,
+                "mode": "chunked"
+            }
+        
+        corrections = merge_chunk_corrections(chunks, [r.get("corrections", []) for r in chunk_results])
+        # キャッシュした段落はキャッシュの修正箇所を適用したテキストを、チャンクはモデルの出力をつなぐ
+        pieces = [(chunk["start"], r.get("corrected_text", "")) for chunk, r in zip(chunks, chunk_results)]
+        for paragraph, paragraph_corrections in cached:
+            corrections.extend(paragraph_corrections)
+            pieces.append((paragraph["start"], apply_corrections(paragraph["text"], paragraph_corrections,
+                                                                 paragraph["start"])))
+        if cached:
+            corrections.sort(key=lambda c: c["position"] if isinstance(c.get("position"), int) else len(text))
+        
+        input_tokens = sum(r.get("input_tokens", 0) for r in chunk_results)
+        output_tokens = sum(r.get("output_tokens", 0) for r in chunk_results)
+        processing_time = time.time() - start_time
+        logger.info(f"✅ 分割校正完了 - 処理時間: {processing_time:.2f}秒, 修正箇所: {len(corrections)}件, 失敗チャンク: {len(chunk_errors)}件")
+        
+        return {
+            "corrected_text": "".join(piece for _, piece in sorted(pieces, key=lambda piece: piece[0])),
+            "corrections": corrections,
+            "processing_time": processing_time,
+            "original_length": len(text),
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "estimated_cost": self.calculate_cost(input_tokens, output_tokens),
+            "mode": "chunked",
+            "fallback_used": any(r.get("fallback_used") for r in chunk_results),
+            "chunk_count": len(chunks),
+            "cached_paragraphs": sum(1 for paragraph, _ in cached if paragraph["body"]),
+            "chunk_errors": chunk_errors,
+            "slowest_chunk_time": max((r.get("processing_time", 0) for r in chunk_results), default=0)
+        }
+    
+    def _max_escalation_ratio(self) -> float:
+        """フル校正へ回す段落の文字数がこの割合を超えた場合は、段落を選ばず全文をフル校正する"""
+        return getattr(settings, "PROOFREAD_CASCADE_MAX_ESCALATION_RATIO", 0.6)
+    
+    def proofread_text_cascade(self, text: str, use_simple_prompt: bool = False,
+                               prepass: Optional[DictionaryPrepass] = None,
+                               local_inconsistencies: Optional[List[Dict]] = None,
+                               max_chunk_tokens: int = None, max_workers: int = None,
+                               use_cache: bool = True) -> Dict:
+        """
+        2段階校正: 段落ごとにスクリーニングし、問題がありそうな段落だけをフル校正（プライマリモデル）に送る
+        
+        スクリーニングは辞書ルール・ローカル矛盾検出・原稿上の兆候と、設定されていれば安価なスクリーニング用モデル
+        （settings.PROOFREAD_CASCADE_SCREEN_MODEL_ID）で行い、スコアが閾値以上の段落をフル校正へ回す。
+        問題のない段落が多い原稿ほどフル校正の入出力トークンと処理時間が減る。
+        フル校正へ回す段落が多い場合は、文脈を保つため全文をフル校正する。
+        
+        Args:
+            text: 校正対象のテキスト
+            use_simple_prompt: シンプルプロンプト（高速処理）を使用するか
+            prepass: 辞書の事前適用結果（ない場合は辞書語句を含む段落をフル校正へ回す）
+            local_inconsistencies: ローカルで検出した矛盾（該当する段落はフル校正へ回す）
+            max_chunk_tokens: 1チャンクあたりの最大トークン数（省略時は settings.PROOFREAD_CHUNK_MAX_TOKENS）
+            max_workers: 同時実行数（省略時は settings.PROOFREAD_CHUNK_WORKERS）
+            use_cache: 全文をフル校正する場合に段落単位のキャッシュを使用するか
+            
+        Returns:
+            校正結果の辞書（cascade に段落数・フル校正へ回した段落数・段ごとの処理時間とコスト）
+        """
+        start_time = time.time()
+        max_chunk_tokens = max_chunk_tokens or getattr(settings, "PROOFREAD_CHUNK_MAX_TOKENS", 3000)
+        max_workers = max_workers or getattr(settings, "PROOFREAD_CHUNK_WORKERS", 4)
+        
+        paragraphs = split_cacheable_paragraphs(text)
+        screening = self._screen_paragraphs(text, paragraphs, prepass, local_inconsistencies or [])
+        escalated = screening["escalated"]
+        escalated_characters = sum(len(paragraphs[index]["text"]) for index in escalated)
+        whole_text = bool(escalated) and escalated_characters > len(text) * self._max_escalation_ratio()
+        logger.info(f"🔎 スクリーニング完了 - フル校正: {len(escalated)}/{sum(1 for p in paragraphs if p['body'])}段落 "
+                    f"({escalated_characters}/{len(text)}文字), 処理時間: {screening['time']:.2f}秒"
+                    + (", 全文をフル校正します" if whole_text else ""))
+        
+        full_start = time.time()
+        if whole_text:
+            result = self.proofread_text_chunked(text, use_simple_prompt, max_chunk_tokens, max_workers,
+                                                 prepass=prepass, use_cache=use_cache)
+        else:
+            chunks = build_novel_chunks(text, paragraphs, escalated, max_chunk_tokens, self.count_tokens)
+            chunk_results = []
+            if chunks:
+                with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks)), thread_name_prefix="proofread-cascade") as executor:
+                    chunk_results = list(executor.map(
+                        lambda chunk: self._proofread_with_json_mode(chunk["text"], use_simple_prompt, prepass=prepass),
+                        chunks
+                    ))
+            # フル校正へ回さなかった段落は原文のまま結合する
+            passed = set(escalated)
+            untouched = [(paragraph, []) for index, paragraph in enumerate(paragraphs) if index not in passed]
+            result = dict(self._merge_chunk_results(text, chunks, chunk_results, full_start, untouched), cached_paragraphs=0)
+        full_time = time.time() - full_start
+        
+        processing_time = time.time() - start_time
+        cascade = {
+            "paragraphs": sum(1 for paragraph in paragraphs if paragraph["body"]),
+            "escalated": len(escalated),
+            "whole_text": whole_text,
+            "escalated_characters": escalated_characters,
+            "screen_model": screening["model_id"],
+            "screen_time": screening["time"],
+            "full_time": full_time,
+            "screen_cost": screening["cost"],
+            "screen_error": screening["error"],
+        }
+        get_cascade_metrics().record(cascade, result.get("estimated_cost", 0), processing_time)
+        logger.info(f"✅ 2段階校正完了 - 処理時間: {processing_time:.2f}秒（スクリーニング {screening['time']:.2f}秒, "
+                    f"フル校正 {full_time:.2f}秒）")
+        return dict(
+            result,
+            processing_time=processing_time,
+            input_tokens=result.get("input_tokens", 0) + screening["input_tokens"],
+            output_tokens=result.get("output_tokens", 0) + screening["output_tokens"],
+            estimated_cost=result.get("estimated_cost", 0) + screening["cost"],
+            mode="cascade",
+            cascade=cascade
+        )
+    
+    def _screen_paragraphs(self, text: str, paragraphs: List[Dict], prepass: Optional[DictionaryPrepass],
+                           local_inconsistencies: List[Dict]) -> Dict:
+        """
+        2段階校正の1段目: 段落ごとにフル校正が必要かを判定する
+        
+        辞書ルール・ローカル矛盾検出・原稿上の兆候で閾値に達しなかった段落だけをスクリーニング用モデルに送る。
+        スクリーニング用モデルの呼び出しに失敗した場合は、それらの段落もすべてフル校正へ回す。
+        
+        Returns:
+            escalated（フル校正へ回す段落番号、昇順）, scores（{段落番号: (スコア, 理由)}）,
+            model_id, input_tokens, output_tokens, cost, time, error を持つ辞書
+        """
+        started = time.time()
+        threshold = get_escalation_threshold()
+        findings = list(local_inconsistencies)
+        if prepass is None:
+            # 辞書の事前適用が無効の場合、辞書語句の修正はフル校正に任せる
+            # （多くの段落に一致するため、それだけでは閾値に届かないスコアにする）
+            dictionary_score = get_dictionary_score()
+            findings.extend(
+                {"position": start, "reason": f"辞書ルール: {original}→{replacement}", "score": dictionary_score}
+                for start, _, original, replacement, _ in get_dictionary_matcher().find(text)
+            )
+        scores = screen_locally(paragraphs, findings)
+        candidates = [
+            index for index, paragraph in enumerate(paragraphs)
+            if paragraph["body"] and scores.get(index, (0.0, ""))[0] < threshold
+        ]
+        
+        screening = {"model_id": None, "input_tokens": 0, "output_tokens": 0, "cost": 0.0, "error": None}
+        if candidates and self.screen_model_id:
+            try:
+                model_scores, usage = self._screen_with_model(paragraphs, candidates, len(text))
+                screening.update(usage)
+            except Exception as e:
+                logger.warning(f"⚠️ スクリーニング用モデルの呼び出しに失敗したため段落をすべてフル校正します: {type(e).__name__}: {str(e)}")
+                model_scores = {index: (1.0, "スクリーニング失敗") for index in candidates}
+                screening["error"] = f"{type(e).__name__}: {str(e)}"
+            for index, (score, reason) in model_scores.items():
+                if score > scores.get(index, (0.0, ""))[0]:
+                    scores[index] = (score, reason)
+        
+        screening.update(
+            escalated=sorted(index for index, (score, _) in scores.items() if score >= threshold),
+            scores=scores,
+            time=time.time() - started
+        )
+        return screening
+    
+    def _screen_with_model(self, paragraphs: List[Dict], indices: List[int],
+                           original_length: int) -> Tuple[Dict[int, Tuple[float, str]], Dict]:
+        """
+        スクリーニング用モデルに段落を送り、問題がありそうな段落のスコアを受け取る
+        （フォールバックモデルは使わず、失敗した場合は例外を送出する）
+        
+        Args:
+            paragraphs: split_cacheable_paragraphs の結果
+            indices: スクリーニングする段落番号
+            original_length: 原文の文字数（使用量の記録用）
+            
+        Returns:
+            ({段落番号: (スコア, 理由)}, model_id・input_tokens・output_tokens・cost を持つ使用量の辞書)
+        """
+        prompt = build_screening_prompt(paragraphs, indices)
+        estimated_input_tokens = self.count_tokens(prompt)
+        body = {
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": min(4096, 256 + 64 * len(indices)),
+            "temperature": 0,
+            "messages": [{"role": "user", "content": prompt}],
+            "tools": [SCREENING_TOOL],
+            "tool_choice": {"type": "tool", "name": SCREENING_TOOL["name"]}
+        }
+        read_timeout = getattr(settings, "PROOFREAD_CASCADE_SCREEN_TIMEOUT", 60)
+        
+        def call(model_id: str) -> Dict:
+            response = self._runtime_for_timeout(read_timeout).invoke_model(
+                modelId=model_id,
+                body=json.dumps(body),
+                contentType="application/json"
+            )
+            return json.loads(response["body"].read())
+        
+        started = time.time()
+        response_body, model_id = self._call_model(call, candidates=[self.screen_model_id])
+        processing_time = time.time() - started
+        
+        tool_input = next(
+            (block.get("input", {}) for block in response_body.get("content", []) if block.get("type") == "tool_use"),
+            None
+        )
+        if tool_input is None:
+            raise ValueError("スクリーニング結果のTool Useが見つかりません")
+        
+        input_tokens, output_tokens, cost = self._account_usage(
+            "screen", prompt, json.dumps(tool_input, ensure_ascii=False), response_body.get("usage", {}),
+            estimated_input_tokens, processing_time, original_length, model_id
+        )
+        usage = {"model_id": model_id, "input_tokens": input_tokens, "output_tokens": output_tokens, "cost": cost}
+        return parse_screening_result(tool_input, indices), usage
+    
+    def proofread_text_by_category(self, text: str, prepass: Optional[DictionaryPrepass] = None,
+                                   max_workers: int = None) -> Dict:
+        """
+        カテゴリー別の並列校正: 矛盾・誤字・辞書・言い回しのカテゴリーごとに小さなプロンプトで並列に校正し、結合する
+        
+        各カテゴリーには修正箇所だけを出力させ、校正後テキストは修正箇所を原文に適用して組み立てる。
+        処理時間は全カテゴリーの出力の合計ではなく、最も遅いカテゴリーに比例する。
+        同じ箇所への指摘はカテゴリーの優先順（settings.PROOFREAD_CATEGORY_PASSES の順）でまとめる。
+        
+        Args:
+            text: 校正対象のテキスト
+            prepass: 辞書の事前適用結果（ある場合は辞書カテゴリーの校正を省く）
+            max_workers: 同時実行数（省略時はカテゴリー数）
+            
+        Returns:
+            校正結果の辞書（category_passes にカテゴリーごとの処理時間・修正箇所数・使用量）
+        """
+        start_time = time.time()
+        requests = self._prepare_category_requests(text, prepass)
+        if not requests:
+            logger.warning("⚠️ 実行するカテゴリーがないため通常の校正を行います")
+            return self._proofread_with_json_mode(text, prepass=prepass)
+        
+        logger.info(f"🗂️ カテゴリー別校正開始 - カテゴリー: {', '.join(category for category, _ in requests)}")
+        with ThreadPoolExecutor(max_workers=max_workers or len(requests), thread_name_prefix="proofread-category") as executor:
+            results = list(executor.map(lambda item: self._proofread_category(text, *item), requests))
+        return self._merge_category_results(text, requests, results, start_time)
+    
+    def _prepare_category_requests(self, text: str, prepass: Optional[DictionaryPrepass] = None) -> List[Tuple[str, Dict]]:
+        """
+        カテゴリーごとのリクエストを組み立てる
+        
+        同期版の proofread_text_by_category と非同期版（AsyncProofreader）の両方から呼ばれる。
+        
+        Returns:
+            [(カテゴリー, body・plan・prompt・input_tokens・restore_html を持つ辞書)]（優先順）
+        """
+        protected_text, restore_html = self._protect_html(text)
+        notice = prepass.prompt_notice(text) if prepass is not None else ""
+        estimator = get_token_estimator()
+        requests = []
+        for category in get_pass_categories():
+            if category == "dict" and prepass is not None:
+                # 辞書ルールは事前適用で確定済み
+                continue
+            prompt = build_category_prompt(category, protected_text)
+            if category in DICTIONARY_SECTION_CATEGORIES:
+                prompt += build_dictionary_prompt_section(protected_text, self.count_tokens)
+            if self.html_protection == "compact":
+                prompt += COMPACT_MARKER_NOTICE
+            prompt += notice
+            
+            input_tokens = estimator.estimate(prompt)
+            plan = plan_request("category", len(text), input_tokens, self.api_timeout, estimator)
+            body = {
+                "anthropic_version": "bedrock-2023-05-31",
+                "max_tokens": plan["max_tokens"],
+                "messages": [{"role": "user", "content": prompt}],
+                "tools": [CATEGORY_TOOL],
+                "tool_choice": {"type": "tool", "name": CATEGORY_TOOL["name"]}
+            }
+            requests.append((category, {"body": body, "plan": plan, "prompt": prompt, "input_tokens": input_tokens,
+                                        "restore_html": restore_html}))
+        return requests
+    
+    def _proofread_category(self, text: str, category: str, request: Dict) -> Dict:
+        """1つのカテゴリーの校正を実行する（失敗時はエラー結果を返す）"""
+        try:
+            start_time = time.time()
+            response_body, model_id = self._invoke_with_plan(request["body"], request["plan"], "category")
+            return self._finish_category_request(text, category, request, response_body, model_id,
+                                                 time.time() - start_time)
+        except Exception as e:
+            return self._category_error_result(category, e)
+    
+    def _finish_category_request(self, text: str, category: str, request: Dict, response_body: Dict,
+                                 model_id: str, processing_time: float) -> Dict:
+        """
+        カテゴリーごとのレスポンスから修正箇所を取り出し、使用量を記録する
+        
+        Returns:
+            corrections, processing_time, input_tokens, output_tokens, estimated_cost, model_id, fallback_used を持つ辞書
+        """
+        tool_input = next(
+            (block.get("input", {}) for block in response_body.get("content", []) if block.get("type") == "tool_use"),
+            None
+        )
+        if tool_input is None:
+            raise ValueError(f"Tool Useの結果が見つかりません（{category}）")
+        
+        input_tokens, output_tokens, total_cost = self._account_usage(
+            "category", request["prompt"], json.dumps(tool_input, ensure_ascii=False), response_body.get("usage", {}),
+            request["input_tokens"], processing_time, len(text), model_id
+        )
+        # 保護後テキストに対する修正箇所のプレースホルダー・マーカーを戻し、原文で位置を探せるようにする
+        _, corrections = request["restore_html"]("", tool_input.get("corrections", []))
+        logger.info(f"🗂️ {category}: 修正箇所 {len(corrections)}件, 処理時間 {processing_time:.2f}秒")
+        return {
+            "corrections": corrections,
+            "processing_time": processing_time,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "estimated_cost": total_cost,
+            "model_id": model_id,
+            "fallback_used": model_id != self.model_id
+        }
+    
+    def _category_error_result(self, category: str, error: Exception) -> Dict:
+        """カテゴリーごとの校正に失敗した場合の結果を返す"""
+        error_msg = f"校正処理中にエラーが発生しました（{category}）: {str(error)}"
+        logger.error(f"{error_msg}\n{traceback.format_exc()}")
+        return {
+            "error": error_msg,
+            "corrections": [],
+            "processing_time": 0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "estimated_cost": 0
+        }
+    
+    def _merge_category_results(self, text: str, requests: List[Tuple[str, Dict]], results: List[Dict],
+                                start_time: float) -> Dict:
+        """
+        カテゴリーごとの校正結果を結合する（失敗したカテゴリーの指摘は含めない）
+        
+        Args:
+            text: 校正対象のテキスト
+            requests: _prepare_category_requests の結果
+            results: カテゴリーごとの校正結果（requests と同じ順）
+            start_time: カテゴリー別校正の開始時刻
+            
+        Returns:
+            校正結果の辞書（修正箇所の文字位置は原文基準）
+        """
+        categories = [category for category, _ in requests]
+        passes = {}
+        for category, result in zip(categories, results):
+            passes[category] = {
+                "corrections": len(result["corrections"]),
+                "processing_time": result["processing_time"],
+                "input_tokens": result["input_tokens"],
+                "output_tokens": result["output_tokens"],
+            }
+            if "error" in result:
+                passes[category]["error"] = result["error"]
+        
+        succeeded = [(category, result) for category, result in zip(categories, results) if "error" not in result]
+        if not succeeded:
+            logger.error(f"❌ 全カテゴリーの校正に失敗しました: {results[0]['error']}")
+            return {
+                "error": results[0]["error"],
+                "corrected_text": text,
+                "corrections": [],
+                "processing_time": time.time() - start_time,
+                "input_tokens": 0,
+                "output_tokens": 0,
+                "estimated_cost": 0,
+                "mode": "category",
+                "category_passes": passes
+            }
+        
+        corrections, merge_stats = merge_category_corrections(
+            text, [(category, result["corrections"]) for category, result in succeeded]
+        )
+        located = [correction for correction in corrections if correction["position"] is not None]
+        processing_time = time.time() - start_time
+        logger.info(f"✅ カテゴリー別校正完了 - 処理時間: {processing_time:.2f}秒, 修正箇所: {len(corrections)}件 "
+                    f"(重複 {merge_stats['duplicates']}件, 競合 {merge_stats['conflicts']}件を除外)")
+        return {
+            "corrected_text": apply_corrections(text, located),
+            "corrections": corrections,
+            "processing_time": processing_time,
+            "original_length": len(text),
+            "input_tokens": sum(r["input_tokens"] for r in results),
+            "output_tokens": sum(r["output_tokens"] for r in results),
+            "estimated_cost": sum(r["estimated_cost"] for r in results),
+            "mode": "category",
+            "fallback_used": any(r.get("fallback_used") for _, r in succeeded),
+            "category_passes": passes,
+            "category_merge": merge_stats,
+            "slowest_pass_time": max(r["processing_time"] for r in results)
+        }
+    
+    def incremental_config_key(self, use_simple_prompt: bool = False, use_chunked: bool = False,
+                               use_cascade: bool = False, use_category_passes: bool = False) -> str:
+        """
+        差分校正で前回の結果を再利用できるかを判定する設定キー
+        （プロンプト版・モデル・校正の方式とその設定・辞書版などが変わった結果は再利用しない）
+        """
+        _, mode = self._proofread_mode(True, use_simple_prompt, use_chunked, use_cascade, use_category_passes)
+        return self.result_cache.make_key(
+            "incremental", self.prompt_version, self.model_id, mode,
+            self.html_protection, get_dictionary_version(), is_dictionary_prepass_enabled(),
+            is_local_inconsistency_enabled()
+        )
+    
+    def proofread_text_incremental(self, text: str, previous_text: str, previous_corrections: List[Dict],
+                                   use_simple_prompt: bool = False, max_workers: int = None,
+                                   use_chunked: bool = False, use_cascade: bool = False,
+                                   use_category_passes: bool = False) -> Dict:
+        """
+        前回の原稿との差分だけを校正する（差分校正）
+        
+        段落単位で前回の原稿と比較し、変わっていない段落は前回の修正箇所を位置をずらして再利用し、
+        変わった段落（連続する場合はまとめた範囲）だけをモデルに送る。
+        処理時間と費用は記事全体ではなく編集した分量に比例する。
+        変更が多い場合は全文を校正する（文脈が大きく変わるため）。
+        
+        Args:
+            text: 校正対象のテキスト
+            previous_text: 前回校正した原稿
+            previous_corrections: 前回の修正箇所（position 付き）
+            use_simple_prompt: シンプルプロンプト（高速処理）を使用するか
+            max_workers: 同時実行数（省略時は settings.PROOFREAD_CHUNK_WORKERS）
+            use_chunked: 分割校正を使用するか（全文・変更範囲の校正に使う。以下同じ）
+            use_cascade: 2段階校正を使用するか
+            use_category_passes: カテゴリー別の並列校正を使用するか
+            
+        Returns:
+            校正結果の辞書（修正箇所の行番号・文字位置は今回の原稿基準、incremental に再利用の統計）
+        """
+        start_time = time.time()
+        options = {"use_json_mode": True, "use_simple_prompt": use_simple_prompt, "use_chunked": use_chunked,
+                   "use_cascade": use_cascade, "use_category_passes": use_category_passes}
+        plan = plan_incremental(previous_text, text)
+        segments = plan["segments"]
+        max_change_ratio = getattr(settings, "PROOFREAD_INCREMENTAL_MAX_CHANGE_RATIO", 0.5)
+        if plan["changed_characters"] > len(text) * max_change_ratio:
+            logger.info(f"🔁 変更が多いため全文を校正します - 変更: {plan['changed_characters']}/{len(text)}文字")
+            return self.proofread_text(text, **options)
+        
+        logger.info(f"♻️ 差分校正開始 - 再利用: {len(plan['reused'])}段落, 校正: {len(segments)}範囲 "
+                    f"({plan['changed_characters']}/{len(text)}文字)")
+        
+        segment_results = []
+        if segments:
+            max_workers = max_workers or getattr(settings, "PROOFREAD_CHUNK_WORKERS", 4)
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(segments)),
+                                    thread_name_prefix="proofread-incremental") as executor:
+                segment_results = list(executor.map(
+                    lambda segment: self.proofread_text(segment["text"], **options), segments
+                ))
+        
+        for segment_result in segment_results:
+            if "error" in segment_result:
+                return dict(segment_result, corrected_text=text, mode="incremental")
+        
+        # 変更した範囲の修正箇所を今回の原稿基準に変換し、再利用する段落の修正箇所と合わせる
+        corrections = merge_chunk_corrections(segments, [r.get("corrections", []) for r in segment_results])
+        corrected_parts = []
+        segment_by_first = {segment["first"]: (segment, result) for segment, result in zip(segments, segment_results)}
+        reused_corrections = remap_reused_corrections(previous_corrections, plan["reused"], plan["paragraphs"])
+        for index, paragraph in enumerate(plan["paragraphs"]):
+            if index in plan["reused"]:
+                reused = reused_corrections[index]
+                corrections.extend(reused)
+                corrected_parts.append(apply_corrections(paragraph["text"], reused, paragraph["start"]))
+            elif index in segment_by_first:
+                corrected_parts.append(segment_by_first[index][1].get("corrected_text", ""))
+        corrections.sort(key=lambda c: c["position"] if isinstance(c.get("position"), int) else len(text))
+        
+        processing_time = time.time() - start_time
+        logger.info(f"✅ 差分校正完了 - 処理時間: {processing_time:.2f}秒, 修正箇所: {len(corrections)}件")
+        return {
+            "corrected_text": "".join(corrected_parts),
+            "corrections": corrections,
+            "processing_time": processing_time,
+            "original_length": len(text),
+            "input_tokens": sum(r.get("input_tokens", 0) for r in segment_results),
+            "output_tokens": sum(r.get("output_tokens", 0) for r in segment_results),
+            "estimated_cost": sum(r.get("estimated_cost", 0) for r in segment_results),
+            "mode": "incremental",
+            "fallback_used": any(r.get("fallback_used") for r in segment_results),
+            "chunk_count": len(segments),
+            "incremental": {
+                "reused_paragraphs": len(plan["reused"]),
+                "changed_paragraphs": len(plan["paragraphs"]) - len(plan["reused"]),
+                "sent_characters": plan["changed_characters"],
+                "total_characters": len(text),
+            }
+        }
+    
+    def proofread_text_stream(self, text: str) -> Iterator[Dict]:
+        """
+        レスポンスストリーミングで校正を実行し、修正箇所を生成され次第返す
+        
+        Tool Useの入力JSONを逐次解析し、修正箇所が1件完成するたびにイベントを返す。
+        校正後テキスト全文は生成させず（ハイライトは呼び出し側で原文から作成する）、
+        修正箇所のみを出力させることで最初の修正箇所が届くまでの時間を短縮する。
+        
+        Args:
+            text: 校正対象のテキスト
+            
+        Yields:
+            {"type": "correction", "correction": {...}} を修正箇所ごとに返し、
+            最後に {"type": "done", ...統計情報} を返す。
+            エラー時は {"type": "error", "error": エラーメッセージ} を返して終了する。
+        """
+        logger.info(f"校正開始（ストリーミング） - 文字数: {len(text)}文字")
+        start_time = time.time()
+        
+        try:
+            # HTMLタグ保護
+            protected_text, restore_html = self._protect_html(text)
+            prepass = DictionaryPrepass(text) if is_dictionary_prepass_enabled() else None
+            local_inconsistencies = self._detect_local_inconsistencies(text)
+            local_originals = {correction["original"] for correction in local_inconsistencies}
+            prompt = self._build_prompt(protected_text, prepass.prompt_notice() if prepass is not None else "")
+            prompt += "\n\n※ 校正後テキスト全文は出力せず、修正箇所のみを proofreading_stream_result ツールで出力してください。"
             
-            # 入力トークン数を計算
             input_tokens = self.count_tokens(prompt)
-            logger.info(f"📏 入力トークン数: {input_tokens}")
+            plan = plan_request("stream", len(text), input_tokens, self.api_timeout)
+            logger.info(f"📏 入力トークン数: {input_tokens}, 📐 max_tokens: {plan['max_tokens']}, 読み取りタイムアウト: {plan['read_timeout']}秒")
             
-            # Tool Use設定
             tools = [{
-                "name": "proofreading_result",
-                "description": "校正結果をJSON形式で出力するツール",
+                "name": "proofreading_stream_result",
+                "description": "校正の修正箇所を1件ずつJSON形式で出力するツール",
                 "input_schema": {
                     "type": "object",
                     "properties": {
-                        "corrected_text": {
-                            "type": "string",
-                            "description": "校正後のHTML込みテキスト全文"
-                        },
                         "corrections": {
                             "type": "array",
-                            "description": "修正箇所のリスト",
+                            "description": "修正箇所のリスト（文書の先頭から順に出力）",
                             "items": {
                                 "type": "object",
                                 "properties": {
-                                    "line_number": {
-                                        "type": "integer",
-                                        "description": "修正箇所の行番号"
-                                    },
-                                    "original": {
-                                        "type": "string",
-                                        "description": "修正前のテキスト"
-                                    },
-                                    "corrected": {
-                                        "type": "string",
-                                        "description": "修正後のテキスト"
-                                    },
-                                    "reason": {
-                                        "type": "string",
-                                        "description": "修正理由の説明"
-                                    },
+                                    "line_number": {"type": "integer", "description": "修正箇所の行番号"},
+                                    "original": {"type": "string", "description": "修正前のテキスト"},
+                                    "corrected": {"type": "string", "description": "修正後のテキスト"},
+                                    "reason": {"type": "string", "description": "修正理由の説明"},
                                     "category": {
                                         "type": "string",
                                         "enum": ["tone", "typo", "dict", "inconsistency"],
@@ -339,139 +1749,152 @@ class BedrockClient:
                             }
                         }
                     },
-                    "required": ["corrected_text", "corrections"]
+                    "required": ["corrections"]
                 }
             }]
             
-            # APIリクエストボディ
             body = {
                 "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 15000,  # JSON出力では少し多めに
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
+                "max_tokens": plan["max_tokens"],
+                "messages": [{"role": "user", "content": prompt}],
                 "tools": tools,
-                "tool_choice": {"type": "tool", "name": "proofreading_result"}
+                "tool_choice": {"type": "tool", "name": "proofreading_stream_result"}
             }
             
-            # API呼び出し
-            logger.info("AWS Bedrock API呼び出し開始（JSON Mode）")
-            start_time = time.time()
-            
-            response = self.bedrock_runtime.invoke_model(
-                modelId=self.model_id,
-                body=json.dumps(body),
-                contentType="application/json"
+            logger.info("AWS Bedrock API呼び出し開始（ストリーミング）")
+            response, model_id = self._call_model(
+                lambda candidate: self._runtime_for_timeout(plan["read_timeout"]).invoke_model_with_response_stream(
+                    modelId=candidate,
+                    body=json.dumps(body),
+                    contentType="application/json"
+                )
             )
             
-            end_time = time.time()
-            processing_time = end_time - start_time
-            logger.info(f"AWS Bedrock API呼び出し完了 - 処理時間: {processing_time:.2f}秒")
-            
-            # レスポンス解析
-            response_body = json.loads(response["body"].read())
-            logger.info(f"APIレスポンス: {json.dumps(response_body, ensure_ascii=False, indent=2)}")
-            
-            # Tool Use結果の抽出
-            if "content" not in response_body or not response_body["content"]:
-                raise ValueError("APIレスポンスにcontentが含まれていません")
-            
-            tool_use_content = None
-            for content_block in response_body["content"]:
-                if content_block.get("type") == "tool_use":
-                    tool_use_content = content_block.get("input", {})
-                    break
-            
-            if not tool_use_content:
-                raise ValueError("Tool Useの結果が見つかりません")
-            
-            # HTMLタグ復元
-            corrected_text = tool_use_content.get("corrected_text", "")
-            corrections = tool_use_content.get("corrections", [])
-            
-            # 出力トークン数を計算
-            output_tokens = self.count_tokens(corrected_text)
-            logger.info(f"📏 出力トークン数: {output_tokens}")
+            parser = CorrectionStreamParser("corrections")
+            model_corrections = []
+            corrections = []
+            usage = {}
+            first_correction_time = None
+            
+            # 辞書ルールで確定した修正箇所はモデルの応答を待たずに返す
+            if prepass is not None and prepass.corrections:
+                first_correction_time = time.time() - start_time
+                for correction in prepass.corrections:
+                    yield {"type": "correction", "correction": correction}
+            # ローカルで検出した矛盾も同様に先に返す
+            if local_inconsistencies:
+                if first_correction_time is None:
+                    first_correction_time = time.time() - start_time
+                for correction in local_inconsistencies:
+                    yield {"type": "correction", "correction": correction}
+            
+            for event in response["body"]:
+                chunk = event.get("chunk")
+                if not chunk:
+                    continue
+                payload = json.loads(chunk["bytes"])
+                event_type = payload.get("type")
+                
+                if event_type == "message_start":
+                    usage.update(payload.get("message", {}).get("usage", {}))
+                elif event_type == "message_delta":
+                    usage.update(payload.get("usage", {}))
+                elif event_type == "content_block_delta":
+                    delta = payload.get("delta", {})
+                    if delta.get("type") != "input_json_delta":
+                        continue
+                    for correction in parser.feed(delta.get("partial_json", "")):
+                        # 保護後テキストに対する修正箇所を元のHTML基準に戻す（compact方式の位置は
+                        # 先頭から順に探すため、それまでの修正箇所と合わせて復元する）
+                        model_corrections.append(correction)
+                        correction = restore_html("", model_corrections)[1][-1]
+                        if prepass is not None and prepass.is_handled(correction):
+                            continue
+                        if correction.get("original") in local_originals:
+                            continue
+                        if first_correction_time is None:
+                            first_correction_time = time.time() - start_time
+                            logger.info(f"⚡ 最初の修正箇所受信: {first_correction_time:.2f}秒")
+                        corrections.append(correction)
+                        yield {"type": "correction", "correction": correction}
             
-            # コスト計算
-            total_cost = self.calculate_cost(input_tokens, output_tokens)
-            logger.info(f"💰 推定コスト: {total_cost:.2f}円")
+            processing_time = time.time() - start_time
+            logger.info(f"AWS Bedrock ストリーミング完了 - 処理時間: {processing_time:.2f}秒, 修正箇所: {len(corrections)}件")
             
-            # プレースホルダーからHTMLタグを復元（4つの引数を正しく渡す）
-            final_text = restore_html_tags_advanced(corrected_text, placeholders, html_tag_info, corrections)
+            # 使用量はストリームのusageを優先し、無い場合は推定する
+            input_tokens, output_tokens, total_cost = self._account_usage(
+                "stream", prompt, json.dumps({"corrections": corrections}, ensure_ascii=False), usage,
+                input_tokens, processing_time, len(text), model_id
+            )
             
-            return {
-                "corrected_text": final_text,
+            done = {
+                "type": "done",
                 "corrections": corrections,
                 "processing_time": processing_time,
+                "first_correction_time": first_correction_time,
                 "original_length": len(text),
                 "input_tokens": input_tokens,
                 "output_tokens": output_tokens,
                 "estimated_cost": total_cost,
-                "mode": "json"
+                "model_id": model_id,
+                "fallback_used": model_id != self.model_id,
+                "mode": "stream"
             }
+            if prepass is not None:
+                done = prepass.merge_into(done)
+                done.pop("corrected_text")
+            done = merge_local_inconsistencies(done, local_inconsistencies)
+            yield done
             
         except Exception as e:
             error_msg = f"校正処理中にエラーが発生しました: {str(e)}"
             logger.error(f"{error_msg}\n{traceback.format_exc()}")
-            return {
-                "error": error_msg,
-                "corrected_text": text,
-                "corrections": [],
-                "processing_time": 0,
-                "input_tokens": 0,
-                "output_tokens": 0,
-                "estimated_cost": 0,
-                "mode": "json"
-            }
+            yield {"type": "error", "error": error_msg, "mode": "stream"}
     
-    def _proofread_with_text_mode(self, text: str, use_simple_prompt: bool = False) -> Dict:
+    def _proofread_with_text_mode(self, text: str, use_simple_prompt: bool = False,
+                                  prepass: Optional[DictionaryPrepass] = None) -> Dict:
         """
         従来のテキストモードで校正を実行（後方互換性のため）
         """
         try:
             # HTMLタグ保護
-            protected_text, placeholders, html_tag_info = protect_html_tags_advanced(text)
+            protected_text, restore_html = self._protect_html(text)
+            notice = prepass.prompt_notice(text) if prepass is not None else ""
             
             # プロンプト選択
             if use_simple_prompt:
-                prompt = self.default_prompt.replace("{原文}", protected_text)
+                prompt = self._build_prompt(protected_text, notice)
                 logger.info("🚀 高速処理モード: デフォルトプロンプト使用")
             else:
-                prompt = self.default_prompt.replace("{原文}", protected_text)
+                prompt = self._build_prompt(protected_text, notice)
                 logger.info("🎯 標準処理モード: デフォルトプロンプト使用")
             
             # 入力トークン数を計算
             input_tokens = self.count_tokens(prompt)
             logger.info(f"📏 入力トークン数: {input_tokens}")
             
+            plan = plan_request("text", len(text), input_tokens, self.api_timeout)
+            logger.info(f"📐 max_tokens: {plan['max_tokens']}, 読み取りタイムアウト: {plan['read_timeout']}秒")
+            
             # 通常のAPI呼び出し
             logger.info("AWS Bedrock API呼び出し開始（Text Mode）")
             start_time = time.time()
             
-            response = self.bedrock_runtime.invoke_model(
-                modelId=self.model_id,  # Claude 4のプライマリモデル使用
-                body=json.dumps({
-                    "anthropic_version": "bedrock-2023-05-31",
-                    "max_tokens": 30000,
-                    "messages": [
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ]
-                }),
-                contentType="application/json"
-            )
+            response_body, model_id = self._invoke_with_plan({
+                "anthropic_version": "bedrock-2023-05-31",
+                "max_tokens": plan["max_tokens"],
+                "messages": [
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ]
+            }, plan, "text")
             
             end_time = time.time()
             processing_time = end_time - start_time
             
             # レスポンス解析
-            response_body = json.loads(response["body"].read())
             corrected_text = ""
             
             if "content" in response_body:
@@ -479,18 +1902,16 @@ class BedrockClient:
                     if content_block.get("type") == "text":
                         corrected_text += content_block.get("text", "")
             
-            # 出力トークン数を計算
-            output_tokens = self.count_tokens(corrected_text)
-            logger.info(f"📏 出力トークン数: {output_tokens}")
-            
-            # コスト計算
-            total_cost = self.calculate_cost(input_tokens, output_tokens)
-            logger.info(f"💰 推定コスト: {total_cost:.2f}円")
+            # 実測トークン数とコスト
+            input_tokens, output_tokens, total_cost = self._account_usage(
+                "text", prompt, corrected_text, response_body.get("usage", {}),
+                input_tokens, processing_time, len(text), model_id
+            )
             
             # HTMLタグ復元（4つの引数を正しく渡す）
             # まず修正箇所解析
             corrections = self._parse_corrections_from_response(corrected_text)
-            final_text = restore_html_tags_advanced(corrected_text, placeholders, html_tag_info, corrections)
+            final_text, corrections = restore_html(corrected_text, corrections)
             
             return {
                 "corrected_text": final_text,
@@ -500,6 +1921,8 @@ class BedrockClient:
                 "input_tokens": input_tokens,
                 "output_tokens": output_tokens,
                 "estimated_cost": total_cost,
+                "model_id": model_id,
+                "fallback_used": model_id != self.model_id,
                 "mode": "text"
             }
             
@@ -537,9 +1960,10 @@ class BedrockClient:
         logger.info(f"📏 入力トークン数: {input_tokens}")
         
         try:
+            plan = plan_request("text", len(full_prompt), input_tokens, self.api_timeout)
             payload = {
                 "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 30000,
+                "max_tokens": plan["max_tokens"],
                 "temperature": temperature,
                 "top_p": top_p,
                 "messages": [
@@ -555,14 +1979,15 @@ class BedrockClient:
             
             # モデル呼び出し実行
             logger.info(f"🚀 Bedrock API呼び出し実行: {self.model_id}")
-            response = self.bedrock_runtime.invoke_model(
-                modelId=self.model_id,
-                body=body
+            response_body, _ = self._call_model(
+                lambda model_id: json.loads(self._runtime_for_timeout(plan["read_timeout"]).invoke_model(
+                    modelId=model_id,
+                    body=body
+                ).get("body").read())
             )
             logger.info(f"✅ Bedrock API呼び出し成功")
             
             # レスポンス解析
-            response_body = json.loads(response.get("body").read())
             logger.info(f"📥 レスポンス受信完了")
             
             content = response_body.get("content", [])
@@ -586,8 +2011,9 @@ class BedrockClient:
             end_time = time.time()
             completion_time = end_time - start_time
             
-            # 出力トークン数とコスト計算
-            output_tokens = self.count_tokens(corrected_text)
+            # 出力トークン数とコスト計算（usageの実測値を優先）
+            input_tokens = usage.get("input_tokens") or input_tokens
+            output_tokens = usage.get("output_tokens") or self.count_tokens(corrected_text)
             total_cost = self.calculate_cost(input_tokens, output_tokens)
             
             cost_info = {
@@ -837,18 +2263,64 @@ class BedrockClient:
         
         return text.strip()
 
-    def apply_replacement_dictionary(self, text: str, replacements: Dict[str, str]) -> str:
+    def apply_replacement_dictionary(self, text: str, replacements: Optional[Dict[str, str]] = None) -> str:
         """
         置換辞書を適用してテキスト中の単語を置換する
         
+        重なる語句は左端が早いもの・同じ位置なら長いものを優先し、
+        テキストを1回走査するだけで置換する（置換後の文字列は再置換しない）。
+        
         Args:
             text: 置換対象のテキスト
             replacements: キーが元の単語、値が置換後の単語の辞書
+                （省略時はすべての辞書ソースをまとめた共有の照合器を使用）
             
         Returns:
             置換後のテキスト
         """
-        result = text
-        for original, replacement in replacements.items():
-            result = result.replace(original, replacement)
-        return result 
\ No newline at end of file
+        if replacements is None:
+            return get_dictionary_matcher().apply(text)
+        return DictionaryMatcher((original, replacement, 'argument') for original, replacement in replacements.items()).apply(text)
+
+
+# プロセス内で共有するクライアント（gunicornワーカーごとに1インスタンス）
+_shared_client = None
+_shared_client_pid = None
+_shared_client_lock = threading.Lock()
+
+
+def get_bedrock_client() -> BedrockClient:
+    """
+    プロセス内で共有するBedrockClientを取得する（遅延初期化・スレッドセーフ）
+
+    boto3クライアントの作成、認証情報の解決、モデルアクセス確認、
+    プロンプトファイルの読み込みはワーカープロセスごとに1回だけ実行される。
+    fork後の子プロセスでは親のクライアントを引き継がずに作り直す。
+
+    Returns:
+        共有BedrockClientインスタンス
+    """
+    global _shared_client, _shared_client_pid
+
+    pid = os.getpid()
+    client = _shared_client
+    if client is not None and _shared_client_pid == pid:
+        return client
+
+    with _shared_client_lock:
+        if _shared_client is None or _shared_client_pid != pid:
+            logger.info(f"🧩 共有BedrockClientを作成します (pid={pid})")
+            _shared_client = BedrockClient()
+            _shared_client_pid = pid
+        return _shared_client
+
+
+def reset_bedrock_client() -> None:
+    """
+    共有BedrockClientを破棄する（設定変更時やテスト用）
+    """
+    global _shared_client, _shared_client_pid
+
+    with _shared_client_lock:
+        _shared_client = None
+        _shared_client_pid = None
@@ -0,0 +1,230 @@
+import re
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from proofreading_ai.utils import HTML_TOKEN_PATTERN
+
+# モデルによる判定を待たずにフル校正へ回す原稿上の兆候（パターン, スコア, 理由）
+LOCAL_SIGNALS = [
+    (re.compile(r'([、。，．！？!?])\1'), 0.6, '句読点の重複'),
+    (re.compile(r'[ｦ-ﾟ]'), 0.6, '半角カタカナ'),
+    (re.compile(r'TODO|TBD|要確認|（仮）'), 0.6, '仮の記述'),
+]
+# 対応が取れていない場合にフル校正へ回す括弧
+BRACKET_PAIRS = [('「', '」'), ('『', '』'), ('（', '）'), ('(', ')')]
+BRACKET_SCORE = 0.6
+
+SCREENING_TOOL = {
+    "name": "screening_result",
+    "description": "校正が必要そうな段落を報告するツール",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "flagged": {
+                "type": "array",
+                "description": "誤字脱字・変換ミス・表記の揺れ・矛盾がありそうな段落（問題がない段落は含めない）",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "index": {"type": "integer", "description": "段落番号"},
+                        "score": {"type": "number", "description": "問題がある確からしさ（0〜1）"},
+                        "reason": {"type": "string", "description": "理由（20文字程度）"}
+                    },
+                    "required": ["index", "score"]
+                }
+            }
+        },
+        "required": ["flagged"]
+    }
+}
+
+SCREENING_PROMPT = """あなたは日本語のWeb記事の校正担当です。以下の段落を読み、詳しい校正が必要な段落を選んでください。
+誤字脱字・変換ミス・表記の揺れ・事実や数値の矛盾（段落をまたぐものを含む）がありそうな段落について、
+段落番号・確からしさ（0〜1）・理由を screening_result で報告してください。問題がない段落は報告しないでください。
+
+{段落}"""
+
+
+def is_cascade_enabled() -> bool:
+    """校正要求で指定がない場合に2段階校正（スクリーニング→フル校正）を使うかどうか"""
+    return getattr(settings, 'PROOFREAD_CASCADE_ENABLED', False)
+
+
+def get_escalation_threshold() -> float:
+    """フル校正へ回す段落のスコアの下限"""
+    return getattr(settings, 'PROOFREAD_CASCADE_ESCALATION_THRESHOLD', 0.5)
+
+
+def get_dictionary_score() -> float:
+    """辞書語句を含む段落に加えるスコア（辞書の事前適用が無効の場合のみ）"""
+    return getattr(settings, 'PROOFREAD_CASCADE_DICTIONARY_SCORE', 0.3)
+
+
+def _add_score(scores: Dict[int, Tuple[float, str]], index: int, score: float, reason: str) -> None:
+    """段落のスコアを加算する（理由は最初に見つかったものを残す）"""
+    current, current_reason = scores.get(index, (0.0, ''))
+    scores[index] = (min(1.0, current + score), current_reason or reason)
+
+
+def screen_locally(paragraphs: List[Dict], findings: List[Dict]) -> Dict[int, Tuple[float, str]]:
+    """
+    辞書・矛盾検出の結果と原稿上の兆候から段落ごとのスコアを付ける（モデルを呼ばないスクリーニング）
+
+    Args:
+        paragraphs: split_cacheable_paragraphs の結果
+        findings: 辞書ルール・ローカル矛盾検出の修正箇所（position 付き、score がなければ該当する段落は必ずフル校正へ回す）
+
+    Returns:
+        {段落番号: (スコア, 理由)}（兆候のない段落は含めない）
+    """
+    scores = {}
+    for finding in findings:
+        position = finding.get('position')
+        if not isinstance(position, int):
+            continue
+        index = next((i for i, p in enumerate(paragraphs) if p['start'] <= position < p['end']), None)
+        score = finding.get('score', 1.0)
+        # 同じ段落の複数の一致は足し合わせず、最も高いスコアを使う
+        if index is not None and score > scores.get(index, (0.0, ''))[0]:
+            scores[index] = (score, finding.get('reason') or finding.get('category', ''))
+
+    for index, paragraph in enumerate(paragraphs):
+        body = HTML_TOKEN_PATTERN.sub('', paragraph['body'])
+        if not body:
+            continue
+        for pattern, score, reason in LOCAL_SIGNALS:
+            if pattern.search(body):
+                _add_score(scores, index, score, reason)
+        for opening, closing in BRACKET_PAIRS:
+            if body.count(opening) != body.count(closing):
+                _add_score(scores, index, BRACKET_SCORE, f'括弧「{opening}{closing}」の対応')
+                break
+    return scores
+
+
+def build_screening_prompt(paragraphs: List[Dict], indices: List[int]) -> str:
+    """スクリーニング用モデルに送るプロンプト（段落番号付きの、HTMLタグを除いた段落本文）を組み立てる"""
+    listing = "\n\n".join(
+        f"[{index}]\n{HTML_TOKEN_PATTERN.sub('', paragraphs[index]['body'])}" for index in indices
+    )
+    return SCREENING_PROMPT.replace("{段落}", listing)
+
+
+def parse_screening_result(tool_input: Dict, indices: List[int]) -> Dict[int, Tuple[float, str]]:
+    """
+    スクリーニング用モデルの出力を段落ごとのスコアにする
+
+    Args:
+        tool_input: screening_result ツールの入力
+        indices: スクリーニングを依頼した段落番号（それ以外の番号は無視する）
+
+    Returns:
+        {段落番号: (スコア, 理由)}
+    """
+    requested = set(indices)
+    scores = {}
+    for item in tool_input.get('flagged') or []:
+        try:
+            index = int(item['index'])
+            score = max(0.0, min(1.0, float(item.get('score', 1.0))))
+        except (KeyError, TypeError, ValueError):
+            continue
+        if index in requested and score > scores.get(index, (0.0, ''))[0]:
+            scores[index] = (score, str(item.get('reason', '')))
+    return scores
+
+
+class CascadeMetrics:
+    """
+    2段階校正の段落数・フル校正への昇格率と、段ごとの処理時間をプロセス内で集計する
+    """
+
+    def __init__(self, window: int = 500):
+        """
+        Args:
+            window: 処理時間の中央値・p95 の計算に使う直近の件数
+        """
+        self._lock = threading.Lock()
+        self._runs = 0
+        self._paragraphs = 0
+        self._escalated = 0
+        self._whole_text = 0
+        self._screen_failures = 0
+        self._screen_cost = 0.0
+        self._full_cost = 0.0
+        self._latencies = {tier: deque(maxlen=window) for tier in ('screen', 'full', 'total')}
+
+    def record(self, cascade: Dict, full_cost: float, total_time: float) -> None:
+        """
+        1回の2段階校正の結果を記録する
+
+        Args:
+            cascade: 校正結果の cascade（段落数・昇格数・段ごとの処理時間）
+            full_cost: フル校正の推定コスト（円）
+            total_time: 2段階校正全体の処理時間（秒）
+        """
+        with self._lock:
+            self._runs += 1
+            self._paragraphs += cascade['paragraphs']
+            self._escalated += cascade['escalated']
+            self._whole_text += 1 if cascade['whole_text'] else 0
+            self._screen_failures += 1 if cascade.get('screen_error') else 0
+            self._screen_cost += cascade['screen_cost']
+            self._full_cost += full_cost
+            self._latencies['screen'].append(cascade['screen_time'])
+            if cascade['escalated']:
+                self._latencies['full'].append(cascade['full_time'])
+            self._latencies['total'].append(total_time)
+
+    def stats(self) -> Dict:
+        """
+        集計結果を返す
+
+        Returns:
+            runs, paragraphs, escalated, escalation_rate, whole_text, screen_failures, screen_cost, full_cost と
+            段（screen / full / total）ごとの latency_p50・latency_p95
+        """
+        with self._lock:
+            stats = {
+                'runs': self._runs,
+                'paragraphs': self._paragraphs,
+                'escalated': self._escalated,
+                'escalation_rate': self._escalated / self._paragraphs if self._paragraphs else 0.0,
+                'whole_text': self._whole_text,
+                'screen_failures': self._screen_failures,
+                'screen_cost': self._screen_cost,
+                'full_cost': self._full_cost,
+            }
+            for tier, latencies in self._latencies.items():
+                ordered = sorted(latencies)
+                stats[f'{tier}_latency_p50'] = ordered[len(ordered) // 2] if ordered else 0.0
+                stats[f'{tier}_latency_p95'] = ordered[int(0.95 * (len(ordered) - 1))] if ordered else 0.0
+            return stats
+
+
+_cascade_metrics: Optional[CascadeMetrics] = None
+_cascade_metrics_lock = threading.Lock()
+
+
+def get_cascade_metrics() -> CascadeMetrics:
+    """プロセス内で共有する2段階校正の集計を取得する"""
+    global _cascade_metrics
+    with _cascade_metrics_lock:
+        if _cascade_metrics is None:
+            _cascade_metrics = CascadeMetrics()
+        return _cascade_metrics
+
+
+def cascade_stats() -> Dict:
+    """このプロセスの2段階校正の集計結果を返す"""
+    return get_cascade_metrics().stats()
+
+
+def reset_cascade_metrics() -> None:
+    """2段階校正の集計を破棄する（テスト用）"""
+    global _cascade_metrics
+    with _cascade_metrics_lock:
+        _cascade_metrics = None
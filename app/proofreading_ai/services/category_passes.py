@@ -0,0 +1,145 @@
+import hashlib
+import json
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+
+from proofreading_ai.services.chunking import merge_chunk_corrections
+
+# カテゴリーごとの校正の指示（1回の校正で全カテゴリーを扱うプロンプトを分割したもの）
+CATEGORY_PROMPTS = {
+    "inconsistency": """あなたは日本語校正の専門家です。以下の文章の論理的・事実的な矛盾だけを指摘してください。
+- 地理的矛盾：「富士山は東京都大阪市にある」→「富士山は静岡県・山梨県境にある」
+- 行政区分：「神奈川県横浜県」→「神奈川県横浜市」
+- 番組と放送局・出演者の組み合わせ：「サザエさん（日本テレビ）」→「サザエさん（フジテレビ）」
+- 学校年次：「小学8年生」→「小学6年生」
+- 年齢・日付・数値の矛盾：「今年25歳、去年27歳」など
+誤字や言い回しは指摘しないでください。""",
+    "typo": """あなたは日本語校正の専門家です。以下の文章の明確な誤字・脱字・変換ミスだけを指摘してください。
+HTMLタグ名・属性名の誤字（<dv>→<div>、<sapn>→<span>、clas=→class= など）も対象です。
+矛盾や言い回し、表記ルールは指摘しないでください。""",
+    "dict": """あなたは日本語校正の専門家です。以下の文章で、社内の表記ルールに合わない語句だけを指摘してください。
+企業名・ブランド名・個人名・地名などの固有名詞は正式な表記に統一します（アマゾン→Amazon、大谷→大谷翔平など）。
+文脈上、置き換えが適切な場合だけ指摘し、誤字や言い回しは指摘しないでください。""",
+    "tone": """あなたは日本語校正の専門家です。以下の文章で、より自然な表現に改善できる言い回しだけを提案してください。
+同じ語尾（です、ます、である等）の連続や、文脈に合わない不自然な表現が対象です。
+誤字・矛盾・表記ルールは指摘しないでください。""",
+}
+
+CATEGORY_PROMPT_FOOTER = """
+**🚫 校正対象外（絶対に変更しないでください）：**
+- 全角数字・全角英字（半角に変換しない）
+- HTMLタグ（指摘は本文のみ。ただしタグの誤字を指摘する場合を除く）
+
+修正箇所がない場合は空のリストを返してください。校正後テキスト全文は出力しないでください。
+
+原文:
+{原文}"""
+
+# 社内辞書・矛盾チェック項目をプロンプトに加えるカテゴリー
+DICTIONARY_SECTION_CATEGORIES = ("inconsistency", "dict")
+
+CATEGORY_TOOL = {
+    "name": "category_proofreading_result",
+    "description": "指定されたカテゴリーの修正箇所をJSON形式で出力するツール",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "corrections": {
+                "type": "array",
+                "description": "修正箇所のリスト（文書の先頭から順に出力）",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "line_number": {"type": "integer", "description": "修正箇所の行番号"},
+                        "original": {"type": "string", "description": "修正前のテキスト（原文のとおり）"},
+                        "corrected": {"type": "string", "description": "修正後のテキスト"},
+                        "reason": {"type": "string", "description": "修正理由の説明"}
+                    },
+                    "required": ["line_number", "original", "corrected", "reason"]
+                }
+            }
+        },
+        "required": ["corrections"]
+    }
+}
+
+
+def is_category_passes_enabled() -> bool:
+    """校正要求で指定がない場合にカテゴリー別の並列校正を使うかどうか"""
+    return getattr(settings, 'PROOFREAD_CATEGORY_PASSES_ENABLED', False)
+
+
+def get_pass_categories() -> List[str]:
+    """
+    実行するカテゴリーを優先順に返す（同じ箇所への指摘が食い違う場合は先のカテゴリーを採用する）
+
+    Returns:
+        settings.PROOFREAD_CATEGORY_PASSES のうち、プロンプトのあるカテゴリー
+    """
+    configured = getattr(settings, 'PROOFREAD_CATEGORY_PASSES', 'inconsistency,typo,dict,tone')
+    categories = []
+    for category in configured.split(','):
+        category = category.strip()
+        if category in CATEGORY_PROMPTS and category not in categories:
+            categories.append(category)
+    return categories
+
+
+def category_prompt_version() -> str:
+    """カテゴリー別プロンプトのバージョン（キャッシュキーに使用）"""
+    payload = json.dumps([CATEGORY_PROMPTS, CATEGORY_PROMPT_FOOTER, CATEGORY_TOOL], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:12]
+
+
+def build_category_prompt(category: str, protected_text: str) -> str:
+    """カテゴリーの指示と原文からプロンプトを組み立てる"""
+    return CATEGORY_PROMPTS[category] + "\n" + CATEGORY_PROMPT_FOOTER.replace("{原文}", protected_text)
+
+
+def merge_category_corrections(text: str, category_corrections: List[Tuple[str, List[Dict]]]) -> Tuple[List[Dict], Dict]:
+    """
+    カテゴリーごとの修正箇所を1つにまとめる
+
+    同じ箇所への同じ修正は1件にし、範囲が重なる修正は優先順の先のカテゴリーを採用する。
+    位置の分からない修正箇所は、同じ修正前テキストの修正をまだ採用していない場合だけ残す。
+
+    Args:
+        text: 校正対象のテキスト
+        category_corrections: [(カテゴリー, モデルの修正箇所)]（優先順）
+
+    Returns:
+        (位置順の修正箇所（'position' と 'category' 付き）, {'duplicates': 重複数, 'conflicts': 競合で除いた数})
+    """
+    whole = [{'start': 0, 'text': text, 'line_offset': 0}]
+    accepted = []
+    spans = []  # 採用した位置付きの修正箇所の (開始, 終了, 修正箇所)
+    duplicates = 0
+    conflicts = 0
+    for category, corrections in category_corrections:
+        located = merge_chunk_corrections(whole, [[dict(c, category=category) for c in corrections]])
+        for correction in sorted(located, key=lambda c: c['position'] if c['position'] is not None else len(text)):
+            original = correction.get('original', '')
+            if not original or correction.get('corrected', original) == original:
+                continue
+            position = correction['position']
+            if position is None:
+                if any(a.get('original') == original for a in accepted):
+                    duplicates += 1
+                else:
+                    accepted.append(correction)
+                continue
+
+            end = position + len(original)
+            overlapping = [placed for start, stop, placed in spans if start < end and position < stop]
+            if not overlapping:
+                accepted.append(correction)
+                spans.append((position, end, correction))
+            elif any(a['position'] == position and a['original'] == original
+                     and a.get('corrected') == correction.get('corrected') for a in overlapping):
+                duplicates += 1
+            else:
+                conflicts += 1
+
+    accepted.sort(key=lambda c: c['position'] if c['position'] is not None else len(text))
+    return accepted, {'duplicates': duplicates, 'conflicts': conflicts}
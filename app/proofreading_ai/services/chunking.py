@@ -0,0 +1,150 @@
+import re
+from typing import Callable, Dict, List
+
+# 段落の区切り: </p>（直後の改行を含む）の後、または空行の後
+PARAGRAPH_BOUNDARY_PATTERN = re.compile(r'</p\s*>[ \t　]*\n?|\n[ \t　]*\n+', re.IGNORECASE)
+
+# 段落が長すぎる場合の区切り: 句点・改行の直後
+SENTENCE_BOUNDARY_PATTERN = re.compile(r'[。！？!?]|\n')
+
+
+def split_paragraphs(text: str) -> List[Dict]:
+    """
+    テキストを段落単位に分割する（連結すると元のテキストに戻る）
+
+    Args:
+        text: 分割対象のテキスト（HTMLタグ含む）
+
+    Returns:
+        段落情報のリスト [{'start': 開始位置, 'end': 終了位置, 'text': 段落テキスト}]
+    """
+    paragraphs = []
+    last = 0
+    for match in PARAGRAPH_BOUNDARY_PATTERN.finditer(text):
+        end = match.end()
+        if end > last:
+            paragraphs.append({'start': last, 'end': end, 'text': text[last:end]})
+            last = end
+    if last < len(text):
+        paragraphs.append({'start': last, 'end': len(text), 'text': text[last:]})
+    return paragraphs
+
+
+def _split_oversized(paragraph: Dict, max_tokens: int, count_tokens: Callable[[str], int]) -> List[Dict]:
+    """トークン上限を超える段落を文単位でさらに分割する"""
+    text = paragraph['text']
+    pieces = []
+    last = 0
+    for match in SENTENCE_BOUNDARY_PATTERN.finditer(text):
+        end = match.end()
+        pieces.append((last, end))
+        last = end
+    if last < len(text):
+        pieces.append((last, len(text)))
+
+    # 1文だけで上限を超える場合はその文を1ピースとして扱う
+    result = []
+    current_start = None
+    current_end = None
+    current_tokens = 0
+    for start, end in pieces:
+        piece_tokens = count_tokens(text[start:end])
+        if current_start is not None and current_tokens + piece_tokens > max_tokens:
+            result.append((current_start, current_end))
+            current_start = None
+        if current_start is None:
+            current_start = start
+            current_tokens = 0
+        current_end = end
+        current_tokens += piece_tokens
+    if current_start is not None:
+        result.append((current_start, current_end))
+
+    base = paragraph['start']
+    return [{'start': base + s, 'end': base + e, 'text': text[s:e]} for s, e in result]
+
+
+def split_into_chunks(text: str, max_tokens: int, count_tokens: Callable[[str], int]) -> List[Dict]:
+    """
+    テキストを段落境界でトークン数の上限以内のチャンクにまとめる
+
+    Args:
+        text: 分割対象のテキスト
+        max_tokens: 1チャンクあたりの最大トークン数
+        count_tokens: トークン数を概算する関数
+
+    Returns:
+        チャンク情報のリスト
+        [{'index': 番号, 'start': 開始位置, 'end': 終了位置, 'text': チャンクテキスト, 'line_offset': 先頭行までの改行数}]
+    """
+    units = []
+    for paragraph in split_paragraphs(text):
+        if count_tokens(paragraph['text']) > max_tokens:
+            units.extend(_split_oversized(paragraph, max_tokens, count_tokens))
+        else:
+            units.append(paragraph)
+
+    spans = []
+    current_start = None
+    current_end = None
+    current_tokens = 0
+    for unit in units:
+        unit_tokens = count_tokens(unit['text'])
+        if current_start is not None and current_tokens + unit_tokens > max_tokens:
+            spans.append((current_start, current_end))
+            current_start = None
+        if current_start is None:
+            current_start = unit['start']
+            current_tokens = 0
+        current_end = unit['end']
+        current_tokens += unit_tokens
+    if current_start is not None:
+        spans.append((current_start, current_end))
+
+    chunks = []
+    line_offset = 0
+    for index, (start, end) in enumerate(spans):
+        chunk_text = text[start:end]
+        chunks.append({
+            'index': index,
+            'start': start,
+            'end': end,
+            'text': chunk_text,
+            'line_offset': line_offset,
+        })
+        line_offset += chunk_text.count('\n')
+    return chunks
+
+
+def merge_chunk_corrections(chunks: List[Dict], chunk_corrections: List[List[Dict]]) -> List[Dict]:
+    """
+    チャンクごとの修正箇所を元テキスト基準の行番号・文字位置に変換して結合する
+
+    Args:
+        chunks: split_into_chunks の結果
+        chunk_corrections: チャンクと同じ順序の修正箇所リスト
+
+    Returns:
+        元テキスト全体に対する修正箇所のリスト（'position' に元テキスト内の開始位置を付与）
+    """
+    merged = []
+    for chunk, corrections in zip(chunks, chunk_corrections):
+        search_from = 0
+        for correction in corrections:
+            adjusted = dict(correction)
+            line_number = correction.get('line_number')
+            if isinstance(line_number, int) and line_number > 0:
+                adjusted['line_number'] = line_number + chunk['line_offset']
+
+            original = correction.get('original', '')
+            position = None
+            if original:
+                local = chunk['text'].find(original, search_from)
+                if local == -1:
+                    local = chunk['text'].find(original)
+                if local != -1:
+                    position = chunk['start'] + local
+                    search_from = local + len(original)
+            adjusted['position'] = position
+            merged.append(adjusted)
+    return merged
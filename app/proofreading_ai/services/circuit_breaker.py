@@ -0,0 +1,290 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from django.conf import settings
+
+from proofreading_ai.services.rate_limiter import RateLimitTimeoutError
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+# モデル側の障害とみなさないエラー（リクエスト内容の誤りはフォールバックしても解決しない）
+NON_TRIPPING_ERROR_CODES = {'ValidationException'}
+
+
+class CircuitOpenError(Exception):
+    """サーキットが開いていてモデルを呼び出せない場合の例外"""
+
+    def __init__(self, name: str, retry_after: float = 0):
+        super().__init__(f"{name} のサーキットが開いています（{retry_after:.0f}秒後に再確認）")
+        self.name = name
+        self.retry_after = retry_after
+
+
+def is_model_failure(error: Exception) -> bool:
+    """
+    例外がモデル・推論プロファイル側の障害（スロットリング・タイムアウト・サーバーエラーなど）かどうか
+
+    このプロセスの同時実行枠を待ちきれなかった場合（RateLimitTimeoutError）はモデルを呼んでいないため数えない。
+
+    Args:
+        error: 呼び出し時の例外
+
+    Returns:
+        サーキットの失敗として数える場合True
+    """
+    if isinstance(error, RateLimitTimeoutError):
+        return False
+    response = getattr(error, 'response', None)
+    if isinstance(response, dict):
+        return response.get('Error', {}).get('Code') not in NON_TRIPPING_ERROR_CODES
+    return True
+
+
+class AttemptTimer:
+    """
+    モデル呼び出し1回の所要時間を測る
+
+    リミッターを通した呼び出しの全体ではなく、その中の各試行を包んで使い、直近の試行の時間を残す
+    （同時実行枠の待ち時間・再試行前のバックオフはサーキットの遅延に含めない）。
+    """
+
+    def __init__(self):
+        self.seconds = 0.0
+
+    def call(self, func: Callable[[], Any]) -> Any:
+        started = time.monotonic()
+        try:
+            return func()
+        finally:
+            self.seconds = time.monotonic() - started
+
+    async def call_async(self, func: Callable[[], Awaitable[Any]]) -> Any:
+        started = time.monotonic()
+        try:
+            return await func()
+        finally:
+            self.seconds = time.monotonic() - started
+
+
+class CircuitBreaker:
+    """
+    モデル（推論プロファイル）ごとのサーキットブレーカー
+
+    直近 window 件の呼び出しの失敗率（遅延が slow_call_seconds を超えた呼び出しも失敗として数える）が
+    failure_rate を超えると開き、cooldown 秒間は呼び出しを止める。
+    その後は半開状態で half_open_probes 件だけ試し、成功すれば閉じ、失敗すれば再び開く。
+    """
+
+    def __init__(self, name: str, window: int = 20, min_calls: int = 5, failure_rate: float = 0.5,
+                 slow_call_seconds: Optional[float] = None, cooldown: float = 30, half_open_probes: int = 1,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            name: 対象の名前（モデルID）
+            window: 失敗率を計算する直近の呼び出し件数
+            min_calls: 失敗率で開くために必要な最小呼び出し件数
+            failure_rate: 開く失敗率のしきい値（0〜1）
+            slow_call_seconds: この秒数を超えた呼び出しを失敗として数える（Noneで無効）
+            cooldown: 開いてから半開にするまでの秒数
+            half_open_probes: 半開状態で同時に試す呼び出し数
+            clock: 時刻関数（テスト用）
+        """
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.cooldown = cooldown
+        self.half_open_probes = half_open_probes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window)  # (失敗か, 遅延秒)
+        self._state = STATE_CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._opened_count = 0
+        self._rejected_count = 0
+        self._last_error = ''
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh_state()
+            return self._state
+
+    def _refresh_state(self) -> None:
+        if self._state == STATE_OPEN and self._clock() - self._opened_at >= self.cooldown:
+            self._state = STATE_HALF_OPEN
+            self._probes_in_flight = 0
+            logger.info(f"🔌 サーキット半開: {self.name}（回復を確認します）")
+
+    def _open(self) -> None:
+        self._state = STATE_OPEN
+        self._opened_at = self._clock()
+        self._opened_count += 1
+        self._probes_in_flight = 0
+
+    def allow_request(self) -> bool:
+        """
+        呼び出してよいかを判定する（半開状態では試行枠を1つ確保する）
+
+        Returns:
+            呼び出してよい場合True
+        """
+        with self._lock:
+            self._refresh_state()
+            if self._state == STATE_CLOSED:
+                return True
+            if self._state == STATE_HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+                self._probes_in_flight += 1
+                return True
+            self._rejected_count += 1
+            return False
+
+    def retry_after(self) -> float:
+        """開いている場合に半開になるまでの残り秒数"""
+        with self._lock:
+            if self._state != STATE_OPEN:
+                return 0.0
+            return max(0.0, self.cooldown - (self._clock() - self._opened_at))
+
+    def record_success(self, latency: float) -> bool:
+        """
+        呼び出しの成功を記録する（遅延がしきい値を超えた場合は失敗として扱う）
+
+        Args:
+            latency: 呼び出しにかかった秒数
+
+        Returns:
+            この記録でサーキットが開いた場合True
+        """
+        if self.slow_call_seconds is not None and latency > self.slow_call_seconds:
+            return self.record_failure(latency, f"遅延 {latency:.1f}秒")
+        with self._lock:
+            self._outcomes.append((False, latency))
+            if self._state == STATE_HALF_OPEN:
+                self._state = STATE_CLOSED
+                self._outcomes.clear()
+                self._probes_in_flight = 0
+                logger.info(f"✅ サーキット復帰: {self.name}")
+        return False
+
+    def record_failure(self, latency: float, error: str = '') -> bool:
+        """
+        呼び出しの失敗を記録する
+
+        Args:
+            latency: 呼び出しにかかった秒数
+            error: エラー内容
+
+        Returns:
+            この記録でサーキットが開いた場合True
+        """
+        with self._lock:
+            self._outcomes.append((True, latency))
+            self._last_error = str(error)[:500]
+            if self._state == STATE_HALF_OPEN:
+                self._open()
+                logger.warning(f"🚧 サーキット再遮断: {self.name}（回復確認に失敗: {self._last_error}）")
+                return True
+            if self._state == STATE_CLOSED and len(self._outcomes) >= self.min_calls:
+                failures = sum(1 for failed, _ in self._outcomes if failed)
+                if failures / len(self._outcomes) >= self.failure_rate:
+                    self._open()
+                    logger.error(
+                        f"🚧 サーキット遮断: {self.name}（失敗率 {failures}/{len(self._outcomes)}、"
+                        f"{self.cooldown:.0f}秒間フォールバックします: {self._last_error}）"
+                    )
+                    return True
+        return False
+
+    def release(self) -> None:
+        """失敗にも成功にも数えない呼び出しで確保した半開の試行枠を返す"""
+        with self._lock:
+            if self._state == STATE_HALF_OPEN and self._probes_in_flight:
+                self._probes_in_flight -= 1
+
+    def metrics(self) -> Dict:
+        """
+        サーキットの状態と直近の失敗率・遅延を返す
+
+        Returns:
+            state, calls, failure_rate, slow_calls, latency_avg, latency_p95, opened_count, rejected_count など
+        """
+        with self._lock:
+            self._refresh_state()
+            outcomes = list(self._outcomes)
+            latencies = sorted(latency for _, latency in outcomes)
+            failures = sum(1 for failed, _ in outcomes if failed)
+            slow_calls = (sum(1 for latency in latencies if latency > self.slow_call_seconds)
+                          if self.slow_call_seconds is not None else 0)
+            return {
+                'name': self.name,
+                'state': self._state,
+                'calls': len(outcomes),
+                'failure_rate': failures / len(outcomes) if outcomes else 0.0,
+                'slow_calls': slow_calls,
+                'latency_avg': sum(latencies) / len(latencies) if latencies else 0.0,
+                'latency_p95': latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0,
+                'opened_count': self._opened_count,
+                'rejected_count': self._rejected_count,
+                'retry_after': (max(0.0, self.cooldown - (self._clock() - self._opened_at))
+                                if self._state == STATE_OPEN else 0.0),
+                'last_error': self._last_error,
+            }
+
+
+def is_circuit_breaker_enabled() -> bool:
+    """サーキットブレーカーとモデルのフォールバックが有効かどうかを返す"""
+    return getattr(settings, 'PROOFREAD_BREAKER_ENABLED', True)
+
+
+# プロセス内で共有するモデルごとのサーキット
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """
+    モデルごとの共有サーキットブレーカーを取得する
+
+    Args:
+        name: モデルID（推論プロファイルARN）
+
+    Returns:
+        共有CircuitBreakerインスタンス
+    """
+    breaker = _breakers.get(name)
+    if breaker is not None:
+        return breaker
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(
+                name,
+                window=getattr(settings, 'PROOFREAD_BREAKER_WINDOW', 20),
+                min_calls=getattr(settings, 'PROOFREAD_BREAKER_MIN_CALLS', 5),
+                failure_rate=getattr(settings, 'PROOFREAD_BREAKER_FAILURE_RATE', 0.5),
+                slow_call_seconds=getattr(settings, 'PROOFREAD_BREAKER_SLOW_CALL_SECONDS', 120) or None,
+                cooldown=getattr(settings, 'PROOFREAD_BREAKER_COOLDOWN', 30),
+                half_open_probes=getattr(settings, 'PROOFREAD_BREAKER_HALF_OPEN_PROBES', 1),
+            )
+        return _breakers[name]
+
+
+def circuit_breaker_metrics() -> Dict[str, Dict]:
+    """すべてのサーキットの状態を返す（{モデルID: metrics}）"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.metrics() for breaker in breakers}
+
+
+def reset_circuit_breakers() -> None:
+    """共有サーキットをすべて破棄する"""
+    with _breakers_lock:
+        _breakers.clear()
@@ -0,0 +1,313 @@
+import csv
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Count, Max, Q
+
+from proofreading_ai.models import ReplacementDictionary, CompanyDictionary, InconsistencyData
+
+logger = logging.getLogger(__name__)
+
+# 辞書エントリの出典（同じ語句が複数の辞書にある場合はこの順で優先する）
+SOURCE_REPLACEMENT = 'replacement_dictionary'
+SOURCE_COMPANY = 'company_dictionary'
+SOURCE_CSV = 'replacement_csv'
+
+
+class PatternAutomaton:
+    """
+    複数の語句を同時に検索する Aho–Corasick オートマトン
+
+    テキストを1回走査するだけで、登録したすべての語句の出現位置（重なりを含む）を求める。
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        """
+        Args:
+            patterns: 検索する語句（空文字列は無視）
+        """
+        goto = [{}]
+        fail = [0]
+        outputs = [()]  # 状態で終わる語句の長さ（失敗遷移先で終わる語句も含む）
+        for pattern in patterns:
+            if not pattern:
+                continue
+            state = 0
+            for ch in pattern:
+                next_state = goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto.append({})
+                    fail.append(0)
+                    outputs.append(())
+                    goto[state][ch] = next_state
+                state = next_state
+            outputs[state] = (len(pattern),)
+
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and ch not in goto[fallback]:
+                    fallback = fail[fallback]
+                fallback = goto[fallback].get(ch, 0)
+                fail[next_state] = fallback
+                if outputs[fallback]:
+                    outputs[next_state] = outputs[next_state] + outputs[fallback]
+
+        self._goto = goto
+        self._fail = fail
+        self._outputs = outputs
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        """
+        語句の出現位置をすべて返す（テキスト長と出現数に比例する1回の走査）
+
+        Args:
+            text: 検索対象のテキスト
+
+        Yields:
+            (開始位置, 終了位置)（終了位置の順）
+        """
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        state = 0
+        for index, ch in enumerate(text):
+            transitions = goto[state]
+            while ch not in transitions and state:
+                state = fail[state]
+                transitions = goto[state]
+            state = transitions.get(ch, 0)
+            if outputs[state]:
+                end = index + 1
+                for length in outputs[state]:
+                    yield end - length, end
+
+    def present_patterns(self, text: str) -> set:
+        """
+        テキストに1回以上出現する語句の集合を返す
+
+        Args:
+            text: 検索対象のテキスト
+
+        Returns:
+            出現した語句の集合
+        """
+        return {text[start:end] for start, end in self.iter_matches(text)}
+
+
+class DictionaryMatcher(PatternAutomaton):
+    """
+    複数の置換辞書をまとめた Aho–Corasick 方式の照合器
+
+    すべての語句を1つのオートマトンに登録し、テキストを1回走査するだけで
+    全辞書の一致箇所を求める。重なる一致は「左端が早いもの、同じ位置なら長いもの」を
+    採用するため、結果は辞書の登録順や語句の並びに依存しない。
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, str, str]], version: str = ''):
+        """
+        Args:
+            entries: (語句, 置換後, 出典) のリスト（同じ語句は先に出たものを優先）
+            version: 元データのバージョン（キャッシュ判定用）
+        """
+        self.version = version
+        self.replacements: Dict[str, Tuple[str, str]] = {}
+        for pattern, replacement, source in entries:
+            if not pattern or pattern == replacement or pattern in self.replacements:
+                continue
+            self.replacements[pattern] = (replacement, source)
+        super().__init__(self.replacements)
+
+    def __len__(self) -> int:
+        return len(self.replacements)
+
+    def find(self, text: str) -> List[Tuple[int, int, str, str, str]]:
+        """
+        テキスト中の辞書語句を検索する（テキスト長に比例する1回の走査）
+
+        Args:
+            text: 検索対象のテキスト
+
+        Returns:
+            (開始位置, 終了位置, 語句, 置換後, 出典) のリスト（位置順・重なりなし）
+        """
+        if not self.replacements:
+            return []
+
+        candidates = [(start, start - end) for start, end in self.iter_matches(text)]
+
+        # 左端が早いもの、同じ位置なら長いものを採用する
+        candidates.sort()
+        matches = []
+        last_end = 0
+        for start, negative_length in candidates:
+            if start < last_end:
+                continue
+            last_end = start - negative_length
+            pattern = text[start:last_end]
+            replacement, source = self.replacements[pattern]
+            matches.append((start, last_end, pattern, replacement, source))
+        return matches
+
+    def apply(self, text: str) -> str:
+        """
+        一致した語句を置換したテキストを返す（置換後の文字列は再照合しない）
+
+        Args:
+            text: 置換対象のテキスト
+
+        Returns:
+            置換後のテキスト
+        """
+        parts = []
+        last_end = 0
+        for start, end, _, replacement, _ in self.find(text):
+            parts.append(text[last_end:start])
+            parts.append(replacement)
+            last_end = end
+        parts.append(text[last_end:])
+        return ''.join(parts)
+
+    def as_dict(self, source: Optional[str] = None) -> Dict[str, str]:
+        """
+        登録済みの語句を {語句: 置換後} の辞書で返す
+
+        Args:
+            source: 指定した出典の語句だけに絞る場合の出典名
+
+        Returns:
+            {語句: 置換後} の辞書
+        """
+        return {
+            pattern: replacement
+            for pattern, (replacement, entry_source) in self.replacements.items()
+            if source is None or entry_source == source
+        }
+
+
+def get_dictionary_csv_path() -> str:
+    """置換辞書CSVのパスを返す"""
+    return str(getattr(settings, 'PROOFREAD_DICTIONARY_CSV', settings.BASE_DIR / 'proofreading' / 'replacement_dict.csv'))
+
+
+def load_dictionary_entries() -> List[Tuple[str, str, str]]:
+    """
+    すべての辞書ソースから置換エントリを読み込む
+
+    優先順は置換辞書（DB）→ 社内辞書の代替表記（優先度順）→ 置換辞書CSV。
+
+    Returns:
+        (語句, 置換後, 出典) のリスト
+    """
+    entries = []
+
+    for item in ReplacementDictionary.objects.filter(is_active=True).order_by('id').values('original_word', 'replacement_word'):
+        entries.append((item['original_word'], item['replacement_word'], SOURCE_REPLACEMENT))
+
+    company_terms = CompanyDictionary.objects.filter(is_active=True).order_by('-priority', 'term', 'id')
+    for item in company_terms.values('correct_form', 'alternative_forms'):
+        for form in item['alternative_forms'].replace('、', ',').split(','):
+            entries.append((form.strip(), item['correct_form'], SOURCE_COMPANY))
+
+    csv_path = get_dictionary_csv_path()
+    if os.path.exists(csv_path):
+        with open(csv_path, 'r', encoding='utf-8') as file:
+            for row in csv.reader(file):
+                if len(row) >= 2:
+                    entries.append((row[0].strip(), row[1].strip(), SOURCE_CSV))
+
+    return entries
+
+
+def _compute_dictionary_version() -> str:
+    stamp = [
+        model.objects.aggregate(
+            last_id=Max('id'),
+            active=Count('id', filter=Q(is_active=True)),
+            updated=Max(updated_field)
+        )
+        for model, updated_field in (
+            (ReplacementDictionary, 'created_at'),
+            (CompanyDictionary, 'updated_at'),
+            (InconsistencyData, 'created_at'),
+        )
+    ]
+    csv_path = get_dictionary_csv_path()
+    if os.path.exists(csv_path):
+        csv_stat = os.stat(csv_path)
+        stamp.append([csv_stat.st_mtime_ns, csv_stat.st_size])
+    return hashlib.sha256(json.dumps(stamp, default=str).encode('utf-8')).hexdigest()[:12]
+
+
+# プロセス内で共有する辞書バージョンと照合器
+_dictionary_version = None
+_dictionary_version_checked_at = 0.0
+_shared_matcher = None
+_dictionary_lock = threading.Lock()
+
+
+def get_dictionary_version() -> str:
+    """
+    辞書データのバージョンを返す（件数・最終更新日時・CSVの更新時刻から算出）
+
+    同じプロセス内での辞書の変更はモデルのシグナルで即座に反映し、
+    他のプロセスでの変更は PROOFREAD_DICTIONARY_CHECK_INTERVAL 秒ごとの再確認で反映する。
+
+    Returns:
+        辞書の内容が変わると変化する短いハッシュ文字列
+    """
+    global _dictionary_version, _dictionary_version_checked_at
+
+    interval = getattr(settings, 'PROOFREAD_DICTIONARY_CHECK_INTERVAL', 30)
+    now = time.monotonic()
+    version = _dictionary_version
+    if version is not None and now - _dictionary_version_checked_at < interval:
+        return version
+
+    version = _compute_dictionary_version()
+    with _dictionary_lock:
+        _dictionary_version = version
+        _dictionary_version_checked_at = now
+    return version
+
+
+def get_dictionary_matcher() -> DictionaryMatcher:
+    """
+    プロセス内で共有する辞書照合器を取得する（辞書バージョンが変わった場合のみ再構築）
+
+    Returns:
+        共有DictionaryMatcherインスタンス
+    """
+    global _shared_matcher
+
+    version = get_dictionary_version()
+    matcher = _shared_matcher
+    if matcher is not None and matcher.version == version:
+        return matcher
+
+    with _dictionary_lock:
+        if _shared_matcher is None or _shared_matcher.version != version:
+            started = time.time()
+            _shared_matcher = DictionaryMatcher(load_dictionary_entries(), version=version)
+            logger.info(f"📚 辞書照合器を構築しました: {len(_shared_matcher)}語 "
+                        f"({(time.time() - started) * 1000:.1f}ms, version={version})")
+        return _shared_matcher
+
+
+def invalidate_dictionary_cache() -> None:
+    """
+    辞書バージョンの記憶を破棄し、次回の取得時に再確認させる（辞書モデルの保存・削除時に呼ばれる）
+    """
+    global _dictionary_version
+
+    with _dictionary_lock:
+        _dictionary_version = None
@@ -0,0 +1,181 @@
+import logging
+import time
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+from proofreading_ai.services.dictionary_matcher import (
+    DictionaryMatcher, get_dictionary_matcher, SOURCE_REPLACEMENT, SOURCE_COMPANY, SOURCE_CSV
+)
+from proofreading_ai.utils import HTML_TOKEN_PATTERN
+
+logger = logging.getLogger(__name__)
+
+SOURCE_LABELS = {
+    SOURCE_REPLACEMENT: '置換辞書',
+    SOURCE_COMPANY: '社内辞書',
+    SOURCE_CSV: '表記ルール辞書',
+}
+
+# プロンプトに列挙する処理済み語句の上限（多すぎる場合は入力トークンが増えるため打ち切る）
+MAX_NOTICE_RULES = 50
+
+
+def is_dictionary_prepass_enabled() -> bool:
+    """辞書の事前適用が有効かどうかを返す"""
+    return getattr(settings, 'PROOFREAD_DICTIONARY_PREPASS', False)
+
+
+class DictionaryPrepass:
+    """
+    モデル呼び出し前に辞書ルールを機械的に適用する前処理
+
+    原文中の辞書語句（HTMLタグ内を除く）を dict カテゴリーの修正箇所として確定し、
+    モデルには「処理済みのため触れない」ことをプロンプトで伝える。
+    モデルの校正結果には同じ規則を適用し、確定済みの修正箇所を結合する。
+    """
+
+    def __init__(self, text: str, matcher: Optional[DictionaryMatcher] = None):
+        """
+        Args:
+            text: 校正対象の原文
+            matcher: 使用する辞書照合器（省略時はプロセス共有の照合器）
+        """
+        started = time.time()
+        self.matcher = matcher if matcher is not None else get_dictionary_matcher()
+        self.text_length = len(text)
+        self.corrections = []
+        self.rules = {}
+
+        line_number = 1
+        last_start = 0
+        for start, end, original, replacement, source in self._find_outside_tags(self.matcher, text):
+            line_number += text.count('\n', last_start, start)
+            last_start = start
+            self.rules[original] = replacement
+            self.corrections.append({
+                'line_number': line_number,
+                'original': original,
+                'corrected': replacement,
+                'reason': f'{SOURCE_LABELS.get(source, "辞書")}のルールにより「{replacement}」と表記します',
+                'category': 'dict',
+                'position': start,
+                'source': source,
+            })
+        # モデルの出力には処理済みの規則だけを適用する
+        self._rules_matcher = DictionaryMatcher((o, r, 'prepass') for o, r in self.rules.items())
+        self.elapsed = time.time() - started
+
+    @staticmethod
+    def _find_outside_tags(matcher: DictionaryMatcher, text: str) -> List:
+        """HTMLタグ・コメントと重ならない一致箇所だけを返す"""
+        matches = matcher.find(text)
+        if not matches or '<' not in text:
+            return matches
+        tag_spans = [(m.start(), m.end()) for m in HTML_TOKEN_PATTERN.finditer(text)]
+        result = []
+        tag_index = 0
+        for match in matches:
+            start, end = match[0], match[1]
+            while tag_index < len(tag_spans) and tag_spans[tag_index][1] <= start:
+                tag_index += 1
+            if tag_index < len(tag_spans) and tag_spans[tag_index][0] < end:
+                continue
+            result.append(match)
+        return result
+
+    def prompt_notice(self, text: Optional[str] = None) -> str:
+        """
+        処理済みの語句をモデルに伝えるプロンプト追記文を返す
+
+        Args:
+            text: 分割校正のチャンクなど、対象を絞る場合のテキスト（省略時はすべての語句）
+
+        Returns:
+            プロンプトに追加する文（処理済みの語句がない場合は空文字列）
+        """
+        rules = [(o, r) for o, r in self.rules.items() if text is None or o in text]
+        if not rules:
+            return ''
+        listed = '、'.join(f'「{original}」→「{replacement}」' for original, replacement in rules[:MAX_NOTICE_RULES])
+        return (
+            f"\n\n※ 次の語句は辞書ルールで自動修正済みです。原文のまま出力し、修正箇所にも含めないでください: {listed}"
+        )
+
+    def apply(self, text: str) -> str:
+        """
+        モデルの校正結果に処理済みの辞書ルールを適用する
+
+        Args:
+            text: モデルが返した校正後テキスト（HTML復元済み）
+
+        Returns:
+            辞書ルールを適用したテキスト
+        """
+        if not self.rules:
+            return text
+        parts = []
+        last_end = 0
+        for start, end, _, replacement, _ in self._find_outside_tags(self._rules_matcher, text):
+            parts.append(text[last_end:start])
+            parts.append(replacement)
+            last_end = end
+        parts.append(text[last_end:])
+        return ''.join(parts)
+
+    def is_handled(self, correction: Dict) -> bool:
+        """モデルの修正箇所が処理済みの辞書ルールと同じ内容かどうか"""
+        return self.rules.get(correction.get('original')) == correction.get('corrected')
+
+    def metrics(self, model_corrections: int = 0) -> Dict:
+        """
+        事前適用の統計情報を返す
+
+        Args:
+            model_corrections: モデルが返した修正箇所の件数
+
+        Returns:
+            ローカルで確定した件数・出典別件数・処理時間など
+        """
+        by_source = {}
+        for correction in self.corrections:
+            by_source[correction['source']] = by_source.get(correction['source'], 0) + 1
+        total = len(self.corrections) + model_corrections
+        return {
+            'resolved_locally': len(self.corrections),
+            'model_corrections': model_corrections,
+            'local_ratio': len(self.corrections) / total if total else 0.0,
+            'by_source': by_source,
+            'rules': len(self.rules),
+            'elapsed_ms': self.elapsed * 1000,
+            'dictionary_version': self.matcher.version,
+        }
+
+    def merge_into(self, result: Dict) -> Dict:
+        """
+        モデルの校正結果に辞書の修正箇所を結合する
+
+        Args:
+            result: _proofread_with_json_mode などの校正結果（エラーでないもの）
+
+        Returns:
+            校正後テキストに辞書ルールを適用し、修正箇所と統計情報を追加した校正結果
+            （修正箇所は位置・行番号の順。位置の分からない修正箇所は末尾に並べる）
+        """
+        model_corrections = [c for c in result.get('corrections', []) if not self.is_handled(c)]
+        corrections = sorted(self.corrections + model_corrections, key=lambda c: (
+            c['position'] if isinstance(c.get('position'), int) else self.text_length,
+            c.get('line_number') or 0,
+        ))
+        metrics = self.metrics(len(model_corrections))
+        logger.info(
+            f"📚 辞書の事前適用: ローカル確定 {metrics['resolved_locally']}件 / "
+            f"モデル {metrics['model_corrections']}件 ({metrics['elapsed_ms']:.1f}ms)"
+        )
+        return dict(
+            result,
+            corrected_text=self.apply(result.get('corrected_text', '')),
+            corrections=corrections,
+            local_corrections=metrics['resolved_locally'],
+            dictionary_prepass=metrics,
+        )
@@ -0,0 +1,320 @@
+import calendar
+import logging
+import re
+import threading
+import time
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from proofreading_ai.models import InconsistencyData
+from proofreading_ai.services.dictionary_matcher import PatternAutomaton, get_dictionary_version
+from proofreading_ai.utils import HTML_TOKEN_PATTERN
+
+logger = logging.getLogger(__name__)
+
+SOURCE_LOCAL_DETECTOR = 'local_detector'
+
+# 全角数字を半角に変換するための表
+FULLWIDTH_DIGITS = str.maketrans('０１２３４５６７８９', '0123456789')
+NUMBER = r'([0-9０-９]{1,4})'
+WEEKDAYS = '月火水木金土日'
+
+# 検出ルールの書式（InconsistencyData.detection_rule の1行ごと）
+#   regex: <正規表現>                   … 一致した箇所を矛盾として報告
+#   range: <数値を1つ捕捉する正規表現> <最小>-<最大>  … 捕捉した数値が範囲外なら報告
+RULE_LINE_PATTERN = re.compile(r'^\s*(regex|range)\s*[:：]\s*(.+?)\s*$', re.IGNORECASE)
+RANGE_RULE_PATTERN = re.compile(r'^(.+?)\s+(\d+)\s*[-〜~]\s*(\d+)$')
+
+# 組み込みの数値・日付チェック
+SCHOOL_YEAR_RULES = (
+    (re.compile(r'小学(?:校)?' + NUMBER + r'年生?'), 6, '小学校は6年生まで'),
+    (re.compile(r'中学(?:校)?' + NUMBER + r'年生?'), 3, '中学校は3年生まで'),
+    (re.compile(r'高校' + NUMBER + r'年生?'), 3, '高校は3年生まで'),
+)
+DATE_PATTERN = re.compile(
+    r'(?:' + NUMBER + r'年)?' + r'([0-9０-９]{1,2})月([0-9０-９]{1,2})日'
+    r'(?:\s*[（(]([' + WEEKDAYS + r'])(?:曜日?)?[）)])?'
+)
+AGE_PATTERN = re.compile(r'(今年|去年|昨年|来年)(?:で|は|の)?' + NUMBER + r'歳')
+AGE_YEAR_OFFSETS = {'今年': 0, '去年': -1, '昨年': -1, '来年': 1}
+
+
+def to_int(value: str) -> int:
+    """全角を含む数字の文字列を整数に変換する"""
+    return int(value.translate(FULLWIDTH_DIGITS))
+
+
+class InconsistencyDetector:
+    """
+    矛盾検出データと組み込みの数値・日付チェックによるローカルの矛盾検出器
+
+    - 誤りパターン（incorrect_patterns）は1つのオートマトンで同時に検索する
+    - 検出ルール（detection_rule）の regex: / range: 行は正規表現にコンパイルする
+    - 学年・日付・曜日・年齢の食い違いは組み込みの抽出器で検出する
+
+    モデルを呼ばずに数ミリ秒で inconsistency カテゴリーの修正箇所を返す。
+    """
+
+    def __init__(self, rows: List[Dict], version: str = ''):
+        """
+        Args:
+            rows: 矛盾検出データ（name, type, correct_form, incorrect_patterns, detection_rule, description）のリスト
+            version: 元データのバージョン（キャッシュ判定用）
+        """
+        self.version = version
+        self._rules_by_pattern: Dict[str, List[Dict]] = {}
+        self._regex_rules: List[Tuple[re.Pattern, Dict]] = []
+        self._range_rules: List[Tuple[re.Pattern, int, int, Dict]] = []
+
+        for row in rows:
+            for pattern in row['patterns']:
+                self._rules_by_pattern.setdefault(pattern, []).append(row)
+            for line in (row.get('detection_rule') or '').splitlines():
+                self._compile_rule_line(line, row)
+
+        self._automaton = PatternAutomaton(self._rules_by_pattern)
+
+    def _compile_rule_line(self, line: str, row: Dict) -> None:
+        """検出ルールの1行をコンパイルする（書式外の行は説明文としてモデルに任せる）"""
+        match = RULE_LINE_PATTERN.match(line)
+        if not match:
+            return
+        kind, body = match.group(1).lower(), match.group(2)
+        try:
+            if kind == 'regex':
+                self._regex_rules.append((re.compile(body), row))
+                return
+            range_match = RANGE_RULE_PATTERN.match(body)
+            if not range_match:
+                logger.warning(f"⚠️ 範囲ルールの書式が不正です: {row['name']}: {line}")
+                return
+            pattern = re.compile(range_match.group(1))
+            if pattern.groups < 1:
+                logger.warning(f"⚠️ 範囲ルールに数値の捕捉グループがありません: {row['name']}: {line}")
+                return
+            self._range_rules.append((pattern, int(range_match.group(2)), int(range_match.group(3)), row))
+        except re.error as e:
+            logger.warning(f"⚠️ 検出ルールの正規表現が不正です: {row['name']}: {line} ({str(e)})")
+
+    @property
+    def rule_count(self) -> int:
+        """登録済みの誤りパターン・検出ルールの数"""
+        return len(self._rules_by_pattern) + len(self._regex_rules) + len(self._range_rules)
+
+    def detect(self, text: str) -> List[Dict]:
+        """
+        テキスト中の矛盾を検出する
+
+        Args:
+            text: 対象テキスト（HTMLタグ・コメント内は検出しない）
+
+        Returns:
+            inconsistency カテゴリーの修正箇所のリスト（位置順、'position' に開始位置）
+        """
+        # タグ部分を同じ長さの空白にして位置を保ったまま検出対象から外す
+        if '<' in text:
+            text = HTML_TOKEN_PATTERN.sub(lambda m: ' ' * len(m.group()), text)
+
+        findings = {}
+
+        def add(start, end, corrected, reason, rule):
+            key = (start, end)
+            if key not in findings:
+                findings[key] = (corrected, reason, rule)
+
+        for start, end in self._automaton.iter_matches(text):
+            for row in self._rules_by_pattern[text[start:end]]:
+                add(start, end, row['correct_form'] or text[start:end], self._reason(row), row['name'])
+
+        for pattern, row in self._regex_rules:
+            for match in pattern.finditer(text):
+                if match.end() > match.start():
+                    add(match.start(), match.end(), row['correct_form'] or match.group(), self._reason(row), row['name'])
+
+        for pattern, minimum, maximum, row in self._range_rules:
+            for match in pattern.finditer(text):
+                try:
+                    value = to_int(match.group(1))
+                except (TypeError, ValueError):
+                    continue
+                if not minimum <= value <= maximum:
+                    add(match.start(), match.end(), match.group(),
+                        f"{self._reason(row)}（{minimum}〜{maximum}の範囲外: {value}）", row['name'])
+
+        for start, end, corrected, reason, rule in self._builtin_findings(text):
+            add(start, end, corrected, reason, rule)
+
+        corrections = []
+        line_number = 1
+        last_start = 0
+        for (start, end), (corrected, reason, rule) in sorted(findings.items()):
+            line_number += text.count('\n', last_start, start)
+            last_start = start
+            corrections.append({
+                'line_number': line_number,
+                'original': text[start:end],
+                'corrected': corrected,
+                'reason': reason,
+                'category': 'inconsistency',
+                'position': start,
+                'source': SOURCE_LOCAL_DETECTOR,
+                'rule': rule,
+            })
+        return corrections
+
+    @staticmethod
+    def _reason(row: Dict) -> str:
+        if row.get('description'):
+            return f"{row['name']}: {row['description']}"
+        if row.get('correct_form'):
+            return f"{row['name']}: 正しくは「{row['correct_form']}」です"
+        return f"{row['name']}に矛盾があります"
+
+    def _builtin_findings(self, text: str) -> List[Tuple[int, int, str, str, str]]:
+        """学年・日付・曜日・年齢の組み込みチェック"""
+        findings = []
+
+        for pattern, maximum, reason in SCHOOL_YEAR_RULES:
+            for match in pattern.finditer(text):
+                value = to_int(match.group(1))
+                if value < 1 or value > maximum:
+                    findings.append((match.start(), match.end(), match.group(), f"学年の矛盾: {reason}です", '学年'))
+
+        for match in DATE_PATTERN.finditer(text):
+            year = to_int(match.group(1)) if match.group(1) else None
+            month, day = to_int(match.group(2)), to_int(match.group(3))
+            if not 1 <= month <= 12:
+                findings.append((match.start(), match.end(), match.group(), f"日付の矛盾: {month}月は存在しません", '日付'))
+                continue
+            last_day = calendar.monthrange(year if year else 2000, month)[1]  # 年の記載がなければうるう年を許容
+            if not 1 <= day <= last_day:
+                findings.append((match.start(), match.end(), match.group(),
+                                 f"日付の矛盾: {month}月は{last_day}日までです", '日付'))
+                continue
+            weekday = match.group(4)
+            if year and weekday:
+                actual = WEEKDAYS[date(year, month, day).weekday()]
+                if actual != weekday:
+                    original = match.group()
+                    corrected = original[:match.start(4) - match.start()] + actual + original[match.end(4) - match.start():]
+                    findings.append((match.start(), match.end(), corrected,
+                                     f"曜日の矛盾: {year}年{month}月{day}日は{actual}曜日です", '曜日'))
+
+        for paragraph_start, paragraph in self._paragraphs(text):
+            ages = [(AGE_YEAR_OFFSETS[m.group(1)], to_int(m.group(2)), m) for m in AGE_PATTERN.finditer(paragraph)]
+            current = next((age for offset, age, _ in ages if offset == 0), None)
+            if current is None:
+                continue
+            for offset, age, match in ages:
+                expected = current + offset
+                if offset and age != expected:
+                    original = match.group()
+                    corrected = original[:match.start(2) - match.start()] + str(expected) + original[match.end(2) - match.start():]
+                    findings.append((paragraph_start + match.start(), paragraph_start + match.end(), corrected,
+                                     f"年齢の矛盾: 今年{current}歳なら{match.group(1)}は{expected}歳です", '年齢'))
+
+        return findings
+
+    @staticmethod
+    def _paragraphs(text: str):
+        start = 0
+        for line in text.split('\n'):
+            yield start, line
+            start += len(line) + 1
+
+
+def load_inconsistency_rows() -> List[Dict]:
+    """
+    有効な矛盾検出データを読み込む
+
+    Returns:
+        InconsistencyDetector に渡す行のリスト
+    """
+    return [
+        {
+            'name': item.name,
+            'type': item.type,
+            'correct_form': item.correct_form,
+            'patterns': item.get_incorrect_patterns_list(),
+            'detection_rule': item.detection_rule,
+            'description': item.description,
+        }
+        for item in InconsistencyData.objects.filter(is_active=True).order_by('id')
+    ]
+
+
+def is_local_inconsistency_enabled() -> bool:
+    """ローカルの矛盾検出が有効かどうかを返す"""
+    return getattr(settings, 'PROOFREAD_LOCAL_INCONSISTENCY', False)
+
+
+# プロセス内で共有する検出器
+_shared_detector = None
+_shared_detector_lock = threading.Lock()
+
+
+def get_inconsistency_detector() -> InconsistencyDetector:
+    """
+    プロセス内で共有する矛盾検出器を取得する（辞書バージョンが変わった場合のみ再構築）
+
+    Returns:
+        共有InconsistencyDetectorインスタンス
+    """
+    global _shared_detector
+
+    version = get_dictionary_version()
+    detector = _shared_detector
+    if detector is not None and detector.version == version:
+        return detector
+
+    with _shared_detector_lock:
+        if _shared_detector is None or _shared_detector.version != version:
+            started = time.time()
+            _shared_detector = InconsistencyDetector(load_inconsistency_rows(), version=version)
+            logger.info(f"🟠 矛盾検出器を構築しました: {_shared_detector.rule_count}ルール "
+                        f"({(time.time() - started) * 1000:.1f}ms, version={version})")
+        return _shared_detector
+
+
+def detect_inconsistencies(text: str, detector: Optional[InconsistencyDetector] = None) -> List[Dict]:
+    """
+    ローカルの矛盾検出を実行する
+
+    Args:
+        text: 対象テキスト
+        detector: 使用する検出器（省略時はプロセス共有の検出器）
+
+    Returns:
+        inconsistency カテゴリーの修正箇所のリスト
+    """
+    started = time.time()
+    corrections = (detector or get_inconsistency_detector()).detect(text)
+    logger.info(f"🟠 ローカル矛盾検出: {len(corrections)}件 ({(time.time() - started) * 1000:.1f}ms)")
+    return corrections
+
+
+def merge_local_inconsistencies(result: Dict, local_corrections: List[Dict]) -> Dict:
+    """
+    モデルの校正結果にローカルで検出した矛盾を結合する
+
+    ローカルの検出結果を先に並べ、同じ箇所（修正前のテキストが同じもの）へのモデルの指摘は除く。
+
+    Args:
+        result: 校正結果（エラーでないもの）
+        local_corrections: detect_inconsistencies の結果
+
+    Returns:
+        修正箇所と件数を更新した校正結果
+    """
+    if not local_corrections:
+        return result
+    local_originals = {correction['original'] for correction in local_corrections}
+    model_corrections = [c for c in result.get('corrections', []) if c.get('original') not in local_originals]
+    return dict(
+        result,
+        corrections=local_corrections + model_corrections,
+        local_corrections=result.get('local_corrections', 0) + len(local_corrections),
+        local_inconsistencies=len(local_corrections),
+    )
@@ -0,0 +1,212 @@
+import logging
+from bisect import bisect_left
+from datetime import timedelta
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+from proofreading_ai.models import ProofreadingRequest, ProofreadingResult
+from proofreading_ai.services.chunking import merge_chunk_corrections, split_paragraphs
+
+logger = logging.getLogger(__name__)
+
+
+def _with_line_offsets(paragraphs: List[Dict]) -> List[Dict]:
+    """段落情報に先頭行までの改行数（line_offset）を付ける"""
+    line_offset = 0
+    for paragraph in paragraphs:
+        paragraph['line_offset'] = line_offset
+        line_offset += paragraph['text'].count('\n')
+    return paragraphs
+
+
+def plan_incremental(previous_text: str, text: str) -> Dict:
+    """
+    前回の原稿と今回の原稿を段落単位で比較し、再利用する段落と校正し直す範囲を決める
+
+    Args:
+        previous_text: 前回校正した原稿
+        text: 今回の原稿
+
+    Returns:
+        {
+            'paragraphs': 今回の段落リスト（start, end, text, line_offset）,
+            'reused': {今回の段落番号: 前回の同じ内容の段落},
+            'segments': 校正し直す範囲（連続する変更段落をまとめたもの、split_into_chunks と同じ形式）,
+            'changed_characters': 校正し直す文字数,
+        }
+    """
+    previous = _with_line_offsets(split_paragraphs(previous_text))
+    paragraphs = _with_line_offsets(split_paragraphs(text))
+
+    matcher = SequenceMatcher(None, [p['text'] for p in previous], [p['text'] for p in paragraphs], autojunk=False)
+    reused = {}
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            for offset in range(i2 - i1):
+                reused[j1 + offset] = previous[i1 + offset]
+
+    segments = []
+    for index, paragraph in enumerate(paragraphs):
+        if index in reused:
+            continue
+        if segments and segments[-1]['last'] == index - 1:
+            segment = segments[-1]
+            segment['end'] = paragraph['end']
+            segment['text'] = text[segment['start']:segment['end']]
+            segment['last'] = index
+        else:
+            segments.append({
+                'index': len(segments),
+                'start': paragraph['start'],
+                'end': paragraph['end'],
+                'text': paragraph['text'],
+                'line_offset': paragraph['line_offset'],
+                'first': index,
+                'last': index,
+            })
+
+    return {
+        'paragraphs': paragraphs,
+        'reused': reused,
+        'segments': segments,
+        'changed_characters': sum(len(segment['text']) for segment in segments),
+    }
+
+
+def remap_corrections(corrections: List[Dict], previous: Dict, paragraph: Dict) -> List[Dict]:
+    """
+    前回の段落内の修正箇所を、今回の同じ内容の段落の位置・行番号に移す
+
+    Args:
+        corrections: 前回の原稿全体の修正箇所（position 付き）
+        previous: 前回の段落
+        paragraph: 今回の段落
+
+    Returns:
+        今回の原稿基準の修正箇所（位置の分からない修正箇所は含めない）
+    """
+    shift = paragraph['start'] - previous['start']
+    line_shift = paragraph['line_offset'] - previous['line_offset']
+    remapped = []
+    for correction in corrections:
+        position = correction.get('position')
+        if not isinstance(position, int) or not previous['start'] <= position < previous['end']:
+            continue
+        adjusted = dict(correction, position=position + shift)
+        line_number = correction.get('line_number')
+        if isinstance(line_number, int) and line_number > 0:
+            adjusted['line_number'] = line_number + line_shift
+        remapped.append(adjusted)
+    return remapped
+
+
+def remap_reused_corrections(corrections: List[Dict], reused: Dict[int, Dict],
+                             paragraphs: List[Dict]) -> Dict[int, List[Dict]]:
+    """
+    再利用するすべての段落について、前回の修正箇所を今回の位置・行番号に移す
+
+    修正箇所は位置順に1回だけ並べ、段落ごとに範囲内の修正箇所を二分探索で取り出す
+    （段落ごとに全修正箇所を走査しない）。
+
+    Args:
+        corrections: 前回の原稿全体の修正箇所（position 付き）
+        reused: plan_incremental の 'reused'（今回の段落番号: 前回の同じ内容の段落）
+        paragraphs: plan_incremental の 'paragraphs'（今回の段落リスト）
+
+    Returns:
+        {今回の段落番号: 今回の原稿基準の修正箇所}
+    """
+    located = sorted((c for c in corrections if isinstance(c.get('position'), int)), key=lambda c: c['position'])
+    positions = [correction['position'] for correction in located]
+    remapped = {}
+    for index, previous in reused.items():
+        first = bisect_left(positions, previous['start'])
+        last = bisect_left(positions, previous['end'], first)
+        remapped[index] = remap_corrections(located[first:last], previous, paragraphs[index])
+    return remapped
+
+
+def apply_corrections(text: str, corrections: List[Dict], base: int = 0) -> str:
+    """
+    位置付きの修正箇所をテキストに適用する（再利用する段落の校正後テキストを組み立てる）
+
+    Args:
+        text: 段落テキスト
+        corrections: 修正箇所（position は原稿全体での位置）
+        base: 段落の原稿内での開始位置
+
+    Returns:
+        修正を適用したテキスト
+    """
+    for correction in sorted(corrections, key=lambda c: c['position'], reverse=True):
+        local = correction['position'] - base
+        original = correction.get('original', '')
+        if original and text[local:local + len(original)] == original:
+            text = text[:local] + correction.get('corrected', original) + text[local + len(original):]
+    return text
+
+
+def locate_corrections(text: str, corrections: List[Dict]) -> List[Dict]:
+    """
+    修正箇所に原稿内の位置（position）を付ける（位置を持たない校正結果を差分校正の基準として保存する場合）
+
+    Args:
+        text: 原稿
+        corrections: 修正箇所
+
+    Returns:
+        position 付きの修正箇所
+    """
+    if all('position' in correction for correction in corrections):
+        return corrections
+    return merge_chunk_corrections([{'start': 0, 'text': text, 'line_offset': 0}], [corrections])
+
+
+def is_incremental_enabled() -> bool:
+    """前回の校正結果を段落単位で再利用する差分校正を使うかどうか"""
+    return getattr(settings, 'PROOFREAD_INCREMENTAL_ENABLED', True)
+
+
+def find_previous_proofread(user, config_key: str) -> Optional[ProofreadingResult]:
+    """
+    ユーザーの直近の、同じ設定で成功した校正結果を探す
+
+    Args:
+        user: ログインユーザー
+        config_key: 校正設定キー（プロンプト版・モデル・辞書版などが違う結果は再利用しない）
+
+    Returns:
+        校正結果（ない場合・有効期間を過ぎている場合はNone）
+    """
+    max_age = getattr(settings, 'PROOFREAD_INCREMENTAL_MAX_AGE', 86400)
+    return ProofreadingResult.objects.filter(
+        request__user=user,
+        config_key=config_key,
+        created_at__gt=timezone.now() - timedelta(seconds=max_age)
+    ).select_related('request').order_by('-created_at').first()
+
+
+def save_proofread_history(user, text: str, result: Dict, config_key: str) -> ProofreadingResult:
+    """
+    校正結果を次回の差分校正の基準として保存する
+
+    Args:
+        user: ログインユーザー
+        text: 原稿
+        result: 校正結果
+        config_key: 校正設定キー
+
+    Returns:
+        保存した校正結果
+    """
+    proofread_request = ProofreadingRequest.objects.create(user=user, original_text=text)
+    return ProofreadingResult.objects.create(
+        request=proofread_request,
+        corrected_text=result.get('corrected_text', text),
+        corrections=locate_corrections(text, result.get('corrections', [])),
+        config_key=config_key,
+        completion_time=result.get('processing_time', 0)
+    )
@@ -0,0 +1,331 @@
+import asyncio
+import logging
+import math
+import os
+import queue
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFullError(Exception):
+    """ジョブの待ち行列が満杯で受け付けられない場合の例外"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f'校正ジョブの待ち行列が満杯です（{retry_after}秒後に再試行してください）')
+        self.retry_after = retry_after
+
+
+class JobExecutorBase:
+    """
+    ジョブ実行器に共通する、実行待ち・実行中のジョブの記録と統計
+
+    ジョブの実行方法（ワーカースレッド・イベントループ上のタスク）はサブクラスで実装する。
+    記録を更新するメソッドは self._lock を取得した状態で呼び出す。
+    """
+
+    def __init__(self, max_workers: int, max_queue_size: int):
+        """
+        Args:
+            max_workers: 同時に実行するジョブ数の上限
+            max_queue_size: 実行待ちジョブ数の上限
+        """
+        self.max_workers = max(1, max_workers)
+        self.max_queue_size = max(1, max_queue_size)
+        self._lock = threading.Lock()
+        self._pending = OrderedDict()  # job_id -> 投入時刻（実行待ちの順序を保持）
+        self._running = set()
+        self._avg_duration = None
+        self._completed = 0
+        self._rejected = 0
+
+    def _reject(self, job_id: str) -> None:
+        """待ち行列が満杯のジョブを拒否する（JobQueueFullError を送出する）"""
+        self._rejected += 1
+        retry_after = self._estimate_retry_after()
+        logger.warning(f"🚦 校正ジョブの待ち行列が満杯のため拒否: {job_id} (retry_after={retry_after}s)")
+        raise JobQueueFullError(retry_after)
+
+    def _add_pending(self, job_id: str) -> int:
+        """ジョブを実行待ちとして記録し、待ち行列内の順番（1始まり）を返す"""
+        self._pending[job_id] = time.time()
+        return len(self._pending)
+
+    def _mark_running(self, job_id: str) -> None:
+        self._pending.pop(job_id, None)
+        self._running.add(job_id)
+
+    def _mark_finished(self, job_id: str, duration: float) -> None:
+        self._running.discard(job_id)
+        self._completed += 1
+        if self._avg_duration is None:
+            self._avg_duration = duration
+        else:
+            self._avg_duration = self._avg_duration * 0.8 + duration * 0.2
+
+    def _estimate_retry_after(self) -> int:
+        """待ち行列が1つ空くまでの目安（秒）を平均処理時間とワーカー数から見積もる"""
+        avg = self._avg_duration if self._avg_duration is not None else 30.0
+        return max(1, math.ceil(avg / self.max_workers))
+
+    def get_state(self, job_id: str) -> Optional[Dict]:
+        """
+        ジョブの実行状況を返す
+
+        Args:
+            job_id: ジョブID
+
+        Returns:
+            {'status': 'queued', 'queue_position': 順番} または {'status': 'running'}、
+            この実行器で管理していない（完了済み・不明の）場合はNone
+        """
+        with self._lock:
+            if job_id in self._running:
+                return {'status': 'running'}
+            if job_id in self._pending:
+                position = list(self._pending).index(job_id) + 1
+                return {'status': 'queued', 'queue_position': position}
+        return None
+
+    def stats(self) -> Dict:
+        """
+        実行器の統計情報を返す
+
+        Returns:
+            ワーカー数・待ち件数・実行中件数・完了件数・拒否件数・平均処理時間
+        """
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'max_queue_size': self.max_queue_size,
+                'queued': len(self._pending),
+                'running': len(self._running),
+                'completed': self._completed,
+                'rejected': self._rejected,
+                'avg_duration': self._avg_duration,
+            }
+
+
+class BoundedJobExecutor(JobExecutorBase):
+    """
+    ワーカー数と待ち行列の長さに上限を持つジョブ実行器
+
+    リクエストごとにスレッドを起動する代わりに、固定数のワーカースレッドが
+    上限付きキューからジョブを取り出して実行する。キューが満杯のときは
+    JobQueueFullError を送出し、呼び出し側がHTTP 429で応答できるようにする。
+    """
+
+    def __init__(self, max_workers: int, max_queue_size: int):
+        """
+        Args:
+            max_workers: 同時に実行するジョブ数の上限
+            max_queue_size: 実行待ちジョブ数の上限
+        """
+        super().__init__(max_workers, max_queue_size)
+        self._queue = queue.Queue(maxsize=self.max_queue_size)
+        self._workers = []
+
+    def _ensure_workers(self) -> None:
+        """ワーカースレッドを必要になった時点で起動する"""
+        if len(self._workers) >= self.max_workers:
+            return
+        for index in range(len(self._workers), self.max_workers):
+            worker = threading.Thread(
+                target=self._worker_loop,
+                name=f'proofread-job-worker-{index}',
+                daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, job_id: str, func: Callable, *args, **kwargs) -> int:
+        """
+        ジョブを待ち行列に追加する
+
+        Args:
+            job_id: ジョブID（状況確認に使用）
+            func: 実行する関数
+            args, kwargs: 関数に渡す引数
+
+        Returns:
+            待ち行列内の順番（1始まり）
+
+        Raises:
+            JobQueueFullError: 待ち行列が満杯の場合
+        """
+        with self._lock:
+            self._ensure_workers()
+            try:
+                self._queue.put_nowait((job_id, func, args, kwargs))
+            except queue.Full:
+                self._reject(job_id)
+            position = self._add_pending(job_id)
+        logger.info(f"📥 校正ジョブ投入: {job_id} (待ち順 {position})")
+        return position
+
+    def _worker_loop(self) -> None:
+        while True:
+            job_id, func, args, kwargs = self._queue.get()
+            with self._lock:
+                self._mark_running(job_id)
+            started = time.time()
+            # ワーカースレッドは長く生きるため、リクエストと同様にジョブの前後で古いDB接続を閉じる
+            close_old_connections()
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                logger.error(f"❌ 校正ジョブ実行エラー: {job_id}: {str(e)}")
+            finally:
+                close_old_connections()
+                with self._lock:
+                    self._mark_finished(job_id, time.time() - started)
+                self._queue.task_done()
+
+
+class AsyncJobRunner(JobExecutorBase):
+    """
+    イベントループ上のタスクとしてジョブを実行する実行器（ASGI用）
+
+    ジョブはワーカースレッドではなくタスクとして実行されるため、Bedrockの応答待ちでスレッドを占有しない。
+    同時実行数はセマフォで、実行待ち件数は記録中の件数で制限する（キューやワーカースレッドは持たない）。
+    """
+
+    def __init__(self, max_workers: int, max_queue_size: int):
+        super().__init__(max_workers, max_queue_size)
+        self._semaphore = asyncio.Semaphore(self.max_workers)
+        self._tasks = set()
+
+    def submit(self, job_id: str, func: Callable[..., Awaitable], *args, **kwargs) -> int:
+        """
+        ジョブ（コルーチン関数）を実行中のイベントループに投入する
+
+        Args:
+            job_id: ジョブID（状況確認に使用）
+            func: 実行するコルーチン関数
+            args, kwargs: 関数に渡す引数
+
+        Returns:
+            待ち行列内の順番（1始まり）
+
+        Raises:
+            JobQueueFullError: 実行待ちが上限に達している場合
+        """
+        with self._lock:
+            if len(self._pending) >= self.max_queue_size:
+                self._reject(job_id)
+            position = self._add_pending(job_id)
+        task = asyncio.get_running_loop().create_task(self._run(job_id, func, args, kwargs))
+        # 実行中のタスクが破棄されないよう参照を保持する
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        logger.info(f"📥 校正ジョブ投入（非同期）: {job_id} (待ち順 {position})")
+        return position
+
+    async def _run(self, job_id: str, func: Callable[..., Awaitable], args: tuple, kwargs: dict) -> None:
+        async with self._semaphore:
+            with self._lock:
+                self._mark_running(job_id)
+            started = time.time()
+            try:
+                await func(*args, **kwargs)
+            except Exception as e:
+                logger.error(f"❌ 校正ジョブ実行エラー: {job_id}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._mark_finished(job_id, time.time() - started)
+
+    async def join(self) -> None:
+        """投入済みのジョブがすべて終わるまで待つ（テスト・シャットダウン用）"""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+
+# プロセス内で共有する実行器（gunicornワーカーごとに1インスタンス）
+_shared_executor = None
+_shared_executor_pid = None
+_shared_executor_lock = threading.Lock()
+
+
+def get_job_executor() -> BoundedJobExecutor:
+    """
+    プロセス内で共有するジョブ実行器を取得する（遅延初期化・スレッドセーフ）
+
+    fork後の子プロセスでは親のワーカースレッドが存在しないため作り直す。
+
+    Returns:
+        共有BoundedJobExecutorインスタンス
+    """
+    global _shared_executor, _shared_executor_pid
+
+    pid = os.getpid()
+    executor = _shared_executor
+    if executor is not None and _shared_executor_pid == pid:
+        return executor
+
+    with _shared_executor_lock:
+        if _shared_executor is None or _shared_executor_pid != pid:
+            max_workers = getattr(settings, 'PROOFREAD_ASYNC_WORKERS', 2)
+            max_queue_size = getattr(settings, 'PROOFREAD_ASYNC_QUEUE_SIZE', 10)
+            logger.info(f"🧩 校正ジョブ実行器を作成します (pid={pid}, workers={max_workers}, queue={max_queue_size})")
+            _shared_executor = BoundedJobExecutor(max_workers, max_queue_size)
+            _shared_executor_pid = pid
+        return _shared_executor
+
+
+def reset_job_executor() -> None:
+    """
+    共有ジョブ実行器を破棄する（設定変更時やテスト用）
+
+    実行中のジョブは既存のワーカースレッドでそのまま完了する。
+    """
+    global _shared_executor, _shared_executor_pid
+
+    with _shared_executor_lock:
+        _shared_executor = None
+        _shared_executor_pid = None
+
+
+# イベントループごとに共有する非同期実行器（ASGIワーカーごとに1インスタンス）
+_async_runners: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncJobRunner]" = weakref.WeakKeyDictionary()
+
+
+def get_async_job_runner() -> AsyncJobRunner:
+    """
+    実行中のイベントループで共有する非同期ジョブ実行器を取得する
+
+    Returns:
+        共有AsyncJobRunnerインスタンス
+    """
+    loop = asyncio.get_running_loop()
+    runner = _async_runners.get(loop)
+    if runner is None:
+        max_workers = getattr(settings, 'PROOFREAD_ASYNC_TASK_WORKERS', 100)
+        max_queue_size = getattr(settings, 'PROOFREAD_ASYNC_TASK_QUEUE_SIZE', 500)
+        logger.info(f"🧩 非同期校正ジョブ実行器を作成します (workers={max_workers}, queue={max_queue_size})")
+        runner = AsyncJobRunner(max_workers, max_queue_size)
+        _async_runners[loop] = runner
+    return runner
+
+
+def find_async_job_state(job_id: str) -> Optional[Dict]:
+    """
+    すべての非同期ジョブ実行器からジョブの実行状況を探す
+
+    Args:
+        job_id: ジョブID
+
+    Returns:
+        AsyncJobRunner.get_state の結果（見つからない場合はNone）
+    """
+    for runner in list(_async_runners.values()):
+        state = runner.get_state(job_id)
+        if state is not None:
+            return state
+    return None
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import logging
+from datetime import timedelta
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+from proofreading_ai.models import ProofreadingJob
+
+logger = logging.getLogger(__name__)
+
+
+def make_dedupe_key(text: str, **options) -> str:
+    """
+    同じ原稿・設定のジョブを判定するキーを生成する
+
+    Args:
+        text: 校正対象のテキスト
+        options: 校正の設定
+
+    Returns:
+        SHA-256の16進文字列
+    """
+    raw = json.dumps([text, options], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def create_job(job_id: str, dedupe_key: str = '') -> ProofreadingJob:
+    """
+    待機中の非同期校正ジョブを登録する（期限切れのジョブも合わせて削除する）
+
+    Args:
+        job_id: ジョブID
+        dedupe_key: 同じ原稿・設定のジョブを判定するキー（make_dedupe_key）
+
+    Returns:
+        作成したジョブ
+    """
+    purge_expired_jobs()
+    ttl = getattr(settings, 'PROOFREAD_JOB_TTL', 3600)
+    now = timezone.now()
+    return ProofreadingJob.objects.create(
+        job_id=job_id,
+        status='queued',
+        dedupe_key=dedupe_key,
+        created_at=now,
+        expires_at=now + timedelta(seconds=ttl)
+    )
+
+
+def update_job(job_id: str, **fields) -> None:
+    """
+    ジョブの状態・進捗などを更新する
+
+    Args:
+        job_id: ジョブID
+        fields: 更新するフィールド（status, progress など）
+    """
+    fields['updated_at'] = timezone.now()
+    ProofreadingJob.objects.filter(job_id=job_id).update(**fields)
+
+
+def complete_job(job_id: str, result: Dict) -> None:
+    """
+    ジョブを完了にして結果を保存する
+
+    Args:
+        job_id: ジョブID
+        result: ステータス確認APIで返す結果（JSONシリアライズ可能な辞書）
+    """
+    update_job(job_id, status='completed', progress=100, result=result)
+
+
+def fail_job(job_id: str, error: str) -> None:
+    """
+    ジョブをエラーにする
+
+    Args:
+        job_id: ジョブID
+        error: エラー内容
+    """
+    update_job(job_id, status='error', error=error)
+
+
+def delete_job(job_id: str) -> None:
+    """
+    ジョブを削除する（投入に失敗した場合など）
+
+    Args:
+        job_id: ジョブID
+    """
+    ProofreadingJob.objects.filter(job_id=job_id).delete()
+
+
+def get_job(job_id: str) -> Optional[ProofreadingJob]:
+    """
+    有効期限内のジョブを取得する
+
+    Args:
+        job_id: ジョブID
+
+    Returns:
+        ジョブ（存在しない・期限切れの場合はNone）
+    """
+    return ProofreadingJob.objects.filter(job_id=job_id, expires_at__gt=timezone.now()).first()
+
+
+def find_active_job(dedupe_key: str) -> Optional[ProofreadingJob]:
+    """
+    同じ原稿・設定で待機中・処理中のジョブを探す（全ワーカー共通）
+
+    Args:
+        dedupe_key: make_dedupe_key で生成したキー
+
+    Returns:
+        最も古いジョブ（ない場合はNone）
+    """
+    return ProofreadingJob.objects.filter(
+        dedupe_key=dedupe_key,
+        status__in=('queued', 'running'),
+        expires_at__gt=timezone.now()
+    ).order_by('created_at').first()
+
+
+def get_queue_position(job: ProofreadingJob) -> int:
+    """
+    待機中のジョブについて、全ワーカー合計での待ち順を返す
+
+    Args:
+        job: 待機中のジョブ
+
+    Returns:
+        待ち行列内の順番（1始まり）
+    """
+    ahead = ProofreadingJob.objects.filter(
+        status='queued',
+        created_at__lt=job.created_at,
+        expires_at__gt=timezone.now()
+    ).count()
+    return ahead + 1
+
+
+def purge_expired_jobs() -> int:
+    """
+    有効期限切れのジョブを削除する
+
+    Returns:
+        削除件数
+    """
+    deleted, _ = ProofreadingJob.objects.filter(expires_at__lte=timezone.now()).delete()
+    if deleted:
+        logger.info(f"🧹 期限切れの非同期校正ジョブを削除: {deleted}件")
+    return deleted
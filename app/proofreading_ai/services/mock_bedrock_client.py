@@ -1,6 +1,9 @@
+import asyncio
+import io
 import json
 import time
 from typing import Dict, Any, Tuple, List
+from urllib.parse import unquote
 import random
 import logging
 import re
@@ -197,4 +200,188 @@ class MockBedrockClient:
             "total_cost": total_cost
         }
         
-        return highlighted_text, corrections_text, completion_time, cost_info 
\ No newline at end of file
+        return highlighted_text, corrections_text, completion_time, cost_info 
+
+class MockBedrockRuntime:
+    """
+    bedrock-runtimeクライアントのモック（テスト・ベンチマーク用）
+    BedrockClient(bedrock_runtime=MockBedrockRuntime(...)) のように注入して使用する
+    """
+    
+    def __init__(self, tool_input=None, text_output: str = "", chunk_size: int = 16,
+                 latency: float = 0.0, chunk_delay: float = 0.0):
+        """
+        Args:
+            tool_input: Tool Use の入力として返す辞書、またはリクエスト辞書を受け取り辞書を返す関数
+            text_output: テキストモードで返す文字列
+            chunk_size: ストリーミング時に partial_json を分割する文字数
+            latency: invoke_model の応答までの待機秒数
+            chunk_delay: ストリーミング時のチャンク間の待機秒数
+        """
+        self.tool_input = tool_input if tool_input is not None else {"corrected_text": "", "corrections": []}
+        self.text_output = text_output
+        self.chunk_size = chunk_size
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.calls = []
+    
+    def _build_content(self, request: Dict) -> List[Dict]:
+        """リクエストに応じたcontentブロックを組み立てる"""
+        if "tools" in request:
+            tool_input = self.tool_input(request) if callable(self.tool_input) else self.tool_input
+            tool_name = request.get("tool_choice", {}).get("name", request["tools"][0]["name"])
+            return [{"type": "tool_use", "id": "toolu_mock", "name": tool_name, "input": tool_input}]
+        return [{"type": "text", "text": self.text_output}]
+    
+    def _usage(self, request: Dict, content: List[Dict]) -> Dict:
+        """概算の使用量を返す"""
+        prompt = json.dumps(request.get("messages", []), ensure_ascii=False)
+        output = json.dumps(content, ensure_ascii=False)
+        return {"input_tokens": len(prompt), "output_tokens": len(output)}
+    
+    def invoke_model(self, modelId: str, body: str, **kwargs) -> Dict:
+        """invoke_model のモック"""
+        request = json.loads(body)
+        self.calls.append({"modelId": modelId, "request": request, "stream": False})
+        if self.latency:
+            time.sleep(self.latency)
+        
+        content = self._build_content(request)
+        response_body = {
+            "id": "msg_mock",
+            "type": "message",
+            "role": "assistant",
+            "model": modelId,
+            "content": content,
+            "stop_reason": "tool_use" if content[0]["type"] == "tool_use" else "end_turn",
+            "usage": self._usage(request, content),
+        }
+        return {"body": io.BytesIO(json.dumps(response_body, ensure_ascii=False).encode("utf-8"))}
+    
+    def invoke_model_with_response_stream(self, modelId: str, body: str, **kwargs) -> Dict:
+        """invoke_model_with_response_stream のモック"""
+        request = json.loads(body)
+        self.calls.append({"modelId": modelId, "request": request, "stream": True})
+        content = self._build_content(request)
+        usage = self._usage(request, content)
+        
+        def encode(payload):
+            return {"chunk": {"bytes": json.dumps(payload, ensure_ascii=False).encode("utf-8")}}
+        
+        def events():
+            if self.latency:
+                time.sleep(self.latency)
+            yield encode({"type": "message_start", "message": {
+                "id": "msg_mock", "model": modelId, "usage": {"input_tokens": usage["input_tokens"], "output_tokens": 1}
+            }})
+            block = content[0]
+            if block["type"] == "tool_use":
+                yield encode({"type": "content_block_start", "index": 0, "content_block": {
+                    "type": "tool_use", "id": block["id"], "name": block["name"], "input": {}
+                }})
+                raw = json.dumps(block["input"], ensure_ascii=False)
+                delta_type, delta_key = "input_json_delta", "partial_json"
+            else:
+                yield encode({"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}})
+                raw = block["text"]
+                delta_type, delta_key = "text_delta", "text"
+            for i in range(0, len(raw), self.chunk_size):
+                if self.chunk_delay:
+                    time.sleep(self.chunk_delay)
+                yield encode({"type": "content_block_delta", "index": 0, "delta": {
+                    "type": delta_type, delta_key: raw[i:i + self.chunk_size]
+                }})
+            yield encode({"type": "content_block_stop", "index": 0})
+            yield encode({"type": "message_delta", "delta": {"stop_reason": "tool_use"},
+                          "usage": {"output_tokens": usage["output_tokens"]}})
+            yield encode({"type": "message_stop"})
+        
+        return {"body": events()}
+
+
+class FakeBedrockEndpoint:
+    """
+    bedrock-runtime の InvokeModel を模したローカルHTTPサーバー（AsyncBedrockRuntime のテスト・負荷ベンチマーク用）
+    
+    応答の内容は MockBedrockRuntime と同じ。keep-alive に対応し、
+    max_concurrency を超えた同時リクエストには 429 ThrottlingException を返す。
+    """
+    
+    def __init__(self, tool_input=None, latency: float = 0.0, max_concurrency: int = None):
+        """
+        Args:
+            tool_input: Tool Use の入力として返す辞書、またはリクエスト辞書を受け取り辞書を返す関数
+            latency: 応答までの待機秒数（イベントループを止めずに待つ）
+            max_concurrency: 同時に処理するリクエスト数の上限（Noneで無制限）
+        """
+        self.runtime = MockBedrockRuntime(tool_input=tool_input)
+        self.latency = latency
+        self.max_concurrency = max_concurrency
+        self.active = 0
+        self.peak = 0
+        self.requests = 0
+        self.throttled = 0
+        self.url = None
+        self._server = None
+    
+    @property
+    def calls(self) -> List[Dict]:
+        return self.runtime.calls
+    
+    async def start(self) -> str:
+        """サーバーを起動してエンドポイントURLを返す"""
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        port = self._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self.url
+    
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+    
+    async def _handle(self, reader, writer) -> None:
+        try:
+            while True:
+                try:
+                    request_line = await reader.readuntil(b"\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readuntil(b"\r\n")
+                    if line == b"\r\n":
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                path = request_line.split()[1].decode("latin-1")
+                model_id = unquote(path.split("/")[2])
+                
+                status, response_headers, payload = await self._respond(model_id, body, headers)
+                head = [f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}",
+                        "Content-Type: application/json", f"Content-Length: {len(payload)}"]
+                head += [f"{name}: {value}" for name, value in response_headers.items()]
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + payload)
+                await writer.drain()
+        finally:
+            writer.close()
+    
+    async def _respond(self, model_id: str, body: bytes, headers: Dict) -> Tuple[int, Dict, bytes]:
+        self.requests += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            if "authorization" not in headers or "x-amz-date" not in headers:
+                return 403, {"x-amzn-ErrorType": "MissingAuthenticationTokenException"}, b'{"message": "Missing Authentication Token"}'
+            if self.max_concurrency is not None and self.active > self.max_concurrency:
+                self.throttled += 1
+                return 429, {"x-amzn-ErrorType": "ThrottlingException:http://internal.amazon.com/coral/com.amazon.bedrock/"}, \
+                    b'{"message": "Too many requests, please wait before trying again."}'
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            response = self.runtime.invoke_model(model_id, body.decode("utf-8"))
+            return 200, {}, response["body"].read()
+        finally:
+            self.active -= 1
@@ -0,0 +1,91 @@
+from typing import Callable, Dict, List
+
+from proofreading_ai.services.chunking import split_into_chunks, split_paragraphs
+
+
+def split_cacheable_paragraphs(text: str) -> List[Dict]:
+    """
+    テキストを段落に分け、前後の空白を除いた本文（キャッシュキーに使う正規化した段落）の位置を付ける
+
+    Args:
+        text: 校正対象のテキスト
+
+    Returns:
+        段落情報のリスト
+        [{'start', 'end', 'text', 'body': 前後の空白を除いた本文, 'body_start': 本文の開始位置,
+          'body_line_offset': 本文の先頭行までの改行数}]
+    """
+    paragraphs = []
+    line_offset = 0
+    for paragraph in split_paragraphs(text):
+        body = paragraph['text'].strip()
+        lead = paragraph['text'][:len(paragraph['text']) - len(paragraph['text'].lstrip())]
+        paragraph.update(
+            body=body,
+            body_start=paragraph['start'] + len(lead),
+            body_line_offset=line_offset + lead.count('\n'),
+        )
+        paragraphs.append(paragraph)
+        line_offset += paragraph['text'].count('\n')
+    return paragraphs
+
+
+def build_novel_chunks(text: str, paragraphs: List[Dict], novel: List[int], max_tokens: int,
+                       count_tokens: Callable[[str], int]) -> List[Dict]:
+    """
+    キャッシュにない段落だけを、連続する範囲ごとにトークン数の上限以内のチャンクにまとめる
+
+    Args:
+        text: 校正対象のテキスト全体
+        paragraphs: split_cacheable_paragraphs の結果
+        novel: モデルに送る段落の番号（昇順）
+        max_tokens: 1チャンクあたりの最大トークン数
+        count_tokens: トークン数を概算する関数
+
+    Returns:
+        split_into_chunks と同じ形式のチャンクリスト（位置・行番号は元テキスト基準）
+    """
+    runs = []
+    for index in novel:
+        if runs and runs[-1][-1] == index - 1:
+            runs[-1].append(index)
+        else:
+            runs.append([index])
+
+    chunks = []
+    for run in runs:
+        start, end = paragraphs[run[0]]['start'], paragraphs[run[-1]]['end']
+        line_offset = text.count('\n', 0, start)
+        for chunk in split_into_chunks(text[start:end], max_tokens, count_tokens):
+            chunks.append(dict(
+                chunk,
+                index=len(chunks),
+                start=start + chunk['start'],
+                end=start + chunk['end'],
+                line_offset=line_offset + chunk['line_offset'],
+            ))
+    return chunks
+
+
+def to_paragraph_corrections(corrections: List[Dict], paragraph: Dict) -> List[Dict]:
+    """元テキスト基準の修正箇所を、段落本文の先頭を基準にした位置・行番号に変換する（キャッシュ保存用）"""
+    relative = []
+    for correction in corrections:
+        adjusted = dict(correction, position=correction['position'] - paragraph['body_start'])
+        line_number = correction.get('line_number')
+        if isinstance(line_number, int) and line_number > 0:
+            adjusted['line_number'] = line_number - paragraph['body_line_offset']
+        relative.append(adjusted)
+    return relative
+
+
+def from_paragraph_corrections(corrections: List[Dict], paragraph: Dict) -> List[Dict]:
+    """キャッシュした段落本文基準の修正箇所を、今回の元テキスト基準の位置・行番号に変換する"""
+    absolute = []
+    for correction in corrections:
+        adjusted = dict(correction, position=correction['position'] + paragraph['body_start'])
+        line_number = correction.get('line_number')
+        if isinstance(line_number, int) and line_number > 0:
+            adjusted['line_number'] = line_number + paragraph['body_line_offset']
+        absolute.append(adjusted)
+    return absolute
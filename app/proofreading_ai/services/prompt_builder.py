@@ -0,0 +1,183 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, List
+
+from django.conf import settings
+
+from proofreading_ai.models import CompanyDictionary, InconsistencyData
+from proofreading_ai.services.dictionary_matcher import PatternAutomaton, get_dictionary_version
+
+logger = logging.getLogger(__name__)
+
+# 矛盾検出データの重要度を社内辞書の優先度（既定1、大きいほど優先）と同じ尺度で扱う
+SEVERITY_RANK = {'high': 3, 'medium': 2, 'low': 1}
+
+PROMPT_SECTION_HEADER = "\n\n**📘 この原稿に関係する社内辞書・矛盾チェック項目：**"
+
+
+def split_forms(value: str) -> List[str]:
+    """カンマ（全角読点を含む）区切りの表記を分割する"""
+    return [form.strip() for form in (value or '').replace('、', ',').split(',') if form.strip()]
+
+
+class DictionaryRuleIndex:
+    """
+    社内辞書・矛盾検出データを原稿中の語句から引くための索引
+
+    各エントリのキー語句（社内辞書は用語と代替表記、矛盾検出データは項目名と誤りパターン）を
+    1つのオートマトンにまとめておき、原稿を1回走査するだけで関係するエントリを求める。
+    辞書の行数が増えても、プロンプトには原稿に出現したエントリだけが入る。
+    """
+
+    def __init__(self, entries: List[Dict], version: str = ''):
+        """
+        Args:
+            entries: {'keys': キー語句のリスト, 'rank': 優先度, 'line': プロンプトに入れる1行} のリスト
+            version: 元データのバージョン（キャッシュ判定用）
+        """
+        self.version = version
+        self.entries = entries
+        self._entries_by_key: Dict[str, List[int]] = {}
+        for index, entry in enumerate(entries):
+            for key in entry['keys']:
+                self._entries_by_key.setdefault(key, []).append(index)
+        self._automaton = PatternAutomaton(self._entries_by_key)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def relevant_entries(self, text: str) -> List[Dict]:
+        """
+        原稿に出現するエントリを優先度の高い順に返す
+
+        Args:
+            text: 原稿
+
+        Returns:
+            エントリのリスト（優先度が同じ場合は原稿中の出現回数が多い順）
+        """
+        if not self.entries:
+            return []
+        hits: Dict[int, int] = {}
+        for start, end in self._automaton.iter_matches(text):
+            for index in self._entries_by_key[text[start:end]]:
+                hits[index] = hits.get(index, 0) + 1
+        ranked = sorted(hits, key=lambda index: (-self.entries[index]['rank'], -hits[index], index))
+        return [self.entries[index] for index in ranked]
+
+    def build_section(self, text: str, count_tokens: Callable[[str], int], max_tokens: int) -> str:
+        """
+        原稿に関係するエントリをトークン予算内でプロンプト用の文にまとめる
+
+        Args:
+            text: 原稿
+            count_tokens: トークン数の概算関数
+            max_tokens: この節に使うトークン数の上限
+
+        Returns:
+            プロンプトに追加する文（関係するエントリがない場合は空文字列）
+        """
+        relevant = self.relevant_entries(text)
+        if not relevant or max_tokens <= 0:
+            return ''
+
+        lines = []
+        used = count_tokens(PROMPT_SECTION_HEADER)
+        for entry in relevant:
+            line = '\n' + entry['line']
+            cost = count_tokens(line)
+            if used + cost > max_tokens:
+                break
+            lines.append(line)
+            used += cost
+        if not lines:
+            return ''
+
+        if len(lines) < len(relevant):
+            logger.info(f"📘 辞書項目をトークン予算で打ち切り: {len(lines)}/{len(relevant)}件 (上限 {max_tokens})")
+        return PROMPT_SECTION_HEADER + ''.join(lines)
+
+
+def load_dictionary_rules() -> List[Dict]:
+    """
+    社内辞書・矛盾検出データからプロンプト用のエントリを作る
+
+    Returns:
+        DictionaryRuleIndex に渡すエントリのリスト
+    """
+    entries = []
+
+    for item in CompanyDictionary.objects.filter(is_active=True).order_by('-priority', 'term', 'id'):
+        alternatives = split_forms(item.alternative_forms)
+        keys = {item.term, *alternatives} - {''}
+        line = f"- 社内辞書（{item.get_category_display()}）: 「{item.term}」は「{item.correct_form}」と表記"
+        if alternatives:
+            line += f"（誤った表記: {'、'.join(alternatives)}）"
+        if item.description:
+            line += f" — {item.description}"
+        entries.append({'keys': sorted(keys), 'rank': item.priority, 'line': line})
+
+    for item in InconsistencyData.objects.filter(is_active=True).order_by('id'):
+        patterns = split_forms(item.incorrect_patterns)
+        keys = {item.name, *patterns} - {''}
+        line = f"- 矛盾チェック（{item.get_type_display()}）: {item.name}"
+        if item.correct_form:
+            line += f" — 正しくは「{item.correct_form}」"
+        if patterns:
+            line += f"（誤りの例: {'、'.join(patterns)}）"
+        if item.description:
+            line += f" — {item.description}"
+        entries.append({'keys': sorted(keys), 'rank': SEVERITY_RANK.get(item.severity, 1), 'line': line})
+
+    return entries
+
+
+# プロセス内で共有する索引
+_shared_index = None
+_shared_index_lock = threading.Lock()
+
+
+def get_dictionary_rule_index() -> DictionaryRuleIndex:
+    """
+    プロセス内で共有する辞書索引を取得する（辞書バージョンが変わった場合のみ再構築）
+
+    Returns:
+        共有DictionaryRuleIndexインスタンス
+    """
+    global _shared_index
+
+    version = get_dictionary_version()
+    index = _shared_index
+    if index is not None and index.version == version:
+        return index
+
+    with _shared_index_lock:
+        if _shared_index is None or _shared_index.version != version:
+            started = time.time()
+            _shared_index = DictionaryRuleIndex(load_dictionary_rules(), version=version)
+            logger.info(f"📘 辞書索引を構築しました: {len(_shared_index)}件 "
+                        f"({(time.time() - started) * 1000:.1f}ms, version={version})")
+        return _shared_index
+
+
+def build_dictionary_prompt_section(text: str, count_tokens: Callable[[str], int]) -> str:
+    """
+    原稿に関係する社内辞書・矛盾チェック項目をプロンプト用にまとめる
+
+    Args:
+        text: 原稿（HTML保護後のテキストでもよい）
+        count_tokens: トークン数の概算関数
+
+    Returns:
+        プロンプトに追加する文（無効時・該当なしの場合は空文字列）
+    """
+    max_tokens = getattr(settings, 'PROOFREAD_PROMPT_DICTIONARY_TOKENS', 1000)
+    if max_tokens <= 0:
+        return ''
+    try:
+        return get_dictionary_rule_index().build_section(text, count_tokens, max_tokens)
+    except Exception as e:
+        # 辞書が読めない場合も校正自体は続行する
+        logger.warning(f"⚠️ 辞書項目のプロンプト追加に失敗: {str(e)}")
+        return ''
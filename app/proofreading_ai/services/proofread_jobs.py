@@ -0,0 +1,99 @@
+import logging
+from typing import Dict
+
+from proofreading_ai.models import ProofreadingRequest, ProofreadingResult
+from proofreading_ai.services import job_store
+from proofreading_ai.services.bedrock_client import get_bedrock_client
+from proofreading_ai.utils import format_corrections
+
+logger = logging.getLogger(__name__)
+
+
+def to_legacy_correction(corr: Dict) -> Dict:
+    """
+    JSONモード（Tool Use）の修正箇所をlegacy形式に変換する
+    """
+    legacy = {
+        "original": corr.get("original", ""),
+        "corrected": corr.get("corrected", ""),
+        "reason": corr.get("reason", ""),
+        "category": corr.get("category", "typo"),
+        "line_number": corr.get("line_number", 0)
+    }
+    # 分割校正などで元テキスト内の位置が分かっている場合は引き継ぐ
+    if corr.get("position") is not None:
+        legacy["position"] = corr["position"]
+    return legacy
+
+
+def run_proofread_job(process_id: str, proofread_request: ProofreadingRequest) -> Dict:
+    """
+    非同期校正ジョブの本体（失敗時は例外を送出する）
+
+    ジョブ実行器のワーカースレッドとCeleryワーカーの両方から呼ばれる。
+    校正リクエストは呼び出し側で1回だけ保存する（Celeryの再試行で行が増えないように）。
+
+    Args:
+        process_id: ジョブID
+        proofread_request: 保存済みの校正リクエスト
+
+    Returns:
+        ステータス確認APIで返す結果
+    """
+    job_store.update_job(process_id, status='running', progress=10)
+    original_text = proofread_request.original_text
+
+    # Bedrock APIを使用して校正（共有クライアント）
+    client = get_bedrock_client()
+    result = client.proofread_text(original_text)
+    if 'error' in result:
+        raise RuntimeError(result['error'])
+
+    return complete_proofread_job(process_id, proofread_request, original_text, result, client.model_id)
+
+
+def complete_proofread_job(process_id: str, proofread_request: ProofreadingRequest, original_text: str,
+                           result: Dict, model_id: str) -> Dict:
+    """
+    校正結果をDBとジョブテーブルに保存する（同期・非同期のジョブ共通）
+
+    Args:
+        process_id: ジョブID
+        proofread_request: 保存済みの校正リクエスト
+        original_text: 校正対象のテキスト
+        result: BedrockClient.proofread_text の結果
+        model_id: 校正に使用したモデルID
+
+    Returns:
+        ステータス確認APIで返す結果
+    """
+    job_store.update_job(process_id, progress=80)
+    corrections = [to_legacy_correction(corr) for corr in result.get('corrections', [])]
+    completion_time = result.get('processing_time', 0)
+
+    # ハイライトHTMLを生成
+    highlighted_html = format_corrections(original_text, corrections)
+
+    # 校正結果をDBに保存
+    ProofreadingResult.objects.create(
+        request=proofread_request,
+        corrected_text=highlighted_html,
+        completion_time=completion_time
+    )
+
+    response_data = {
+        'success': True,
+        'status': 'completed',
+        'original_text': original_text,
+        'corrected_text': highlighted_html,
+        'corrections': corrections,
+        'model': model_id,
+        'input_tokens': result.get('input_tokens', 0),
+        'output_tokens': result.get('output_tokens', 0),
+        'total_cost': result.get('estimated_cost', 0),
+        'completion_time': completion_time
+    }
+
+    # 結果をジョブテーブルに保存（全ワーカーから参照できる）
+    job_store.complete_job(process_id, response_data)
+    return response_data
@@ -0,0 +1,562 @@
+import asyncio
+import logging
+import math
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from botocore.exceptions import ConnectionClosedError, EndpointConnectionError
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# 同時実行数を下げる（AIMDの乗算的減少）エラー
+THROTTLING_ERROR_CODES = {'ThrottlingException', 'TooManyRequestsException'}
+# 同時実行数は変えずに待って再試行するエラー
+TRANSIENT_ERROR_CODES = {'ServiceUnavailableException', 'ModelNotReadyException'}
+# 共有ストアで上限待ちをするときのポーリング間隔（秒）
+SHARED_POLL_INTERVAL = 0.05
+
+
+class RateLimitTimeoutError(Exception):
+    """同時実行枠を待ちきれなかった場合の例外"""
+
+    def __init__(self, name: str, timeout: float):
+        super().__init__(f"{name} の同時実行枠を{timeout:.0f}秒待っても確保できませんでした")
+        self.name = name
+        self.timeout = timeout
+
+
+def _error_code(error: Exception) -> Optional[str]:
+    response = getattr(error, 'response', None)
+    if isinstance(response, dict):
+        return response.get('Error', {}).get('Code')
+    return None
+
+
+def is_throttling_error(error: Exception) -> bool:
+    """例外がスロットリング（クォータ超過）によるものかどうか"""
+    return _error_code(error) in THROTTLING_ERROR_CODES
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """
+    例外が待ってから再試行すれば成功しうるものかどうか
+
+    Args:
+        error: 呼び出し時の例外
+
+    Returns:
+        スロットリング・一時的なサービス停止・接続エラーの場合True
+    """
+    if isinstance(error, (EndpointConnectionError, ConnectionClosedError)):
+        return True
+    code = _error_code(error)
+    return code in THROTTLING_ERROR_CODES or code in TRANSIENT_ERROR_CODES
+
+
+def backoff_delay(attempt: int, base: float, cap: float, rng: Optional[random.Random] = None) -> float:
+    """
+    ジッター付き指数バックオフの待ち時間（full jitter）
+
+    Args:
+        attempt: 再試行の回数（0始まり）
+        base: 1回目の待ち時間の上限（秒）
+        cap: 待ち時間の上限（秒）
+        rng: 乱数生成器（テスト用）
+
+    Returns:
+        0 〜 min(cap, base × 2^attempt) の一様乱数（秒）
+    """
+    return (rng or random).uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class TokenBucket:
+    """1秒あたりのリクエスト数を制限するトークンバケット"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            rate: 1秒あたりに補充するトークン数
+            burst: バケットの容量（省略時は max(1, rate)）
+            clock: 時刻関数（テスト用）
+        """
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self._clock = clock
+        self._tokens = self.burst
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        トークンを1つ予約する（不足分は前借りする）
+
+        Returns:
+            予約したトークンが使えるようになるまでの待ち時間（秒）
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class CacheLimiterStore:
+    """
+    Djangoキャッシュを使ってワーカー間で同時実行数と上限を共有するストア
+
+    キャッシュがワーカー間で共有される（Redis・Memcachedなど）場合に、全ワーカーの合計が上限を超えないようにする。
+    異常終了したワーカーの枠は ttl 秒で期限切れになる。
+    """
+
+    def __init__(self, cache, prefix: str, ttl: int = 600):
+        """
+        Args:
+            cache: Djangoのキャッシュ
+            prefix: キーの接頭辞
+            ttl: キーの有効期間（秒）
+        """
+        self.cache = cache
+        self.ttl = ttl
+        self._in_flight_key = f'{prefix}:in_flight'
+        self._limit_key = f'{prefix}:limit'
+
+    def try_acquire(self, limit: int) -> bool:
+        """全ワーカー合計の実行中の数が limit 未満なら枠を1つ確保する"""
+        self.cache.add(self._in_flight_key, 0, self.ttl)
+        try:
+            in_flight = self.cache.incr(self._in_flight_key)
+        except ValueError:
+            # add と incr の間に期限切れになった場合
+            self.cache.set(self._in_flight_key, 1, self.ttl)
+            in_flight = 1
+        if in_flight <= limit:
+            self.cache.touch(self._in_flight_key, self.ttl)
+            return True
+        self.release()
+        return False
+
+    def release(self) -> None:
+        try:
+            if self.cache.decr(self._in_flight_key) < 0:
+                self.cache.set(self._in_flight_key, 0, self.ttl)
+        except ValueError:
+            pass
+
+    def in_flight(self) -> int:
+        return max(0, self.cache.get(self._in_flight_key, 0))
+
+    def get_limit(self, default: float) -> float:
+        return self.cache.get(self._limit_key, default)
+
+    def set_limit(self, limit: float) -> None:
+        self.cache.set(self._limit_key, limit, self.ttl)
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    スロットリングに応じて同時実行数を調整するリミッター（AIMD）
+
+    成功するたびに上限を 1/上限 ずつ増やし（上限分の成功でおよそ+1）、
+    ThrottlingException を受けると上限を decrease_factor 倍に下げる。
+    同じスロットリングの波で何度も下げないよう、減少は decrease_cooldown 秒に1回までとする。
+    rate を指定した場合は、トークンバケットで1秒あたりのリクエスト数も制限する。
+    """
+
+    def __init__(self, name: str, initial_limit: float = 4, min_limit: int = 1, max_limit: int = 16,
+                 decrease_factor: float = 0.5, decrease_cooldown: float = 2.0, rate: float = 0,
+                 burst: Optional[float] = None, acquire_timeout: float = 300,
+                 store: Optional[CacheLimiterStore] = None, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        Args:
+            name: 対象の名前（モデルID）
+            initial_limit: 同時実行数の初期上限
+            min_limit: 同時実行数の下限
+            max_limit: 同時実行数の上限
+            decrease_factor: スロットリング時に上限に掛ける係数
+            decrease_cooldown: 上限を続けて下げない秒数
+            rate: 1秒あたりのリクエスト数の上限（0で無効）
+            burst: トークンバケットの容量
+            acquire_timeout: 同時実行枠を待つ最大秒数
+            store: ワーカー間で共有するストア（省略時はプロセス内のみ）
+            clock: 時刻関数（テスト用）
+            sleep: 待機関数（テスト用）
+        """
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+        self.acquire_timeout = acquire_timeout
+        self.store = store
+        self.bucket = TokenBucket(rate, burst, clock) if rate > 0 else None
+        self._clock = clock
+        self._sleep = sleep
+        self._condition = threading.Condition()
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._last_decrease = None
+        self._in_flight = 0
+        self._waiting = 0
+        self._acquired_count = 0
+        self._throttled_count = 0
+        self._retried_count = 0
+        self._timeout_count = 0
+
+    @property
+    def limit(self) -> float:
+        if self.store is not None:
+            return self.store.get_limit(self._limit)
+        return self._limit
+
+    @property
+    def concurrency(self) -> int:
+        """現在の同時実行数の上限（整数）"""
+        return max(self.min_limit, int(math.floor(self.limit)))
+
+    def _try_acquire(self) -> bool:
+        if self.store is not None:
+            return self.store.try_acquire(self.concurrency)
+        return self._in_flight < self.concurrency
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """
+        同時実行枠を1つ確保する（トークンバケットが有効な場合は補充まで待つ）
+
+        Args:
+            timeout: 待つ最大秒数（省略時は acquire_timeout）
+
+        Returns:
+            確保できた場合True
+        """
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            self._waiting += 1
+            try:
+                while not self._try_acquire():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeout_count += 1
+                        return False
+                    # 共有ストアの枠は他ワーカーが返すため通知が届かない。短い間隔で確認し直す
+                    self._condition.wait(min(remaining, SHARED_POLL_INTERVAL) if self.store is not None else remaining)
+                self._in_flight += 1
+                self._acquired_count += 1
+            finally:
+                self._waiting -= 1
+
+        if self.bucket is not None:
+            delay = self.bucket.reserve()
+            if delay > 0:
+                self._sleep(delay)
+        return True
+
+    def try_acquire(self) -> bool:
+        """待たずに同時実行枠を1つ確保する（空きがなければFalse）"""
+        with self._condition:
+            if not self._try_acquire():
+                return False
+            self._in_flight += 1
+            self._acquired_count += 1
+            return True
+
+    async def acquire_async(self, timeout: Optional[float] = None) -> bool:
+        """
+        acquire の asyncio 版（イベントループを止めずに枠が空くのを待つ）
+
+        Args:
+            timeout: 待つ最大秒数（省略時は acquire_timeout）
+
+        Returns:
+            確保できた場合True
+        """
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            self._waiting += 1
+        try:
+            while not self.try_acquire():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    with self._condition:
+                        self._timeout_count += 1
+                    return False
+                await asyncio.sleep(min(remaining, SHARED_POLL_INTERVAL))
+        finally:
+            with self._condition:
+                self._waiting -= 1
+
+        if self.bucket is not None:
+            delay = self.bucket.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        return True
+
+    def release(self) -> None:
+        with self._condition:
+            self._in_flight = max(0, self._in_flight - 1)
+            if self.store is not None:
+                self.store.release()
+            self._condition.notify()
+
+    def record_success(self) -> None:
+        """成功を記録し、上限を加算的に増やす"""
+        with self._condition:
+            limit = self.limit
+            new_limit = min(float(self.max_limit), limit + 1.0 / limit)
+            self._set_limit(new_limit)
+            if int(new_limit) > int(limit):
+                self._condition.notify()
+
+    def record_throttle(self) -> bool:
+        """
+        スロットリングを記録し、上限を乗算的に下げる
+
+        Returns:
+            上限を下げた場合True（直前に下げていた場合はFalse）
+        """
+        with self._condition:
+            self._throttled_count += 1
+            now = self._clock()
+            if self._last_decrease is not None and now - self._last_decrease < self.decrease_cooldown:
+                return False
+            self._last_decrease = now
+            limit = self.limit
+            new_limit = max(float(self.min_limit), limit * self.decrease_factor)
+            self._set_limit(new_limit)
+        if new_limit < limit:
+            logger.warning(f"🐢 スロットリングのため同時実行数を下げます: {self.name}（{limit:.1f} → {new_limit:.1f}）")
+        return True
+
+    def _set_limit(self, limit: float) -> None:
+        self._limit = limit
+        if self.store is not None:
+            self.store.set_limit(limit)
+
+    def call(self, func: Callable[[], Any], max_retries: int = 4, backoff_base: float = 1.0,
+             backoff_cap: float = 30.0) -> Any:
+        """
+        同時実行枠を確保して呼び出し、スロットリングや一時的なエラーではジッター付きで待って再試行する
+
+        Args:
+            func: 呼び出す関数
+            max_retries: 再試行の最大回数
+            backoff_base: 1回目の待ち時間の上限（秒）
+            backoff_cap: 待ち時間の上限（秒）
+
+        Returns:
+            func の戻り値
+        """
+        attempt = 0
+        while True:
+            if not self.acquire():
+                raise RateLimitTimeoutError(self.name, self.acquire_timeout)
+            try:
+                result = func()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, max_retries, backoff_base, backoff_cap)
+                if delay is None:
+                    raise
+            else:
+                self.record_success()
+                return result
+            finally:
+                self.release()
+            attempt += 1
+            self._sleep(delay)
+
+    async def call_async(self, func: Callable[[], Awaitable[Any]], max_retries: int = 4,
+                         backoff_base: float = 1.0, backoff_cap: float = 30.0) -> Any:
+        """
+        call の asyncio 版（枠の確保とバックオフの待機でイベントループを止めない）
+
+        Args:
+            func: 呼び出すコルーチン関数
+            max_retries: 再試行の最大回数
+            backoff_base: 1回目の待ち時間の上限（秒）
+            backoff_cap: 待ち時間の上限（秒）
+
+        Returns:
+            func の戻り値
+        """
+        attempt = 0
+        while True:
+            if not await self.acquire_async():
+                raise RateLimitTimeoutError(self.name, self.acquire_timeout)
+            try:
+                result = await func()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, max_retries, backoff_base, backoff_cap)
+                if delay is None:
+                    raise
+            else:
+                self.record_success()
+                return result
+            finally:
+                self.release()
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def _retry_delay(self, error: Exception, attempt: int, max_retries: int, backoff_base: float,
+                     backoff_cap: float) -> Optional[float]:
+        """
+        失敗した呼び出しを再試行するまでの待ち時間を決める（スロットリングの場合は上限も下げる）
+
+        Returns:
+            待ち時間（秒）、再試行しない場合はNone
+        """
+        if not is_retryable_error(error):
+            return None
+        if is_throttling_error(error):
+            self.record_throttle()
+        if attempt >= max_retries:
+            return None
+        delay = backoff_delay(attempt, backoff_base, backoff_cap)
+        with self._condition:
+            self._retried_count += 1
+        logger.info(f"⏳ {type(error).__name__} のため{delay:.1f}秒後に再試行します: {self.name}（{attempt + 1}/{max_retries}）")
+        return delay
+
+    def metrics(self) -> Dict:
+        """
+        リミッターの状態を返す
+
+        Returns:
+            limit, concurrency, in_flight, waiting, acquired_count, throttled_count, retried_count, timeout_count など
+        """
+        with self._condition:
+            return {
+                'name': self.name,
+                'limit': round(self.limit, 2),
+                'concurrency': self.concurrency,
+                'in_flight': self._in_flight,
+                'shared_in_flight': self.store.in_flight() if self.store is not None else None,
+                'waiting': self._waiting,
+                'requests_per_second': self.bucket.rate if self.bucket is not None else None,
+                'acquired_count': self._acquired_count,
+                'throttled_count': self._throttled_count,
+                'retried_count': self._retried_count,
+                'timeout_count': self._timeout_count,
+            }
+
+
+def is_rate_limiter_enabled() -> bool:
+    """Bedrock呼び出しの同時実行数制限が有効かどうかを返す"""
+    return getattr(settings, 'PROOFREAD_RATE_LIMIT_ENABLED', True)
+
+
+def botocore_retry_config() -> Dict:
+    """
+    boto3クライアントの再試行設定
+
+    リミッターが有効な場合、スロットリングの再試行はリミッターが待ってから行うため、
+    botocore によるスレッド内の即時再試行は行わない。
+    """
+    if is_rate_limiter_enabled():
+        return {'mode': 'standard', 'total_max_attempts': 1}
+    return {'max_attempts': 3}
+
+
+# プロセス内で共有するモデルごとのリミッター
+_limiters: Dict[str, AdaptiveConcurrencyLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def _build_store(name: str) -> Optional[CacheLimiterStore]:
+    if not getattr(settings, 'PROOFREAD_RATE_LIMIT_SHARED', False):
+        return None
+    from django.core.cache import caches
+    return CacheLimiterStore(
+        caches[getattr(settings, 'PROOFREAD_RATE_LIMIT_CACHE', 'default')],
+        prefix=f'proofread_rate_limit:{name}',
+        ttl=getattr(settings, 'PROOFREAD_RATE_LIMIT_SHARED_TTL', 600),
+    )
+
+
+def get_rate_limiter(name: str) -> AdaptiveConcurrencyLimiter:
+    """
+    モデルごとの共有リミッターを取得する
+
+    Args:
+        name: モデルID（推論プロファイルARN）
+
+    Returns:
+        共有AdaptiveConcurrencyLimiterインスタンス
+    """
+    limiter = _limiters.get(name)
+    if limiter is not None:
+        return limiter
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = AdaptiveConcurrencyLimiter(
+                name,
+                initial_limit=getattr(settings, 'PROOFREAD_RATE_LIMIT_INITIAL_CONCURRENCY', 4),
+                min_limit=getattr(settings, 'PROOFREAD_RATE_LIMIT_MIN_CONCURRENCY', 1),
+                max_limit=getattr(settings, 'PROOFREAD_RATE_LIMIT_MAX_CONCURRENCY', 16),
+                decrease_factor=getattr(settings, 'PROOFREAD_RATE_LIMIT_DECREASE_FACTOR', 0.5),
+                decrease_cooldown=getattr(settings, 'PROOFREAD_RATE_LIMIT_DECREASE_COOLDOWN', 2.0),
+                rate=getattr(settings, 'PROOFREAD_RATE_LIMIT_REQUESTS_PER_SECOND', 0),
+                burst=getattr(settings, 'PROOFREAD_RATE_LIMIT_BURST', 0) or None,
+                acquire_timeout=getattr(settings, 'PROOFREAD_RATE_LIMIT_ACQUIRE_TIMEOUT', 300),
+                store=_build_store(name),
+            )
+        return _limiters[name]
+
+
+def call_with_rate_limit(name: str, func: Callable[[], Any]) -> Any:
+    """
+    モデルごとの共有リミッターを通して呼び出す（無効時はそのまま呼び出す）
+
+    Args:
+        name: モデルID
+        func: 呼び出す関数
+
+    Returns:
+        func の戻り値
+    """
+    if not is_rate_limiter_enabled():
+        return func()
+    return get_rate_limiter(name).call(
+        func,
+        max_retries=getattr(settings, 'PROOFREAD_RATE_LIMIT_MAX_RETRIES', 4),
+        backoff_base=getattr(settings, 'PROOFREAD_RATE_LIMIT_BACKOFF_BASE', 1.0),
+        backoff_cap=getattr(settings, 'PROOFREAD_RATE_LIMIT_BACKOFF_CAP', 30.0),
+    )
+
+
+async def call_with_rate_limit_async(name: str, func: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    call_with_rate_limit の asyncio 版
+
+    Args:
+        name: モデルID
+        func: 呼び出すコルーチン関数
+
+    Returns:
+        func の戻り値
+    """
+    if not is_rate_limiter_enabled():
+        return await func()
+    return await get_rate_limiter(name).call_async(
+        func,
+        max_retries=getattr(settings, 'PROOFREAD_RATE_LIMIT_MAX_RETRIES', 4),
+        backoff_base=getattr(settings, 'PROOFREAD_RATE_LIMIT_BACKOFF_BASE', 1.0),
+        backoff_cap=getattr(settings, 'PROOFREAD_RATE_LIMIT_BACKOFF_CAP', 30.0),
+    )
+
+
+def rate_limiter_metrics() -> Dict[str, Dict]:
+    """すべてのリミッターの状態を返す（{モデルID: metrics}）"""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.metrics() for limiter in limiters}
+
+
+def reset_rate_limiters() -> None:
+    """共有リミッターをすべて破棄する"""
+    with _limiters_lock:
+        _limiters.clear()
@@ -0,0 +1,148 @@
+import logging
+import math
+import threading
+import time
+from typing import Dict, Optional
+
+from django.conf import settings
+
+from proofreading_ai.models import TokenUsageRecord
+from proofreading_ai.services.token_estimator import TokenEstimator, get_token_estimator
+
+logger = logging.getLogger(__name__)
+
+# モードごとの max_tokens の上限（従来の固定値）
+MODE_OUTPUT_LIMITS = {
+    'json': 15000,
+    'text': 30000,
+    'stream': 15000,
+    'category': 15000,
+}
+# 実測値が集まるまでの原文1文字あたりの出力トークン数
+# （json/text は校正後テキスト全文と修正箇所、stream は修正箇所のみ、category は1カテゴリーの修正箇所のみを出力する）
+DEFAULT_OUTPUT_TOKENS_PER_CHARACTER = {
+    'json': 2.0,
+    'text': 2.5,
+    'stream': 0.6,
+    'category': 0.3,
+}
+# 読み取りタイムアウトの段階（boto3クライアントをこの段階ごとに作って使い回す）
+READ_TIMEOUT_STEPS = (30, 60, 120, 300, 600)
+
+
+def is_adaptive_sizing_enabled() -> bool:
+    """max_tokens・タイムアウトのリクエストごとの調整が有効かどうかを返す"""
+    return getattr(settings, 'PROOFREAD_ADAPTIVE_SIZING', True)
+
+
+def round_up_timeout(timeout: float, max_timeout: int) -> int:
+    """
+    タイムアウトを段階値に切り上げる
+
+    Args:
+        timeout: 必要なタイムアウト（秒）
+        max_timeout: 上限（秒）
+
+    Returns:
+        段階値に切り上げたタイムアウト（上限を超えない）
+    """
+    for step in READ_TIMEOUT_STEPS:
+        if timeout <= step:
+            return min(step, max_timeout)
+    return max_timeout
+
+
+# プロセス内で共有する出力比率 {mode: (比率, 確認時刻)}
+_output_ratios: Dict[str, tuple] = {}
+_output_ratios_lock = threading.Lock()
+
+
+def get_output_ratio(mode: str) -> float:
+    """
+    原文1文字あたりの出力トークン数（直近の実測値の95パーセンタイル）を返す
+
+    実測値が PROOFREAD_TOKEN_CALIBRATION_MIN_SAMPLES 件に満たない場合は既定値を使う。
+
+    Args:
+        mode: 校正モード（json / text / stream / category）
+
+    Returns:
+        原文1文字あたりの出力トークン数
+    """
+    interval = getattr(settings, 'PROOFREAD_TOKEN_CALIBRATION_INTERVAL', 300)
+    cached = _output_ratios.get(mode)
+    now = time.monotonic()
+    if cached is not None and now - cached[1] < interval:
+        return cached[0]
+
+    ratio = DEFAULT_OUTPUT_TOKENS_PER_CHARACTER.get(mode, DEFAULT_OUTPUT_TOKENS_PER_CHARACTER['json'])
+    try:
+        limit = getattr(settings, 'PROOFREAD_TOKEN_CALIBRATION_SAMPLES', 500)
+        samples = sorted(
+            output_tokens / original_length
+            for output_tokens, original_length in TokenUsageRecord.objects.filter(
+                mode=mode, original_length__gt=0
+            ).order_by('-created_at', '-id').values_list('output_tokens', 'original_length')[:limit]
+        )
+        if len(samples) >= getattr(settings, 'PROOFREAD_TOKEN_CALIBRATION_MIN_SAMPLES', 20):
+            ratio = samples[int(0.95 * (len(samples) - 1))]
+    except Exception as e:
+        logger.warning(f"⚠️ 出力比率の読み込みに失敗: {str(e)}")
+
+    with _output_ratios_lock:
+        _output_ratios[mode] = (ratio, now)
+    return ratio
+
+
+def reset_output_ratios() -> None:
+    """共有の出力比率を破棄し、次回の取得時に再計算させる"""
+    with _output_ratios_lock:
+        _output_ratios.clear()
+
+
+def plan_request(mode: str, original_length: int, input_tokens: int, max_timeout: int,
+                 estimator: Optional[TokenEstimator] = None) -> Dict:
+    """
+    1回のモデル呼び出しの max_tokens と読み取りタイムアウトを決める
+
+    出力トークン数は原文の文字数と実測の出力比率から見積もり、余裕を持たせた値を max_tokens にする。
+    タイムアウトは max_tokens まで出力した場合の予測処理時間に余裕を持たせ、段階値に切り上げる。
+
+    Args:
+        mode: 校正モード（json / text / stream / category）
+        original_length: 原文（チャンク）の文字数
+        input_tokens: 推定入力トークン数
+        max_timeout: タイムアウトの上限（秒）
+        estimator: 処理時間の予測に使う推定器（省略時はプロセス共有の推定器）
+
+    Returns:
+        max_tokens, read_timeout, expected_output_tokens, required_output_tokens, fits（上限内に収まるか）
+    """
+    limit = MODE_OUTPUT_LIMITS.get(mode, MODE_OUTPUT_LIMITS['json'])
+    if not is_adaptive_sizing_enabled():
+        return {
+            'max_tokens': limit,
+            'read_timeout': max_timeout,
+            'expected_output_tokens': None,
+            'required_output_tokens': None,
+            'fits': True,
+        }
+
+    estimator = estimator or get_token_estimator()
+    margin = getattr(settings, 'PROOFREAD_MAX_TOKENS_MARGIN', 1.5)
+    floor = getattr(settings, 'PROOFREAD_MAX_TOKENS_FLOOR', 1024)
+    expected = int(math.ceil(original_length * get_output_ratio(mode)))
+    required = int(math.ceil(expected * margin)) + floor
+    max_tokens = min(required, limit)
+
+    predicted = estimator.predict_latency(input_tokens, max_tokens)
+    timeout_margin = getattr(settings, 'PROOFREAD_TIMEOUT_MARGIN', 2.0)
+    read_timeout = round_up_timeout(predicted * timeout_margin + 10, max_timeout)
+
+    return {
+        'max_tokens': max_tokens,
+        'read_timeout': read_timeout,
+        'expected_output_tokens': expected,
+        'required_output_tokens': required,
+        'fits': required <= limit,
+    }
@@ -0,0 +1,233 @@
+import hashlib
+import json
+import logging
+import threading
+from datetime import timedelta
+from typing import Any, Dict, Iterable, Optional
+
+from django.conf import settings
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from proofreading_ai.models import ProofreadingCacheEntry
+
+logger = logging.getLogger(__name__)
+
+
+class ProofreadResultCache:
+    """
+    コンテンツアドレス方式の校正結果キャッシュ
+
+    キーは入力と設定（保護済みテキスト、プロンプト版、モデルID、モード、辞書版）のハッシュ。
+    DB（ProofreadingCacheEntry）に保存するため全gunicornワーカーで共有され、
+    TTLによる期限切れと、件数上限を超えた分の最終アクセスが古い順（LRU）の削除を行う。
+    """
+
+    def __init__(self, namespace: str = 'result', max_entries: Optional[int] = None, ttl: Optional[int] = None):
+        """
+        Args:
+            namespace: キャッシュの名前空間（用途ごとに件数上限と統計を分ける）
+            max_entries: 最大保持件数（省略時は settings.PROOFREAD_CACHE_MAX_ENTRIES）
+            ttl: 有効期間（秒、省略時は settings.PROOFREAD_CACHE_TTL）
+        """
+        self.namespace = namespace
+        self.max_entries = max_entries if max_entries is not None else getattr(settings, 'PROOFREAD_CACHE_MAX_ENTRIES', 500)
+        self.ttl = ttl if ttl is not None else getattr(settings, 'PROOFREAD_CACHE_TTL', 86400)
+        self.enabled = getattr(settings, 'PROOFREAD_CACHE_ENABLED', True)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def make_key(self, *parts: Any) -> str:
+        """
+        キャッシュキーを生成する
+
+        Args:
+            parts: キーに含める値（JSONシリアライズ可能なもの）
+
+        Returns:
+            SHA-256の16進文字列
+        """
+        raw = json.dumps([self.namespace, *parts], ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self._hits += 1
+            else:
+                self._misses += 1
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        キャッシュを取得する
+
+        Args:
+            key: make_key で生成したキー
+
+        Returns:
+            キャッシュ内容（存在しない・期限切れの場合はNone）
+        """
+        now = timezone.now()
+        try:
+            entry = ProofreadingCacheEntry.objects.filter(cache_key=key, expires_at__gt=now).only('payload').first()
+            if entry is None:
+                self._record(False)
+                return None
+            ProofreadingCacheEntry.objects.filter(pk=entry.pk).update(
+                hit_count=F('hit_count') + 1,
+                last_accessed_at=now
+            )
+            self._record(True)
+            return entry.payload
+        except Exception as e:
+            logger.warning(f"⚠️ 校正結果キャッシュ取得エラー: {str(e)}")
+            self._record(False)
+            return None
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict]:
+        """
+        複数のキャッシュをまとめて取得する（段落単位のキャッシュで1記事分を1回の問い合わせで引く）
+
+        Args:
+            keys: make_key で生成したキー
+
+        Returns:
+            {キー: キャッシュ内容}（存在しない・期限切れのキーは含まない）
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        now = timezone.now()
+        try:
+            entries = list(ProofreadingCacheEntry.objects.filter(
+                cache_key__in=keys, expires_at__gt=now
+            ).only('cache_key', 'payload'))
+            if entries:
+                ProofreadingCacheEntry.objects.filter(pk__in=[entry.pk for entry in entries]).update(
+                    hit_count=F('hit_count') + 1,
+                    last_accessed_at=now
+                )
+        except Exception as e:
+            logger.warning(f"⚠️ 校正結果キャッシュ取得エラー: {str(e)}")
+            entries = []
+        found = {entry.cache_key: entry.payload for entry in entries}
+        with self._lock:
+            self._hits += len(found)
+            self._misses += len(keys) - len(found)
+        return found
+
+    def peek(self, key: str) -> Optional[Dict]:
+        """
+        ヒット数・統計を更新せずにキャッシュを取得する（他のワーカーの完了待ちなど、繰り返し確認する場合に使う）
+
+        Args:
+            key: make_key で生成したキー
+
+        Returns:
+            キャッシュ内容（存在しない・期限切れの場合はNone）
+        """
+        try:
+            entry = ProofreadingCacheEntry.objects.filter(
+                cache_key=key, expires_at__gt=timezone.now()
+            ).only('payload').first()
+            return entry.payload if entry is not None else None
+        except Exception as e:
+            logger.warning(f"⚠️ 校正結果キャッシュ取得エラー: {str(e)}")
+            return None
+
+    def set(self, key: str, payload: Dict) -> None:
+        """
+        キャッシュを保存し、期限切れと上限超過分を削除する
+
+        Args:
+            key: make_key で生成したキー
+            payload: 保存する内容（JSONシリアライズ可能な辞書）
+        """
+        now = timezone.now()
+        try:
+            ProofreadingCacheEntry.objects.update_or_create(
+                cache_key=key,
+                defaults={
+                    'namespace': self.namespace,
+                    'payload': payload,
+                    'created_at': now,
+                    'last_accessed_at': now,
+                    'expires_at': now + timedelta(seconds=self.ttl),
+                }
+            )
+            self._evict(now)
+        except Exception as e:
+            logger.warning(f"⚠️ 校正結果キャッシュ保存エラー: {str(e)}")
+
+    def set_many(self, items: Dict[str, Dict]) -> None:
+        """
+        複数のキャッシュを保存し、期限切れと上限超過分の削除は最後に1回だけ行う
+
+        Args:
+            items: {make_key で生成したキー: 保存する内容}
+        """
+        if not items:
+            return
+        now = timezone.now()
+        try:
+            for key, payload in items.items():
+                ProofreadingCacheEntry.objects.update_or_create(
+                    cache_key=key,
+                    defaults={
+                        'namespace': self.namespace,
+                        'payload': payload,
+                        'created_at': now,
+                        'last_accessed_at': now,
+                        'expires_at': now + timedelta(seconds=self.ttl),
+                    }
+                )
+            self._evict(now)
+        except Exception as e:
+            logger.warning(f"⚠️ 校正結果キャッシュ保存エラー: {str(e)}")
+
+    def _evict(self, now) -> None:
+        """期限切れのエントリと、件数上限を超えたLRU側のエントリを削除する"""
+        entries = ProofreadingCacheEntry.objects.filter(namespace=self.namespace)
+        expired, _ = entries.filter(expires_at__lte=now).delete()
+
+        overflow = entries.count() - self.max_entries
+        evicted = 0
+        if overflow > 0:
+            stale_ids = list(entries.order_by('last_accessed_at').values_list('id', flat=True)[:overflow])
+            evicted, _ = ProofreadingCacheEntry.objects.filter(id__in=stale_ids).delete()
+
+        if expired or evicted:
+            with self._lock:
+                self._evictions += expired + evicted
+            logger.info(f"🧹 校正結果キャッシュ削除: 期限切れ {expired}件, LRU {evicted}件")
+
+    def clear(self) -> None:
+        """名前空間内のキャッシュをすべて削除する"""
+        ProofreadingCacheEntry.objects.filter(namespace=self.namespace).delete()
+
+    def stats(self) -> Dict:
+        """
+        ヒット率などの統計情報を返す
+
+        Returns:
+            このプロセスのヒット・ミス・削除件数と、全ワーカー合計のエントリ数・ヒット数
+        """
+        with self._lock:
+            hits, misses, evictions = self._hits, self._misses, self._evictions
+        lookups = hits + misses
+        shared = ProofreadingCacheEntry.objects.filter(namespace=self.namespace).aggregate(
+            total_hits=Sum('hit_count')
+        )
+        return {
+            'namespace': self.namespace,
+            'hits': hits,
+            'misses': misses,
+            'evictions': evictions,
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'entries': ProofreadingCacheEntry.objects.filter(namespace=self.namespace).count(),
+            'total_hits': shared['total_hits'] or 0,
+            'max_entries': self.max_entries,
+            'ttl': self.ttl,
+        }
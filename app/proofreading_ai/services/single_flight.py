@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from proofreading_ai.models import ProofreadingInFlight
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    同じキーの呼び出しを1回の実行にまとめる（single-flight）
+
+    最初の呼び出し（リーダー）だけが関数を実行し、実行中に来た同じキーの呼び出しは
+    その完了を待って同じ結果（例外の場合は同じ例外）を受け取る。
+    スレッドとイベントループの両方から呼べるよう、実行中の呼び出しは concurrent.futures.Future で表す。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self._executed = 0
+        self._coalesced = 0
+
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        """実行中の呼び出しに合流する（なければ登録してリーダーになる）"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self._coalesced += 1
+                return call, False
+            call = Future()
+            self._calls[key] = call
+            self._executed += 1
+            return call, True
+
+    def _finish(self, key: str, call: Future, result: Any = None, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self._calls.pop(key, None)
+        if error is not None:
+            call.set_exception(error)
+        else:
+            call.set_result(result)
+
+    def do(self, key: str, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        同じキーの実行中の呼び出しがあればその結果を待ち、なければ func を実行する
+
+        Args:
+            key: 呼び出しをまとめるキー
+            func: 実行する関数
+
+        Returns:
+            (結果, 他の呼び出しの結果を共有したか) のタプル
+        """
+        call, leader = self._join(key)
+        if not leader:
+            return call.result(), True
+        try:
+            result = func()
+        except BaseException as e:
+            self._finish(key, call, error=e)
+            raise
+        self._finish(key, call, result)
+        return result, False
+
+    async def do_async(self, key: str, func: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        do の非同期版（同期版の呼び出しとも同じキーでまとめる）
+
+        Args:
+            key: 呼び出しをまとめるキー
+            func: 実行するコルーチン関数
+
+        Returns:
+            (結果, 他の呼び出しの結果を共有したか) のタプル
+        """
+        call, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(call), True
+        try:
+            result = await func()
+        except BaseException as e:
+            self._finish(key, call, error=e)
+            raise
+        self._finish(key, call, result)
+        return result, False
+
+    def stats(self) -> Dict:
+        """実行件数・合流件数・実行中の件数を返す"""
+        with self._lock:
+            return {
+                'executed': self._executed,
+                'coalesced': self._coalesced,
+                'in_flight': len(self._calls),
+            }
+
+
+class SharedFlightLock:
+    """
+    実行中の校正のロック表（ProofreadingInFlight）による全ワーカー共通のロック
+
+    キーの行を作れたワーカーがリーダーになる。リーダーが異常終了した場合に備え、
+    行には有効期限を持たせ、期限切れの行は次に取得しようとしたワーカーが削除する。
+    """
+
+    def __init__(self, ttl: int = 600):
+        """
+        Args:
+            ttl: ロックの有効期限（秒、校正1回の最大所要時間より長くする）
+        """
+        self.ttl = ttl
+        self.owner = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def acquire(self, key: str) -> bool:
+        """
+        ロックを取得する
+
+        Args:
+            key: 校正キー
+
+        Returns:
+            取得できた場合True（他のワーカーが実行中の場合False）
+        """
+        now = timezone.now()
+        ProofreadingInFlight.objects.filter(key=key, expires_at__lte=now).delete()
+        try:
+            with transaction.atomic():
+                ProofreadingInFlight.objects.create(
+                    key=key, owner=self.owner, created_at=now, expires_at=now + timedelta(seconds=self.ttl)
+                )
+            return True
+        except IntegrityError:
+            return False
+
+    def release(self, key: str) -> None:
+        """このワーカーが取得したロックを解放する"""
+        ProofreadingInFlight.objects.filter(key=key, owner=self.owner).delete()
+
+    def held(self, key: str) -> bool:
+        """有効期限内のロックがあるかどうか"""
+        return ProofreadingInFlight.objects.filter(key=key, expires_at__gt=timezone.now()).exists()
+
+
+def run_shared(lock: SharedFlightLock, key: str, run: Callable[[], Dict],
+               lookup: Callable[[], Optional[Dict]], poll_interval: float = 0.2,
+               sleep: Callable[[float], None] = time.sleep) -> Tuple[Dict, bool]:
+    """
+    他のワーカーで同じ校正が実行中なら完了を待って結果を受け取り、なければ自分で実行する
+
+    結果の受け渡しには全ワーカー共通の校正結果キャッシュを使う（lookup）。
+    リーダーの失敗などで結果がキャッシュされなかった場合は、自分がリーダーになって実行し直す。
+
+    Args:
+        lock: 共通ロック
+        key: 校正キー
+        run: 校正を実行する関数（結果をキャッシュに保存する）
+        lookup: キャッシュから結果を取り出す関数（ない場合はNone）
+        poll_interval: 他のワーカーの完了を確認する間隔（秒）
+        sleep: 待機関数（テスト用）
+
+    Returns:
+        (結果, 他のワーカーの結果を共有したか) のタプル
+    """
+    while True:
+        if lock.acquire(key):
+            try:
+                return run(), False
+            finally:
+                lock.release(key)
+
+        logger.info(f"🔗 他のワーカーで実行中の同じ校正を待ちます: {key[:12]}")
+        while lock.held(key):
+            sleep(poll_interval)
+        shared = lookup()
+        if shared is not None:
+            return shared, True
+
+
+async def run_shared_async(lock: SharedFlightLock, key: str, run: Callable[[], Awaitable[Dict]],
+                           lookup: Callable[[], Optional[Dict]], poll_interval: float = 0.2) -> Tuple[Dict, bool]:
+    """
+    run_shared の非同期版（run はコルーチン関数、lookup は同期関数）
+
+    Returns:
+        (結果, 他のワーカーの結果を共有したか) のタプル
+    """
+    while True:
+        if await sync_to_async(lock.acquire)(key):
+            try:
+                return await run(), False
+            finally:
+                await sync_to_async(lock.release)(key)
+
+        logger.info(f"🔗 他のワーカーで実行中の同じ校正を待ちます: {key[:12]}")
+        while await sync_to_async(lock.held)(key):
+            await asyncio.sleep(poll_interval)
+        shared = await sync_to_async(lookup)()
+        if shared is not None:
+            return shared, True
+
+
+def is_single_flight_enabled() -> bool:
+    """同じ校正の同時実行を1回にまとめるかどうか"""
+    return getattr(settings, 'PROOFREAD_SINGLE_FLIGHT_ENABLED', True)
+
+
+def is_shared_flight_enabled() -> bool:
+    """ワーカーをまたいで同じ校正をまとめるかどうか（校正結果キャッシュが有効な場合のみ）"""
+    return is_single_flight_enabled() and getattr(settings, 'PROOFREAD_SINGLE_FLIGHT_SHARED', True)
+
+
+_single_flight: Optional[SingleFlight] = None
+_shared_lock: Optional[SharedFlightLock] = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """プロセス内で共有するSingleFlightを取得する"""
+    global _single_flight
+    with _single_flight_lock:
+        if _single_flight is None:
+            _single_flight = SingleFlight()
+        return _single_flight
+
+
+def get_shared_flight_lock() -> SharedFlightLock:
+    """プロセス内で共有するワーカー共通ロックを取得する（設定は初回作成時に反映）"""
+    global _shared_lock
+    with _single_flight_lock:
+        if _shared_lock is None:
+            _shared_lock = SharedFlightLock(ttl=getattr(settings, 'PROOFREAD_SINGLE_FLIGHT_LOCK_TTL', 600))
+        return _shared_lock
+
+
+def single_flight_stats() -> Dict:
+    """このプロセスのまとめた件数と、全ワーカーで実行中の校正の件数を返す"""
+    stats = get_single_flight().stats()
+    stats['shared_in_flight'] = ProofreadingInFlight.objects.filter(expires_at__gt=timezone.now()).count()
+    return stats
+
+
+def reset_single_flight() -> None:
+    """SingleFlightとワーカー共通ロックを破棄する（設定変更時やテスト用）"""
+    global _single_flight, _shared_lock
+    with _single_flight_lock:
+        _single_flight = None
+        _shared_lock = None
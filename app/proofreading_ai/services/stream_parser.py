@@ -0,0 +1,103 @@
+import json
+import logging
+import re
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+class CorrectionStreamParser:
+    """
+    Tool Useの partial_json を逐次受け取り、配列要素（修正箇所）を完成した順に取り出すパーサー
+
+    Bedrockのレスポンスストリーミングでは、ツール入力のJSONが任意の位置で分割されて届く。
+    配列内のオブジェクトの括弧の深さと文字列リテラルの状態だけを追跡し、
+    1件分のオブジェクトが閉じた時点で json.loads して返す。
+    """
+
+    def __init__(self, array_key: str = "corrections"):
+        """
+        Args:
+            array_key: 逐次取り出す配列のキー名
+        """
+        self._key_pattern = re.compile(r'"%s"\s*:\s*\[' % re.escape(array_key))
+        self._buffer = ""
+        self._scan_pos = 0
+        self._in_array = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._object_start = None
+        self.items_parsed = 0
+
+    @property
+    def finished(self) -> bool:
+        """配列の終端まで読み終えたかどうか"""
+        return self._finished
+
+    def feed(self, fragment: str) -> List[Dict]:
+        """
+        JSON断片を追加し、新たに完成した配列要素を返す
+
+        Args:
+            fragment: partial_json の断片
+
+        Returns:
+            この断片で完成した要素のリスト
+        """
+        if self._finished or not fragment:
+            return []
+
+        self._buffer += fragment
+        items = []
+
+        if not self._in_array:
+            match = self._key_pattern.search(self._buffer)
+            if not match:
+                return items
+            self._in_array = True
+            self._buffer = self._buffer[match.end():]
+            self._scan_pos = 0
+
+        buffer = self._buffer
+        i = self._scan_pos
+        length = len(buffer)
+        while i < length:
+            char = buffer[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                if self._depth == 0:
+                    self._object_start = i
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0 and self._object_start is not None:
+                    raw = buffer[self._object_start:i + 1]
+                    self._object_start = None
+                    try:
+                        items.append(json.loads(raw))
+                        self.items_parsed += 1
+                    except json.JSONDecodeError as e:
+                        logger.warning(f"⚠️ ストリーム内の修正箇所JSON解析エラー: {str(e)}")
+            elif char == "]" and self._depth == 0:
+                self._finished = True
+                i += 1
+                break
+            i += 1
+
+        # 解析済みの部分を捨ててバッファを小さく保つ
+        keep_from = self._object_start if self._object_start is not None else i
+        self._buffer = buffer[keep_from:]
+        if self._object_start is not None:
+            self._object_start = 0
+        self._scan_pos = i - keep_from
+        return items
@@ -0,0 +1,289 @@
+import logging
+import math
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from django.conf import settings
+
+from proofreading_ai.models import TokenUsageRecord
+from proofreading_ai.utils import HTML_TOKEN_PATTERN
+
+logger = logging.getLogger(__name__)
+
+# 文字種（markup はHTMLタグ・コメント、other は全角記号・全角英数字・絵文字など）
+CHARACTER_CLASSES = ('kanji', 'kana', 'ascii', 'markup', 'other')
+
+KANJI_PATTERN = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff々〆ヵヶ]+')
+KANA_PATTERN = re.compile(r'[\u3040-\u30ff\uff66-\uff9f]+')
+ASCII_PATTERN = re.compile(r'[\x00-\x7f]+')
+
+# 実測値が集まるまでの文字種ごとのトークン数（1文字あたり）
+DEFAULT_TOKENS_PER_CHARACTER = {
+    'kanji': 1.5,
+    'kana': 1.2,
+    'ascii': 0.3,
+    'markup': 0.4,
+    'other': 1.0,
+}
+# 実測値が集まるまでの処理時間モデル: 固定時間 + 入力トークンあたり + 出力トークンあたり（秒）
+DEFAULT_LATENCY_COEFFICIENTS = (1.0, 0.0002, 0.02)
+
+
+def count_character_classes(text: str) -> Dict[str, int]:
+    """
+    テキストの文字数を文字種ごとに数える
+
+    Args:
+        text: 対象テキスト
+
+    Returns:
+        {文字種: 文字数}
+    """
+    counts = dict.fromkeys(CHARACTER_CLASSES, 0)
+    if not text:
+        return counts
+    if '<' in text:
+        counts['markup'] = sum(len(tag) for tag in HTML_TOKEN_PATTERN.findall(text))
+        text = HTML_TOKEN_PATTERN.sub('', text)
+    counts['kanji'] = sum(map(len, KANJI_PATTERN.findall(text)))
+    counts['kana'] = sum(map(len, KANA_PATTERN.findall(text)))
+    counts['ascii'] = sum(map(len, ASCII_PATTERN.findall(text)))
+    counts['other'] = len(text) - counts['kanji'] - counts['kana'] - counts['ascii']
+    return counts
+
+
+def _solve_regularized(rows: Sequence[Sequence[float]], targets: Sequence[float], prior: Sequence[float]) -> List[float]:
+    """
+    事前値へ弱く引き寄せた最小二乗法で係数を求める（サンプルに現れない項目は事前値のまま）
+
+    Args:
+        rows: 説明変数の行
+        targets: 目的変数
+        prior: 事前値
+
+    Returns:
+        係数のリスト
+    """
+    size = len(prior)
+    gram = [[0.0] * size for _ in range(size)]
+    moment = [0.0] * size
+    for row, target in zip(rows, targets):
+        for i in range(size):
+            if not row[i]:
+                continue
+            moment[i] += row[i] * target
+            for j in range(size):
+                gram[i][j] += row[i] * row[j]
+
+    # 項目ごとの尺度に合わせた弱い正則化（サンプルに現れない項目は事前値に固定される）
+    ridges = [gram[i][i] * 1e-4 + 1e-9 for i in range(size)]
+    matrix = [gram[i][:] + [moment[i] + ridges[i] * prior[i]] for i in range(size)]
+    for i in range(size):
+        matrix[i][i] += ridges[i]
+
+    # 部分ピボット選択付きのガウスの消去法
+    for column in range(size):
+        pivot = max(range(column, size), key=lambda r: abs(matrix[r][column]))
+        matrix[column], matrix[pivot] = matrix[pivot], matrix[column]
+        divisor = matrix[column][column]
+        for r in range(size):
+            if r != column and matrix[r][column]:
+                factor = matrix[r][column] / divisor
+                for c in range(column, size + 1):
+                    matrix[r][c] -= factor * matrix[column][c]
+    return [matrix[i][size] / matrix[i][i] for i in range(size)]
+
+
+class TokenEstimator:
+    """
+    文字種ごとの係数によるトークン数・処理時間の推定器
+
+    係数は Bedrock の usage で記録した実測トークン数（TokenUsageRecord）から較正する。
+    実測値が少ないうちは DEFAULT_TOKENS_PER_CHARACTER を使う。
+    """
+
+    def __init__(self, coefficients: Optional[Dict[str, float]] = None,
+                 latency_coefficients: Optional[Sequence[float]] = None, samples: int = 0):
+        """
+        Args:
+            coefficients: {文字種: 1文字あたりのトークン数}
+            latency_coefficients: (固定秒, 入力トークンあたり秒, 出力トークンあたり秒)
+            samples: 較正に使った実測値の件数（0は既定値）
+        """
+        self.coefficients = dict(DEFAULT_TOKENS_PER_CHARACTER, **(coefficients or {}))
+        self.latency_coefficients = tuple(latency_coefficients or DEFAULT_LATENCY_COEFFICIENTS)
+        self.samples = samples
+
+    @property
+    def calibrated(self) -> bool:
+        return self.samples > 0
+
+    def estimate_from_counts(self, counts: Dict[str, int]) -> int:
+        """文字種ごとの文字数からトークン数を推定する"""
+        return int(math.ceil(sum(self.coefficients[name] * counts.get(name, 0) for name in CHARACTER_CLASSES)))
+
+    def estimate(self, text: str) -> int:
+        """
+        テキストのトークン数を推定する
+
+        Args:
+            text: 対象テキスト
+
+        Returns:
+            推定トークン数
+        """
+        return self.estimate_from_counts(count_character_classes(text))
+
+    def predict_latency(self, input_tokens: int, output_tokens: int) -> float:
+        """
+        入出力トークン数から処理時間（秒）を予測する
+
+        Args:
+            input_tokens: 入力トークン数
+            output_tokens: 出力トークン数
+
+        Returns:
+            予測処理時間（秒）
+        """
+        base, per_input, per_output = self.latency_coefficients
+        return max(0.0, base + per_input * input_tokens + per_output * output_tokens)
+
+    @classmethod
+    def calibrate(cls, records: Iterable) -> 'TokenEstimator':
+        """
+        実測値から係数を求めた推定器を作る
+
+        入力（プロンプト）と出力は同じトークナイザーなので、両方を1つのサンプルとして扱う。
+
+        Args:
+            records: TokenUsageRecord（または同じ属性を持つオブジェクト）
+
+        Returns:
+            較正済みのTokenEstimator
+        """
+        records = list(records)
+        if not records:
+            return cls()
+
+        token_rows, token_targets = [], []
+        latency_rows, latency_targets = [], []
+        for record in records:
+            for counts, tokens in ((record.input_characters, record.input_tokens),
+                                   (record.output_characters, record.output_tokens)):
+                if counts and tokens:
+                    token_rows.append([counts.get(name, 0) for name in CHARACTER_CLASSES])
+                    token_targets.append(tokens)
+            if record.latency:
+                latency_rows.append([1.0, record.input_tokens, record.output_tokens])
+                latency_targets.append(record.latency)
+
+        coefficients = None
+        if token_rows:
+            solved = _solve_regularized(token_rows, token_targets,
+                                        [DEFAULT_TOKENS_PER_CHARACTER[name] for name in CHARACTER_CLASSES])
+            coefficients = {name: max(0.0, value) for name, value in zip(CHARACTER_CLASSES, solved)}
+        latency_coefficients = None
+        if latency_rows:
+            latency_coefficients = [max(0.0, value) for value in
+                                    _solve_regularized(latency_rows, latency_targets, DEFAULT_LATENCY_COEFFICIENTS)]
+        return cls(coefficients, latency_coefficients, samples=len(records))
+
+
+def is_token_usage_recording_enabled() -> bool:
+    """トークン使用量の記録が有効かどうかを返す"""
+    return getattr(settings, 'PROOFREAD_TOKEN_USAGE_RECORDING', True)
+
+
+def record_token_usage(mode: str, model_id: str, prompt: str, output_text: str, input_tokens: int,
+                       output_tokens: int, estimated_input_tokens: int, estimated_output_tokens: int,
+                       latency: float, estimated_cost: float, original_length: int = 0) -> Optional[TokenUsageRecord]:
+    """
+    Bedrock の usage で得た実測トークン数を記録する
+
+    Args:
+        mode: 校正モード（json / text / stream など）
+        model_id: モデルID
+        prompt: 送信したプロンプト
+        output_text: モデルの出力（Tool Useの場合は入力JSON）
+        input_tokens: 実測入力トークン数
+        output_tokens: 実測出力トークン数
+        estimated_input_tokens: 送信前の推定入力トークン数
+        estimated_output_tokens: 推定出力トークン数
+        latency: 処理時間（秒）
+        estimated_cost: 推定コスト（円）
+        original_length: 原文の文字数
+
+    Returns:
+        作成したTokenUsageRecord（無効時・失敗時はNone）
+    """
+    if not is_token_usage_recording_enabled():
+        return None
+    try:
+        return TokenUsageRecord.objects.create(
+            mode=mode,
+            model_id=model_id,
+            original_length=original_length,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            estimated_input_tokens=estimated_input_tokens,
+            estimated_output_tokens=estimated_output_tokens,
+            input_characters=count_character_classes(prompt),
+            output_characters=count_character_classes(output_text),
+            latency=latency,
+            estimated_cost=estimated_cost,
+        )
+    except Exception as e:
+        # 記録に失敗しても校正結果は返す
+        logger.warning(f"⚠️ トークン使用量の記録に失敗: {type(e).__name__}: {str(e)}")
+        return None
+
+
+# プロセス内で共有する推定器
+_shared_estimator = None
+_shared_estimator_checked_at = 0.0
+_shared_estimator_lock = threading.Lock()
+
+
+def get_token_estimator() -> TokenEstimator:
+    """
+    プロセス内で共有するトークン推定器を取得する
+    （PROOFREAD_TOKEN_CALIBRATION_INTERVAL 秒ごとに直近の実測値で再較正する）
+
+    Returns:
+        共有TokenEstimatorインスタンス
+    """
+    global _shared_estimator, _shared_estimator_checked_at
+
+    interval = getattr(settings, 'PROOFREAD_TOKEN_CALIBRATION_INTERVAL', 300)
+    estimator = _shared_estimator
+    if estimator is not None and time.monotonic() - _shared_estimator_checked_at < interval:
+        return estimator
+
+    with _shared_estimator_lock:
+        now = time.monotonic()
+        if _shared_estimator is not None and now - _shared_estimator_checked_at < interval:
+            return _shared_estimator
+        _shared_estimator_checked_at = now
+        try:
+            limit = getattr(settings, 'PROOFREAD_TOKEN_CALIBRATION_SAMPLES', 500)
+            records = list(TokenUsageRecord.objects.order_by('-created_at', '-id')[:limit])
+        except Exception as e:
+            logger.warning(f"⚠️ トークン実測値の読み込みに失敗: {str(e)}")
+            records = []
+        if len(records) >= getattr(settings, 'PROOFREAD_TOKEN_CALIBRATION_MIN_SAMPLES', 20):
+            _shared_estimator = TokenEstimator.calibrate(records)
+            coefficients = ', '.join(f"{name}={value:.2f}" for name, value in _shared_estimator.coefficients.items())
+            logger.info(f"📏 トークン推定器を較正しました: {len(records)}件 ({coefficients})")
+        elif _shared_estimator is None or _shared_estimator.calibrated:
+            _shared_estimator = TokenEstimator()
+        return _shared_estimator
+
+
+def reset_token_estimator() -> None:
+    """共有推定器を破棄し、次回の取得時に再較正させる"""
+    global _shared_estimator
+
+    with _shared_estimator_lock:
+        _shared_estimator = None
@@ -0,0 +1,14 @@
+from django.db.models.signals import post_delete, post_save
+
+from proofreading_ai.models import ReplacementDictionary, CompanyDictionary, InconsistencyData
+from proofreading_ai.services.dictionary_matcher import invalidate_dictionary_cache
+
+
+def dictionary_changed(sender, **kwargs):
+    """辞書モデルの保存・削除時に辞書バージョンを再確認させる"""
+    invalidate_dictionary_cache()
+
+
+for dictionary_model in (ReplacementDictionary, CompanyDictionary, InconsistencyData):
+    post_save.connect(dictionary_changed, sender=dictionary_model, dispatch_uid=f'dictionary_saved_{dictionary_model.__name__}')
+    post_delete.connect(dictionary_changed, sender=dictionary_model, dispatch_uid=f'dictionary_deleted_{dictionary_model.__name__}')
@@ -0,0 +1,38 @@
+import logging
+
+from celery import shared_task
+from django.conf import settings
+
+from .models import ProofreadingRequest
+from .services import job_store
+from .services.proofread_jobs import run_proofread_job
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, max_retries=getattr(settings, 'PROOFREAD_TASK_MAX_RETRIES', 3))
+def proofread_job_task(self, process_id, request_id):
+    """
+    非同期校正ジョブをCeleryワーカーで実行する
+
+    Bedrockのスロットリングや一時的なエラーは指数バックオフで再試行し、
+    再試行回数を超えた場合にジョブをエラーにする。
+
+    Args:
+        process_id: ジョブID（ProofreadingJob.job_id）
+        request_id: 投入時に保存した校正リクエスト（ProofreadingRequest）のID
+
+    Returns:
+        ステータス確認APIで返す結果
+    """
+    try:
+        return run_proofread_job(process_id, ProofreadingRequest.objects.get(pk=request_id))
+    except Exception as e:
+        if self.request.retries < self.max_retries:
+            countdown = 5 * (2 ** self.request.retries)
+            logger.warning(f"🔁 校正タスク再試行 ({self.request.retries + 1}/{self.max_retries}, {countdown}秒後): {process_id}: {str(e)}")
+            job_store.update_job(process_id, status='queued', progress=0)
+            raise self.retry(exc=e, countdown=countdown)
+        logger.error(f"❌ 校正タスク失敗: {process_id}: {str(e)}")
+        job_store.fail_job(process_id, str(e))
+        raise
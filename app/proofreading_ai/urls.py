@@ -1,13 +1,25 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
 app_name = 'proofreading_ai'
 
+# ASGIサーバーで動かす場合は、校正・非同期校正・状況確認を非同期ビューで処理する
+if getattr(settings, 'PROOFREAD_ASYNC_VIEWS', False):
+    proofread_view = views.aproofread
+    proofread_async_view = views.aproofread_async
+    proofread_status_view = views.acheck_proofread_status
+else:
+    proofread_view = views.proofread
+    proofread_async_view = views.proofread_async
+    proofread_status_view = views.check_proofread_status
+
 urlpatterns = [
     path('', views.index, name='index'),
-    path('proofread/', views.proofread, name='proofread'),
-    path('proofread-async/', views.proofread_async, name='proofread_async'),
-    path('proofread-status/', views.check_proofread_status, name='proofread_status'),
+    path('proofread/', proofread_view, name='proofread'),
+    path('proofread-stream/', views.proofread_stream, name='proofread_stream'),
+    path('proofread-async/', proofread_async_view, name='proofread_async'),
+    path('proofread-status/', proofread_status_view, name='proofread_status'),
     path('history/', views.history, name='history'),
     path('dictionary/', views.dictionary, name='dictionary'),
     path('dictionary/add/', views.add_dictionary, name='add_dictionary'),
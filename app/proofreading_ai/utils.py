@@ -1,6 +1,7 @@
 import re
 import html
 import difflib
+from bisect import bisect_right
 from typing import Dict, List, Tuple, Union
 
 
@@ -105,6 +106,127 @@ def restore_html_tags(text: str, placeholders: Dict[str, str]) -> str:
     return result 
 
 
+# ハイライト表示用のカテゴリー情報（CSSクラス名・バッジ表示）
+CORRECTION_CATEGORY_INFO = {
+    'typo': {'name': '誤字修正', 'icon': '🔤', 'color': '#dc2626'},
+    'tone': {'name': '言い回し改善', 'icon': '✨', 'color': '#7c3aed'},
+    'dict': {'name': '辞書ルール', 'icon': '📚', 'color': '#d97706'},
+    'inconsistency': {'name': '矛盾チェック', 'icon': '⚠️', 'color': '#2563eb'},
+    'contradiction': {'name': '矛盾チェック', 'icon': '⚠️', 'color': '#2563eb'}
+}
+DEFAULT_CATEGORY_INFO = {'name': '修正', 'icon': '📝', 'color': '#6b7280'}
+
+# カテゴリーごとに組み立て済みのスパン断片（(開始タグ側の断片, 本体とツールチップ側の断片)）
+_correction_fragment_cache = {}
+
+
+def _escape_html(text: str) -> str:
+    """特殊文字を含む場合のみ html.escape を呼び出す（結果は html.escape と同一）"""
+    if '&' in text or '<' in text or '>' in text or '"' in text or "'" in text:
+        return html.escape(text)
+    return text
+
+
+def _get_correction_fragments(category) -> Tuple[str, str]:
+    """
+    カテゴリーごとの固定部分（data-category・CSSクラス・バッジ）を組み立てて再利用する
+
+    Args:
+        category: 修正カテゴリー
+
+    Returns:
+        (data-category属性以降の断片, バッジとツールチップ開始までの断片)
+    """
+    fragments = _correction_fragment_cache.get(category)
+    if fragments is None:
+        css_class = f"correction-{category}" if category in CORRECTION_CATEGORY_INFO else "correction-text"
+        cat_info = CORRECTION_CATEGORY_INFO.get(category, DEFAULT_CATEGORY_INFO)
+        head = f'data-category="{category}"><span class="{css_class}">'
+        badge = (
+            f'</span>'
+            f'<span class="correction-tooltip">'
+            f'<div class="tooltip-category-badge" style="background: {cat_info["color"]}; color: white; padding: 4px 8px; border-radius: 12px; font-size: 11px; font-weight: 600; margin-bottom: -33px; text-align: center;">'
+            f'{cat_info["icon"]} {cat_info["name"]}'
+            f'</div>'
+            f'\n            <div class="tooltip-original clickable-correction" data-action="revert" title="クリックして元に戻す">'
+        )
+        fragments = _correction_fragment_cache[category] = (head, badge)
+    return fragments
+
+
+def find_correction_spans(original_text: str, corrections: List[Dict]) -> List[Tuple[int, int, Dict]]:
+    """
+    ハイライトする修正箇所を決定する
+
+    各修正の原文が最初に出現する位置を求め、位置順（同じ位置なら修正リストの順）に
+    並べて前から重ならないものだけを採用する。同じ原文を持つ修正は一度だけ検索する。
+    検索は原文ごとの str.find のまま（Python実装の複数語句オートマトンで1回走査するより、
+    記事規模のテキストではC実装の str.find を原文ごとに呼ぶほうが速いため）。
+
+    Args:
+        original_text: 元のテキスト
+        corrections: 修正箇所のリスト
+
+    Returns:
+        (開始位置, 終了位置, 修正) のリスト（位置順・重なりなし）
+    """
+    first_positions = {}
+    candidates = []
+    find = original_text.find
+    for index, corr in enumerate(corrections):
+        original_word = corr.get("original", "")
+        if not original_word:
+            continue
+        pos = first_positions.get(original_word)
+        if pos is None:
+            pos = first_positions[original_word] = find(original_word)
+        if pos != -1:
+            candidates.append((pos, index, len(original_word), corr))
+
+    candidates.sort(key=lambda item: (item[0], item[1]))
+
+    spans = []
+    last_idx = 0
+    for start_pos, _, length, corr in candidates:
+        if start_pos < last_idx:
+            continue
+        last_idx = start_pos + length
+        spans.append((start_pos, last_idx, corr))
+    return spans
+
+
+# UTF-16でサロゲートペアになる文字（BMP外）
+ASTRAL_CHAR_PATTERN = re.compile('[\U00010000-\U0010FFFF]')
+
+
+def build_correction_spans(original_text: str, corrections: List[Dict]) -> List[List]:
+    """
+    修正箇所をクライアント側で描画するためのコンパクトな配列に変換する
+
+    ハイライトする箇所の決定は format_corrections と同じ。位置はブラウザの
+    文字列操作（String.prototype.slice）でそのまま使えるようUTF-16単位で返す。
+
+    Args:
+        original_text: 元のテキスト
+        corrections: 修正箇所のリスト
+
+    Returns:
+        [開始位置, 終了位置, 修正後, 理由, カテゴリー] のリスト（位置順・重なりなし）
+    """
+    spans = find_correction_spans(original_text, corrections)
+
+    # BMP外の文字（絵文字など）はUTF-16で2単位になるため、その分だけ位置をずらす
+    astral_positions = [match.start() for match in ASTRAL_CHAR_PATTERN.finditer(original_text)]
+
+    def to_utf16(pos):
+        return pos + bisect_right(astral_positions, pos - 1)
+
+    return [
+        [to_utf16(start), to_utf16(end), corr.get("corrected", ""), corr.get("reason", ""), corr.get("category", "general")]
+        for start, end, corr in spans
+    ]
+
+
 def format_corrections(original_text: str, corrections: List[Dict]) -> str:
     """
     校正結果をハイライト付きHTMLとして生成する（4色カテゴリー対応・改良版）
@@ -114,97 +236,36 @@ def format_corrections(original_text: str, corrections: List[Dict]) -> str:
     if not corrections:
         # 修正箇所がない場合は元のテキストをエスケープして返す
         return html.escape(original_text)
-    
+
     result = []
+    append = result.append
     last_idx = 0
-    used_positions = set()  # 使用済み位置を記録
-    
-    # 修正箇所を位置順にソート
-    sorted_corrections = []
-    for corr in corrections:
-        original_word = corr.get("original", "")
-        if original_word:
-            # 複数の出現位置を検索
-            start = 0
-            while True:
-                pos = original_text.find(original_word, start)
-                if pos == -1:
-                    break
-                # 既に使用済みでない位置のみ追加
-                if pos not in used_positions:
-                    sorted_corrections.append((pos, corr))
-                    break
-                start = pos + 1
-    
-    # 位置順にソート
-    sorted_corrections.sort(key=lambda x: x[0])
-    
-    for start_pos, corr in sorted_corrections:
-        # 既に処理済みの位置はスキップ
-        if start_pos in used_positions:
-            continue
-            
-        # 現在の位置より前の位置はスキップ
-        if start_pos < last_idx:
-            continue
-            
-        original_word = corr.get("original", "")
-        corrected_word = corr.get("corrected", "")
-        reason = corr.get("reason", "")
-        category = corr.get("category", "general")
-        
-        end_pos = start_pos + len(original_word)
-        
+
+    for start_pos, end_pos, corr in find_correction_spans(original_text, corrections):
+        escaped_original = _escape_html(original_text[start_pos:end_pos])
+        escaped_corrected = _escape_html(corr.get("corrected", ""))
+        escaped_reason = _escape_html(corr.get("reason", ""))
+        head, badge = _get_correction_fragments(corr.get("category", "general"))
+
         # 修正前の部分
-        result.append(html.escape(original_text[last_idx:start_pos]))
-        
-        # カテゴリーに応じたCSSクラスを決定
-        css_class = f"correction-{category}" if category in ["tone", "typo", "dict", "inconsistency", "contradiction"] else "correction-text"
-        
-        # カテゴリー名とアイコンのマッピング
-        category_info = {
-            'typo': {'name': '誤字修正', 'icon': '🔤', 'color': '#dc2626'},
-            'tone': {'name': '言い回し改善', 'icon': '✨', 'color': '#7c3aed'},
-            'dict': {'name': '辞書ルール', 'icon': '📚', 'color': '#d97706'},
-            'inconsistency': {'name': '矛盾チェック', 'icon': '⚠️', 'color': '#2563eb'},
-            'contradiction': {'name': '矛盾チェック', 'icon': '⚠️', 'color': '#2563eb'}
-        }
-        
-        cat_info = category_info.get(category, {'name': '修正', 'icon': '📝', 'color': '#6b7280'})
-        
-        # ツールチップ内容
-        tooltip_content = f'''
-            <div class="tooltip-original clickable-correction" data-action="revert" title="クリックして元に戻す">{html.escape(original_word)}</div>
-            <div class="tooltip-corrected clickable-correction" data-action="apply" title="クリックして修正を適用">{html.escape(corrected_word)}</div>
-            <div class="tooltip-reason">{html.escape(reason)}</div>
-        '''
-        
+        append(_escape_html(original_text[last_idx:start_pos]))
+
         # ハイライト付きスパンの生成
-        result.append(
+        append(
             f'<span class="correction-span" '
-            f'data-original="{html.escape(original_word)}" '
-            f'data-corrected="{html.escape(corrected_word)}" '
-            f'data-reason="{html.escape(reason)}" '
-            f'data-category="{category}">'
-            f'<span class="{css_class}">{html.escape(original_word)}</span>'
-            f'<span class="correction-tooltip">'
-            f'<div class="tooltip-category-badge" style="background: {cat_info["color"]}; color: white; padding: 4px 8px; border-radius: 12px; font-size: 11px; font-weight: 600; margin-bottom: -33px; text-align: center;">'
-            f'{cat_info["icon"]} {cat_info["name"]}'
-            f'</div>'
-            f'{tooltip_content}'
-            f'</span>'
-            f'</span>'
+            f'data-original="{escaped_original}" '
+            f'data-corrected="{escaped_corrected}" '
+            f'data-reason="{escaped_reason}" '
+            f'{head}{escaped_original}{badge}{escaped_original}</div>'
+            f'\n            <div class="tooltip-corrected clickable-correction" data-action="apply" title="クリックして修正を適用">{escaped_corrected}</div>'
+            f'\n            <div class="tooltip-reason">{escaped_reason}</div>'
+            f'\n        </span></span>'
         )
-        
-        # 使用済み位置を記録
-        for i in range(start_pos, end_pos):
-            used_positions.add(i)
-            
         last_idx = end_pos
-    
+
     # 残りの部分
-    result.append(html.escape(original_text[last_idx:]))
-    
+    append(_escape_html(original_text[last_idx:]))
+
     return ''.join(result)
 
 
@@ -367,10 +428,40 @@ def protect_html_tags_advanced(text: str) -> Tuple[str, Dict[str, str], List[Dic
     return protected_text, placeholders, html_tag_info
 
 
+# 保護済みタグ（__HTML_TAG_n__ タグ名 [__TAG_SPLIT_n__ 属性] __TAG_END_n__）を検出する正規表現
+PLACEHOLDER_TRIPLE_PATTERN = re.compile(
+    r'__HTML_TAG_(\d+)__(?: (\S+?) (?:__TAG_SPLIT_\1__ (.*?) )?__TAG_END_\1__)?',
+    re.DOTALL
+)
+
+
+def _compile_corrections(corrections: List[Dict]) -> Tuple[Union[re.Pattern, None], Dict[str, str]]:
+    """
+    本文に適用する修正箇所を1つの正規表現（長い語句優先）にまとめる
+
+    Returns:
+        修正前の語句にマッチする正規表現（修正がない場合はNone）と {修正前: 修正後} の辞書
+    """
+    replacements = {}
+    for correction in corrections:
+        original = correction.get('original', '')
+        if not original or original.startswith('__') or original.endswith('__'):
+            continue
+        # 同じ語句が複数ある場合は先に現れた修正を使う（従来の逐次置換と同じ）
+        replacements.setdefault(original, correction.get('corrected', ''))
+    if not replacements:
+        return None, replacements
+    alternation = '|'.join(re.escape(original) for original in sorted(replacements, key=len, reverse=True))
+    return re.compile(alternation), replacements
+
+
 def restore_html_tags_advanced(text: str, placeholders: Dict[str, str], html_tag_info: List[Dict], corrections: List[Dict]) -> str:
     """
     改善されたHTMLタグ復元機能（タグ名と属性内の修正も反映）
     
+    プレースホルダーの位置をたどる1回の走査で復元し、本文の修正はタグ以外の区間にまとめて適用する
+    （タグ数×テキスト長の繰り返し置換を行わないため、長い記事でも線形時間で終わる）。
+    
     Args:
         text: プレースホルダーを含むテキスト
         placeholders: プレースホルダーとタグのマッピング辞書
@@ -380,74 +471,226 @@ def restore_html_tags_advanced(text: str, placeholders: Dict[str, str], html_tag
     Returns:
         タグと修正を復元したテキスト
     """
-    result = text
-    
-    # HTMLタグ情報に基づいて修正を適用
-    for i, tag_info in enumerate(html_tag_info):
-        original_tag_name = tag_info['tag_name_original']
-        is_closing = tag_info['is_closing']
-        tag_placeholder = tag_info['tag_placeholder']
-        full_placeholder = tag_info['full_placeholder']
-        tag_counter = tag_info['tag_counter']
-        tag_end_marker = f"__TAG_END_{tag_counter}__"
+    tag_info_by_counter = {info['tag_counter']: info for info in html_tag_info}
+    
+    # タグ名の修正（同じ語句が複数ある場合は後に現れた修正を使う）
+    tag_name_corrections = {
+        correction.get('original', ''): correction.get('corrected', '') for correction in corrections
+    }
+    correction_pattern, replacements = _compile_corrections(corrections)
+    
+    def apply_corrections(segment: str) -> str:
+        if correction_pattern is None or not segment:
+            return segment
+        return correction_pattern.sub(lambda m: replacements[m.group(0)], segment)
+    
+    parts = []
+    position = 0
+    while True:
+        match = PLACEHOLDER_TRIPLE_PATTERN.search(text, position)
+        if match is None:
+            break
+        parts.append(apply_corrections(text[position:match.start()]))
         
-        # タグ名に対する修正を適用
-        corrected_tag_name = original_tag_name
-        for correction in corrections:
-            if correction['original'] == original_tag_name:
-                corrected_tag_name = correction['corrected']
+        counter = int(match.group(1))
+        placeholder = f"__HTML_TAG_{counter}__"
+        tag_info = tag_info_by_counter.get(counter)
+        tag_name = match.group(2)
+        attributes = match.group(3)
         
-        if is_closing:
-            # 終了タグの場合
-            # パターン: __HTML_TAG_X__ tag_name __TAG_END_X__
-            pattern = f"{re.escape(full_placeholder)} {re.escape(original_tag_name)} {re.escape(tag_end_marker)}"
-            corrected_tag = f"</{corrected_tag_name}>"
-            result = re.sub(pattern, corrected_tag, result)
-            
+        restored = None
+        if tag_info is not None and tag_name == tag_info['tag_name_original']:
+            corrected_tag_name = tag_name_corrections.get(tag_name, tag_name)
+            original_attrs = tag_info.get('attributes_original', '')
+            if tag_info['is_closing']:
+                if attributes is None:
+                    restored = f"</{corrected_tag_name}>"
+            elif original_attrs:
+                if attributes == original_attrs:
+                    restored = f"<{corrected_tag_name} {apply_corrections(original_attrs)}>"
+            elif attributes is None:
+                restored = f"<{corrected_tag_name}>"
+        
+        if restored is not None:
+            parts.append(restored)
+            position = match.end()
         else:
-            # 開始タグの場合
-            original_attrs = tag_info['attributes_original']
-            attr_placeholder = tag_info.get('attr_placeholder', '')
-            
-            if original_attrs:
-                # 属性ありの場合
-                tag_split_marker = f"__TAG_SPLIT_{tag_counter}__"
-                
-                # 属性部分に対する修正を適用
-                corrected_attrs = original_attrs
-                for correction in corrections:
-                    if correction['original'] in original_attrs:
-                        corrected_attrs = corrected_attrs.replace(
-                            correction['original'], 
-                            correction['corrected']
-                        )
-                
-                # パターン: __HTML_TAG_X__ tag_name __TAG_SPLIT_X__ attributes __TAG_END_X__
-                pattern = f"{re.escape(full_placeholder)} {re.escape(original_tag_name)} {re.escape(tag_split_marker)} {re.escape(original_attrs)} {re.escape(tag_end_marker)}"
-                corrected_tag = f"<{corrected_tag_name} {corrected_attrs}>"
-                result = re.sub(pattern, corrected_tag, result)
-                
-            else:
-                # 属性なしの場合
-                # パターン: __HTML_TAG_X__ tag_name __TAG_END_X__
-                pattern = f"{re.escape(full_placeholder)} {re.escape(original_tag_name)} {re.escape(tag_end_marker)}"
-                corrected_tag = f"<{corrected_tag_name}>"
-                result = re.sub(pattern, corrected_tag, result)
+            # モデルがタグ名・属性を書き換えた場合はプレースホルダーのみ復元し、残りは本文として扱う
+            parts.append(placeholders.get(placeholder, placeholder))
+            position = match.start() + len(placeholder)
     
-    # 本文テキストに対する修正を適用
+    parts.append(apply_corrections(text[position:]))
+    return ''.join(parts)
+
+
+def restore_placeholder_corrections(corrections: List[Dict], placeholders: Dict[str, str],
+                                    html_tag_info: List[Dict]) -> List[Dict]:
+    """
+    修正前・修正後テキストに含まれる protect_html_tags_advanced のプレースホルダーを元のタグに戻す
+
+    Args:
+        corrections: モデルの修正箇所リスト
+        placeholders: プレースホルダーとタグのマッピング辞書
+        html_tag_info: HTMLタグ詳細情報
+
+    Returns:
+        プレースホルダーを戻した修正箇所のリスト
+    """
+    restored = []
     for correction in corrections:
-        original = correction['original']
-        corrected = correction['corrected']
-        
-        # プレースホルダー以外の通常テキスト部分で修正を適用
-        if original in result and not original.startswith('__') and not original.endswith('__'):
-            result = result.replace(original, corrected)
-    
-    # 残っているプレースホルダーを復元（通常は使われないはず）
-    sorted_placeholders = sorted(placeholders.items(), key=lambda x: len(x[0]), reverse=True)
-    
-    for placeholder, tag in sorted_placeholders:
-        if placeholder in result:
-            result = result.replace(placeholder, tag)
-    
-    return result 
\ No newline at end of file
+        adjusted = dict(correction)
+        for key in ('original', 'corrected'):
+            if isinstance(correction.get(key), str) and '__' in correction[key]:
+                adjusted[key] = restore_html_tags_advanced(correction[key], placeholders, html_tag_info, [])
+        restored.append(adjusted)
+    return restored
+
+
+# HTMLトークン（開始・終了タグとコメント）を1回の走査で検出する正規表現
+HTML_TOKEN_PATTERN = re.compile(r'<!--[\s\S]*?-->|</?[a-zA-Z][a-zA-Z0-9]*(?:\s[^>]*)?/?>')
+
+# コンパクト保護で使用するマーカー（<#番号>）
+SEGMENT_MARKER_PATTERN = re.compile(r'<#(\d+)>')
+
+# 保護対象（HTMLトークンと、原文中にたまたま含まれるマーカーと同じ形の文字列）
+_SEGMENT_PROTECTED_PATTERN = re.compile(f'{HTML_TOKEN_PATTERN.pattern}|{SEGMENT_MARKER_PATTERN.pattern}')
+
+
+def protect_html_segments(text: str) -> Tuple[str, List[str], List[Tuple[int, int, bool]]]:
+    """
+    HTMLを1回の走査でテキスト部分とタグ部分に分け、連続するタグをまとめて短いマーカーに置換する
+
+    protect_html_tags_advanced はタグ名・属性も校正対象としてモデルに送るため、
+    タグの多い記事ではトークン数がほぼ倍になる。こちらはテキスト部分のみを送り、
+    タグは <#番号> の1トークン程度のマーカーにする（改行はテキストとして残るため行番号は変わらない）。
+
+    Args:
+        text: 元テキスト（HTMLタグ含む）
+
+    Returns:
+        マーカーに置換したテキスト、
+        マーカー番号順のタグ文字列リスト、
+        オフセット対応表 [(保護後テキストの位置, 元テキストの位置, マーカーか)]
+        （各テキスト部分・マーカーの開始位置と、末尾の番兵）
+    """
+    parts = []
+    tag_runs = []
+    offset_map = []
+    protected_length = 0
+    last = 0
+    run_start = None
+    run_end = None
+
+    def flush_run():
+        nonlocal protected_length
+        marker = f'<#{len(tag_runs)}>'
+        tag_runs.append(text[run_start:run_end])
+        offset_map.append((protected_length, run_start, True))
+        parts.append(marker)
+        protected_length += len(marker)
+
+    for match in _SEGMENT_PROTECTED_PATTERN.finditer(text):
+        start, end = match.span()
+        if run_start is not None and start == run_end:
+            # 直前のタグと隣接している場合は同じマーカーにまとめる
+            run_end = last = end
+            continue
+        if run_start is not None:
+            flush_run()
+            run_start = None
+        if start > last:
+            offset_map.append((protected_length, last, False))
+            parts.append(text[last:start])
+            protected_length += start - last
+        run_start, run_end = start, end
+        last = end
+
+    if run_start is not None:
+        flush_run()
+        last = run_end
+    if last < len(text):
+        offset_map.append((protected_length, last, False))
+        parts.append(text[last:])
+        protected_length += len(text) - last
+    offset_map.append((protected_length, len(text), False))
+
+    return ''.join(parts), tag_runs, offset_map
+
+
+def map_protected_offset(offset_map: List[Tuple[int, int, bool]], position: int) -> int:
+    """
+    保護後テキストの位置を元テキストの位置に変換する
+
+    Args:
+        offset_map: protect_html_segments が返すオフセット対応表
+        position: 保護後テキスト内の位置
+
+    Returns:
+        元テキスト内の位置（マーカー内の位置はタグの開始位置）
+    """
+    index = bisect_right(offset_map, (position, float('inf'))) - 1
+    if index < 0:
+        return position
+    protected_start, original_start, is_marker = offset_map[index]
+    if is_marker:
+        # マーカー内の位置はタグの開始位置に丸める
+        return original_start
+    return original_start + (position - protected_start)
+
+
+def locate_segment_corrections(protected_text: str, tag_runs: List[str], offset_map: List[Tuple[int, int, bool]],
+                               corrections: List[Dict]) -> List[Dict]:
+    """
+    保護後テキストに対するモデルの修正箇所を元テキスト基準に直す
+
+    修正前テキストを保護後テキストから先頭側の順に探し、オフセット対応表で元テキストの位置に変換する。
+    修正前・修正後テキストに含まれるマーカーは元のタグに戻す。
+
+    Args:
+        protected_text: protect_html_segments で保護したテキスト（モデルに送ったもの）
+        tag_runs: protect_html_segments が返すタグ文字列リスト
+        offset_map: protect_html_segments が返すオフセット対応表
+        corrections: モデルの修正箇所リスト
+
+    Returns:
+        'position' に元テキスト内の開始位置（見つからない場合はNone）を付けた修正箇所のリスト
+    """
+    located = []
+    search_from = 0
+    for correction in corrections:
+        adjusted = dict(correction)
+        original = correction.get('original', '')
+        position = None
+        if original:
+            local = protected_text.find(original, search_from)
+            if local == -1:
+                local = protected_text.find(original)
+            if local != -1:
+                position = map_protected_offset(offset_map, local)
+                search_from = local + len(original)
+            adjusted['original'] = restore_html_segments(original, tag_runs)
+        if isinstance(correction.get('corrected'), str):
+            adjusted['corrected'] = restore_html_segments(correction['corrected'], tag_runs)
+        adjusted['position'] = position
+        located.append(adjusted)
+    return located
+
+
+def restore_html_segments(text: str, tag_runs: List[str]) -> str:
+    """
+    protect_html_segments のマーカーを元のタグに戻す（1回の置換で復元する）
+
+    Args:
+        text: マーカーを含むテキスト（モデルの出力）
+        tag_runs: protect_html_segments が返すタグ文字列リスト
+
+    Returns:
+        タグを復元したテキスト
+    """
+    def replace_marker(match):
+        index = int(match.group(1))
+        if index < len(tag_runs):
+            return tag_runs[index]
+        return match.group(0)
+
+    return SEGMENT_MARKER_PATTERN.sub(replace_marker, text)
@@ -1,12 +1,11 @@
 from django.shortcuts import render, redirect
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_POST, require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
 import json
 import logging
 import time
-import threading
 import uuid
 import html
 from django.utils.html import escape
@@ -21,15 +20,28 @@ from django.core.cache import cache
 from django.utils import timezone as django_timezone
 from django.views.decorators.cache import never_cache
 from django.views.decorators.vary import vary_on_headers
+from asgiref.sync import sync_to_async
 
 from .models import ProofreadingRequest, ProofreadingResult, ReplacementDictionary
 # 本番用とモック用両方をインポート
-from .services.bedrock_client import BedrockClient
+from .services.bedrock_client import get_bedrock_client
+from .services.async_bedrock import async_runtime_stats, get_async_proofreader
+from .services.circuit_breaker import circuit_breaker_metrics
+from .services.rate_limiter import rate_limiter_metrics
+from .services.single_flight import is_single_flight_enabled, single_flight_stats
+from .services.cascade import cascade_stats, is_cascade_enabled
+from .services.category_passes import is_category_passes_enabled
+from .services.incremental import find_previous_proofread, is_incremental_enabled, save_proofread_history
+from .services.dictionary_matcher import get_dictionary_matcher, SOURCE_REPLACEMENT
+from .services.job_executor import get_job_executor, get_async_job_runner, find_async_job_state, JobQueueFullError
+from .services import job_store
+from .services.proofread_jobs import complete_proofread_job, run_proofread_job, to_legacy_correction
 from .services.mock_bedrock_client import MockBedrockClient
 from .utils import (
     protect_html_tags_advanced, 
     restore_html_tags_advanced, 
     format_corrections,
+    build_correction_spans,
     parse_corrections_from_text
 )
 
@@ -41,22 +53,55 @@ logger = logging.getLogger(__name__)
 # モックを使用するかどうか（実際の運用ではFalseにする）
 USE_MOCK = False
 
+# 校正結果のレスポンス形式（html: サーバーで描画したHTML / spans: 原文と修正箇所の配列）
+RESPONSE_FORMATS = ('html', 'spans')
+
+
+def build_highlight_payload(text, corrections, response_format='html'):
+    """
+    校正結果のハイライト部分をレスポンス形式に応じて組み立てる
+
+    Args:
+        text: 元のテキスト
+        corrections: legacy形式の修正箇所リスト
+        response_format: 'html'（従来形式）または 'spans'（クライアント描画用のコンパクト形式）
+
+    Returns:
+        レスポンスに追加する辞書
+    """
+    if response_format == 'spans':
+        return {
+            'response_format': 'spans',
+            'original_text': text,
+            'spans': build_correction_spans(text, corrections),
+        }
+    return {
+        'corrected_text': format_corrections(text, corrections),
+        'corrections': corrections,
+    }
+
 def get_replacement_dict():
     """
-    置換辞書を取得する
+    置換辞書を取得する（共有の辞書照合器から取り出すため、通常はDBに問い合わせない）
     
     Returns:
         dict: 置換辞書（キー: 元の単語、値: 置換後の単語）
     """
     try:
-        dictionaries = ReplacementDictionary.objects.filter(is_active=True).values('original_word', 'replacement_word')
-        replacement_dict = {item['original_word']: item['replacement_word'] for item in dictionaries}
+        replacement_dict = get_dictionary_matcher().as_dict(SOURCE_REPLACEMENT)
         logger.info(f"📚 置換辞書取得成功: {len(replacement_dict)}件")
         return replacement_dict
     except Exception as e:
         logger.error(f"❌ 置換辞書取得エラー: {str(e)}")
         return {}
 
+def sse_event(event, data):
+    """
+    Server-Sent Events形式の1イベントを組み立てる
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
 @never_cache  # キャッシュ完全無効化
 @vary_on_headers('Authorization', 'Cookie')  # 認証ヘッダーでキャッシュ分離
 @login_required
@@ -82,6 +127,239 @@ def index(request):
     return response
 
 
+def parse_proofread_params(body):
+    """
+    校正APIのリクエストを解析する
+    
+    Args:
+        body: リクエストボディ
+        
+    Returns:
+        (パラメータの辞書, エラー時のJsonResponse) のタプル（正常時はエラーがNone）
+    """
+    data = json.loads(body)
+    params = {
+        'text': data.get('text', ''),
+        'use_json_mode': data.get('use_json_mode', True),  # デフォルトはJSONモード
+        'use_simple_prompt': data.get('use_simple_prompt', False),  # デフォルトは標準プロンプト
+        'use_chunked': data.get('use_chunked', False),  # 段落分割による並列校正
+        'use_cascade': data.get('use_cascade', is_cascade_enabled()),  # スクリーニングで選んだ段落だけをフル校正する
+        'use_category_passes': data.get('use_category_passes', is_category_passes_enabled()),  # カテゴリー別の並列校正
+        'response_format': data.get('response_format', 'html'),  # spans: 原文と修正箇所の配列で返す
+        'incremental': data.get('incremental', False),  # 前回の校正結果との差分だけを校正する
+    }
+    
+    logger.info(f"📝 入力テキスト長: {len(params['text'])}文字")
+    logger.info(f"⚙️ JSONモード: {params['use_json_mode']}")
+    logger.info(f"🚀 シンプルプロンプト: {params['use_simple_prompt']}")
+    logger.info(f"🧩 分割校正: {params['use_chunked']}")
+    logger.info(f"🔎 2段階校正: {params['use_cascade']}")
+    logger.info(f"🗂️ カテゴリー別校正: {params['use_category_passes']}")
+    logger.info(f"♻️ 差分校正: {params['incremental']}")
+    
+    if not params['text'].strip():
+        logger.warning("❌ 空のテキストが送信されました")
+        return params, JsonResponse({
+            'success': False, 
+            'error': '校正するテキストが入力されていません。'
+        })
+    
+    if params['response_format'] not in RESPONSE_FORMATS:
+        return params, JsonResponse({
+            'success': False,
+            'error': f"未対応のレスポンス形式です: {params['response_format']}"
+        })
+    return params, None
+
+
+def build_proofread_response(params, result, start_time):
+    """
+    校正結果からAPIレスポンスを組み立てる（修正箇所のハイライト処理を含む）
+    
+    Args:
+        params: parse_proofread_params で解析したパラメータ
+        result: BedrockClient.proofread_text の結果
+        start_time: API呼び出しの開始時刻
+        
+    Returns:
+        JsonResponse
+    """
+    text = params['text']
+    response_format = params['response_format']
+    logger.info(f"✅ Claude 4校正完了: 処理時間 {result.get('processing_time', 0):.2f}秒")
+    
+    # エラーがある場合の処理
+    if 'error' in result:
+        logger.error(f"❌ 校正エラー: {result['error']}")
+        return JsonResponse({
+            'success': False,
+            'error': result['error'],
+            'processing_time': result.get('processing_time', 0),
+            'mode': result.get('mode', 'unknown')
+        })
+    
+    # 成功時の処理
+    corrections = result.get('corrections', [])
+    processing_time = result.get('processing_time', 0)
+    
+    # 修正箇所のハイライト処理
+    logger.info("🎨 修正箇所ハイライト処理開始")
+    
+    # JSONモードの場合、correctionsは既に適切な形式
+    if params['use_json_mode']:
+        # JSON形式のcorrectionsをlegacy形式に変換
+        formatted_corrections = [to_legacy_correction(corr) for corr in corrections]
+    else:
+        formatted_corrections = corrections
+    
+    highlight_payload = build_highlight_payload(text, formatted_corrections, response_format)
+    logger.info("✅ ハイライト処理完了")
+    
+    total_time = time.time() - start_time
+    logger.info(f"🏁 校正API処理完了: 総時間 {total_time:.2f}秒")
+    
+    # コンパクト形式では原文の日本語を \uXXXX にせずUTF-8のまま返す
+    payload = {
+        'success': True,
+        **highlight_payload,
+        'processing_time': processing_time,
+        'total_time': total_time,
+        'mode': result.get('mode', 'unknown'),
+        'original_length': result.get('original_length', len(text)),
+        'input_tokens': result.get('input_tokens', 0),
+        'output_tokens': result.get('output_tokens', 0),
+        'estimated_cost': result.get('estimated_cost', 0),
+        'chunk_count': result.get('chunk_count', 1),
+        'cached_paragraphs': result.get('cached_paragraphs', 0),
+        'local_corrections': result.get('local_corrections', 0),
+        'cache_hit': result.get('cache_hit', False),
+        'processed_at': time.strftime('%Y-%m-%d %H:%M:%S')
+    }
+    if 'incremental' in result:
+        payload['incremental'] = result['incremental']
+    if 'cascade' in result:
+        payload['cascade'] = result['cascade']
+    if 'category_passes' in result:
+        payload['category_passes'] = result['category_passes']
+    return JsonResponse(payload, json_dumps_params={'ensure_ascii': response_format != 'spans'})
+
+
+def use_incremental_proofread(params):
+    """差分校正を行うかどうか（位置付きの修正箇所を返すJSONモードのみ対応）"""
+    return params['incremental'] and params['use_json_mode'] and is_incremental_enabled()
+
+
+def run_incremental_proofread(user, params, bedrock_client):
+    """
+    ユーザーの前回の校正結果との差分だけを校正し、結果を次回の基準として保存する
+    
+    前回の結果がない場合（初回・設定変更後）は全文を校正する。
+    
+    Args:
+        user: ログインユーザー
+        params: parse_proofread_params で解析したパラメータ
+        bedrock_client: 校正に使うBedrockClient
+        
+    Returns:
+        BedrockClient.proofread_text と同じ形式の校正結果
+    """
+    text = params['text']
+    options = {
+        'use_simple_prompt': params['use_simple_prompt'],
+        'use_chunked': params['use_chunked'],
+        'use_cascade': params['use_cascade'],
+        'use_category_passes': params['use_category_passes'],
+    }
+    config_key = bedrock_client.incremental_config_key(**options)
+    previous = find_previous_proofread(user, config_key)
+    if previous is None:
+        logger.info("♻️ 前回の校正結果がないため全文を校正します")
+        result = bedrock_client.proofread_text(text, use_json_mode=True, **options)
+    else:
+        result = bedrock_client.proofread_text_incremental(
+            text, previous.request.original_text, previous.corrections, **options
+        )
+    
+    if 'error' not in result:
+        save_proofread_history(user, text, result, config_key)
+    return result
+
+
+def proofread_error_response(request, error, text, start_time):
+    """
+    校正API処理中の例外をChatworkに通知し、エラーレスポンスを返す
+    
+    Args:
+        request: リクエスト
+        error: 発生した例外
+        text: 校正対象のテキスト
+        start_time: API呼び出しの開始時刻
+        
+    Returns:
+        JsonResponse
+    """
+    if isinstance(error, json.JSONDecodeError):
+        logger.error(f"❌ JSON解析エラー: {str(error)}")
+        return JsonResponse({
+            'success': False, 
+            'error': f'リクエストデータの解析に失敗しました: {str(error)}'
+        })
+    
+    total_time = time.time() - start_time
+    error_message = str(error)
+    error_type = type(error).__name__
+    stack_trace = ''.join(traceback.format_exception(type(error), error, error.__traceback__))
+    
+    logger.error(f"💥 校正処理中にエラー発生: {error_message}")
+    logger.error(f"📋 エラー詳細:\n{stack_trace}")
+    
+    # Chatwork通知を送信
+    try:
+        chatwork_service = ChatworkNotificationService()
+        
+        # クライアント情報を取得
+        def get_client_ip(request):
+            x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+            if x_forwarded_for:
+                return x_forwarded_for.split(',')[0]
+            return request.META.get('REMOTE_ADDR', '不明')
+        
+        client_ip = get_client_ip(request)
+        user_agent = request.META.get('HTTP_USER_AGENT', '不明')
+        
+        # エラー情報をまとめる
+        error_context = {
+            'error_type': error_type,
+            'error_message': error_message,
+            'function': 'proofread',
+            'processing_time': total_time,
+            'text_length': len(text),
+            'client_ip': client_ip,
+            'user_agent': user_agent,
+            'stack_trace': stack_trace
+        }
+        
+        if chatwork_service.is_configured():
+            chatwork_service.send_error_notification(
+                error_type="PROOFREADING_VIEW_ERROR",
+                error_message=f"校正API処理中にエラーが発生: {error_message}",
+                context=error_context
+            )
+            logger.info("✅ Chatworkエラー通知送信完了")
+        else:
+            logger.warning("⚠️ Chatwork設定が不完全のため通知をスキップ")
+        
+    except Exception as notification_error:
+        logger.error(f"❌ Chatworkエラー通知送信失敗: {str(notification_error)}")
+    
+    return JsonResponse({
+        'success': False,
+        'error': f'校正処理中にエラーが発生しました: {error_message}',
+        'error_type': error_type,
+        'processing_time': total_time
+    })
+
+
 @login_required
 @csrf_exempt
 @require_http_methods(["POST"])
@@ -91,148 +369,244 @@ def proofread(request):
     """
     start_time = time.time()
     logger.info("🚀 校正API呼び出し開始（JSONモード）")
+    text = ''
     
     try:
         # リクエストデータの解析
-        data = json.loads(request.body)
-        text = data.get('text', '')
-        use_json_mode = data.get('use_json_mode', True)  # デフォルトはJSONモード
-        use_simple_prompt = data.get('use_simple_prompt', False)  # デフォルトは標準プロンプト
-        
-        logger.info(f"📝 入力テキスト長: {len(text)}文字")
-        logger.info(f"⚙️ JSONモード: {use_json_mode}")
-        logger.info(f"🚀 シンプルプロンプト: {use_simple_prompt}")
+        params, error_response = parse_proofread_params(request.body)
+        if error_response is not None:
+            return error_response
+        text = params['text']
         
-        if not text.strip():
-            logger.warning("❌ 空のテキストが送信されました")
-            return JsonResponse({
-                'success': False, 
-                'error': '校正するテキストが入力されていません。'
-            })
-        
-        # BedrockClient初期化と校正実行
-        logger.info("🤖 BedrockClient初期化開始")
-        bedrock_client = BedrockClient()
-        logger.info("✅ BedrockClient初期化完了")
+        # 共有BedrockClientを取得して校正実行（初期化はワーカーごとに1回のみ）
+        bedrock_client = get_bedrock_client()
         
         logger.info("🔍 Claude 4で校正実行開始")
-        result = bedrock_client.proofread_text(text, use_json_mode=use_json_mode, use_simple_prompt=use_simple_prompt)
-        logger.info(f"✅ Claude 4校正完了: 処理時間 {result.get('processing_time', 0):.2f}秒")
-        
-        # エラーがある場合の処理
-        if 'error' in result:
-            logger.error(f"❌ 校正エラー: {result['error']}")
-            return JsonResponse({
-                'success': False,
-                'error': result['error'],
-                'processing_time': result.get('processing_time', 0),
-                'mode': result.get('mode', 'unknown')
-            })
-        
-        # 成功時の処理
-        corrected_text = result.get('corrected_text', text)
-        corrections = result.get('corrections', [])
-        processing_time = result.get('processing_time', 0)
-        
-        # 修正箇所のハイライト処理
-        logger.info("🎨 修正箇所ハイライト処理開始")
-        
-        # JSONモードの場合、correctionsは既に適切な形式
-        if use_json_mode:
-            # JSON形式のcorrectionsをlegacy形式に変換
-            formatted_corrections = []
-            for corr in corrections:
-                formatted_corrections.append({
-                    "original": corr.get("original", ""),
-                    "corrected": corr.get("corrected", ""),
-                    "reason": corr.get("reason", ""),
-                    "category": corr.get("category", "typo"),
-                    "line_number": corr.get("line_number", 0)
-                })
+        if use_incremental_proofread(params):
+            result = run_incremental_proofread(request.user, params, bedrock_client)
         else:
-            formatted_corrections = corrections
-        
-        highlighted_text = format_corrections(text, formatted_corrections)
-        logger.info("✅ ハイライト処理完了")
-        
-        total_time = time.time() - start_time
-        logger.info(f"🏁 校正API処理完了: 総時間 {total_time:.2f}秒")
+            result = bedrock_client.proofread_text(
+                text,
+                use_json_mode=params['use_json_mode'],
+                use_simple_prompt=params['use_simple_prompt'],
+                use_chunked=params['use_chunked'],
+                use_cascade=params['use_cascade'],
+                use_category_passes=params['use_category_passes']
+            )
+        return build_proofread_response(params, result, start_time)
         
-        return JsonResponse({
-            'success': True,
-            'corrected_text': highlighted_text,
-            'corrections': formatted_corrections,
-            'processing_time': processing_time,
-            'total_time': total_time,
-            'mode': result.get('mode', 'unknown'),
-            'original_length': result.get('original_length', len(text)),
-            'input_tokens': result.get('input_tokens', 0),
-            'output_tokens': result.get('output_tokens', 0),
-            'estimated_cost': result.get('estimated_cost', 0),
-            'processed_at': time.strftime('%Y-%m-%d %H:%M:%S')
-        })
+    except Exception as e:
+        return proofread_error_response(request, e, text, start_time)
+
+
+@login_required
+@csrf_exempt
+@require_http_methods(["POST"])
+async def aproofread(request):
+    """
+    proofread の非同期版（ASGI用）
+    
+    モデルの応答はイベントループ上で待つため、校正中もワーカーのスレッドを占有しない。
+    """
+    start_time = time.time()
+    logger.info("🚀 校正API呼び出し開始（JSONモード・非同期）")
+    text = ''
+    
+    try:
+        params, error_response = parse_proofread_params(request.body)
+        if error_response is not None:
+            return error_response
+        text = params['text']
+        
+        proofreader = await get_async_proofreader()
+        if use_incremental_proofread(params):
+            # 差分校正は変更範囲ごとの同期版の校正をスレッドで実行する
+            result = await sync_to_async(run_incremental_proofread, thread_sensitive=False)(
+                await request.auser(), params, proofreader.client
+            )
+        else:
+            result = await proofreader.proofread_text(
+                text,
+                use_json_mode=params['use_json_mode'],
+                use_simple_prompt=params['use_simple_prompt'],
+                use_chunked=params['use_chunked'],
+                use_cascade=params['use_cascade'],
+                use_category_passes=params['use_category_passes']
+            )
+        return build_proofread_response(params, result, start_time)
         
+    except Exception as e:
+        return await sync_to_async(proofread_error_response, thread_sensitive=False)(request, e, text, start_time)
+
+
+@login_required
+@csrf_exempt
+@require_http_methods(["POST"])
+def proofread_stream(request):
+    """
+    テキストを校正し、修正箇所をServer-Sent Eventsで逐次返す（ストリーミングモード）
+    修正箇所が生成されるたびに correction イベントを送り、
+    最後に /proofread/ と同じ形式の結果を done イベントで送る
+    """
+    start_time = time.time()
+    logger.info("🚀 校正API呼び出し開始（ストリーミング）")
+    
+    try:
+        data = json.loads(request.body)
     except json.JSONDecodeError as e:
         logger.error(f"❌ JSON解析エラー: {str(e)}")
         return JsonResponse({
-            'success': False, 
+            'success': False,
             'error': f'リクエストデータの解析に失敗しました: {str(e)}'
         })
-        
-    except Exception as e:
-        total_time = time.time() - start_time
-        error_message = str(e)
-        error_type = type(e).__name__
-        stack_trace = traceback.format_exc()
-        
-        logger.error(f"💥 校正処理中にエラー発生: {error_message}")
-        logger.error(f"📋 エラー詳細:\n{stack_trace}")
-        
-        # Chatwork通知を送信
-        try:
-            chatwork_service = ChatworkNotificationService()
-            
-            # クライアント情報を取得
-            def get_client_ip(request):
-                x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-                if x_forwarded_for:
-                    return x_forwarded_for.split(',')[0]
-                return request.META.get('REMOTE_ADDR', '不明')
-            
-            client_ip = get_client_ip(request)
-            user_agent = request.META.get('HTTP_USER_AGENT', '不明')
-            
-            # エラー情報をまとめる
-            error_context = {
-                'error_type': error_type,
-                'error_message': error_message,
-                'function': 'proofread',
-                'processing_time': total_time,
-                'text_length': len(text) if 'text' in locals() else 0,
-                'client_ip': client_ip,
-                'user_agent': user_agent,
-                'stack_trace': stack_trace
-            }
-            
-            if chatwork_service.is_configured():
-                chatwork_service.send_error_notification(
-                    error_type="PROOFREADING_VIEW_ERROR",
-                    error_message=f"校正API処理中にエラーが発生: {error_message}",
-                    context=error_context
-                )
-                logger.info("✅ Chatworkエラー通知送信完了")
-            else:
-                logger.warning("⚠️ Chatwork設定が不完全のため通知をスキップ")
-            
-        except Exception as notification_error:
-            logger.error(f"❌ Chatworkエラー通知送信失敗: {str(notification_error)}")
-        
+    
+    text = data.get('text', '')
+    if not text.strip():
+        logger.warning("❌ 空のテキストが送信されました")
         return JsonResponse({
             'success': False,
-            'error': f'校正処理中にエラーが発生しました: {error_message}',
-            'error_type': error_type,
-            'processing_time': total_time
+            'error': '校正するテキストが入力されていません。'
         })
+    
+    response_format = data.get('response_format', 'html')
+    if response_format not in RESPONSE_FORMATS:
+        return JsonResponse({
+            'success': False,
+            'error': f'未対応のレスポンス形式です: {response_format}'
+        })
+    
+    logger.info(f"📝 入力テキスト長: {len(text)}文字")
+    
+    def event_stream():
+        corrections = []
+        try:
+            bedrock_client = get_bedrock_client()
+            for event in bedrock_client.proofread_text_stream(text):
+                if event['type'] == 'correction':
+                    correction = to_legacy_correction(event['correction'])
+                    corrections.append(correction)
+                    yield sse_event('correction', {
+                        'index': len(corrections) - 1,
+                        'correction': correction
+                    })
+                elif event['type'] == 'error':
+                    logger.error(f"❌ 校正エラー: {event['error']}")
+                    yield sse_event('error', {
+                        'success': False,
+                        'error': event['error'],
+                        'processing_time': time.time() - start_time,
+                        'mode': 'stream'
+                    })
+                    return
+                else:
+                    highlight_payload = build_highlight_payload(text, corrections, response_format)
+                    total_time = time.time() - start_time
+                    logger.info(f"🏁 校正API処理完了（ストリーミング）: 総時間 {total_time:.2f}秒")
+                    yield sse_event('done', {
+                        'success': True,
+                        **highlight_payload,
+                        'processing_time': event.get('processing_time', 0),
+                        'first_correction_time': event.get('first_correction_time'),
+                        'total_time': total_time,
+                        'mode': 'stream',
+                        'original_length': event.get('original_length', len(text)),
+                        'input_tokens': event.get('input_tokens', 0),
+                        'output_tokens': event.get('output_tokens', 0),
+                        'estimated_cost': event.get('estimated_cost', 0),
+                        'local_corrections': event.get('local_corrections', 0),
+                        'processed_at': time.strftime('%Y-%m-%d %H:%M:%S')
+                    })
+        except Exception as e:
+            logger.error(f"💥 ストリーミング校正中にエラー発生: {str(e)}\n{traceback.format_exc()}")
+            yield sse_event('error', {
+                'success': False,
+                'error': f'校正処理中にエラーが発生しました: {str(e)}',
+                'error_type': type(e).__name__,
+                'processing_time': time.time() - start_time,
+                'mode': 'stream'
+            })
+    
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream; charset=utf-8')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginxでのバッファリングを無効化
+    return response
+
+
+def parse_proofread_async_params(body):
+    """
+    非同期校正APIのリクエストを解析する
+    
+    Returns:
+        (パラメータの辞書, エラー時のJsonResponse) のタプル（正常時はエラーがNone）
+    """
+    data = json.loads(body)
+    params = {
+        'text': data.get('text', ''),
+        'temperature': float(data.get('temperature', 0.1)),
+        'top_p': float(data.get('top_p', 0.7)),
+    }
+    if not params['text']:
+        return params, JsonResponse({
+            'success': False,
+            'error': '校正するテキストが入力されていません。'
+        })
+    return params, None
+
+
+def job_queue_full_response(error):
+    """待ち行列が満杯の場合のHTTP 429レスポンス（Retry-After付き）"""
+    response = JsonResponse({
+        'success': False,
+        'error': '校正処理が混み合っています。しばらく待ってから再度お試しください。',
+        'retry_after': error.retry_after
+    }, status=429)
+    response['Retry-After'] = str(error.retry_after)
+    return response
+
+
+def job_started_response(process_id, queue_position=None, coalesced=False):
+    """ジョブ投入時のレスポンス（coalesced は実行中の同じジョブのIDを返した場合）"""
+    payload = {
+        'success': True,
+        'process_id': process_id,
+        'message': '校正処理を開始しました。'
+    }
+    if queue_position is not None:
+        payload['queue_position'] = queue_position
+    if coalesced:
+        payload['coalesced'] = True
+    return JsonResponse(payload)
+
+
+def find_duplicate_job(params):
+    """
+    同じ原稿・設定で待機中・処理中のジョブを探す
+    
+    二重クリックや複数人での同時確認では、新しいジョブを投入せず実行中のジョブのIDを返す。
+    
+    Returns:
+        (重複判定キー, 実行中のジョブ) のタプル（ない場合・無効の場合はジョブがNone）
+    """
+    dedupe_key = job_store.make_dedupe_key(
+        params['text'], temperature=params['temperature'], top_p=params['top_p']
+    )
+    if not is_single_flight_enabled():
+        return dedupe_key, None
+    job = job_store.find_active_job(dedupe_key)
+    if job is not None:
+        logger.info(f"🔗 実行中の同じ校正ジョブに合流します: {job.job_id}")
+    return dedupe_key, job
+
+
+def submit_celery_job(process_id, original_text):
+    """
+    Celeryワーカーのタスクキューにジョブを投入する
+    
+    校正リクエストは投入時に1回だけ保存し、タスクの再試行では同じ行を使う。
+    """
+    from .tasks import proofread_job_task
+    proofread_request = ProofreadingRequest.objects.create(original_text=original_text)
+    proofread_job_task.delay(process_id, proofread_request.id)
 
 
 @login_required
@@ -245,32 +619,35 @@ def proofread_async(request):
     """
     try:
         # POSTデータの取得
-        data = json.loads(request.body)
-        original_text = data.get('text', '')
-        temperature = float(data.get('temperature', 0.1))
-        top_p = float(data.get('top_p', 0.7))
+        params, error_response = parse_proofread_async_params(request.body)
+        if error_response is not None:
+            return error_response
         
-        if not original_text:
-            return JsonResponse({
-                'success': False,
-                'error': '校正するテキストが入力されていません。'
-            })
+        # 同じ原稿・設定のジョブが実行中ならそのIDを返す
+        dedupe_key, duplicate = find_duplicate_job(params)
+        if duplicate is not None:
+            return job_started_response(duplicate.job_id, coalesced=True)
         
         # 処理IDを生成
         process_id = str(uuid.uuid4())
+        job_store.create_job(process_id, dedupe_key)
         
-        # 非同期処理開始
-        thread = threading.Thread(
-            target=process_proofread_async,
-            args=(process_id, original_text, temperature, top_p)
-        )
-        thread.start()
+        # Celeryワーカーで実行する場合はタスクキューに投入する
+        if getattr(settings, 'PROOFREAD_USE_CELERY', False):
+            submit_celery_job(process_id, params['text'])
+            return job_started_response(process_id)
         
-        return JsonResponse({
-            'success': True,
-            'process_id': process_id,
-            'message': '校正処理を開始しました。'
-        })
+        # 上限付きの実行器に投入（満杯の場合は429で再試行を促す）
+        try:
+            queue_position = get_job_executor().submit(
+                process_id, process_proofread_async,
+                process_id, params['text'], params['temperature'], params['top_p']
+            )
+        except JobQueueFullError as e:
+            job_store.delete_job(process_id)
+            return job_queue_full_response(e)
+        
+        return job_started_response(process_id, queue_position)
         
     except Exception as e:
         logger.error(f"非同期校正処理の開始中にエラーが発生しました: {str(e)}")
@@ -280,87 +657,165 @@ def proofread_async(request):
         })
 
 
-def process_proofread_async(process_id, original_text, temperature, top_p):
+@login_required
+@csrf_exempt
+@require_http_methods(["POST"])
+async def aproofread_async(request):
     """
-    非同期で校正処理を実行する
+    proofread_async の非同期版（ASGI用）
+    
+    ジョブはワーカースレッドではなくイベントループ上のタスクとして実行する。
     """
     try:
-        # HTMLタグを保護
-        protected_text, placeholders, html_tag_info = protect_html_tags_advanced(original_text)
+        params, error_response = parse_proofread_async_params(request.body)
+        if error_response is not None:
+            return error_response
         
-        # リクエストをDBに保存
-        proofread_request = ProofreadingRequest.objects.create(
-            original_text=original_text
-        )
+        dedupe_key, duplicate = await sync_to_async(find_duplicate_job)(params)
+        if duplicate is not None:
+            return job_started_response(duplicate.job_id, coalesced=True)
         
-        # 置換辞書の取得（有効なもののみ）
-        dictionaries = ReplacementDictionary.objects.filter(is_active=True).values('original_word', 'replacement_word')
-        replacement_dict = {item['original_word']: item['replacement_word'] for item in dictionaries}
+        process_id = str(uuid.uuid4())
+        await sync_to_async(job_store.create_job)(process_id, dedupe_key)
         
-        # Bedrock APIを使用して校正
-        client = BedrockClient()
+        if getattr(settings, 'PROOFREAD_USE_CELERY', False):
+            await sync_to_async(submit_celery_job, thread_sensitive=False)(process_id, params['text'])
+            return job_started_response(process_id)
         
-        # 校正実行
-        corrected_text, corrections, completion_time, cost_info = client.proofread_text(
-            protected_text, replacement_dict, temperature, top_p
-        )
-        print('DEBUG 校正AI返り値:', corrected_text, corrections, completion_time, cost_info)
+        try:
+            queue_position = get_async_job_runner().submit(
+                process_id, aprocess_proofread_async, process_id, params['text']
+            )
+        except JobQueueFullError as e:
+            await sync_to_async(job_store.delete_job)(process_id)
+            return job_queue_full_response(e)
         
-        # HTMLタグを復元
-        corrected_text = restore_html_tags_advanced(corrected_text, placeholders, html_tag_info, corrections)
+        return job_started_response(process_id, queue_position)
         
-        # 修正箇所リストをパース
-        corrections = parse_corrections_from_text(corrected_text)
+    except Exception as e:
+        logger.error(f"非同期校正処理の開始中にエラーが発生しました: {str(e)}")
+        return JsonResponse({
+            'success': False,
+            'error': f'校正処理の開始に失敗しました: {str(e)}'
+        })
+
+
+def process_proofread_async(process_id, original_text, temperature, top_p):
+    """
+    非同期で校正処理を実行する（ジョブ実行器のワーカースレッドで呼ばれる）
+    
+    temperature / top_p は互換性のために受け取るが、推論パラメータはBedrockClientの設定を使用する
+    """
+    try:
+        proofread_request = ProofreadingRequest.objects.create(original_text=original_text)
+        return run_proofread_job(process_id, proofread_request)
+    except Exception as e:
+        logger.error(f"非同期校正処理中にエラーが発生しました: {str(e)}")
+        # エラー情報をジョブテーブルに保存
+        job_store.fail_job(process_id, str(e))
+
+
+async def aprocess_proofread_async(process_id, original_text):
+    """
+    非同期校正ジョブの本体（イベントループ上のタスクとして実行され、失敗時はジョブをエラーにする）
+    
+    Args:
+        process_id: ジョブID
+        original_text: 校正対象のテキスト
+    """
+    try:
+        await sync_to_async(job_store.update_job)(process_id, status='running', progress=10)
+        proofread_request = await ProofreadingRequest.objects.acreate(original_text=original_text)
         
-        # ハイライトHTMLを生成
-        if corrections:
-            highlighted_html = format_corrections(original_text, corrections)
-        else:
-            highlighted_html = format_corrections(corrected_text, [])
+        proofreader = await get_async_proofreader()
+        result = await proofreader.proofread_text(original_text)
+        if 'error' in result:
+            raise RuntimeError(result['error'])
         
-        # 校正結果をDBに保存
-        result = ProofreadingResult.objects.create(
-            request=proofread_request,
-            corrected_text=highlighted_html,
-            completion_time=completion_time
+        return await sync_to_async(complete_proofread_job)(
+            process_id, proofread_request, original_text, result, proofreader.client.model_id
         )
-        
-        # 結果をキャッシュに保存
-        cache.set(f'proofread_result_{process_id}', {
-            'original_text': original_text,
-            'corrected_text': highlighted_html,
-            'corrections': corrections,
-            'model': client.model_id,
-            'input_tokens': cost_info.get('input_tokens', 0),
-            'output_tokens': cost_info.get('output_tokens', 0),
-            'total_cost': cost_info.get('total_cost', 0),
-            'completion_time': completion_time
-        }, timeout=3600)  # 1時間キャッシュ
-        
-        # Claude 3.7のtool_uses, usage, modelも返す
-        return {
-            'original_text': original_text,
-            'corrected_text': highlighted_html,
-            'corrections': corrections,
-            'model': client.model_id,
-            'input_tokens': cost_info.get('input_tokens', 0),
-            'output_tokens': cost_info.get('output_tokens', 0),
-            'total_cost': cost_info.get('total_cost', 0),
-            'completion_time': completion_time
-        }
-        
     except Exception as e:
         logger.error(f"非同期校正処理中にエラーが発生しました: {str(e)}")
-        # エラー情報をキャッシュに保存
-        cache.set(
-            f"proofread_result_{process_id}",
-            {
-                'success': False,
-                'status': 'error',
-                'error': str(e)
-            },
-            timeout=3600
-        )
+        await sync_to_async(job_store.fail_job)(process_id, str(e))
+
+
+def build_job_status_response(process_id, get_state):
+    """
+    ジョブテーブルとこのワーカーの実行器からジョブの状況レスポンスを組み立てる
+    
+    Args:
+        process_id: ジョブID
+        get_state: このワーカーの実行器からジョブの実行状況を返す関数
+        
+    Returns:
+        JsonResponse
+    """
+    # ジョブテーブルから処理状況を取得（どのワーカーで実行されていても参照できる）
+    job = job_store.get_job(process_id)
+    
+    if job is None:
+        return JsonResponse({
+            'success': False,
+            'status': 'not_found',
+            'error': '指定された処理が見つかりません（期限切れの可能性があります）。'
+        })
+    
+    if job.status == 'completed':
+        return JsonResponse(job.result)
+    
+    if job.status == 'error':
+        return JsonResponse({
+            'success': False,
+            'status': 'error',
+            'error': job.error
+        })
+    
+    if job.status == 'queued':
+        # このワーカーの実行器にあれば正確な順番、なければ全体の待ち順を返す
+        state = get_state(process_id)
+        if state and state['status'] == 'queued':
+            queue_position = state['queue_position']
+        else:
+            queue_position = job_store.get_queue_position(job)
+        return JsonResponse({
+            'success': True,
+            'status': 'queued',
+            'progress': job.progress,
+            'queue_position': queue_position,
+            'message': f"処理待ちです（{queue_position}番目）。"
+        })
+    
+    return JsonResponse({
+        'success': True,
+        'status': 'processing',
+        'progress': job.progress,
+        'message': '処理中です。'
+    })
+
+
+def parse_process_id(body):
+    """
+    ステータス確認APIのリクエストから処理IDを取り出す
+    
+    Returns:
+        (処理ID, エラー時のJsonResponse) のタプル（正常時はエラーがNone）
+    """
+    process_id = json.loads(body).get('process_id')
+    if not process_id:
+        return None, JsonResponse({
+            'success': False,
+            'error': '処理IDが指定されていません。'
+        })
+    return process_id, None
+
+
+def status_check_error_response(error):
+    logger.error(f"処理状況の確認中にエラーが発生しました: {str(error)}")
+    return JsonResponse({
+        'success': False,
+        'error': f'処理状況の確認に失敗しました: {str(error)}'
+    })
 
 
 @login_required
@@ -371,35 +826,30 @@ def check_proofread_status(request):
     非同期校正処理の状況を確認するエンドポイント
     """
     try:
-        data = json.loads(request.body)
-        process_id = data.get('process_id')
-        
-        if not process_id:
-            return JsonResponse({
-                'success': False,
-                'error': '処理IDが指定されていません。'
-            })
-        
-        # キャッシュから処理結果を取得
-        result = cache.get(f"proofread_result_{process_id}")
-        
-        if result is None:
-            # 処理中または結果が見つからない
-            return JsonResponse({
-                'success': True,
-                'status': 'processing',
-                'message': '処理中です。'
-            })
+        process_id, error_response = parse_process_id(request.body)
+        if error_response is not None:
+            return error_response
+        return build_job_status_response(process_id, get_job_executor().get_state)
         
-        # 結果をそのまま返す
-        return JsonResponse(result)
+    except Exception as e:
+        return status_check_error_response(e)
+
+
+@login_required
+@csrf_exempt
+@require_POST
+async def acheck_proofread_status(request):
+    """
+    check_proofread_status の非同期版（ASGI用）
+    """
+    try:
+        process_id, error_response = parse_process_id(request.body)
+        if error_response is not None:
+            return error_response
+        return await sync_to_async(build_job_status_response)(process_id, find_async_job_state)
         
     except Exception as e:
-        logger.error(f"処理状況の確認中にエラーが発生しました: {str(e)}")
-        return JsonResponse({
-            'success': False,
-            'error': f'処理状況の確認に失敗しました: {str(e)}'
-        })
+        return status_check_error_response(e)
 
 
 @login_required
@@ -585,13 +1035,20 @@ def debug_server_status(request):
         except ImportError:
             debug_info['packages']['requests'] = '未インストール'
         
-        # BedrockClientの初期化テスト
+        # BedrockClientの初期化テスト（共有クライアント）
         try:
-            bedrock_client = BedrockClient()
+            bedrock_client = get_bedrock_client()
             debug_info['bedrock_client'] = {
                 'initialization': '成功',
                 'model_id': bedrock_client.model_id,
-                'fallback_model_id': bedrock_client.fallback_model_id
+                'fallback_model_id': bedrock_client.fallback_model_id,
+                'result_cache': bedrock_client.result_cache.stats(),
+                'paragraph_cache': bedrock_client.paragraph_cache.stats(),
+                'circuit_breakers': circuit_breaker_metrics(),
+                'rate_limiters': rate_limiter_metrics(),
+                'async_runtimes': async_runtime_stats(),
+                'single_flight': single_flight_stats(),
+                'cascade': cascade_stats()
             }
         except Exception as bc_error:
             debug_info['bedrock_client'] = {
@@ -0,0 +1,86 @@
+// 校正結果のコンパクト形式（response_format: 'spans'）をブラウザ側でHTMLに描画する
+// 出力はサーバー側の format_corrections と同じHTMLになる
+(function() {
+    const CATEGORY_INFO = {
+        typo: { name: '誤字修正', icon: '🔤', color: '#dc2626' },
+        tone: { name: '言い回し改善', icon: '✨', color: '#7c3aed' },
+        dict: { name: '辞書ルール', icon: '📚', color: '#d97706' },
+        inconsistency: { name: '矛盾チェック', icon: '⚠️', color: '#2563eb' },
+        contradiction: { name: '矛盾チェック', icon: '⚠️', color: '#2563eb' }
+    };
+    const DEFAULT_CATEGORY_INFO = { name: '修正', icon: '📝', color: '#6b7280' };
+    const ESCAPE_MAP = { '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#x27;' };
+
+    // Pythonの html.escape(quote=True) と同じエスケープ
+    function escapeHtml(text) {
+        return String(text).replace(/[&<>"']/g, ch => ESCAPE_MAP[ch]);
+    }
+
+    function categoryInfo(category) {
+        return Object.prototype.hasOwnProperty.call(CATEGORY_INFO, category) ? CATEGORY_INFO[category] : null;
+    }
+
+    function pythonStr(value) {
+        // サーバー側の f'{category}' と同じ表記にする（None -> "None"）
+        return value === null ? 'None' : String(value);
+    }
+
+    /**
+     * 原文と修正箇所の配列からハイライト付きHTMLを生成する
+     * @param {string} text 原文
+     * @param {Array} spans [開始位置, 終了位置, 修正後, 理由, カテゴリー] の配列（UTF-16単位・位置順）
+     * @returns {string} ハイライト付きHTML
+     */
+    window.renderCorrectionSpans = function(text, spans) {
+        if (!spans || spans.length === 0) {
+            return escapeHtml(text);
+        }
+
+        const parts = [];
+        let last = 0;
+        spans.forEach(([start, end, corrected, reason, category]) => {
+            const original = escapeHtml(text.slice(start, end));
+            const escapedCorrected = escapeHtml(corrected);
+            const escapedReason = escapeHtml(reason);
+            const info = categoryInfo(category);
+            const cssClass = info ? `correction-${category}` : 'correction-text';
+            const badge = info || DEFAULT_CATEGORY_INFO;
+
+            parts.push(escapeHtml(text.slice(last, start)));
+            parts.push(
+                `<span class="correction-span" ` +
+                `data-original="${original}" ` +
+                `data-corrected="${escapedCorrected}" ` +
+                `data-reason="${escapedReason}" ` +
+                `data-category="${pythonStr(category)}">` +
+                `<span class="${cssClass}">${original}</span>` +
+                `<span class="correction-tooltip">` +
+                `<div class="tooltip-category-badge" style="background: ${badge.color}; color: white; padding: 4px 8px; border-radius: 12px; font-size: 11px; font-weight: 600; margin-bottom: -33px; text-align: center;">` +
+                `${badge.icon} ${badge.name}` +
+                `</div>` +
+                `\n            <div class="tooltip-original clickable-correction" data-action="revert" title="クリックして元に戻す">${original}</div>` +
+                `\n            <div class="tooltip-corrected clickable-correction" data-action="apply" title="クリックして修正を適用">${escapedCorrected}</div>` +
+                `\n            <div class="tooltip-reason">${escapedReason}</div>` +
+                `\n        </span></span>`
+            );
+            last = end;
+        });
+        parts.push(escapeHtml(text.slice(last)));
+        return parts.join('');
+    };
+
+    /**
+     * 修正箇所の配列を従来の corrections 形式に戻す（修正一覧の表示用）
+     * @param {string} text 原文
+     * @param {Array} spans [開始位置, 終了位置, 修正後, 理由, カテゴリー] の配列
+     * @returns {Array<Object>} {original, corrected, reason, category} の配列
+     */
+    window.correctionsFromSpans = function(text, spans) {
+        return (spans || []).map(([start, end, corrected, reason, category]) => ({
+            original: text.slice(start, end),
+            corrected: corrected,
+            reason: reason,
+            category: category
+        }));
+    };
+})();
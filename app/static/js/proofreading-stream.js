@@ -0,0 +1,85 @@
+// 校正ストリーミングAPI（Server-Sent Events）クライアント
+// POSTでSSEを受け取るため EventSource ではなく fetch + ReadableStream で読み取る
+(function() {
+    function parseEvent(rawEvent) {
+        let eventName = 'message';
+        const dataLines = [];
+        rawEvent.split('\n').forEach(line => {
+            if (line.startsWith('event:')) {
+                eventName = line.slice(6).trim();
+            } else if (line.startsWith('data:')) {
+                dataLines.push(line.slice(5).trimStart());
+            }
+        });
+        if (dataLines.length === 0) {
+            return null;
+        }
+        return { event: eventName, data: JSON.parse(dataLines.join('\n')) };
+    }
+
+    /**
+     * 校正をストリーミングで実行する
+     * @param {string} url ストリーミングエンドポイント
+     * @param {Object} requestData 送信データ
+     * @param {Object} options csrfToken, signal, onResponse(response), onCorrection(correction, count)
+     * @returns {Promise<Object>} /proofread/ と同じ形式の最終結果
+     */
+    window.streamProofread = async function(url, requestData, options = {}) {
+        const response = await fetch(url, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'text/event-stream',
+                'X-CSRFToken': options.csrfToken || ''
+            },
+            body: JSON.stringify(requestData),
+            signal: options.signal
+        });
+
+        if (options.onResponse) {
+            options.onResponse(response);
+        }
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status} ${response.statusText}`);
+        }
+
+        // 入力エラーなどはストリームではなく通常のJSONで返る
+        const contentType = response.headers.get('Content-Type') || '';
+        if (!contentType.includes('text/event-stream')) {
+            return response.json();
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder('utf-8');
+        let buffer = '';
+        let count = 0;
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) {
+                break;
+            }
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const parsed = parseEvent(buffer.slice(0, boundary));
+                buffer = buffer.slice(boundary + 2);
+                if (!parsed) {
+                    continue;
+                }
+                if (parsed.event === 'correction') {
+                    count += 1;
+                    if (options.onCorrection) {
+                        options.onCorrection(parsed.data.correction, count);
+                    }
+                } else if (parsed.event === 'done' || parsed.event === 'error') {
+                    reader.cancel();
+                    return parsed.data;
+                }
+            }
+        }
+
+        throw new Error('ストリームが完了イベントの前に終了しました');
+    };
+})();
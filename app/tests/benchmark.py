@@ -0,0 +1,14 @@
+"""
+ベンチマーク用のテストの共通設定
+
+処理時間の比較は実行環境の負荷で結果が変わるため、ベンチマークは既定ではスキップし、
+PROOFREAD_RUN_BENCHMARKS=1 を指定したときだけ実行する。
+
+    PROOFREAD_RUN_BENCHMARKS=1 python app/manage.py test tests
+"""
+import os
+from unittest import skipUnless
+
+RUN_BENCHMARKS = os.environ.get('PROOFREAD_RUN_BENCHMARKS') == '1'
+
+benchmark = skipUnless(RUN_BENCHMARKS, 'PROOFREAD_RUN_BENCHMARKS=1 のときだけ実行するベンチマーク')
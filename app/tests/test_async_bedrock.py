@@ -0,0 +1,274 @@
+import asyncio
+import json
+import threading
+from unittest import mock
+
+from botocore.credentials import Credentials
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+
+from proofreading_ai.models import ProofreadingJob, TokenUsageRecord
+from proofreading_ai.services.async_bedrock import AsyncBedrockRuntime, AsyncProofreader
+from proofreading_ai.services.bedrock_client import BedrockClient
+from proofreading_ai.services.circuit_breaker import reset_circuit_breakers
+from proofreading_ai.services.job_executor import get_async_job_runner
+from proofreading_ai.services.mock_bedrock_client import FakeBedrockEndpoint, MockBedrockRuntime
+from proofreading_ai.services.rate_limiter import rate_limiter_metrics, reset_rate_limiters
+from proofreading_ai.views import acheck_proofread_status, aproofread, aproofread_async
+
+CREDENTIALS = Credentials('AKIDEXAMPLE', 'secret')
+
+
+def echo_responder(request):
+    return {'corrected_text': request['messages'][0]['content'], 'corrections': []}
+
+
+def build_proofreader(endpoint_url, max_connections=200):
+    client = BedrockClient(bedrock_runtime=MockBedrockRuntime())
+    client.default_prompt = '{原文}'
+    runtime = AsyncBedrockRuntime('ap-northeast-1', endpoint_url=endpoint_url, credentials=CREDENTIALS,
+                                  max_connections=max_connections)
+    return AsyncProofreader(client, runtime)
+
+
+@override_settings(PROOFREAD_CACHE_ENABLED=False)
+class AsyncBedrockRuntimeTest(TransactionTestCase):
+    """
+    asyncioのBedrockクライアントをローカルの偽エンドポイントでテストするクラス
+
+    前後処理は別スレッドのDB接続で実行されるため、書き込みが見えるよう TransactionTestCase を使う。
+    """
+
+    def setUp(self):
+        TokenUsageRecord.objects.all().delete()
+        reset_rate_limiters()
+        reset_circuit_breakers()
+        self.addCleanup(reset_rate_limiters)
+        self.addCleanup(reset_circuit_breakers)
+
+    async def test_invoke_model_signs_and_reuses_connections(self):
+        """署名付きで呼び出され、keep-alive で接続が使い回されることをテスト"""
+        endpoint = FakeBedrockEndpoint(tool_input={'corrected_text': '本文', 'corrections': []})
+        runtime = AsyncBedrockRuntime('ap-northeast-1', endpoint_url=await endpoint.start(), credentials=CREDENTIALS)
+        try:
+            for _ in range(3):
+                response = await runtime.invoke_model(
+                    modelId='arn:aws:bedrock:ap-northeast-1:0:inference-profile/model:0',
+                    body=json.dumps({'messages': [{'role': 'user', 'content': '本文'}],
+                                     'tools': [{'name': 'proofreading_result'}]})
+                )
+                body = json.loads(response['body'].read())
+                self.assertEqual(body['content'][0]['input']['corrected_text'], '本文')
+        finally:
+            await runtime.close()
+            await endpoint.close()
+
+        self.assertEqual(endpoint.calls[0]['modelId'], 'arn:aws:bedrock:ap-northeast-1:0:inference-profile/model:0')
+        self.assertEqual(runtime.stats()['connections_opened'], 1)
+        self.assertEqual(runtime.stats()['requests_sent'], 3)
+
+    async def test_credentials_are_resolved_off_loop_and_cached(self):
+        """認証情報の解決・更新がイベントループ外で行われ、期限が近づくまで固定値が使い回されることをテスト"""
+        class RefreshingCredentials:
+            def __init__(self):
+                self.expiring = False
+                self.threads = []
+
+            def refresh_needed(self):
+                return self.expiring
+
+            def get_frozen_credentials(self):
+                self.threads.append(threading.get_ident())
+                self.expiring = False
+                return CREDENTIALS.get_frozen_credentials()
+
+        credentials = RefreshingCredentials()
+        endpoint = FakeBedrockEndpoint(tool_input={'corrected_text': '本文', 'corrections': []})
+        runtime = AsyncBedrockRuntime('ap-northeast-1', endpoint_url=await endpoint.start(), credentials=credentials)
+        body = json.dumps({'messages': []})
+        try:
+            await asyncio.gather(*(runtime.invoke_model(modelId='model', body=body) for _ in range(5)))
+            self.assertEqual(len(credentials.threads), 1)
+            credentials.expiring = True
+            await runtime.invoke_model(modelId='model', body=body)
+        finally:
+            await runtime.close()
+            await endpoint.close()
+
+        self.assertEqual(len(credentials.threads), 2)
+        self.assertNotIn(threading.get_ident(), credentials.threads)
+        self.assertEqual(len(endpoint.calls), 6)
+
+    async def test_error_response_raises_client_error(self):
+        """エラー応答が botocore と同じ ClientError のエラーコードになることをテスト"""
+        endpoint = FakeBedrockEndpoint(latency=0.05, max_concurrency=1)
+        runtime = AsyncBedrockRuntime('ap-northeast-1', endpoint_url=await endpoint.start(), credentials=CREDENTIALS)
+        body = json.dumps({'messages': []})
+        try:
+            results = await asyncio.gather(
+                runtime.invoke_model(modelId='model', body=body),
+                runtime.invoke_model(modelId='model', body=body),
+                return_exceptions=True
+            )
+        finally:
+            await runtime.close()
+            await endpoint.close()
+
+        errors = [result for result in results if isinstance(result, Exception)]
+        self.assertEqual(len(errors), 1)
+        self.assertIsInstance(errors[0], ClientError)
+        self.assertEqual(errors[0].response['Error']['Code'], 'ThrottlingException')
+
+    async def test_proofread_text_matches_sync_client(self):
+        """非同期版の校正結果が同期版と同じ形で返り、使用量が記録されることをテスト"""
+        endpoint = FakeBedrockEndpoint(tool_input={'corrected_text': '経済的な理由', 'corrections': [
+            {'line_number': 1, 'original': '経済敵', 'corrected': '経済的', 'reason': '誤字', 'category': 'typo'}
+        ]})
+        proofreader = build_proofreader(await endpoint.start())
+        try:
+            result = await proofreader.proofread_text('経済敵な理由', use_cache=False)
+        finally:
+            await proofreader.runtime.close()
+            await endpoint.close()
+
+        self.assertNotIn('error', result)
+        self.assertEqual(result['mode'], 'json')
+        self.assertEqual(result['corrected_text'], '経済的な理由')
+        self.assertEqual(result['corrections'][0]['corrected'], '経済的')
+        self.assertFalse(result['fallback_used'])
+        self.assertEqual(await TokenUsageRecord.objects.acount(), 1)
+
+    @override_settings(PROOFREAD_TOKEN_USAGE_RECORDING=False)
+    async def test_pre_processing_runs_concurrently(self):
+        """同時に受け付けた校正の前処理が1本のスレッドに直列化されず、並行して実行されることをテスト"""
+        endpoint = FakeBedrockEndpoint(tool_input=echo_responder)
+        proofreader = build_proofreader(await endpoint.start())
+        prepare = proofreader.client._prepare_json_request
+        barrier = threading.Barrier(2, timeout=5)
+        threads = set()
+
+        def prepare_together(*args):
+            # 2件の前処理が同時に実行中でなければ通過できない
+            threads.add(threading.get_ident())
+            barrier.wait()
+            return prepare(*args)
+
+        try:
+            with mock.patch.object(proofreader.client, '_prepare_json_request', side_effect=prepare_together):
+                results = await asyncio.gather(*(
+                    proofreader.proofread_text(f'本文{i}', use_cache=False) for i in range(2)
+                ))
+        finally:
+            await proofreader.runtime.close()
+            await endpoint.close()
+
+        self.assertTrue(all('error' not in result for result in results))
+        self.assertEqual(len(threads), 2)
+
+    @override_settings(PROOFREAD_RATE_LIMIT_BACKOFF_BASE=0.01, PROOFREAD_RATE_LIMIT_BACKOFF_CAP=0.05,
+                       PROOFREAD_RATE_LIMIT_MAX_RETRIES=20, PROOFREAD_TOKEN_USAGE_RECORDING=False)
+    async def test_throttling_is_retried_by_shared_limiter(self):
+        """偽エンドポイントのスロットリングが共有リミッターで待って再試行されることをテスト"""
+        endpoint = FakeBedrockEndpoint(tool_input=echo_responder, latency=0.02, max_concurrency=2)
+        proofreader = build_proofreader(await endpoint.start())
+        try:
+            results = await asyncio.gather(*(
+                proofreader.proofread_text(f'本文{i}', use_cache=False) for i in range(12)
+            ))
+        finally:
+            await proofreader.runtime.close()
+            await endpoint.close()
+
+        self.assertTrue(all('error' not in result for result in results))
+        self.assertEqual(rate_limiter_metrics()[proofreader.client.model_id]['in_flight'], 0)
+
+    @override_settings(PROOFREAD_TOKEN_USAGE_RECORDING=False)
+    async def test_load_is_bounded_by_default_limiter(self):
+        """
+        既定の設定（共有リミッター有効）で数百件の校正を同時に受け付けたときの動作を偽エンドポイントで確認する
+
+        1プロセスで受け付けた校正はスレッドを使わずにリミッターの枠を待ち、Bedrockへの同時呼び出しは
+        PROOFREAD_RATE_LIMIT_MAX_CONCURRENCY（既定16）までに抑えられる。
+        """
+        requests, latency = 300, 0.1
+        max_concurrency = settings.PROOFREAD_RATE_LIMIT_MAX_CONCURRENCY
+        endpoint = FakeBedrockEndpoint(tool_input=echo_responder, latency=latency)
+        proofreader = build_proofreader(await endpoint.start(), max_connections=requests)
+        try:
+            results = await asyncio.gather(*(
+                proofreader.proofread_text(f'<p>本文{i}</p>', use_cache=False) for i in range(requests)
+            ))
+        finally:
+            await proofreader.runtime.close()
+            await endpoint.close()
+
+        self.assertTrue(all('error' not in result for result in results))
+        # 上限まで増えた同時実行数で処理され、上限は超えない
+        self.assertEqual(endpoint.peak, max_concurrency)
+        metrics = rate_limiter_metrics()[proofreader.client.model_id]
+        self.assertEqual(metrics['in_flight'], 0)
+        self.assertEqual(metrics['limit'], max_concurrency)
+
+
+@override_settings(PROOFREAD_CACHE_ENABLED=False, PROOFREAD_TOKEN_USAGE_RECORDING=False)
+class AsyncViewsTest(TestCase):
+    """ASGI用の非同期ビューをテストするクラス"""
+
+    def setUp(self):
+        self.factory = AsyncRequestFactory()
+        self.user = User.objects.create_user(username='testuser', email='test@grapee.co.jp', password='testpassword')
+        reset_rate_limiters()
+        self.addCleanup(reset_rate_limiters)
+
+    def post(self, data):
+        request = self.factory.post('/proofreading_ai/proofread/', data=json.dumps(data),
+                                    content_type='application/json')
+        request.user = self.user
+
+        async def auser():
+            return self.user
+        request.auser = auser
+        return request
+
+    async def test_aproofread_returns_highlighted_result(self):
+        """非同期の校正APIが同期版と同じ形式で結果を返すことをテスト"""
+        endpoint = FakeBedrockEndpoint(tool_input={'corrected_text': '経済的な理由', 'corrections': [
+            {'line_number': 1, 'original': '経済敵', 'corrected': '経済的', 'reason': '誤字', 'category': 'typo'}
+        ]})
+        proofreader = build_proofreader(await endpoint.start())
+        try:
+            with mock.patch('proofreading_ai.views.get_async_proofreader',
+                            mock.AsyncMock(return_value=proofreader)):
+                response = await aproofread(self.post({'text': '経済敵な理由'}))
+        finally:
+            await proofreader.runtime.close()
+            await endpoint.close()
+
+        payload = json.loads(response.content)
+        self.assertTrue(payload['success'])
+        self.assertEqual(payload['corrections'][0]['corrected'], '経済的')
+
+    async def test_aproofread_async_job_completes(self):
+        """非同期ジョブがイベントループ上で実行され、状況確認で結果が返ることをテスト"""
+        endpoint = FakeBedrockEndpoint(tool_input=echo_responder, latency=0.05)
+        proofreader = build_proofreader(await endpoint.start())
+        try:
+            with mock.patch('proofreading_ai.views.get_async_proofreader',
+                            mock.AsyncMock(return_value=proofreader)):
+                response = await aproofread_async(self.post({'text': '本文'}))
+                process_id = json.loads(response.content)['process_id']
+
+                status = json.loads((await acheck_proofread_status(self.post({'process_id': process_id}))).content)
+                self.assertIn(status['status'], ('queued', 'processing'))
+
+                await get_async_job_runner().join()
+        finally:
+            await proofreader.runtime.close()
+            await endpoint.close()
+
+        status = json.loads((await acheck_proofread_status(self.post({'process_id': process_id}))).content)
+        self.assertEqual(status['status'], 'completed')
+        self.assertEqual(status['original_text'], '本文')
+        self.assertEqual((await ProofreadingJob.objects.aget(job_id=process_id)).status, 'completed')
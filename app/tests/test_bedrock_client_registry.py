@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from proofreading_ai.services import bedrock_client as proofreading_bedrock
+from grapecheck.services import bedrock_client as grapecheck_bedrock
+from tests.benchmark import benchmark
+
+
+class ProofreadingBedrockClientRegistryTest(SimpleTestCase):
+    """校正AI用の共有BedrockClientをテストするクラス"""
+
+    def setUp(self):
+        proofreading_bedrock.reset_bedrock_client()
+        self.addCleanup(proofreading_bedrock.reset_bedrock_client)
+
+    def test_client_is_created_once_per_process(self):
+        """複数スレッドから取得してもクライアントは1回だけ作成されることをテスト"""
+        with mock.patch.object(proofreading_bedrock, 'BedrockClient') as client_class:
+            client_class.side_effect = lambda: object()
+            results = []
+
+            def worker():
+                results.append(proofreading_bedrock.get_bedrock_client())
+
+            threads = [threading.Thread(target=worker) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual(client_class.call_count, 1)
+            self.assertEqual(len({id(client) for client in results}), 1)
+
+    def test_client_is_recreated_after_fork(self):
+        """プロセスIDが変わった場合はクライアントを作り直すことをテスト"""
+        with mock.patch.object(proofreading_bedrock, 'BedrockClient') as client_class:
+            client_class.side_effect = lambda: object()
+            first = proofreading_bedrock.get_bedrock_client()
+            with mock.patch.object(proofreading_bedrock.os, 'getpid', return_value=-1):
+                second = proofreading_bedrock.get_bedrock_client()
+
+            self.assertIsNot(first, second)
+            self.assertEqual(client_class.call_count, 2)
+
+
+class GrapecheckBedrockClientRegistryTest(SimpleTestCase):
+    """グレイプらしさチェック用の共有BedrockClientをテストするクラス"""
+
+    def setUp(self):
+        grapecheck_bedrock.reset_bedrock_client()
+        self.addCleanup(grapecheck_bedrock.reset_bedrock_client)
+
+    def test_client_is_shared_per_region(self):
+        """同じリージョンでは同じクライアントが返されることをテスト"""
+        with mock.patch.object(grapecheck_bedrock, 'BedrockClient') as client_class:
+            client_class.side_effect = lambda region_name=None: object()
+            tokyo = grapecheck_bedrock.get_bedrock_client('ap-northeast-1')
+            self.assertIs(tokyo, grapecheck_bedrock.get_bedrock_client('ap-northeast-1'))
+            self.assertIsNot(tokyo, grapecheck_bedrock.get_bedrock_client('us-east-1'))
+            self.assertEqual(client_class.call_count, 2)
+
+
+class BedrockClientStartupBenchmarkTest(SimpleTestCase):
+    """リクエストごとにクライアントを作る場合と共有クライアントを使う場合の取得時間を比較するベンチマーク"""
+
+    def setUp(self):
+        proofreading_bedrock.reset_bedrock_client()
+        self.addCleanup(proofreading_bedrock.reset_bedrock_client)
+
+    @benchmark
+    def test_cold_vs_warm_benchmark(self):
+        """boto3クライアントの作成・認証情報の解決・プロンプト読み込みを共有クライアントで省けることを計測"""
+        # ネットワークに出ないよう、認証情報は環境変数で与え、モデル一覧の取得は省く
+        environment = {
+            'AWS_ACCESS_KEY_ID': 'AKIATESTTESTTEST', 'AWS_SECRET_ACCESS_KEY': 'secret',
+            'AWS_REGION': 'ap-northeast-1', 'AWS_DEFAULT_REGION': 'ap-northeast-1',
+        }
+        rounds = 10
+        with mock.patch.dict(os.environ, environment), \
+                mock.patch.object(proofreading_bedrock.BedrockClient, '_check_model_access'):
+            start = time.perf_counter()
+            for _ in range(rounds):
+                proofreading_bedrock.BedrockClient()
+            cold = (time.perf_counter() - start) / rounds
+
+            proofreading_bedrock.get_bedrock_client()
+            start = time.perf_counter()
+            for _ in range(rounds):
+                proofreading_bedrock.get_bedrock_client()
+            warm = (time.perf_counter() - start) / rounds
+
+        print(f"\n[共有クライアントベンチマーク] 毎回作成 {cold * 1000:.2f}ms / 共有 {warm * 1000:.4f}ms（1リクエストあたり）")
+        self.assertLess(warm * 100, cold)
@@ -0,0 +1,234 @@
+import json
+import re
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from proofreading_ai.services.bedrock_client import BedrockClient
+from proofreading_ai.services.cascade import (
+    cascade_stats, parse_screening_result, reset_cascade_metrics, screen_locally
+)
+from proofreading_ai.services.circuit_breaker import reset_circuit_breakers
+from proofreading_ai.services.mock_bedrock_client import MockBedrockRuntime
+from proofreading_ai.services.paragraph_cache import split_cacheable_paragraphs
+from tests.benchmark import benchmark
+from tests.test_incremental import typo_responder
+
+PARAGRAPHS = [
+    '今日は晴れていたので、朝から近所を散歩しました。',
+    '公園では子どもたちが元気に遊んでいました。',
+    '帰り道では経済敵な話題について考えました。',
+    'とても良い一日になりました。',
+]
+DRAFT = '\n\n'.join(PARAGRAPHS) + '\n'
+CLEAN = DRAFT.replace('経済敵', '経済的')
+
+
+def screening_responder(score=0.9):
+    """スクリーニングでは「経済敵」を含む段落を報告し、フル校正では誤字を直すモックの応答"""
+    def respond(request):
+        if request['tools'][0]['name'] != 'screening_result':
+            return typo_responder(request)
+        flagged = []
+        for block in request['messages'][0]['content'].split('\n\n'):
+            match = re.match(r'\[(\d+)\]\n', block)
+            if match and '経済敵' in block:
+                flagged.append({'index': int(match.group(1)), 'score': score, 'reason': '誤字の疑い'})
+        return {'flagged': flagged}
+    return respond
+
+
+class LocalScreeningTest(SimpleTestCase):
+    """辞書・ルールによるスクリーニングとスクリーニング結果の解析をテストするクラス"""
+
+    def test_local_signals_and_findings(self):
+        """ローカルの検出結果を含む段落と、原稿上の兆候がある段落にスコアが付くことをテスト"""
+        text = '問題のない段落です。\n\n句読点が重複しています。。\n\n「括弧が閉じていない段落\n\n矛盾のある段落です。\n'
+        paragraphs = split_cacheable_paragraphs(text)
+
+        scores = screen_locally(paragraphs, [{'position': text.index('矛盾'), 'reason': '年齢の矛盾'}])
+
+        self.assertEqual(sorted(scores), [1, 2, 3])
+        self.assertEqual(scores[3], (1.0, '年齢の矛盾'))
+        self.assertEqual(scores[1][1], '句読点の重複')
+
+    def test_parse_ignores_unknown_paragraphs(self):
+        """依頼していない段落番号や不正な値は無視し、スコアを0〜1に収めることをテスト"""
+        scores = parse_screening_result(
+            {'flagged': [{'index': 1, 'score': 3}, {'index': 9, 'score': 1}, {'index': 'x'}, {'index': 2}]},
+            [1, 2]
+        )
+
+        self.assertEqual(scores, {1: (1.0, ''), 2: (1.0, '')})
+
+
+@override_settings(PROOFREAD_CACHE_ENABLED=False, PROOFREAD_TOKEN_USAGE_RECORDING=False,
+                   PROOFREAD_RATE_LIMIT_ENABLED=False, PROOFREAD_CASCADE_SCREEN_MODEL_ID='screen-model')
+class BedrockClientCascadeTest(TestCase):
+    """BedrockClientの2段階校正をテストするクラス"""
+
+    def setUp(self):
+        reset_cascade_metrics()
+        reset_circuit_breakers()
+        self.addCleanup(reset_cascade_metrics)
+        self.addCleanup(reset_circuit_breakers)
+        self.runtime = MockBedrockRuntime(tool_input=screening_responder())
+        self.client = BedrockClient(bedrock_runtime=self.runtime)
+        self.client.default_prompt = '{原文}'
+
+    def proofread(self, text):
+        return self.client.proofread_text(text, use_cascade=True)
+
+    def full_model_calls(self):
+        return [call for call in self.runtime.calls if call['modelId'] != 'screen-model']
+
+    def test_clean_draft_skips_full_model(self):
+        """問題のない原稿はスクリーニングだけで終わり、フル校正より安いことをテスト"""
+        result = self.proofread(CLEAN)
+
+        self.assertEqual([call['modelId'] for call in self.runtime.calls], ['screen-model'])
+        self.assertEqual(result['mode'], 'cascade')
+        self.assertEqual(result['corrected_text'], CLEAN)
+        self.assertEqual(result['corrections'], [])
+        self.assertEqual((result['cascade']['paragraphs'], result['cascade']['escalated']), (4, 0))
+
+        full = self.client.proofread_text(CLEAN)
+        self.assertLess(result['estimated_cost'], full['estimated_cost'] / 2)
+
+    def test_flagged_paragraph_is_escalated(self):
+        """スクリーニングで報告された段落だけをフル校正し、修正箇所が原稿全体の位置になることをテスト"""
+        result = self.proofread(DRAFT)
+
+        sent = [call['request']['messages'][0]['content'] for call in self.full_model_calls()]
+        self.assertEqual(len(sent), 1)
+        self.assertIn(PARAGRAPHS[2], sent[0])
+        self.assertNotIn(PARAGRAPHS[0], sent[0])
+        self.assertEqual(result['corrected_text'], CLEAN)
+        self.assertEqual(len(result['corrections']), 1)
+        position = result['corrections'][0]['position']
+        self.assertEqual(DRAFT[position:position + 3], '経済敵')
+        self.assertEqual(result['corrections'][0]['line_number'], 5)
+        self.assertEqual(result['cascade']['escalated'], 1)
+        self.assertGreater(result['cascade']['screen_cost'], 0)
+
+    @override_settings(PROOFREAD_CASCADE_ESCALATION_THRESHOLD=0.95)
+    def test_escalation_threshold_is_configurable(self):
+        """閾値に満たないスコアの段落はフル校正しないことをテスト"""
+        result = self.proofread(DRAFT)
+
+        self.assertEqual(self.full_model_calls(), [])
+        self.assertEqual(result['cascade']['escalated'], 0)
+
+    @override_settings(PROOFREAD_CASCADE_SCREEN_MODEL_ID='')
+    def test_rules_only_screening(self):
+        """スクリーニング用モデルがない場合は辞書・ルールの兆候がある段落だけをフル校正することをテスト"""
+        client = BedrockClient(bedrock_runtime=self.runtime)
+        client.default_prompt = '{原文}'
+        text = CLEAN.replace('遊んでいました。', '遊んでいました。。')
+
+        result = client.proofread_text(text, use_cascade=True)
+
+        self.assertEqual(len(self.runtime.calls), 1)
+        self.assertIn('公園', self.runtime.calls[0]['request']['messages'][0]['content'])
+        self.assertIsNone(result['cascade']['screen_model'])
+
+    def test_screening_failure_escalates_everything(self):
+        """スクリーニング用モデルが応答しない場合は全文をフル校正することをテスト"""
+        def respond(request):
+            if request['tools'][0]['name'] == 'screening_result':
+                raise ValueError('screening unavailable')
+            return typo_responder(request)
+        self.runtime.tool_input = respond
+
+        result = self.proofread(DRAFT)
+
+        self.assertTrue(result['cascade']['whole_text'])
+        self.assertIn('screening unavailable', result['cascade']['screen_error'])
+        self.assertEqual(result['corrected_text'], CLEAN)
+
+    def test_whole_text_respects_use_cache(self):
+        """全文をフル校正する場合も呼び出し元の use_cache が段落単位のキャッシュに渡ることをテスト"""
+        def respond(request):
+            if request['tools'][0]['name'] == 'screening_result':
+                raise ValueError('screening unavailable')
+            return typo_responder(request)
+        self.runtime.tool_input = respond
+
+        with mock.patch.object(self.client, 'proofread_text_chunked', wraps=self.client.proofread_text_chunked) as chunked:
+            result = self.client.proofread_text(DRAFT, use_cascade=True, use_cache=False)
+
+        self.assertTrue(result['cascade']['whole_text'])
+        self.assertFalse(chunked.call_args.kwargs['use_cache'])
+
+    def test_metrics_are_recorded(self):
+        """段ごとの処理時間とフル校正への昇格率が集計されることをテスト"""
+        self.proofread(CLEAN)
+        self.proofread(DRAFT)
+
+        stats = cascade_stats()
+        self.assertEqual(stats['runs'], 2)
+        self.assertEqual((stats['paragraphs'], stats['escalated']), (8, 1))
+        self.assertAlmostEqual(stats['escalation_rate'], 1 / 8)
+        self.assertGreater(stats['screen_cost'], 0)
+        for tier in ('screen', 'full', 'total'):
+            self.assertIn(f'{tier}_latency_p50', stats)
+            self.assertIn(f'{tier}_latency_p95', stats)
+
+    @benchmark
+    def test_clean_draft_latency_benchmark(self):
+        """問題のない原稿でフル校正と処理時間の中央値を比較するベンチマーク（モデルの遅延を模擬）"""
+        runtime = MockBedrockRuntime(tool_input=screening_responder())
+        client = BedrockClient(bedrock_runtime=runtime)
+        client.default_prompt = '{原文}'
+        original_invoke = runtime.invoke_model
+
+        def invoke_model(modelId, body, **kwargs):
+            # スクリーニング用モデルは出力が短く速い
+            runtime.latency = 0.01 if modelId == 'screen-model' else 0.05
+            return original_invoke(modelId=modelId, body=body, **kwargs)
+
+        with mock.patch.object(runtime, 'invoke_model', side_effect=invoke_model):
+            cascade = sorted(client.proofread_text(CLEAN, use_cascade=True)['processing_time'] for _ in range(3))
+            full = sorted(client.proofread_text(CLEAN)['processing_time'] for _ in range(3))
+
+        print(f"\n2段階校正の処理時間（中央値）: {cascade[1]:.3f}秒 / フル校正: {full[1]:.3f}秒")
+        self.assertLess(cascade[1], full[1])
+
+
+@override_settings(PROOFREAD_CACHE_ENABLED=False, PROOFREAD_TOKEN_USAGE_RECORDING=False,
+                   PROOFREAD_RATE_LIMIT_ENABLED=False, PROOFREAD_CASCADE_SCREEN_MODEL_ID='screen-model')
+class CascadeProofreadViewTest(TestCase):
+    """校正APIの2段階校正をテストするクラス"""
+
+    def setUp(self):
+        reset_cascade_metrics()
+        self.addCleanup(reset_cascade_metrics)
+        self.client = Client()
+        User.objects.create_user(username='testuser', email='test@grapee.co.jp', password='testpassword')
+        self.client.login(username='testuser', password='testpassword')
+        self.bedrock = BedrockClient(bedrock_runtime=MockBedrockRuntime(tool_input=screening_responder()))
+        self.bedrock.default_prompt = '{原文}'
+
+    def post(self, **options):
+        with mock.patch('proofreading_ai.views.get_bedrock_client', return_value=self.bedrock):
+            return self.client.post(
+                reverse('proofreading_ai:proofread'),
+                data=json.dumps({'text': DRAFT, **options}),
+                content_type='application/json'
+            ).json()
+
+    def test_use_cascade_option(self):
+        """use_cascade を指定すると2段階校正の統計を返すことをテスト"""
+        response = self.post(use_cascade=True)
+
+        self.assertTrue(response['success'])
+        self.assertEqual(response['mode'], 'cascade')
+        self.assertEqual(response['cascade']['escalated'], 1)
+
+    @override_settings(PROOFREAD_CASCADE_ENABLED=True)
+    def test_setting_enables_cascade_by_default(self):
+        """設定で有効にすると指定のない校正も2段階校正になり、use_cascade=false で通常の校正になることをテスト"""
+        self.assertEqual(self.post()['mode'], 'cascade')
+        self.assertEqual(self.post(use_cascade=False)['mode'], 'json')
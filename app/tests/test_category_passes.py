@@ -0,0 +1,314 @@
+import asyncio
+import json
+import os
+import statistics
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from proofreading_ai.models import TokenUsageRecord
+from proofreading_ai.services.bedrock_client import BedrockClient
+from proofreading_ai.services.category_passes import (
+    CATEGORY_PROMPTS, get_pass_categories, merge_category_corrections
+)
+from proofreading_ai.services.circuit_breaker import reset_circuit_breakers
+from proofreading_ai.services.mock_bedrock_client import FakeBedrockEndpoint, MockBedrockRuntime
+from proofreading_ai.services.rate_limiter import reset_rate_limiters
+from tests.benchmark import benchmark
+from tests.test_async_bedrock import build_proofreader
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'proofread_corpus.json')
+# ベンチマーク用の出力1文字あたりの生成時間（出力トークン数に比例する応答時間を模擬）
+SECONDS_PER_OUTPUT_CHARACTER = 0.0002
+
+
+def load_corpus():
+    with open(CORPUS_PATH, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def with_line_numbers(text, corrections):
+    return [
+        dict(correction, line_number=text[:text.index(correction['original'])].count('\n') + 1,
+             reason='テスト')
+        for correction in corrections
+    ]
+
+
+def corpus_responder(corpus):
+    """
+    コーパスの記事ごとの想定の修正箇所を返すモックの応答
+    （カテゴリー別の校正では担当カテゴリーの修正箇所と、重複・競合する指摘を返す）
+    """
+    def respond(request):
+        prompt = request['messages'][0]['content']
+        article = next(article for article in corpus if article['title'] in prompt)
+        text = article['text']
+        if request['tools'][0]['name'] == 'proofreading_result':
+            corrected = text
+            for correction in article['expected']:
+                corrected = corrected.replace(correction['original'], correction['corrected'])
+            return {'corrected_text': corrected, 'corrections': with_line_numbers(text, article['expected'])}
+
+        category = next(category for category, instructions in CATEGORY_PROMPTS.items()
+                        if prompt.startswith(instructions))
+        reported = article['expected'] + article.get('conflicting', []) + article.get('duplicates', [])
+        return {'corrections': [
+            {key: value for key, value in correction.items() if key != 'category'}
+            for correction in with_line_numbers(text, reported) if correction['category'] == category
+        ]}
+    return respond
+
+
+class GatedBedrockEndpoint(FakeBedrockEndpoint):
+    """指定数のリクエストが同時に届くまで応答を保留する偽エンドポイント（逐次実行なら待ちきれずに失敗する）"""
+
+    def __init__(self, parties, **kwargs):
+        super().__init__(**kwargs)
+        self.barrier = asyncio.Barrier(parties)
+
+    async def _respond(self, model_id, body, headers):
+        await asyncio.wait_for(self.barrier.wait(), timeout=5)
+        return await super()._respond(model_id, body, headers)
+
+
+class TokenPacedRuntime(MockBedrockRuntime):
+    """出力の長さに比例して応答が遅くなるモック（出力トークンの生成時間を模擬）"""
+
+    def invoke_model(self, modelId, body, **kwargs):
+        output = json.dumps(self._build_content(json.loads(body)), ensure_ascii=False)
+        time.sleep(SECONDS_PER_OUTPUT_CHARACTER * len(output))
+        return super().invoke_model(modelId=modelId, body=body, **kwargs)
+
+
+class MergeCategoryCorrectionsTest(SimpleTestCase):
+    """カテゴリーごとの修正箇所の結合をテストするクラス"""
+
+    TEXT = '年配の女性は何度もお礼を行っていました。\n'
+
+    def test_duplicates_and_conflicts_follow_priority(self):
+        """同じ修正は1件にまとめ、範囲が重なる修正は優先順の先のカテゴリーを採用することをテスト"""
+        typo = {'line_number': 1, 'original': 'お礼を行って', 'corrected': 'お礼を言って', 'reason': '誤字'}
+        tone = {'line_number': 1, 'original': 'お礼を行っていました', 'corrected': 'お礼を伝えていました', 'reason': '表現'}
+
+        merged, stats = merge_category_corrections(self.TEXT, [
+            ('typo', [typo]),
+            ('dict', [dict(typo, reason='辞書')]),
+            ('tone', [tone, {'line_number': 1, 'original': '年配', 'corrected': '年配', 'reason': '変更なし'}]),
+        ])
+
+        self.assertEqual(len(merged), 1)
+        self.assertEqual(merged[0]['category'], 'typo')
+        self.assertEqual(merged[0]['position'], self.TEXT.index('お礼'))
+        self.assertEqual(stats, {'duplicates': 1, 'conflicts': 1})
+
+    def test_unlocated_corrections_are_kept_once(self):
+        """位置の分からない修正箇所は、同じ修正前テキストの修正がなければ残すことをテスト"""
+        missing = {'line_number': 1, 'original': '存在しない語句', 'corrected': '別の語句', 'reason': '誤字'}
+
+        merged, stats = merge_category_corrections(self.TEXT, [('typo', [missing]), ('tone', [missing])])
+
+        self.assertEqual([c['category'] for c in merged], ['typo'])
+        self.assertIsNone(merged[0]['position'])
+        self.assertEqual(stats['duplicates'], 1)
+
+    @override_settings(PROOFREAD_CATEGORY_PASSES='typo, tone,unknown,typo')
+    def test_pass_categories_follow_setting(self):
+        """設定の順（優先順）でカテゴリーを実行し、未知のカテゴリーと重複は除くことをテスト"""
+        self.assertEqual(get_pass_categories(), ['typo', 'tone'])
+
+
+@override_settings(PROOFREAD_CACHE_ENABLED=False, PROOFREAD_TOKEN_USAGE_RECORDING=False,
+                   PROOFREAD_RATE_LIMIT_ENABLED=False)
+class BedrockClientCategoryPassesTest(TestCase):
+    """BedrockClientのカテゴリー別の並列校正をテストするクラス"""
+
+    def setUp(self):
+        reset_circuit_breakers()
+        self.addCleanup(reset_circuit_breakers)
+        self.corpus = load_corpus()
+        self.runtime = MockBedrockRuntime(tool_input=corpus_responder(self.corpus))
+        self.client = BedrockClient(bedrock_runtime=self.runtime)
+        self.client.default_prompt = '{原文}'
+
+    def test_passes_are_merged(self):
+        """各カテゴリーの指摘を重複・競合を除いて結合し、校正後テキストを原文から組み立てることをテスト"""
+        article = self.corpus[0]
+        text = article['text']
+
+        result = self.client.proofread_text(text, use_category_passes=True)
+
+        self.assertEqual(result['mode'], 'category')
+        self.assertEqual(len(self.runtime.calls), 4)
+        self.assertEqual(
+            sorted((c['category'], c['original'], c['corrected']) for c in result['corrections']),
+            sorted((c['category'], c['original'], c['corrected']) for c in article['expected'])
+        )
+        self.assertEqual(result['category_merge'], {'duplicates': 0, 'conflicts': 1})
+        self.assertEqual(result['corrected_text'],
+                         text.replace('お礼を行って', 'お礼を言って').replace('感じます。感じます。', '感じます。'))
+        for correction in result['corrections']:
+            position = correction['position']
+            self.assertEqual(text[position:position + len(correction['original'])], correction['original'])
+        self.assertEqual(set(result['category_passes']), {'inconsistency', 'typo', 'dict', 'tone'})
+
+    def test_corrections_spanning_tags_are_located(self):
+        """タグをまたぐ修正箇所がHTMLを復元したうえで原文の位置に結合されることをテスト"""
+        text = '<p>年配の女性は何度もお礼を</p><p>行っていました。</p>\n'
+        for protection in ('legacy', 'compact'):
+            with self.subTest(protection=protection):
+                self.client.html_protection = protection
+                protected_text, _ = self.client._protect_html(text)
+                original = protected_text[protected_text.index('お礼を'):protected_text.index('行って') + 3]
+                typo = {'line_number': 1, 'original': original, 'corrected': original.replace('行って', '言って'),
+                        'reason': '誤字'}
+                self.runtime.tool_input = lambda request: {'corrections': (
+                    [typo] if request['messages'][0]['content'].startswith(CATEGORY_PROMPTS['typo']) else []
+                )}
+
+                result = self.client.proofread_text(text, use_category_passes=True)
+
+                self.assertEqual(len(result['corrections']), 1)
+                correction = result['corrections'][0]
+                self.assertEqual(correction['original'], 'お礼を</p><p>行って')
+                self.assertEqual(correction['position'], text.index('お礼を'))
+                self.assertEqual(result['corrected_text'], text.replace('行って', '言って'))
+
+    def test_prompts_are_smaller_and_specialised(self):
+        """カテゴリーごとのプロンプトは担当カテゴリーの指示だけを含み、全文を出力させないことをテスト"""
+        self.client.proofread_text(self.corpus[3]['text'], use_category_passes=True)
+
+        for call in self.runtime.calls:
+            request = call['request']
+            self.assertEqual(request['tools'][0]['name'], 'category_proofreading_result')
+            self.assertNotIn('corrected_text', request['tools'][0]['input_schema']['properties'])
+            self.assertEqual(sum(request['messages'][0]['content'].startswith(p) for p in CATEGORY_PROMPTS.values()), 1)
+
+    def test_passes_run_concurrently(self):
+        """全カテゴリーの呼び出しが同時に実行中になることをテスト（逐次実行ならバリアが破れて失敗する）"""
+        barrier = threading.Barrier(len(get_pass_categories()), timeout=5)
+        responder = corpus_responder(self.corpus)
+
+        def respond(request):
+            barrier.wait()
+            return responder(request)
+        self.runtime.tool_input = respond
+
+        result = self.client.proofread_text(self.corpus[3]['text'], use_category_passes=True)
+
+        self.assertEqual(len(self.runtime.calls), len(get_pass_categories()))
+        self.assertTrue(all('error' not in summary for summary in result['category_passes'].values()))
+        self.assertIn('slowest_pass_time', result)
+
+    @override_settings(PROOFREAD_DICTIONARY_PREPASS=True)
+    def test_dict_pass_is_skipped_with_prepass(self):
+        """辞書の事前適用が有効な場合は辞書カテゴリーの校正を省くことをテスト"""
+        result = self.client.proofread_text(self.corpus[3]['text'], use_category_passes=True)
+
+        self.assertEqual(len(self.runtime.calls), 3)
+        self.assertNotIn('dict', result['category_passes'])
+
+    def test_failed_pass_does_not_drop_others(self):
+        """一部のカテゴリーが失敗しても他のカテゴリーの指摘を返すことをテスト"""
+        responder = corpus_responder(self.corpus)
+
+        def respond(request):
+            if request['messages'][0]['content'].startswith(CATEGORY_PROMPTS['tone']):
+                raise ValueError('tone pass unavailable')
+            return responder(request)
+        self.runtime.tool_input = respond
+
+        result = self.client.proofread_text(self.corpus[0]['text'], use_category_passes=True)
+
+        self.assertNotIn('error', result)
+        self.assertIn('tone pass unavailable', result['category_passes']['tone']['error'])
+        self.assertEqual([c['category'] for c in result['corrections']], ['typo'])
+
+    def test_corpus_matches_single_pass(self):
+        """コーパスの全記事でカテゴリー別の校正が1回の校正と同じ指摘・校正後テキストになる（検出漏れがない）ことをテスト"""
+        for article in self.corpus:
+            single = self.client.proofread_text(article['text'], use_cache=False)
+            by_category = self.client.proofread_text(article['text'], use_cache=False, use_category_passes=True)
+
+            expected = sorted((c['original'], c['corrected']) for c in article['expected'])
+            self.assertEqual(sorted((c['original'], c['corrected']) for c in by_category['corrections']), expected)
+            self.assertEqual(by_category['corrected_text'], single['corrected_text'])
+
+    @benchmark
+    def test_corpus_benchmark(self):
+        """コーパスでカテゴリー別の並列校正と1回の校正の処理時間（中央値）を比較するベンチマーク"""
+        runtime = TokenPacedRuntime(tool_input=corpus_responder(self.corpus))
+        client = BedrockClient(bedrock_runtime=runtime)
+        client.default_prompt = '{原文}'
+
+        single_times, category_times = [], []
+        for article in self.corpus:
+            single_times.append(client.proofread_text(article['text'], use_cache=False)['processing_time'])
+            category_times.append(client.proofread_text(
+                article['text'], use_cache=False, use_category_passes=True
+            )['processing_time'])
+
+        single_median = statistics.median(single_times)
+        category_median = statistics.median(category_times)
+        print(f"\n[カテゴリー別校正ベンチマーク] {len(self.corpus)}記事: "
+              f"1回の校正 {single_median * 1000:.0f}ms / カテゴリー別 {category_median * 1000:.0f}ms（中央値）")
+        self.assertLess(category_median, single_median)
+
+
+@override_settings(PROOFREAD_CACHE_ENABLED=False, PROOFREAD_TOKEN_USAGE_RECORDING=False,
+                   PROOFREAD_RATE_LIMIT_ENABLED=False)
+class CategoryPassesViewTest(TestCase):
+    """校正APIのカテゴリー別の並列校正をテストするクラス"""
+
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_user(username='testuser', email='test@grapee.co.jp', password='testpassword')
+        self.client.login(username='testuser', password='testpassword')
+        self.corpus = load_corpus()
+        self.bedrock = BedrockClient(bedrock_runtime=MockBedrockRuntime(tool_input=corpus_responder(self.corpus)))
+        self.bedrock.default_prompt = '{原文}'
+
+    def test_use_category_passes_option(self):
+        """use_category_passes を指定するとカテゴリーごとの統計を返すことをテスト"""
+        with mock.patch('proofreading_ai.views.get_bedrock_client', return_value=self.bedrock):
+            response = self.client.post(
+                reverse('proofreading_ai:proofread'),
+                data=json.dumps({'text': self.corpus[2]['text'], 'use_category_passes': True}),
+                content_type='application/json'
+            ).json()
+
+        self.assertTrue(response['success'])
+        self.assertEqual(response['mode'], 'category')
+        self.assertEqual(response['category_passes']['typo']['corrections'], 2)
+        self.assertEqual(len(response['corrections']), 2)
+
+
+@override_settings(PROOFREAD_CACHE_ENABLED=False, PROOFREAD_TOKEN_USAGE_RECORDING=False,
+                   PROOFREAD_RATE_LIMIT_ENABLED=False)
+class AsyncCategoryPassesTest(TestCase):
+    """非同期版のカテゴリー別の並列校正をテストするクラス"""
+
+    def setUp(self):
+        TokenUsageRecord.objects.all().delete()
+        reset_rate_limiters()
+        self.addCleanup(reset_rate_limiters)
+
+    async def test_async_passes_are_merged(self):
+        """非同期版でもカテゴリーごとに同時に呼び出して結合することをテスト"""
+        corpus = load_corpus()
+        endpoint = GatedBedrockEndpoint(len(get_pass_categories()), tool_input=corpus_responder(corpus))
+        proofreader = build_proofreader(await endpoint.start())
+        try:
+            result = await proofreader.proofread_text(corpus[1]['text'], use_category_passes=True)
+        finally:
+            await proofreader.runtime.close()
+            await endpoint.close()
+
+        self.assertEqual(len(endpoint.calls), 4)
+        self.assertTrue(all('error' not in summary for summary in result['category_passes'].values()))
+        self.assertEqual(result['mode'], 'category')
+        self.assertEqual(sorted(c['original'] for c in result['corrections']), ['アマゾン', '東京都'])
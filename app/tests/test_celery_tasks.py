@@ -0,0 +1,178 @@
+import json
+import os
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, Client, override_settings
+from django.urls import reverse
+
+from config.celery import app as celery_app, create_local_data_dirs
+from grapecheck.models import Category, GrapeCheck
+from proofreading_ai.models import ProofreadingRequest
+from proofreading_ai.services import job_store
+from proofreading_ai.services.bedrock_client import BedrockClient
+from proofreading_ai.services.mock_bedrock_client import MockBedrockRuntime
+
+
+GRAPE_RESULT = {
+    'total_score': 80,
+    'writing_style_score': 30,
+    'structure_score': 25,
+    'keyword_score': 25,
+    'improvement_suggestions': '見出しを具体的にする',
+}
+
+
+class CeleryTaskTestMixin:
+    """Celeryタスクをワーカーなしで同期実行するためのミックスイン"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = Client()
+        User.objects.create_user(username='testuser', email='test@grapee.co.jp', password='testpassword')
+        self.client.login(username='testuser', password='testpassword')
+
+        # 設定は CELERY_ 名前空間付きで読み込まれているため同じキーで上書きする
+        eager = {
+            'CELERY_TASK_ALWAYS_EAGER': True,
+            'CELERY_TASK_EAGER_PROPAGATES': False,
+            'CELERY_TASK_STORE_EAGER_RESULT': False,
+        }
+        previous = {key: celery_app.conf.get(key) for key in eager}
+        celery_app.conf.update(eager)
+        self.addCleanup(celery_app.conf.update, previous)
+
+
+@override_settings(PROOFREAD_USE_CELERY=True)
+class ProofreadTaskTest(CeleryTaskTestMixin, TestCase):
+    """校正タスクのパイプラインをテストするクラス"""
+
+    def post_async(self, text):
+        return self.client.post(
+            reverse('proofreading_ai:proofread_async'),
+            data=json.dumps({'text': text}),
+            content_type='application/json'
+        ).json()
+
+    def test_job_is_run_by_task_and_result_is_persisted(self):
+        """タスクで実行した結果がジョブテーブルに保存されることをテスト"""
+        runtime = MockBedrockRuntime(tool_input={
+            'corrected_text': '経済的な理由',
+            'corrections': [{'line_number': 1, 'original': '経済敵', 'corrected': '経済的',
+                             'reason': '誤字', 'category': 'typo'}]
+        })
+        with mock.patch('proofreading_ai.services.proofread_jobs.get_bedrock_client',
+                        return_value=BedrockClient(bedrock_runtime=runtime)), \
+                mock.patch('proofreading_ai.views.get_job_executor') as executor:
+            data = self.post_async('経済敵な理由')
+
+        executor.assert_not_called()
+        job = job_store.get_job(data['process_id'])
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.result['corrections'][0]['corrected'], '経済的')
+
+    def test_transient_error_is_retried(self):
+        """一時的なエラーは再試行されることをテスト"""
+        client = mock.Mock(model_id='test-model')
+        client.proofread_text.side_effect = [
+            RuntimeError('ThrottlingException'),
+            {'corrections': [], 'processing_time': 0.1},
+        ]
+        with mock.patch('proofreading_ai.services.proofread_jobs.get_bedrock_client', return_value=client):
+            data = self.post_async('テスト')
+
+        self.assertEqual(client.proofread_text.call_count, 2)
+        self.assertEqual(job_store.get_job(data['process_id']).status, 'completed')
+        # 再試行しても校正リクエストは1件だけ保存される
+        self.assertEqual(ProofreadingRequest.objects.count(), 1)
+        self.assertEqual(ProofreadingRequest.objects.get().results.count(), 1)
+
+    def test_job_fails_after_retries(self):
+        """再試行回数を超えるとジョブがエラーになることをテスト"""
+        from proofreading_ai.tasks import proofread_job_task
+
+        client = mock.Mock(model_id='test-model')
+        client.proofread_text.side_effect = RuntimeError('ValidationException')
+        with mock.patch('proofreading_ai.services.proofread_jobs.get_bedrock_client', return_value=client):
+            data = self.post_async('テスト')
+
+        self.assertEqual(client.proofread_text.call_count, proofread_job_task.max_retries + 1)
+        job = job_store.get_job(data['process_id'])
+        self.assertEqual(job.status, 'error')
+        self.assertIn('ValidationException', job.error)
+
+
+@override_settings(GRAPECHECK_USE_CELERY=True)
+class GrapeCheckTaskTest(CeleryTaskTestMixin, TestCase):
+    """グレイプらしさ評価タスクのパイプラインをテストするクラス"""
+
+    def test_form_redirects_to_pending_and_status_points_to_result(self):
+        """フォーム送信で待機ページへ移動し、完了後は結果ページのURLが返ることをテスト"""
+        category = Category.objects.create(name='エンタメ', slug='entertainment')
+        bedrock = mock.Mock()
+        bedrock.evaluate_grape_style.return_value = GRAPE_RESULT
+
+        with mock.patch('grapecheck.tasks.get_bedrock_client', return_value=bedrock):
+            response = self.client.post(reverse('grapecheck:form'), {
+                'category': category.id,
+                'content_text': '今日は晴れ',
+            })
+
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('/pending/', response['Location'])
+        check = GrapeCheck.objects.get()
+        self.assertEqual(check.total_score, 80)
+
+        task_id = response['Location'].rstrip('/').rsplit('/', 1)[-1]
+        task_result = mock.Mock()
+        task_result.successful.return_value = True
+        task_result.result = {'check_id': check.id}
+        with mock.patch('grapecheck.views.AsyncResult', return_value=task_result) as async_result:
+            data = self.client.get(reverse('grapecheck:task_status', kwargs={'task_id': task_id})).json()
+
+        async_result.assert_called_once_with(task_id)
+        self.assertEqual(data['status'], 'completed')
+        self.assertEqual(data['redirect_url'], reverse('grapecheck:results', kwargs={'pk': check.id}))
+
+
+    def test_other_users_task_is_not_found(self):
+        """他のユーザーが投入したタスクIDの状況・待機ページは404になり、結果IDがセッションに入らないことをテスト"""
+        task_result = mock.Mock()
+        task_result.successful.return_value = True
+        task_result.result = {'check_id': 1}
+        with mock.patch('grapecheck.views.AsyncResult', return_value=task_result) as async_result:
+            status = self.client.get(reverse('grapecheck:task_status', kwargs={'task_id': 'someone-elses-task'}))
+            pending = self.client.get(reverse('grapecheck:pending', kwargs={'task_id': 'someone-elses-task'}))
+
+        self.assertEqual(status.status_code, 404)
+        self.assertEqual(pending.status_code, 404)
+        async_result.assert_not_called()
+        self.assertNotIn('check_result_id', self.client.session)
+
+
+class CeleryDataDirTest(SimpleTestCase):
+    """ファイルベースのブローカー・結果バックエンドの保存先ディレクトリ作成をテストするクラス"""
+
+    def test_local_data_dirs_are_created(self):
+        """ローカルファイルの保存先ディレクトリを作成し、作成できない場合は警告にとどめることをテスト"""
+        with tempfile.TemporaryDirectory() as root:
+            conf = SimpleNamespace(
+                broker_url='filesystem://',
+                broker_transport_options={
+                    'data_folder_in': os.path.join(root, 'broker'),
+                    'data_folder_out': os.path.join(root, 'broker'),
+                    'processed_folder': os.path.join(root, 'processed'),
+                    'control_folder': os.path.join(root, 'control'),
+                },
+                result_backend=f"file://{os.path.join(root, 'results')}",
+            )
+            create_local_data_dirs(SimpleNamespace(conf=conf))
+            self.assertEqual(sorted(os.listdir(root)), ['broker', 'control', 'processed', 'results'])
+
+        with mock.patch('config.celery.os.makedirs', side_effect=PermissionError('read-only')), \
+                self.assertLogs('config.celery', level='WARNING'):
+            create_local_data_dirs(SimpleNamespace(conf=SimpleNamespace(
+                broker_url='redis://', broker_transport_options={}, result_backend='file:///readonly/results'
+            )))
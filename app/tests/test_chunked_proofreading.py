@@ -0,0 +1,85 @@
+import re
+import threading
+
+from django.test import SimpleTestCase, TestCase
+
+from proofreading_ai.services.bedrock_client import BedrockClient
+from proofreading_ai.services.chunking import split_into_chunks, merge_chunk_corrections
+from proofreading_ai.services.mock_bedrock_client import MockBedrockRuntime
+
+
+def count_tokens(text):
+    return int(len(text) * 1.5)
+
+
+class SplitIntoChunksTest(SimpleTestCase):
+    """段落境界でのチャンク分割をテストするクラス"""
+
+    def test_chunks_cover_text_and_respect_budget(self):
+        """チャンクを連結すると元テキストに戻り、各チャンクが上限以内であることをテスト"""
+        text = ''.join(f'<p>段落{i}の本文です。経済敵な理由。</p>\n' for i in range(40))
+        chunks = split_into_chunks(text, 120, count_tokens)
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(''.join(c['text'] for c in chunks), text)
+        for chunk in chunks:
+            self.assertLessEqual(count_tokens(chunk['text']), 120)
+            self.assertTrue(chunk['text'].startswith('<p>'))
+            self.assertEqual(chunk['line_offset'], text[:chunk['start']].count('\n'))
+
+    def test_oversized_paragraph_is_split_on_sentences(self):
+        """上限を超える段落は文単位で分割されることをテスト"""
+        text = '長い文章です。' * 50
+        chunks = split_into_chunks(text, 30, count_tokens)
+
+        self.assertEqual(''.join(c['text'] for c in chunks), text)
+        self.assertTrue(all(c['text'].endswith('。') for c in chunks))
+
+    def test_merge_remaps_lines_and_positions(self):
+        """修正箇所の行番号と位置が元テキスト基準に変換されることをテスト"""
+        text = 'あいう\n\nかきく\nけこ'
+        chunks = split_into_chunks(text, 8, count_tokens)
+        self.assertEqual([c['text'] for c in chunks], ['あいう\n\n', 'かきく\n', 'けこ'])
+        merged = merge_chunk_corrections(chunks, [
+            [{'original': 'いう', 'corrected': 'イウ', 'line_number': 1}],
+            [],
+            [{'original': 'けこ', 'corrected': 'ケコ', 'line_number': 1}],
+        ])
+
+        self.assertEqual(merged[0]['position'], 1)
+        self.assertEqual(merged[1]['position'], text.index('けこ'))
+        self.assertEqual(merged[1]['line_number'], 4)
+
+
+class ChunkedProofreadingTest(TestCase):
+    """BedrockClient.proofread_text_chunked をテストするクラス"""
+
+    def test_chunks_are_proofread_concurrently(self):
+        """チャンクが並列に校正される（4チャンクが同時に実行中になる）ことをテスト"""
+        barrier = threading.Barrier(4, timeout=5)
+
+        def responder(request):
+            # 逐次実行ならバリアが破れてチャンクの校正が失敗する
+            barrier.wait()
+            chunk = request['messages'][0]['content']
+            numbers = re.findall(r'段落(\d+)', chunk)
+            return {
+                'corrected_text': chunk,
+                'corrections': [{'line_number': 1, 'original': f'段落{n}', 'corrected': f'第{n}段落',
+                                 'reason': '表記', 'category': 'tone'} for n in numbers],
+            }
+
+        runtime = MockBedrockRuntime(tool_input=responder)
+        client = BedrockClient(bedrock_runtime=runtime)
+        client.default_prompt = '{原文}'
+        text = ''.join(f'<p>段落{i}の本文です。</p>\n' for i in range(4))
+        # 1段落ずつのチャンクになる上限
+        max_chunk_tokens = client.count_tokens('<p>段落0の本文です。</p>\n') + 1
+
+        result = client.proofread_text_chunked(text, max_chunk_tokens=max_chunk_tokens, max_workers=4)
+
+        self.assertNotIn('error', result)
+        self.assertEqual(result['chunk_count'], 4)
+        self.assertEqual(len(runtime.calls), 4)
+        self.assertEqual([c['position'] for c in result['corrections']],
+                         [text.index(f'段落{i}') for i in range(4)])
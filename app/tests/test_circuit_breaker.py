@@ -0,0 +1,202 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from proofreading_ai.services.bedrock_client import BedrockClient
+from proofreading_ai.services.circuit_breaker import (
+    STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN, CircuitBreaker, circuit_breaker_metrics,
+    get_circuit_breaker, is_model_failure, reset_circuit_breakers
+)
+from proofreading_ai.services.mock_bedrock_client import MockBedrockRuntime
+from proofreading_ai.services.rate_limiter import RateLimitTimeoutError, reset_rate_limiters
+
+
+def client_error(code):
+    return ClientError({'Error': {'Code': code, 'Message': code}}, 'InvokeModel')
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FailingModelRuntime(MockBedrockRuntime):
+    """指定したモデルIDの呼び出しだけ失敗させるモック"""
+
+    def __init__(self, failing_model_ids, error_code='ThrottlingException', **kwargs):
+        super().__init__(**kwargs)
+        self.failing_model_ids = set(failing_model_ids)
+        self.error_code = error_code
+
+    def invoke_model(self, modelId, body, **kwargs):
+        if modelId in self.failing_model_ids:
+            self.calls.append({'modelId': modelId, 'request': None, 'stream': False})
+            raise client_error(self.error_code)
+        return super().invoke_model(modelId, body, **kwargs)
+
+
+class CircuitBreakerTest(SimpleTestCase):
+    """サーキットブレーカーの状態遷移をテストするクラス"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker('model', window=10, min_calls=4, failure_rate=0.5,
+                                      slow_call_seconds=5, cooldown=30, clock=self.clock)
+
+    def test_trips_open_on_failure_rate(self):
+        """失敗率がしきい値を超えると開き、呼び出しを拒否することをテスト"""
+        self.breaker.record_success(0.1)
+        self.breaker.record_success(0.1)
+        self.assertFalse(self.breaker.record_failure(0.1, 'throttled'))
+        self.assertTrue(self.breaker.record_failure(0.1, 'throttled'))
+
+        self.assertEqual(self.breaker.state, STATE_OPEN)
+        self.assertFalse(self.breaker.allow_request())
+        metrics = self.breaker.metrics()
+        self.assertEqual(metrics['opened_count'], 1)
+        self.assertEqual(metrics['rejected_count'], 1)
+        self.assertEqual(metrics['failure_rate'], 0.5)
+        self.assertEqual(metrics['retry_after'], 30)
+
+    def test_half_open_probe_closes_or_reopens(self):
+        """冷却後は半開で1件だけ試し、成功で閉じ、失敗で再び開くことをテスト"""
+        for _ in range(4):
+            self.breaker.record_failure(0.1, 'error')
+        self.clock.now = 31
+
+        self.assertEqual(self.breaker.state, STATE_HALF_OPEN)
+        self.assertTrue(self.breaker.allow_request())
+        self.assertFalse(self.breaker.allow_request())
+        self.assertTrue(self.breaker.record_failure(0.1, 'still failing'))
+        self.assertEqual(self.breaker.state, STATE_OPEN)
+
+        self.clock.now = 62
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.record_success(0.2)
+        self.assertEqual(self.breaker.state, STATE_CLOSED)
+        self.assertTrue(self.breaker.allow_request())
+
+    def test_slow_calls_count_as_failures(self):
+        """遅延がしきい値を超えた呼び出しが失敗として数えられることをテスト"""
+        for _ in range(4):
+            self.breaker.record_success(10)
+
+        self.assertEqual(self.breaker.state, STATE_OPEN)
+        self.assertEqual(self.breaker.metrics()['slow_calls'], 4)
+
+    def test_validation_errors_do_not_trip(self):
+        """リクエスト内容の誤りはモデルの障害として数えないことをテスト"""
+        self.assertFalse(is_model_failure(client_error('ValidationException')))
+        self.assertTrue(is_model_failure(client_error('ThrottlingException')))
+        self.assertTrue(is_model_failure(TimeoutError('read timeout')))
+        self.assertFalse(is_model_failure(RateLimitTimeoutError('model', 300)))
+
+
+@override_settings(PROOFREAD_BREAKER_MIN_CALLS=2, PROOFREAD_BREAKER_COOLDOWN=60, PROOFREAD_CACHE_ENABLED=False,
+                   PROOFREAD_RATE_LIMIT_MAX_RETRIES=0)
+class BedrockClientFallbackTest(TestCase):
+    """BedrockClientのサーキットブレーカーとフォールバックをテストするクラス"""
+
+    def setUp(self):
+        reset_circuit_breakers()
+        reset_rate_limiters()
+        self.addCleanup(reset_circuit_breakers)
+        self.addCleanup(reset_rate_limiters)
+
+    def build_client(self, runtime):
+        client = BedrockClient(bedrock_runtime=runtime)
+        client.default_prompt = '{原文}'
+        return client
+
+    def test_failed_primary_falls_back_and_then_is_skipped(self):
+        """プライマリの失敗時はフォールバックで校正し、遮断後はプライマリを呼ばないことをテスト"""
+        runtime = FailingModelRuntime(set(), tool_input={'corrected_text': '本文', 'corrections': []})
+        client = self.build_client(runtime)
+        runtime.failing_model_ids = {client.model_id}
+
+        for _ in range(2):
+            result = client.proofread_text('本文', use_cache=False)
+            self.assertNotIn('error', result)
+            self.assertTrue(result['fallback_used'])
+            self.assertEqual(result['model_id'], client.fallback_model_id)
+        self.assertEqual(get_circuit_breaker(client.model_id).state, STATE_OPEN)
+
+        runtime.calls.clear()
+        result = client.proofread_text('本文', use_cache=False)
+
+        self.assertNotIn('error', result)
+        self.assertEqual([call['modelId'] for call in runtime.calls], [client.fallback_model_id])
+        metrics = circuit_breaker_metrics()
+        self.assertEqual(metrics[client.model_id]['state'], STATE_OPEN)
+        self.assertEqual(metrics[client.model_id]['rejected_count'], 1)
+        self.assertEqual(metrics[client.fallback_model_id]['state'], STATE_CLOSED)
+
+    def test_validation_error_is_not_retried_on_fallback(self):
+        """リクエスト内容の誤りではフォールバックせずエラーを返すことをテスト"""
+        runtime = FailingModelRuntime(set(), error_code='ValidationException',
+                                      tool_input={'corrected_text': '本文', 'corrections': []})
+        client = self.build_client(runtime)
+        runtime.failing_model_ids = {client.model_id}
+
+        result = client.proofread_text('本文', use_cache=False)
+
+        self.assertIn('error', result)
+        self.assertEqual([call['modelId'] for call in runtime.calls], [client.model_id])
+        self.assertEqual(get_circuit_breaker(client.model_id).metrics()['calls'], 0)
+
+    def test_both_models_failing_returns_error(self):
+        """両方のモデルが失敗した場合はエラー結果になることをテスト"""
+        runtime = FailingModelRuntime(set(), tool_input={'corrected_text': '本文', 'corrections': []})
+        client = self.build_client(runtime)
+        runtime.failing_model_ids = {client.model_id, client.fallback_model_id}
+
+        result = client.proofread_text('本文', use_cache=False)
+
+        self.assertIn('error', result)
+        self.assertEqual(len(runtime.calls), 2)
+
+    @override_settings(PROOFREAD_BREAKER_ENABLED=False)
+    def test_disabled_calls_primary_only(self):
+        """無効時はプライマリモデルのみを呼び出すことをテスト"""
+        runtime = FailingModelRuntime(set(), tool_input={'corrected_text': '本文', 'corrections': []})
+        client = self.build_client(runtime)
+        runtime.failing_model_ids = {client.model_id}
+
+        result = client.proofread_text('本文', use_cache=False)
+
+        self.assertIn('error', result)
+        self.assertEqual(len(runtime.calls), 1)
+
+
+@override_settings(PROOFREAD_BREAKER_MIN_CALLS=2, PROOFREAD_BREAKER_SLOW_CALL_SECONDS=0.15, PROOFREAD_CACHE_ENABLED=False,
+                   PROOFREAD_TOKEN_USAGE_RECORDING=False, PROOFREAD_RATE_LIMIT_ENABLED=True,
+                   PROOFREAD_RATE_LIMIT_INITIAL_CONCURRENCY=1, PROOFREAD_RATE_LIMIT_MAX_CONCURRENCY=1,
+                   PROOFREAD_RATE_LIMIT_ACQUIRE_TIMEOUT=0.25)
+class BreakerWithRateLimiterTest(TestCase):
+    """リミッターの混雑がサーキットの失敗として数えられないことをテストするクラス"""
+
+    def setUp(self):
+        reset_circuit_breakers()
+        reset_rate_limiters()
+        self.addCleanup(reset_circuit_breakers)
+        self.addCleanup(reset_rate_limiters)
+
+    def test_limiter_saturation_does_not_open_circuit(self):
+        """同時実行枠の待ち時間・待ちきれなかった呼び出しでプライマリのサーキットが開かないことをテスト"""
+        runtime = MockBedrockRuntime(latency=0.1, tool_input={'corrected_text': '本文', 'corrections': []})
+        client = BedrockClient(bedrock_runtime=runtime)
+        client.default_prompt = '{原文}'
+
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            results = list(executor.map(lambda i: client.proofread_text(f'本文{i}', use_cache=False), range(6)))
+
+        # 枠は1つなので、待ち時間がしきい値を超える呼び出しと枠を待ちきれない呼び出しが出る
+        self.assertTrue(any('error' in result for result in results))
+        self.assertEqual({call['modelId'] for call in runtime.calls}, {client.model_id})
+        metrics = get_circuit_breaker(client.model_id).metrics()
+        self.assertEqual(metrics['state'], STATE_CLOSED)
+        self.assertEqual((metrics['failure_rate'], metrics['slow_calls']), (0.0, 0))
@@ -0,0 +1,128 @@
+import os
+import random
+import tempfile
+import time
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from proofreading_ai.models import ReplacementDictionary, CompanyDictionary
+from proofreading_ai.services.bedrock_client import BedrockClient
+from proofreading_ai.services.dictionary_matcher import (
+    DictionaryMatcher, get_dictionary_matcher, invalidate_dictionary_cache,
+    SOURCE_REPLACEMENT, SOURCE_COMPANY, SOURCE_CSV
+)
+from proofreading_ai.services.mock_bedrock_client import MockBedrockRuntime
+from tests.benchmark import benchmark
+
+
+def naive_leftmost_longest(text, replacements):
+    """比較用: 各位置で最長の語句を探す素朴な実装"""
+    result = []
+    index = 0
+    while index < len(text):
+        best = max((p for p in replacements if text.startswith(p, index)), key=len, default=None)
+        if best is None:
+            result.append(text[index])
+            index += 1
+        else:
+            result.append(replacements[best])
+            index += len(best)
+    return ''.join(result)
+
+
+class DictionaryMatcherTest(SimpleTestCase):
+    """辞書照合器の一致規則をテストするクラス"""
+
+    def build(self, replacements):
+        return DictionaryMatcher((original, replacement, 'test') for original, replacement in replacements.items())
+
+    def test_longest_match_wins(self):
+        """同じ位置から始まる語句は長いものが優先されることをテスト"""
+        matcher = self.build({'あい': '愛', 'あいさつ': '挨拶'})
+        self.assertEqual(matcher.apply('あいさつとあい'), '挨拶と愛')
+
+    def test_result_does_not_depend_on_entry_order(self):
+        """辞書の登録順によって結果が変わらず、置換結果は再置換されないことをテスト"""
+        entries = [('ab', 'X'), ('bc', 'Y'), ('a', 'b'), ('b', 'c')]
+        expected = DictionaryMatcher((o, r, 'test') for o, r in entries).apply('abcab')
+        self.assertEqual(expected, 'XcX')
+        self.assertEqual(DictionaryMatcher((o, r, 'test') for o, r in reversed(entries)).apply('abcab'), expected)
+
+    def test_matches_naive_leftmost_longest(self):
+        """ランダムな辞書とテキストで素朴な実装と同じ結果になることをテスト"""
+        rng = random.Random(5)
+        for _ in range(300):
+            replacements = {
+                ''.join(rng.choice('abcd') for _ in range(rng.randint(1, 4))): rng.choice(['X', 'YY', ''])
+                for _ in range(rng.randint(1, 8))
+            }
+            text = ''.join(rng.choice('abcde') for _ in range(rng.randint(0, 30)))
+            self.assertEqual(self.build(replacements).apply(text), naive_leftmost_longest(text, replacements))
+
+    def test_find_reports_positions_and_source(self):
+        """一致箇所の位置・置換後・出典が返ることをテスト"""
+        matcher = DictionaryMatcher([('経済敵', '経済的', SOURCE_REPLACEMENT)])
+        self.assertEqual(matcher.find('ああ経済敵な'), [(2, 5, '経済敵', '経済的', SOURCE_REPLACEMENT)])
+
+    @benchmark
+    def test_benchmark_against_sequential_replace(self):
+        """語句数を増やしたときの処理時間を逐次置換と比較するベンチマーク"""
+        rng = random.Random(1)
+        kana = [chr(c) for c in range(0x3041, 0x3094)]
+        text = ''.join(rng.choice(kana) for _ in range(20_000))
+
+        print("\n[辞書照合ベンチマーク] 2万字")
+        for size in (100, 1_000, 5_000):
+            replacements = {''.join(rng.choice(kana) for _ in range(rng.randint(3, 6))): '＊' for _ in range(size)}
+            matcher = self.build(replacements)
+
+            start = time.perf_counter()
+            result = text
+            for original, replacement in replacements.items():
+                result = result.replace(original, replacement)
+            sequential_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            matcher.apply(text)
+            matcher_time = time.perf_counter() - start
+            print(f"  {size}語: 逐次置換 {sequential_time * 1000:.2f}ms / 照合器 {matcher_time * 1000:.2f}ms")
+
+
+class SharedDictionaryMatcherTest(TestCase):
+    """全辞書ソースをまとめた共有照合器をテストするクラス"""
+
+    def setUp(self):
+        csv_file = tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8', delete=False)
+        csv_file.write('あいさつ,挨拶,閉じる,1\nアマゾン,amazon,閉じる,2\n')
+        csv_file.close()
+        self.addCleanup(os.unlink, csv_file.name)
+
+        overrides = override_settings(PROOFREAD_DICTIONARY_CSV=csv_file.name, PROOFREAD_DICTIONARY_CHECK_INTERVAL=3600)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        invalidate_dictionary_cache()
+        self.addCleanup(invalidate_dictionary_cache)
+
+    def test_all_sources_are_merged_with_priority(self):
+        """3つの辞書ソースが1つの照合器にまとめられ、DBの置換辞書が優先されることをテスト"""
+        ReplacementDictionary.objects.create(original_word='アマゾン', replacement_word='Amazon')
+        CompanyDictionary.objects.create(term='グレイプ', correct_form='grape', alternative_forms='グレープ, ぐれいぷ')
+
+        matcher = get_dictionary_matcher()
+
+        self.assertEqual(matcher.apply('アマゾンでグレープとぐれいぷにあいさつ'), 'Amazonでgrapeとgrapeに挨拶')
+        self.assertEqual(matcher.replacements['アマゾン'], ('Amazon', SOURCE_REPLACEMENT))
+        self.assertEqual(matcher.replacements['グレープ'], ('grape', SOURCE_COMPANY))
+        self.assertEqual(matcher.replacements['あいさつ'], ('挨拶', SOURCE_CSV))
+
+    def test_matcher_is_shared_and_rebuilt_on_save(self):
+        """辞書が変わらない間は同じ照合器が共有され、保存時に作り直されることをテスト"""
+        matcher = get_dictionary_matcher()
+        self.assertIs(get_dictionary_matcher(), matcher)
+
+        ReplacementDictionary.objects.create(original_word='経済敵', replacement_word='経済的')
+
+        rebuilt = get_dictionary_matcher()
+        self.assertIsNot(rebuilt, matcher)
+        self.assertNotEqual(rebuilt.version, matcher.version)
+        self.assertEqual(BedrockClient(bedrock_runtime=MockBedrockRuntime()).apply_replacement_dictionary('経済敵'), '経済的')
@@ -0,0 +1,116 @@
+import os
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from proofreading_ai.models import ReplacementDictionary
+from proofreading_ai.services.bedrock_client import BedrockClient
+from proofreading_ai.services.dictionary_matcher import DictionaryMatcher, invalidate_dictionary_cache, SOURCE_CSV
+from proofreading_ai.services.dictionary_prepass import DictionaryPrepass
+from proofreading_ai.services.mock_bedrock_client import MockBedrockRuntime
+
+
+def build_matcher(replacements):
+    return DictionaryMatcher((original, replacement, SOURCE_CSV) for original, replacement in replacements.items())
+
+
+class DictionaryPrepassTest(SimpleTestCase):
+    """辞書の事前適用をテストするクラス"""
+
+    def test_corrections_have_positions_and_skip_tags(self):
+        """HTMLタグ内を除いた辞書語句が位置・行番号付きのdict修正になることをテスト"""
+        text = '<p class="アマゾン">今日は</p>\n<p>アマゾンであいさつ</p>'
+        prepass = DictionaryPrepass(text, build_matcher({'アマゾン': 'Amazon', 'あいさつ': '挨拶'}))
+
+        self.assertEqual(
+            [(c['original'], c['position'], c['line_number'], c['category']) for c in prepass.corrections],
+            [('アマゾン', text.index('アマゾンで'), 2, 'dict'), ('あいさつ', text.index('あいさつ'), 2, 'dict')]
+        )
+        self.assertIn('「アマゾン」→「Amazon」', prepass.prompt_notice())
+        # 分割校正のチャンクには、そのチャンクに含まれる語句だけを伝える
+        self.assertNotIn('アマゾン', prepass.prompt_notice('あいさつのみ'))
+        self.assertIn('あいさつ', prepass.prompt_notice('あいさつのみ'))
+
+    def test_merge_applies_rules_and_drops_duplicates(self):
+        """モデルの結果に規則が適用され、同じ内容の修正箇所が重複しないことをテスト"""
+        text = '<p>アマゾンで経済敵な買い物</p>'
+        prepass = DictionaryPrepass(text, build_matcher({'アマゾン': 'Amazon'}))
+        result = prepass.merge_into({
+            'corrected_text': '<p>アマゾンで経済的な買い物</p>',
+            'corrections': [
+                {'original': 'アマゾン', 'corrected': 'Amazon', 'reason': '辞書', 'category': 'dict'},
+                {'original': '経済敵', 'corrected': '経済的', 'reason': '誤字', 'category': 'typo'},
+            ],
+        })
+
+        self.assertEqual(result['corrected_text'], '<p>Amazonで経済的な買い物</p>')
+        self.assertEqual([c['original'] for c in result['corrections']], ['アマゾン', '経済敵'])
+        self.assertEqual(result['local_corrections'], 1)
+        self.assertEqual(result['dictionary_prepass']['model_corrections'], 1)
+        self.assertEqual(result['dictionary_prepass']['by_source'], {SOURCE_CSV: 1})
+
+    def test_merged_corrections_are_in_text_order(self):
+        """結合後の修正箇所が位置・行番号の順に並び、位置の分からない修正箇所は末尾になることをテスト"""
+        text = '経済敵な理由で\nアマゾンを使う\n来月から始まる'
+        prepass = DictionaryPrepass(text, build_matcher({'アマゾン': 'Amazon'}))
+        result = prepass.merge_into({
+            'corrected_text': '経済的な理由で\nアマゾンを使う\n来月から始める',
+            'corrections': [
+                {'original': '始まる', 'corrected': '始める', 'reason': '表現', 'category': 'tone',
+                 'line_number': 3},
+                {'original': '経済敵', 'corrected': '経済的', 'reason': '誤字', 'category': 'typo',
+                 'line_number': 1, 'position': 0},
+                {'original': '理由', 'corrected': 'わけ', 'reason': '表現', 'category': 'tone',
+                 'line_number': 1},
+            ],
+        })
+
+        self.assertEqual([c['original'] for c in result['corrections']], ['経済敵', 'アマゾン', '理由', '始まる'])
+
+
+@override_settings(PROOFREAD_DICTIONARY_PREPASS=True,
+                   PROOFREAD_DICTIONARY_CSV=os.path.join(os.path.dirname(__file__), 'missing.csv'))
+class BedrockClientDictionaryPrepassTest(TestCase):
+    """BedrockClientでの辞書の事前適用をテストするクラス"""
+
+    def setUp(self):
+        invalidate_dictionary_cache()
+        self.addCleanup(invalidate_dictionary_cache)
+        ReplacementDictionary.objects.create(original_word='アマゾン', replacement_word='Amazon')
+
+    def test_json_mode_sends_notice_and_merges_local_corrections(self):
+        """プロンプトで処理済みと伝え、モデルの結果に辞書の修正箇所が結合されることをテスト"""
+        def responder(request):
+            prompt = request['messages'][0]['content']
+            self.assertIn('「アマゾン」→「Amazon」', prompt)
+            return {
+                'corrected_text': 'アマゾンで経済的な買い物',
+                'corrections': [{'line_number': 1, 'original': '経済敵', 'corrected': '経済的',
+                                 'reason': '誤字', 'category': 'typo'}]
+            }
+
+        client = BedrockClient(bedrock_runtime=MockBedrockRuntime(tool_input=responder))
+        client.default_prompt = '{原文}'
+        result = client.proofread_text('アマゾンで経済敵な買い物', use_cache=False)
+
+        self.assertEqual(result['corrected_text'], 'Amazonで経済的な買い物')
+        self.assertEqual([c['category'] for c in result['corrections']], ['dict', 'typo'])
+        self.assertEqual(result['corrections'][0]['position'], 0)
+        self.assertEqual(result['local_corrections'], 1)
+
+    def test_stream_yields_local_corrections_first(self):
+        """ストリーミングでは辞書の修正箇所がモデルの応答より先に返ることをテスト"""
+        runtime = MockBedrockRuntime(tool_input={'corrections': [
+            {'line_number': 1, 'original': 'アマゾン', 'corrected': 'Amazon', 'reason': '辞書', 'category': 'dict'},
+            {'line_number': 1, 'original': '経済敵', 'corrected': '経済的', 'reason': '誤字', 'category': 'typo'},
+        ]})
+        client = BedrockClient(bedrock_runtime=runtime)
+        client.default_prompt = '{原文}'
+
+        events = list(client.proofread_text_stream('アマゾンで経済敵な買い物'))
+
+        corrections = [e['correction']['original'] for e in events if e['type'] == 'correction']
+        self.assertEqual(corrections, ['アマゾン', '経済敵'])
+        self.assertEqual(events[-1]['type'], 'done')
+        self.assertEqual(events[-1]['local_corrections'], 1)
+        self.assertEqual(len(events[-1]['corrections']), 2)
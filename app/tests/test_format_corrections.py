@@ -0,0 +1,191 @@
+import html
+import random
+import time
+from typing import Dict, List
+
+from django.test import SimpleTestCase
+
+from proofreading_ai.services.dictionary_matcher import PatternAutomaton
+from proofreading_ai.utils import find_correction_spans, format_corrections
+from tests.benchmark import benchmark
+
+
+# 比較用: 断片の再利用と重なり判定の整理を行う前の実装（修正ごとに出現位置を探し、1文字ずつ使用済み位置を記録する）
+def legacy_format_corrections(original_text: str, corrections: List[Dict]) -> str:
+    if not corrections:
+        return html.escape(original_text)
+
+    result = []
+    last_idx = 0
+    used_positions = set()
+
+    sorted_corrections = []
+    for corr in corrections:
+        original_word = corr.get("original", "")
+        if original_word:
+            start = 0
+            while True:
+                pos = original_text.find(original_word, start)
+                if pos == -1:
+                    break
+                if pos not in used_positions:
+                    sorted_corrections.append((pos, corr))
+                    break
+                start = pos + 1
+
+    sorted_corrections.sort(key=lambda x: x[0])
+
+    for start_pos, corr in sorted_corrections:
+        if start_pos in used_positions:
+            continue
+        if start_pos < last_idx:
+            continue
+
+        original_word = corr.get("original", "")
+        corrected_word = corr.get("corrected", "")
+        reason = corr.get("reason", "")
+        category = corr.get("category", "general")
+        end_pos = start_pos + len(original_word)
+
+        result.append(html.escape(original_text[last_idx:start_pos]))
+        css_class = f"correction-{category}" if category in ["tone", "typo", "dict", "inconsistency", "contradiction"] else "correction-text"
+        category_info = {
+            'typo': {'name': '誤字修正', 'icon': '🔤', 'color': '#dc2626'},
+            'tone': {'name': '言い回し改善', 'icon': '✨', 'color': '#7c3aed'},
+            'dict': {'name': '辞書ルール', 'icon': '📚', 'color': '#d97706'},
+            'inconsistency': {'name': '矛盾チェック', 'icon': '⚠️', 'color': '#2563eb'},
+            'contradiction': {'name': '矛盾チェック', 'icon': '⚠️', 'color': '#2563eb'}
+        }
+        cat_info = category_info.get(category, {'name': '修正', 'icon': '📝', 'color': '#6b7280'})
+        tooltip_content = f'''
+            <div class="tooltip-original clickable-correction" data-action="revert" title="クリックして元に戻す">{html.escape(original_word)}</div>
+            <div class="tooltip-corrected clickable-correction" data-action="apply" title="クリックして修正を適用">{html.escape(corrected_word)}</div>
+            <div class="tooltip-reason">{html.escape(reason)}</div>
+        '''
+        result.append(
+            f'<span class="correction-span" '
+            f'data-original="{html.escape(original_word)}" '
+            f'data-corrected="{html.escape(corrected_word)}" '
+            f'data-reason="{html.escape(reason)}" '
+            f'data-category="{category}">'
+            f'<span class="{css_class}">{html.escape(original_word)}</span>'
+            f'<span class="correction-tooltip">'
+            f'<div class="tooltip-category-badge" style="background: {cat_info["color"]}; color: white; padding: 4px 8px; border-radius: 12px; font-size: 11px; font-weight: 600; margin-bottom: -33px; text-align: center;">'
+            f'{cat_info["icon"]} {cat_info["name"]}'
+            f'</div>'
+            f'{tooltip_content}'
+            f'</span>'
+            f'</span>'
+        )
+        for i in range(start_pos, end_pos):
+            used_positions.add(i)
+        last_idx = end_pos
+
+    result.append(html.escape(original_text[last_idx:]))
+    return ''.join(result)
+
+
+CATEGORIES = ('typo', 'tone', 'dict', 'inconsistency', 'contradiction', 'general')
+
+
+def build_article(length, correction_count, seed=0):
+    """指定した文字数の記事風HTMLと、本文から切り出した修正箇所（同じ語の重複を含む）を作る"""
+    rng = random.Random(seed)
+    kanji = [chr(c) for c in range(0x4E00, 0x4E00 + 1500)]
+    kana = [chr(c) for c in range(0x3041, 0x3094)]
+
+    paragraphs = []
+    size = 0
+    while size < length:
+        sentences = []
+        for _ in range(rng.randint(2, 5)):
+            chars = [rng.choice(kanji if rng.random() < 0.4 else kana) for _ in range(rng.randint(15, 60))]
+            sentences.append(''.join(chars) + '。')
+        paragraph = f"<p>{''.join(sentences)}</p>\n"
+        paragraphs.append(paragraph)
+        size += len(paragraph)
+    text = ''.join(paragraphs)
+
+    corrections = []
+    for i in range(correction_count):
+        if corrections and rng.random() < 0.2:
+            original = rng.choice(corrections)['original']
+        else:
+            pos = rng.randrange(len(text) - 8)
+            original = text[pos:pos + rng.randint(2, 8)]
+        corrections.append({
+            'original': original,
+            'corrected': original + '＊',
+            'reason': f'理由<{i}>',
+            'category': CATEGORIES[i % len(CATEGORIES)],
+        })
+    return text, corrections
+
+
+class FormatCorrectionsTest(SimpleTestCase):
+    """format_corrections の修正箇所の決定・断片再利用をテストするクラス"""
+
+    def test_matches_legacy_output_on_random_inputs(self):
+        """重なり・重複・特殊文字を含む入力で従来の実装と同じHTMLになることをテスト"""
+        rng = random.Random(3)
+        for _ in range(2000):
+            text = ''.join(rng.choice('ab<c&"d\n') for _ in range(rng.randint(0, 40)))
+            corrections = []
+            for _ in range(rng.randint(0, 8)):
+                correction = {
+                    'original': ''.join(rng.choice('ab<c&d') for _ in range(rng.randint(0, 3))),
+                    'corrected': rng.choice(['x', '<y>', '']),
+                    'reason': rng.choice(['r', '"q"']),
+                }
+                if rng.random() < 0.8:
+                    correction['category'] = rng.choice(CATEGORIES + ('unknown', None))
+                corrections.append(correction)
+            self.assertEqual(format_corrections(text, corrections), legacy_format_corrections(text, corrections))
+
+    def test_matches_legacy_output_on_article(self):
+        """記事規模の入力で従来の実装と同じHTMLになることをテスト"""
+        text, corrections = build_article(20_000, 500)
+        self.assertEqual(format_corrections(text, corrections), legacy_format_corrections(text, corrections))
+
+    def test_overlapping_corrections_keep_first(self):
+        """重なる修正は位置の早いもの（同位置なら先に指定したもの）だけが採用されることをテスト"""
+        corrections = [
+            {'original': '経済', 'corrected': 'けいざい'},
+            {'original': '経済敵', 'corrected': '経済的'},
+            {'original': '敵な', 'corrected': '的な'},
+            {'original': '理由', 'corrected': 'わけ'},
+        ]
+        spans = find_correction_spans('経済敵な理由', corrections)
+        self.assertEqual([(start, end, corr['original']) for start, end, corr in spans],
+                         [(0, 2, '経済'), (2, 4, '敵な'), (4, 6, '理由')])
+
+    @benchmark
+    def test_benchmark_against_legacy(self):
+        """数百件の修正で従来の実装との処理時間を比較するベンチマーク"""
+        def measure(func, text, corrections, rounds=20):
+            start = time.perf_counter()
+            for _ in range(rounds):
+                func(text, corrections)
+            return (time.perf_counter() - start) / rounds
+
+        def automaton_scan(text, corrections):
+            # 参考: 原文をまとめてオートマトンに登録し、テキストを1回走査した場合の検索時間
+            PatternAutomaton(corr['original'] for corr in corrections).present_patterns(text)
+
+        def find_scan(text, corrections):
+            for original in {corr['original'] for corr in corrections}:
+                text.find(original)
+
+        print("\n[format_corrections ベンチマーク]")
+        print(f"{'文字数':>8} {'修正数':>6} {'従来(ms)':>10} {'改善(ms)':>10} {'倍率':>6} "
+              f"{'検索:find(ms)':>14} {'検索:AC(ms)':>12}")
+        for length, count in ((20_000, 100), (20_000, 500), (50_000, 1_000)):
+            text, corrections = build_article(length, count)
+            legacy_time = measure(legacy_format_corrections, text, corrections)
+            new_time = measure(format_corrections, text, corrections)
+            find_time = measure(find_scan, text, corrections)
+            automaton_time = measure(automaton_scan, text, corrections, rounds=5)
+            print(f"{len(text):>8} {count:>6} {legacy_time * 1000:>10.2f} "
+                  f"{new_time * 1000:>10.2f} {legacy_time / max(new_time, 1e-9):>6.1f} "
+                  f"{find_time * 1000:>14.2f} {automaton_time * 1000:>12.2f}")
+            self.assertLess(new_time, legacy_time)
@@ -0,0 +1,148 @@
+import os
+import re
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from proofreading_ai.services.bedrock_client import BedrockClient
+from proofreading_ai.services.mock_bedrock_client import MockBedrockRuntime
+from proofreading_ai.utils import (
+    protect_html_tags_advanced, restore_html_tags_advanced,
+    protect_html_segments, restore_html_segments, map_protected_offset
+)
+from tests.benchmark import benchmark
+
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'article_sample.html')
+
+# ベンチマーク用のトークン数概算（日本語1文字・英数字の連続・記号をそれぞれ1トークンとみなす）
+TOKEN_PATTERN = re.compile(r'[぀-ヿ㐀-鿿＀-￯]|[A-Za-z0-9]+|[^\sA-Za-z0-9]')
+
+
+def estimate_tokens(text):
+    return len(TOKEN_PATTERN.findall(text))
+
+
+def load_article():
+    with open(FIXTURE_PATH, encoding='utf-8') as f:
+        return f.read()
+
+
+class ProtectHtmlSegmentsTest(SimpleTestCase):
+    """コンパクトなHTMLタグ保護をテストするクラス"""
+
+    def test_round_trip_and_offsets(self):
+        """復元すると元のHTMLに戻り、テキスト部分の位置が元のHTMLに対応することをテスト"""
+        article = load_article()
+        protected, tag_runs, offset_map = protect_html_segments(article)
+
+        self.assertEqual(restore_html_segments(protected, tag_runs), article)
+        self.assertNotIn('class=', protected)
+        self.assertEqual(protected.count('\n'), article.count('\n'))
+        for word in ('朝の通勤電車', '本当にありがとう', '電車', '出典'):
+            position = protected.index(word)
+            self.assertTrue(article[map_protected_offset(offset_map, position):].startswith(word))
+
+    def test_adjacent_tags_share_one_marker(self):
+        """隣接するタグが1つのマーカーにまとめられることをテスト"""
+        protected, tag_runs, offset_map = protect_html_segments('<div><p>本文</p></div>')
+
+        self.assertEqual(protected, '<#0>本文<#1>')
+        self.assertEqual(tag_runs, ['<div><p>', '</p></div>'])
+        self.assertEqual(map_protected_offset(offset_map, 1), 0)
+
+    def test_marker_like_text_is_preserved(self):
+        """原文中のマーカーと同じ形の文字列も元に戻ることをテスト"""
+        text = '記号<#0>と<b>太字</b>'
+        protected, tag_runs, _ = protect_html_segments(text)
+        self.assertEqual(restore_html_segments(protected, tag_runs), text)
+
+    def test_compact_protection_halves_tokens(self):
+        """実記事のHTMLでモデルに送るトークン数が従来方式の半分未満になることをテスト"""
+        article = load_article()
+        legacy_text, _, _ = protect_html_tags_advanced(article)
+        compact_text, _, _ = protect_html_segments(article)
+
+        self.assertLess(estimate_tokens(compact_text), estimate_tokens(legacy_text) / 2)
+
+    @benchmark
+    def test_benchmark_against_legacy_protection(self):
+        """実記事のHTMLでトークン数とCPU時間を従来方式と比較するベンチマーク"""
+        article = load_article()
+        legacy_text, _, _ = protect_html_tags_advanced(article)
+        compact_text, _, _ = protect_html_segments(article)
+
+        def legacy_round_trip():
+            protected, placeholders, html_tag_info = protect_html_tags_advanced(article)
+            return restore_html_tags_advanced(protected, placeholders, html_tag_info, [])
+
+        def compact_round_trip():
+            protected, tag_runs, _ = protect_html_segments(article)
+            return restore_html_segments(protected, tag_runs)
+
+        def measure(func, rounds=50):
+            start = time.perf_counter()
+            for _ in range(rounds):
+                func()
+            return (time.perf_counter() - start) / rounds
+
+        legacy_time = measure(legacy_round_trip)
+        compact_time = measure(compact_round_trip)
+        legacy_tokens = estimate_tokens(legacy_text)
+        compact_tokens = estimate_tokens(compact_text)
+
+        print(
+            f"\n[HTML保護ベンチマーク] 原文 {estimate_tokens(article)}トークン / "
+            f"従来 {legacy_tokens}トークン {legacy_time * 1000:.3f}ms / "
+            f"コンパクト {compact_tokens}トークン {compact_time * 1000:.3f}ms"
+        )
+        self.assertLess(compact_time, legacy_time)
+
+
+class BedrockClientCompactProtectionTest(TestCase):
+    """BedrockClientでのコンパクト保護の利用をテストするクラス"""
+
+    def test_only_text_is_sent_and_tags_are_restored(self):
+        """モデルにはテキスト部分のみが送られ、校正後にタグが復元されることをテスト"""
+        def responder(request):
+            prompt = request['messages'][0]['content']
+            return {
+                'corrected_text': prompt.replace('経済敵', '経済的'),
+                'corrections': [{'line_number': 1, 'original': '経済敵', 'corrected': '経済的',
+                                 'reason': '誤字', 'category': 'typo'}]
+            }
+
+        runtime = MockBedrockRuntime(tool_input=responder)
+        with mock.patch.dict(os.environ, {'BEDROCK_HTML_PROTECTION': 'compact'}):
+            client = BedrockClient(bedrock_runtime=runtime)
+        client.default_prompt = '{原文}'
+
+        result = client.proofread_text('<p class="lead">経済敵な<strong>理由</strong></p>', use_cache=False)
+
+        prompt = runtime.calls[0]['request']['messages'][0]['content']
+        self.assertTrue(prompt.startswith('<#0>経済敵な<#1>理由<#2>'))
+        self.assertNotIn('class', prompt)
+        self.assertTrue(result['corrected_text'].startswith('<p class="lead">経済的な<strong>理由</strong></p>'))
+
+    def test_correction_positions_refer_to_original_html(self):
+        """修正箇所の位置がオフセット対応表で元のHTML基準になり、マーカーがタグに戻ることをテスト"""
+        text = '<p class="lead">経済敵な<strong>理由</strong></p>\n<p>二つ目の経済敵</p>'
+        runtime = MockBedrockRuntime(tool_input=lambda request: {
+            'corrected_text': request['messages'][0]['content'],
+            'corrections': [
+                {'line_number': 1, 'original': '経済敵な<#1>理由', 'corrected': '経済的な<#1>理由',
+                 'reason': '誤字', 'category': 'typo'},
+                {'line_number': 2, 'original': '経済敵', 'corrected': '経済的', 'reason': '誤字', 'category': 'typo'},
+            ]
+        })
+        with mock.patch.dict(os.environ, {'BEDROCK_HTML_PROTECTION': 'compact'}):
+            client = BedrockClient(bedrock_runtime=runtime)
+        client.default_prompt = '{原文}'
+
+        corrections = client.proofread_text(text, use_cache=False)['corrections']
+
+        self.assertEqual(corrections[0]['original'], '経済敵な<strong>理由')
+        self.assertEqual(corrections[0]['corrected'], '経済的な<strong>理由')
+        self.assertEqual(corrections[0]['position'], text.index('経済敵'))
+        self.assertEqual(corrections[1]['position'], text.rindex('経済敵'))
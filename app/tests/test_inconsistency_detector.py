@@ -0,0 +1,152 @@
+import os
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from proofreading_ai.models import InconsistencyData
+from proofreading_ai.services.bedrock_client import BedrockClient
+from proofreading_ai.services.dictionary_matcher import PatternAutomaton, invalidate_dictionary_cache
+from proofreading_ai.services.inconsistency_detector import (
+    InconsistencyDetector, get_inconsistency_detector, merge_local_inconsistencies
+)
+from proofreading_ai.services.mock_bedrock_client import MockBedrockRuntime
+
+
+def build_row(name, correct_form='', patterns=(), detection_rule='', description=''):
+    return {
+        'name': name,
+        'type': 'factual',
+        'correct_form': correct_form,
+        'patterns': list(patterns),
+        'detection_rule': detection_rule,
+        'description': description,
+    }
+
+
+class InconsistencyDetectorTest(SimpleTestCase):
+    """ローカルの矛盾検出器をテストするクラス"""
+
+    def detect(self, text, rows=()):
+        return InconsistencyDetector(list(rows)).detect(text)
+
+    def test_incorrect_patterns_are_found_outside_tags(self):
+        """誤りパターンがタグ外でのみ検出され、位置と正しい表記が付くことをテスト"""
+        text = '<a title="富士山の高さは3776m">富士山</a>\n富士山の高さは3776m'
+        corrections = self.detect(text, [build_row('富士山の標高', '3,776m', ['富士山の高さは3776m'])])
+
+        self.assertEqual(len(corrections), 1)
+        correction = corrections[0]
+        self.assertEqual(correction['position'], text.rindex('富士山の高さ'))
+        self.assertEqual(correction['line_number'], 2)
+        self.assertEqual(correction['corrected'], '3,776m')
+        self.assertEqual(correction['category'], 'inconsistency')
+        self.assertEqual(correction['source'], 'local_detector')
+
+    def test_detection_rule_lines(self):
+        """detection_rule の regex: / range: 行がコンパイルされ、それ以外の行は無視されることをテスト"""
+        rows = [
+            build_row('営業時間', '9時〜18時', detection_rule='regex: 営業時間は\\d+時〜\\d+時\n説明文はモデルに任せる'),
+            build_row('定員', detection_rule='range: 定員(\\d+)名 1-40'),
+            build_row('不正なルール', detection_rule='regex: (\nrange: 数値なし 1-2'),
+        ]
+        corrections = self.detect('営業時間は8時〜17時。定員50名、定員30名。', rows)
+
+        self.assertEqual([c['original'] for c in corrections], ['営業時間は8時〜17時', '定員50名'])
+        self.assertEqual(corrections[0]['corrected'], '9時〜18時')
+        self.assertIn('範囲外: 50', corrections[1]['reason'])
+
+    def test_builtin_school_year_and_dates(self):
+        """学年・存在しない日付・曜日の食い違いが検出されることをテスト"""
+        text = '中学４年生の春。2月30日と2023年2月29日。2024年2月29日（木）と2024年10月1日（月）に実施。'
+        corrections = self.detect(text)
+
+        found = {c['original']: c for c in corrections}
+        self.assertIn('中学４年生', found)
+        self.assertIn('2月30日', found)
+        self.assertIn('2023年2月29日', found)
+        self.assertNotIn('2024年2月29日（木）', found)
+        self.assertEqual(found['2024年10月1日（月）']['corrected'], '2024年10月1日（火）')
+
+    def test_age_mismatch_within_paragraph(self):
+        """同じ段落内の今年と去年の年齢の食い違いが検出されることをテスト"""
+        corrections = self.detect('今年で30歳になった。去年は28歳だった。\n去年は40歳だった。')
+
+        self.assertEqual([(c['original'], c['corrected']) for c in corrections], [('去年は28歳', '去年は29歳')])
+
+    def test_merge_drops_model_duplicates(self):
+        """結合時にローカル検出と同じ箇所へのモデルの指摘が除かれることをテスト"""
+        local = self.detect('中学4年生')
+        result = merge_local_inconsistencies({'corrections': [
+            {'original': '中学4年生', 'corrected': '中学3年生', 'reason': '矛盾', 'category': 'inconsistency'},
+            {'original': '経済敵', 'corrected': '経済的', 'reason': '誤字', 'category': 'typo'},
+        ]}, local)
+
+        self.assertEqual([c.get('source') for c in result['corrections']], ['local_detector', None])
+        self.assertEqual(result['local_inconsistencies'], 1)
+
+    def test_patterns_are_scanned_in_one_pass(self):
+        """数百件のルールでもパターンの照合は原稿を1回走査するだけで済むことをテスト"""
+        rows = [build_row(f'項目{i}', f'正{i}', [f'誤りパターン{i}'], f'range: 値{i}は(\\d+) 0-10') for i in range(300)]
+        detector = InconsistencyDetector(rows)
+        text = ('2024年5月3日（金）に中学2年生が今年14歳になった。誤りパターン7があり値3は12だった。\n' * 200)
+
+        with mock.patch.object(PatternAutomaton, 'iter_matches', autospec=True,
+                               side_effect=PatternAutomaton.iter_matches) as iter_matches:
+            corrections = detector.detect(text)
+
+        iter_matches.assert_called_once_with(mock.ANY, text)
+        self.assertEqual(len(corrections), 400)  # 各行の誤りパターンと範囲外の値
+
+
+@override_settings(PROOFREAD_LOCAL_INCONSISTENCY=True,
+                   PROOFREAD_DICTIONARY_CSV=os.path.join(os.path.dirname(__file__), 'missing.csv'))
+class BedrockClientLocalInconsistencyTest(TestCase):
+    """BedrockClientでのローカル矛盾検出をテストするクラス"""
+
+    def setUp(self):
+        invalidate_dictionary_cache()
+        self.addCleanup(invalidate_dictionary_cache)
+        InconsistencyData.objects.create(
+            name='創業年', type='temporal', correct_form='1990年創業',
+            incorrect_patterns='1989年創業,1991年創業', severity='high'
+        )
+
+    def test_shared_detector_is_rebuilt_on_change(self):
+        """矛盾検出データの追加で共有検出器が再構築されることをテスト"""
+        detector = get_inconsistency_detector()
+        self.assertIs(get_inconsistency_detector(), detector)
+
+        InconsistencyData.objects.create(name='本社', type='geographic', correct_form='東京', incorrect_patterns='大阪本社')
+        self.assertIsNot(get_inconsistency_detector(), detector)
+
+    def test_json_mode_merges_local_detections(self):
+        """JSONモードの結果にローカル検出の矛盾が先頭に結合されることをテスト"""
+        runtime = MockBedrockRuntime(tool_input={
+            'corrected_text': '1990年創業の会社',
+            'corrections': [{'line_number': 1, 'original': '1991年創業', 'corrected': '1990年創業',
+                             'reason': '矛盾', 'category': 'inconsistency'}]
+        })
+        client = BedrockClient(bedrock_runtime=runtime)
+        client.default_prompt = '{原文}'
+        result = client.proofread_text('1991年創業の会社', use_cache=False)
+
+        self.assertEqual(len(result['corrections']), 1)
+        self.assertEqual(result['corrections'][0]['source'], 'local_detector')
+        self.assertEqual(result['local_corrections'], 1)
+
+    def test_stream_yields_local_detections_first(self):
+        """ストリーミングではローカル検出の矛盾がモデルの応答より先に返ることをテスト"""
+        runtime = MockBedrockRuntime(tool_input={'corrections': [
+            {'line_number': 1, 'original': '1991年創業', 'corrected': '1990年創業', 'reason': '矛盾', 'category': 'inconsistency'},
+            {'line_number': 1, 'original': '経済敵', 'corrected': '経済的', 'reason': '誤字', 'category': 'typo'},
+        ]})
+        client = BedrockClient(bedrock_runtime=runtime)
+        client.default_prompt = '{原文}'
+
+        events = list(client.proofread_text_stream('1991年創業の経済敵な会社'))
+
+        corrections = [e['correction'] for e in events if e['type'] == 'correction']
+        self.assertEqual([(c['original'], c.get('source')) for c in corrections],
+                         [('1991年創業', 'local_detector'), ('経済敵', None)])
+        self.assertEqual(events[-1]['local_inconsistencies'], 1)
+        self.assertEqual(len(events[-1]['corrections']), 2)
@@ -0,0 +1,229 @@
+import json
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from proofreading_ai.models import ProofreadingRequest, ProofreadingResult
+from proofreading_ai.services.bedrock_client import BedrockClient
+from proofreading_ai.services.incremental import (
+    apply_corrections, plan_incremental, remap_corrections, remap_reused_corrections
+)
+from proofreading_ai.services.mock_bedrock_client import MockBedrockRuntime
+
+UNCHANGED = 'これは変更しない長い本文です。' * 3
+FIRST = f'第一段落は経済敵な理由です。{UNCHANGED}\n\n'
+SECOND = f'第二段落は問題ありません。{UNCHANGED}\n\n'
+THIRD = f'第三段落も経済敵です。{UNCHANGED}\n'
+DRAFT = FIRST + SECOND + THIRD
+EDITED = 'はじめに段落を追加しました。\n\n' + FIRST + '第二段落を書き直しました。経済敵。\n\n' + THIRD
+
+
+def typo_responder(request):
+    text = request['messages'][0]['content']
+    corrections = [
+        {'line_number': number, 'original': '経済敵', 'corrected': '経済的', 'reason': '誤字', 'category': 'typo'}
+        for number, line in enumerate(text.split('\n'), 1) if '経済敵' in line
+    ]
+    return {'corrected_text': text.replace('経済敵', '経済的'), 'corrections': corrections}
+
+
+class IncrementalPlanTest(SimpleTestCase):
+    """段落単位の差分と修正箇所の移し替えをテストするクラス"""
+
+    def test_plan_reuses_unchanged_paragraphs(self):
+        """変わっていない段落は再利用され、変わった段落だけが校正範囲になることをテスト"""
+        plan = plan_incremental(DRAFT, EDITED)
+
+        self.assertEqual(len(plan['paragraphs']), 4)
+        self.assertEqual(sorted(plan['reused']), [1, 3])
+        self.assertEqual([segment['text'] for segment in plan['segments']],
+                         ['はじめに段落を追加しました。\n\n', '第二段落を書き直しました。経済敵。\n\n'])
+        self.assertEqual(plan['segments'][1]['line_offset'], 4)
+        self.assertEqual(plan['changed_characters'], sum(len(segment['text']) for segment in plan['segments']))
+
+    def test_adjacent_changes_are_merged(self):
+        """連続して変わった段落は1つの校正範囲にまとめることをテスト"""
+        plan = plan_incremental(DRAFT, '新しい一段落目\n\n新しい二段落目\n\n' + THIRD)
+
+        self.assertEqual(len(plan['segments']), 1)
+        self.assertEqual(plan['segments'][0]['text'], '新しい一段落目\n\n新しい二段落目\n\n')
+
+    def test_remap_and_apply_corrections(self):
+        """前回の修正箇所が今回の段落の位置・行番号に移り、校正後テキストを組み立てられることをテスト"""
+        previous = {'start': 0, 'end': len(FIRST), 'line_offset': 0}
+        paragraph = {'start': 20, 'end': 20 + len(FIRST), 'line_offset': 2}
+        corrections = [
+            {'line_number': 1, 'original': '経済敵', 'corrected': '経済的', 'position': FIRST.index('経済敵')},
+            {'line_number': 5, 'original': '他段落', 'corrected': '他', 'position': len(FIRST) + 3},
+            {'line_number': 1, 'original': '位置不明', 'corrected': '不明', 'position': None},
+        ]
+
+        remapped = remap_corrections(corrections, previous, paragraph)
+
+        self.assertEqual(len(remapped), 1)
+        self.assertEqual(remapped[0]['position'], 20 + FIRST.index('経済敵'))
+        self.assertEqual(remapped[0]['line_number'], 3)
+        self.assertEqual(apply_corrections(FIRST, remapped, 20), FIRST.replace('経済敵', '経済的'))
+
+    def test_remap_reused_corrections_by_paragraph(self):
+        """再利用する段落ごとに、その段落内の前回の修正箇所だけが今回の位置に移ることをテスト"""
+        corrections = [
+            {'line_number': 5, 'original': '経済敵', 'corrected': '経済的', 'position': DRAFT.rindex('経済敵')},
+            {'line_number': 1, 'original': '経済敵', 'corrected': '経済的', 'position': DRAFT.index('経済敵')},
+            {'line_number': 1, 'original': '位置不明', 'corrected': '不明', 'position': None},
+        ]
+        plan = plan_incremental(DRAFT, EDITED)
+
+        remapped = remap_reused_corrections(corrections, plan['reused'], plan['paragraphs'])
+
+        self.assertEqual(set(remapped), set(plan['reused']))
+        moved = [c for index in sorted(remapped) for c in remapped[index]]
+        self.assertEqual([EDITED[c['position']:c['position'] + 3] for c in moved], ['経済敵', '経済敵'])
+        self.assertEqual([c['line_number'] for c in moved],
+                         [EDITED[:c['position']].count('\n') + 1 for c in moved])
+
+
+@override_settings(PROOFREAD_CACHE_ENABLED=False, PROOFREAD_TOKEN_USAGE_RECORDING=False)
+class BedrockClientIncrementalTest(TestCase):
+    """BedrockClientの差分校正をテストするクラス"""
+
+    def build_client(self):
+        client = BedrockClient(bedrock_runtime=MockBedrockRuntime(tool_input=typo_responder))
+        client.default_prompt = '{原文}'
+        return client
+
+    def test_only_changed_paragraphs_are_sent(self):
+        """変わった段落だけがモデルに送られ、修正箇所が今回の原稿の位置になることをテスト"""
+        client = self.build_client()
+        previous = client.proofread_text_chunked(DRAFT, max_chunk_tokens=10)
+        client.bedrock_runtime.calls.clear()
+
+        result = client.proofread_text_incremental(EDITED, DRAFT, previous['corrections'])
+
+        sent = [call['request']['messages'][0]['content'] for call in client.bedrock_runtime.calls]
+        self.assertEqual(len(sent), 2)
+        self.assertFalse(any(UNCHANGED in content for content in sent))
+        self.assertEqual(result['mode'], 'incremental')
+        self.assertEqual(result['incremental']['reused_paragraphs'], 2)
+        self.assertEqual(result['corrected_text'], EDITED.replace('経済敵', '経済的'))
+
+        self.assertEqual(len(result['corrections']), EDITED.count('経済敵'))
+        for correction in result['corrections']:
+            position = correction['position']
+            self.assertEqual(EDITED[position:position + 3], '経済敵')
+            self.assertEqual(correction['line_number'], EDITED[:position].count('\n') + 1)
+
+        self.assertLess(result['incremental']['sent_characters'], len(EDITED) / 2)
+        full = self.build_client().proofread_text(EDITED)
+        self.assertLess(result['input_tokens'], full['input_tokens'])
+
+    def test_unchanged_draft_makes_no_model_call(self):
+        """原稿が変わっていない場合はモデルを呼ばずに前回の修正箇所を返すことをテスト"""
+        client = self.build_client()
+        previous = [{'line_number': 1, 'original': '経済敵', 'corrected': '経済的', 'position': DRAFT.index('経済敵')}]
+
+        result = client.proofread_text_incremental(DRAFT, DRAFT, previous)
+
+        self.assertEqual(client.bedrock_runtime.calls, [])
+        self.assertEqual(result['corrections'], previous)
+        self.assertEqual(result['estimated_cost'], 0)
+
+    def test_large_edit_proofreads_whole_text(self):
+        """変更が多い場合は全文を校正することをテスト"""
+        client = self.build_client()
+
+        result = client.proofread_text_incremental('まったく別の原稿です。経済敵。\n', DRAFT, [])
+
+        self.assertEqual(result['mode'], 'json')
+        self.assertEqual(len(client.bedrock_runtime.calls), 1)
+
+    def test_large_edit_keeps_proofread_options(self):
+        """変更が多く全文を校正する場合も、呼び出し元の校正方式の指定を引き継ぐことをテスト"""
+        client = self.build_client()
+
+        with mock.patch.object(client, 'proofread_text', wraps=client.proofread_text) as proofread_text:
+            client.proofread_text_incremental('まったく別の原稿です。経済敵。\n', DRAFT, [],
+                                              use_chunked=True, use_category_passes=True)
+
+        self.assertTrue(proofread_text.call_args.kwargs['use_chunked'])
+        self.assertTrue(proofread_text.call_args.kwargs['use_category_passes'])
+        self.assertFalse(proofread_text.call_args.kwargs['use_cascade'])
+
+    def test_config_key_includes_proofread_mode(self):
+        """校正の方式が違う結果は別の設定キーになることをテスト"""
+        client = self.build_client()
+
+        keys = {
+            client.incremental_config_key(),
+            client.incremental_config_key(use_chunked=True),
+            client.incremental_config_key(use_cascade=True),
+            client.incremental_config_key(use_category_passes=True),
+            client.incremental_config_key(use_simple_prompt=True),
+        }
+
+        self.assertEqual(len(keys), 5)
+
+
+@override_settings(PROOFREAD_CACHE_ENABLED=False, PROOFREAD_TOKEN_USAGE_RECORDING=False)
+class IncrementalProofreadViewTest(TestCase):
+    """校正APIの差分校正をテストするクラス"""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', email='test@grapee.co.jp', password='testpassword')
+        self.client.login(username='testuser', password='testpassword')
+        self.bedrock = BedrockClient(bedrock_runtime=MockBedrockRuntime(tool_input=typo_responder))
+        self.bedrock.default_prompt = '{原文}'
+
+    def post(self, text, **options):
+        with mock.patch('proofreading_ai.views.get_bedrock_client', return_value=self.bedrock):
+            return self.client.post(
+                reverse('proofreading_ai:proofread'),
+                data=json.dumps({'text': text, 'incremental': True, **options}),
+                content_type='application/json'
+            ).json()
+
+    def test_recheck_reuses_previous_result(self):
+        """2回目の校正では前回の結果を再利用し、変わった段落だけを送ることをテスト"""
+        first = self.post(DRAFT)
+        self.assertTrue(first['success'])
+        self.assertNotIn('incremental', first)
+        calls_after_first = len(self.bedrock.bedrock_runtime.calls)
+
+        second = self.post(EDITED)
+
+        self.assertTrue(second['success'])
+        self.assertEqual(second['mode'], 'incremental')
+        self.assertEqual(second['incremental']['reused_paragraphs'], 2)
+        self.assertEqual(len(self.bedrock.bedrock_runtime.calls) - calls_after_first, 2)
+        self.assertEqual(len(second['corrections']), EDITED.count('経済敵'))
+        self.assertEqual(ProofreadingRequest.objects.filter(user=self.user).count(), 2)
+        latest = ProofreadingResult.objects.order_by('-created_at').first()
+        self.assertTrue(all(EDITED[c['position']:c['position'] + 3] == '経済敵' for c in latest.corrections))
+
+    def test_other_settings_are_not_reused(self):
+        """プロンプトの種類が違う前回の結果は再利用しないことをテスト"""
+        self.post(DRAFT)
+
+        second = self.post(EDITED, use_simple_prompt=True)
+
+        self.assertNotEqual(second['mode'], 'incremental')
+
+    def test_other_modes_are_not_reused(self):
+        """校正の方式（分割・カテゴリー別など）が違う前回の結果は再利用しないことをテスト"""
+        self.post(DRAFT)
+
+        second = self.post(EDITED, use_chunked=True)
+
+        self.assertNotEqual(second['mode'], 'incremental')
+
+    @override_settings(PROOFREAD_INCREMENTAL_ENABLED=False)
+    def test_disabled_does_not_store_history(self):
+        """無効の場合は通常の校正を行い、履歴を保存しないことをテスト"""
+        self.post(DRAFT)
+        second = self.post(EDITED)
+
+        self.assertEqual(second['mode'], 'json')
+        self.assertFalse(ProofreadingRequest.objects.exists())
@@ -0,0 +1,183 @@
+import asyncio
+import json
+import threading
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, Client
+from django.urls import reverse
+from django.utils import timezone
+
+from proofreading_ai.models import ProofreadingJob
+from proofreading_ai.services import job_store
+from proofreading_ai.services.bedrock_client import BedrockClient
+from proofreading_ai.services.job_executor import AsyncJobRunner, BoundedJobExecutor, JobQueueFullError
+from proofreading_ai.services.mock_bedrock_client import MockBedrockRuntime
+from proofreading_ai.views import process_proofread_async
+
+
+class BoundedJobExecutorTest(SimpleTestCase):
+    """上限付きジョブ実行器をテストするクラス"""
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        self.started = threading.Semaphore(0)
+
+    def blocking_job(self):
+        self.started.release()
+        self.release.wait(5)
+
+    def test_concurrency_and_queue_are_bounded(self):
+        """同時実行数と待ち行列の長さが上限を超えないことをテスト"""
+        executor = BoundedJobExecutor(max_workers=1, max_queue_size=2)
+
+        executor.submit('a', self.blocking_job)
+        self.assertTrue(self.started.acquire(timeout=5))
+        self.assertEqual(executor.submit('b', self.blocking_job), 1)
+        self.assertEqual(executor.submit('c', self.blocking_job), 2)
+
+        with self.assertRaises(JobQueueFullError) as ctx:
+            executor.submit('d', self.blocking_job)
+        self.assertGreaterEqual(ctx.exception.retry_after, 1)
+
+        self.assertEqual(executor.get_state('a'), {'status': 'running'})
+        self.assertEqual(executor.get_state('c'), {'status': 'queued', 'queue_position': 2})
+        stats = executor.stats()
+        self.assertEqual((stats['running'], stats['queued'], stats['rejected']), (1, 2, 1))
+
+        self.release.set()
+        executor._queue.join()
+        self.assertIsNone(executor.get_state('c'))
+        self.assertEqual(executor.stats()['completed'], 3)
+
+    def test_db_connections_are_recycled_around_each_job(self):
+        """ワーカースレッドがジョブの前後で古いDB接続を閉じることをテスト"""
+        executor = BoundedJobExecutor(max_workers=1, max_queue_size=2)
+        events = []
+
+        with mock.patch('proofreading_ai.services.job_executor.close_old_connections',
+                        side_effect=lambda: events.append('close')):
+            executor.submit('a', events.append, 'job')
+            executor.submit('b', lambda: 1 / 0)
+            executor._queue.join()
+
+        self.assertEqual(events, ['close', 'job', 'close', 'close', 'close'])
+
+
+class AsyncJobRunnerTest(SimpleTestCase):
+    """イベントループ上でジョブを実行する非同期実行器をテストするクラス"""
+
+    async def test_concurrency_and_pending_jobs_are_bounded(self):
+        """同時実行数と実行待ち件数が上限を超えず、スレッド用のキューを持たないことをテスト"""
+        runner = AsyncJobRunner(max_workers=1, max_queue_size=1)
+        release = asyncio.Event()
+
+        self.assertEqual(runner.submit('a', release.wait), 1)
+        await asyncio.sleep(0)
+        self.assertEqual(runner.submit('b', release.wait), 1)
+        with self.assertRaises(JobQueueFullError):
+            runner.submit('c', release.wait)
+
+        self.assertEqual(runner.get_state('a'), {'status': 'running'})
+        self.assertEqual(runner.get_state('b'), {'status': 'queued', 'queue_position': 1})
+        self.assertFalse(hasattr(runner, '_queue'))
+
+        release.set()
+        await runner.join()
+        stats = runner.stats()
+        self.assertEqual((stats['running'], stats['queued'], stats['completed'], stats['rejected']), (0, 0, 2, 1))
+
+
+class ProofreadAsyncViewTest(TestCase):
+    """非同期校正エンドポイントのバックプレッシャーをテストするクラス"""
+
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_user(username='testuser', email='test@grapee.co.jp', password='testpassword')
+        self.client.login(username='testuser', password='testpassword')
+
+    def test_full_queue_returns_429(self):
+        """待ち行列が満杯の場合は429とRetry-Afterが返ることをテスト"""
+        executor = mock.Mock()
+        executor.submit.side_effect = JobQueueFullError(12)
+        with mock.patch('proofreading_ai.views.get_job_executor', return_value=executor):
+            response = self.client.post(
+                reverse('proofreading_ai:proofread_async'),
+                data=json.dumps({'text': '経済敵な理由'}),
+                content_type='application/json'
+            )
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '12')
+        self.assertFalse(response.json()['success'])
+        self.assertFalse(ProofreadingJob.objects.exists())
+
+    def test_status_reports_queue_position(self):
+        """実行待ちのジョブは待ち行列内の順番が返ることをテスト"""
+        executor = mock.Mock()
+        executor.get_state.return_value = {'status': 'queued', 'queue_position': 3}
+        job_store.create_job('job-1')
+        with mock.patch('proofreading_ai.views.get_job_executor', return_value=executor):
+            response = self.client.post(
+                reverse('proofreading_ai:proofread_status'),
+                data=json.dumps({'process_id': 'job-1'}),
+                content_type='application/json'
+            )
+
+        data = response.json()
+        self.assertEqual(data['status'], 'queued')
+        self.assertEqual(data['queue_position'], 3)
+
+
+class JobStoreTest(TestCase):
+    """ジョブテーブルによる処理状況の共有をテストするクラス"""
+
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_user(username='testuser', email='test@grapee.co.jp', password='testpassword')
+        self.client.login(username='testuser', password='testpassword')
+
+    def check_status(self, process_id):
+        # 別ワーカーからの問い合わせを想定し、実行器はジョブを知らない状態にする
+        executor = mock.Mock()
+        executor.get_state.return_value = None
+        with mock.patch('proofreading_ai.views.get_job_executor', return_value=executor):
+            return self.client.post(
+                reverse('proofreading_ai:proofread_status'),
+                data=json.dumps({'process_id': process_id}),
+                content_type='application/json'
+            ).json()
+
+    def test_result_is_visible_from_any_worker(self):
+        """別のワーカーで完了したジョブの結果が取得できることをテスト"""
+        runtime = MockBedrockRuntime(tool_input={
+            'corrected_text': '経済的な理由',
+            'corrections': [{'line_number': 1, 'original': '経済敵', 'corrected': '経済的',
+                             'reason': '誤字', 'category': 'typo'}]
+        })
+        job_store.create_job('job-1')
+        with mock.patch('proofreading_ai.services.proofread_jobs.get_bedrock_client',
+                        return_value=BedrockClient(bedrock_runtime=runtime)):
+            process_proofread_async('job-1', '経済敵な理由', 0.1, 0.7)
+
+        data = self.check_status('job-1')
+        self.assertEqual(data['status'], 'completed')
+        self.assertEqual(data['corrections'][0]['corrected'], '経済的')
+
+    def test_queue_position_falls_back_to_global_order(self):
+        """実行器にないジョブは全体の待ち順が返ることをテスト"""
+        job_store.create_job('job-1')
+        job_store.create_job('job-2')
+
+        data = self.check_status('job-2')
+        self.assertEqual(data['status'], 'queued')
+        self.assertEqual(data['queue_position'], 2)
+
+    def test_expired_job_is_not_found(self):
+        """期限切れのジョブは見つからないことをテスト"""
+        job_store.create_job('job-1')
+        job_store.update_job('job-1', expires_at=timezone.now())
+
+        self.assertEqual(self.check_status('job-1')['status'], 'not_found')
+        self.assertEqual(job_store.purge_expired_jobs(), 1)
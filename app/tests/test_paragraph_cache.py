@@ -0,0 +1,136 @@
+import json
+
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from proofreading_ai.models import ProofreadingCacheEntry, TokenUsageRecord
+from proofreading_ai.services.bedrock_client import BedrockClient
+from proofreading_ai.services.mock_bedrock_client import FakeBedrockEndpoint, MockBedrockRuntime
+from proofreading_ai.services.paragraph_cache import build_novel_chunks, split_cacheable_paragraphs
+from proofreading_ai.services.rate_limiter import reset_rate_limiters
+from tests.test_async_bedrock import build_proofreader
+from tests.test_incremental import typo_responder
+
+CREDIT = '写真提供：経済敵な理由ニュース編集部\n\n'
+CLOSING = 'この記事が気に入ったらフォローしてください。経済敵。\n'
+
+
+def article(body):
+    return CREDIT + body + '\n\n' + CLOSING
+
+
+def sent_texts(runtime):
+    return [call['request']['messages'][0]['content'] for call in runtime.calls]
+
+
+@override_settings(PROOFREAD_TOKEN_USAGE_RECORDING=False, PROOFREAD_RATE_LIMIT_ENABLED=False)
+class ParagraphCacheTest(TestCase):
+    """分割校正での段落単位のキャッシュをテストするクラス"""
+
+    def setUp(self):
+        self.runtime = MockBedrockRuntime(tool_input=typo_responder)
+        self.client = BedrockClient(bedrock_runtime=self.runtime)
+        self.client.default_prompt = '{原文}'
+
+    def proofread(self, text, **kwargs):
+        return self.client.proofread_text_chunked(text, **kwargs)
+
+    def assert_corrections_located(self, text, result):
+        self.assertEqual(len(result['corrections']), text.count('経済敵'))
+        for correction in result['corrections']:
+            position = correction['position']
+            self.assertEqual(text[position:position + 3], '経済敵')
+            self.assertEqual(correction['line_number'], text[:position].count('\n') + 1)
+
+    def test_boilerplate_paragraphs_are_not_sent_again(self):
+        """別の記事でも共通の段落はモデルに送らず、キャッシュした修正箇所を今回の位置で返すことをテスト"""
+        self.proofread(article('一本目の記事の本文です。'))
+        self.runtime.calls.clear()
+
+        text = article('二本目の記事は本文が長く、\n経済敵な話題も含みます。')
+        result = self.proofread(text)
+
+        self.assertEqual(len(self.runtime.calls), 1)
+        self.assertNotIn('写真提供', sent_texts(self.runtime)[0])
+        self.assertEqual(result['cached_paragraphs'], 2)
+        self.assertEqual(result['corrected_text'], text.replace('経済敵', '経済的'))
+        self.assert_corrections_located(text, result)
+
+        stats = self.client.paragraph_cache.stats()
+        self.assertEqual(stats['namespace'], 'paragraph')
+        self.assertEqual((stats['hits'], stats['misses']), (2, 4))
+        self.assertGreater(stats['hit_rate'], 0)
+
+    def test_surrounding_whitespace_is_normalized(self):
+        """前後の空白・改行だけが違う段落も同じ段落としてキャッシュを使うことをテスト"""
+        self.proofread(article('本文です。'))
+        self.runtime.calls.clear()
+
+        text = '\n' + CREDIT.replace('\n\n', '　\n\n') + '本文です。\n\n' + CLOSING
+        result = self.proofread(text)
+
+        self.assertEqual(self.runtime.calls, [])
+        self.assertEqual(result['input_tokens'], 0)
+        self.assert_corrections_located(text, result)
+
+    def test_cache_is_bypassed_when_disabled(self):
+        """キャッシュを使わない指定・設定では毎回モデルに送ることをテスト"""
+        self.proofread(article('本文です。'))
+        self.runtime.calls.clear()
+
+        self.proofread(article('本文です。'), use_cache=False)
+        self.assertEqual(len(self.runtime.calls), 1)
+        self.assertIn('写真提供', sent_texts(self.runtime)[0])
+
+        with override_settings(PROOFREAD_PARAGRAPH_CACHE_ENABLED=False):
+            client = BedrockClient(bedrock_runtime=self.runtime)
+        self.assertFalse(client.paragraph_cache.enabled)
+
+    def test_failed_chunks_are_not_cached(self):
+        """失敗したチャンクの段落はキャッシュしないことをテスト"""
+        self.runtime.tool_input = lambda request: {}
+        self.proofread(article('本文です。'))
+
+        self.assertFalse(ProofreadingCacheEntry.objects.filter(namespace='paragraph').exists())
+
+    def test_novel_chunks_keep_original_positions(self):
+        """キャッシュにない段落だけのチャンクが元テキスト基準の位置・行番号を持つことをテスト"""
+        text = article('本文の一行目\n本文の二行目')
+        paragraphs = split_cacheable_paragraphs(text)
+
+        chunks = build_novel_chunks(text, paragraphs, [1], 1000, len)
+
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual(chunks[0]['text'], text[chunks[0]['start']:chunks[0]['end']])
+        self.assertEqual(chunks[0]['line_offset'], 2)
+        self.assertEqual(paragraphs[2]['body_line_offset'], 5)
+
+
+@override_settings(PROOFREAD_TOKEN_USAGE_RECORDING=False, PROOFREAD_RATE_LIMIT_ENABLED=False)
+class AsyncParagraphCacheTest(TransactionTestCase):
+    """
+    非同期版の分割校正での段落単位のキャッシュをテストするクラス
+
+    キャッシュの保存は別スレッドのDB接続で実行されるため、書き込みが見えるよう TransactionTestCase を使う。
+    """
+
+    def setUp(self):
+        TokenUsageRecord.objects.all().delete()
+        reset_rate_limiters()
+        self.addCleanup(reset_rate_limiters)
+
+    async def test_async_chunked_uses_paragraph_cache(self):
+        """非同期版の分割校正でも段落単位のキャッシュを使うことをテスト"""
+        endpoint = FakeBedrockEndpoint(tool_input=typo_responder)
+        proofreader = build_proofreader(await endpoint.start())
+        try:
+            await proofreader.proofread_text(article('一本目の本文です。'), use_chunked=True)
+            text = article('二本目の本文です。')
+            result = await proofreader.proofread_text(text, use_chunked=True)
+        finally:
+            await proofreader.runtime.close()
+            await endpoint.close()
+
+        self.assertEqual(len(endpoint.calls), 2)
+        self.assertNotIn('写真提供', json.dumps(endpoint.calls[1], ensure_ascii=False))
+        self.assertEqual(result['cached_paragraphs'], 2)
+        self.assertEqual(result['corrected_text'], text.replace('経済敵', '経済的'))
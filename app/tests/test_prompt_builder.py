@@ -0,0 +1,94 @@
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from proofreading_ai.models import CompanyDictionary, InconsistencyData
+from proofreading_ai.services.bedrock_client import BedrockClient
+from proofreading_ai.services.dictionary_matcher import invalidate_dictionary_cache
+from proofreading_ai.services.mock_bedrock_client import MockBedrockRuntime
+from proofreading_ai.services.prompt_builder import DictionaryRuleIndex, build_dictionary_prompt_section
+
+
+def count_tokens(text):
+    return len(text)
+
+
+class DictionaryRuleIndexTest(SimpleTestCase):
+    """辞書索引による関連項目の抽出をテストするクラス"""
+
+    def setUp(self):
+        self.index = DictionaryRuleIndex([
+            {'keys': ['グレイプ', 'グレープ'], 'rank': 1, 'line': '- グレイプ'},
+            {'keys': ['富士山'], 'rank': 3, 'line': '- 富士山'},
+            {'keys': ['サザエさん'], 'rank': 2, 'line': '- サザエさん'},
+            {'keys': ['横浜県'], 'rank': 2, 'line': '- 横浜県'},
+        ])
+
+    def test_only_entries_in_text_are_ranked(self):
+        """原稿に出現するエントリだけが優先度順に返ることをテスト"""
+        relevant = self.index.relevant_entries('グレープで富士山とサザエさんを見た')
+        self.assertEqual([entry['line'] for entry in relevant], ['- 富士山', '- サザエさん', '- グレイプ'])
+
+    def test_section_is_capped_by_token_budget(self):
+        """トークン予算を超える分は優先度の低いものから省かれることをテスト"""
+        text = 'グレープで富士山とサザエさんを見た'
+        full = self.index.build_section(text, count_tokens, 1000)
+        capped = self.index.build_section(text, count_tokens, len(full) - 3)
+
+        self.assertIn('- グレイプ', full)
+        self.assertIn('- 富士山', capped)
+        self.assertNotIn('- グレイプ', capped)
+        self.assertEqual(self.index.build_section('関係のない文章', count_tokens, 1000), '')
+
+
+class DictionaryPromptSectionTest(TestCase):
+    """DBの辞書からのプロンプト生成をテストするクラス"""
+
+    def setUp(self):
+        invalidate_dictionary_cache()
+        self.addCleanup(invalidate_dictionary_cache)
+
+    def add_rows(self, start, count):
+        CompanyDictionary.objects.bulk_create([
+            CompanyDictionary(term=f'用語{i:05d}', correct_form=f'正式{i:05d}', alternative_forms=f'別表記{i:05d}')
+            for i in range(start, start + count)
+        ])
+        invalidate_dictionary_cache()
+
+    def test_prompt_size_stays_flat_as_dictionary_grows(self):
+        """辞書が数千件に増えてもプロンプトには原稿に出現する項目だけが入ることをテスト"""
+        CompanyDictionary.objects.create(term='グレイプ', correct_form='grape', alternative_forms='グレープ', priority=2)
+        InconsistencyData.objects.create(name='富士山の所在地', type='geographic', correct_form='静岡県・山梨県',
+                                         incorrect_patterns='富士山は東京都', severity='high')
+        text = 'グレープの記者が富士山は東京都にあると書いた。別表記00007も含む。'
+
+        self.add_rows(0, 100)
+        small = build_dictionary_prompt_section(text, count_tokens)
+        self.add_rows(100, 3000)
+        large = build_dictionary_prompt_section(text, count_tokens)
+
+        self.assertEqual(small, large)
+        self.assertIn('「グレイプ」は「grape」と表記', large)
+        self.assertIn('富士山の所在地', large)
+        self.assertIn('正式00007', large)
+        self.assertNotIn('正式00008', large)
+        # 重要度の高い矛盾チェック項目が先頭になる
+        self.assertLess(large.index('富士山の所在地'), large.index('グレイプ'))
+
+    @override_settings(PROOFREAD_PROMPT_DICTIONARY_TOKENS=0)
+    def test_section_can_be_disabled(self):
+        """トークン上限0で無効化できることをテスト"""
+        CompanyDictionary.objects.create(term='グレイプ', correct_form='grape')
+        self.assertEqual(build_dictionary_prompt_section('グレイプ', count_tokens), '')
+
+    def test_bedrock_prompt_includes_relevant_entries(self):
+        """BedrockClientのプロンプトに関係する項目が含まれることをテスト"""
+        CompanyDictionary.objects.create(term='グレイプ', correct_form='grape', alternative_forms='グレープ')
+        CompanyDictionary.objects.create(term='アマゾン', correct_form='Amazon')
+        runtime = MockBedrockRuntime(tool_input={'corrected_text': 'グレープの記事', 'corrections': []})
+        client = BedrockClient(bedrock_runtime=runtime)
+        client.default_prompt = '{原文}'
+
+        client.proofread_text('グレープの記事', use_cache=False)
+
+        prompt = runtime.calls[0]['request']['messages'][0]['content']
+        self.assertIn('grape', prompt)
+        self.assertNotIn('Amazon', prompt)
@@ -0,0 +1,129 @@
+import json
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, Client, override_settings
+from django.urls import reverse
+
+from proofreading_ai.services.bedrock_client import BedrockClient
+from proofreading_ai.services.mock_bedrock_client import MockBedrockRuntime
+from proofreading_ai.services.stream_parser import CorrectionStreamParser
+
+
+CORRECTIONS = [
+    {"line_number": 1, "original": "経済敵な", "corrected": "経済的な", "reason": "誤字修正", "category": "typo"},
+    {"line_number": 2, "original": "アマゾン", "corrected": "Amazon", "reason": "社内辞書 \"表記\"", "category": "dict"},
+    {"line_number": 3, "original": "小学8年生", "corrected": "中学2年生", "reason": "{小学校は6年間}", "category": "inconsistency"},
+]
+
+
+class CorrectionStreamParserTest(SimpleTestCase):
+    """partial_json の逐次解析をテストするクラス"""
+
+    def test_items_are_emitted_for_any_split(self):
+        """任意の位置で分割されたJSONから全要素が順に取り出せることをテスト"""
+        raw = json.dumps({"corrections": CORRECTIONS}, ensure_ascii=False)
+        for size in (1, 2, 7, 50, len(raw)):
+            parser = CorrectionStreamParser("corrections")
+            items = []
+            for i in range(0, len(raw), size):
+                items.extend(parser.feed(raw[i:i + size]))
+            self.assertEqual(items, CORRECTIONS)
+            self.assertTrue(parser.finished)
+
+    def test_items_before_array_are_ignored(self):
+        """対象配列より前のキーは無視されることをテスト"""
+        raw = json.dumps({"corrected_text": "{\"corrections\": []}", "corrections": CORRECTIONS[:1]}, ensure_ascii=False)
+        parser = CorrectionStreamParser("corrections")
+        self.assertEqual(parser.feed(raw), CORRECTIONS[:1])
+
+
+@override_settings(PROOFREAD_TOKEN_USAGE_RECORDING=False)
+class BedrockStreamingTest(SimpleTestCase):
+    """
+    BedrockClientのストリーミング校正をテストするクラス
+
+    使用量の記録（DB）は test_token_estimator でテストするため、ここでは無効にする。
+    """
+
+    def test_stream_yields_corrections_then_done(self):
+        """修正箇所イベントの後に完了イベントが返ることをテスト"""
+        runtime = MockBedrockRuntime(tool_input={"corrections": CORRECTIONS}, chunk_size=5)
+        client = BedrockClient(bedrock_runtime=runtime)
+
+        events = list(client.proofread_text_stream("<p>経済敵な理由でアマゾンを使う小学8年生</p>"))
+
+        self.assertEqual([e["type"] for e in events], ["correction"] * 3 + ["done"])
+        self.assertEqual([e["correction"] for e in events[:3]], CORRECTIONS)
+        self.assertEqual(events[-1]["corrections"], CORRECTIONS)
+        self.assertIsNotNone(events[-1]["first_correction_time"])
+        self.assertTrue(runtime.calls[0]["stream"])
+
+    def test_stream_corrections_refer_to_original_html(self):
+        """タグをまたぐ修正箇所がHTML保護のプレースホルダー・マーカーを含まず、元のHTMLで返ることをテスト"""
+        text = "<p>経済敵な理由</p><p>です<b>ね</b></p>"
+        for protection in ("legacy", "compact"):
+            with self.subTest(protection=protection):
+                client = BedrockClient(bedrock_runtime=MockBedrockRuntime())
+                client.html_protection = protection
+                protected_text, _ = client._protect_html(text)
+                original = protected_text[protected_text.index("理由"):protected_text.index("ね") + 1]
+                correction = {"line_number": 1, "original": original, "corrected": original.replace("です", "でした"),
+                              "reason": "語尾", "category": "tone"}
+                client.bedrock_runtime.tool_input = {"corrections": [correction]}
+
+                events = list(client.proofread_text_stream(text))
+
+                expected = {"original": "理由</p><p>です<b>ね", "corrected": "理由</p><p>でした<b>ね"}
+                for streamed in (events[0]["correction"], events[-1]["corrections"][0]):
+                    self.assertEqual({key: streamed[key] for key in expected}, expected)
+                if protection == "compact":
+                    self.assertEqual(events[0]["correction"]["position"], text.index("理由"))
+
+    def test_stream_reports_errors(self):
+        """API呼び出しエラーがerrorイベントとして返ることをテスト"""
+        runtime = mock.Mock()
+        runtime.invoke_model_with_response_stream.side_effect = RuntimeError("throttled")
+        client = BedrockClient(bedrock_runtime=runtime)
+
+        events = list(client.proofread_text_stream("テスト"))
+
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]["type"], "error")
+
+
+class ProofreadStreamViewTest(TestCase):
+    """SSEエンドポイントをテストするクラス"""
+
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_user(username='testuser', email='test@grapee.co.jp', password='testpassword')
+        self.client.login(username='testuser', password='testpassword')
+
+    def test_sse_events(self):
+        """correctionイベントとハイライト付きdoneイベントが送られることをテスト"""
+        bedrock_client = BedrockClient(bedrock_runtime=MockBedrockRuntime(tool_input={"corrections": CORRECTIONS}))
+        with mock.patch('proofreading_ai.views.get_bedrock_client', return_value=bedrock_client):
+            response = self.client.post(
+                reverse('proofreading_ai:proofread_stream'),
+                data=json.dumps({'text': '経済敵な理由'}),
+                content_type='application/json'
+            )
+            body = b''.join(response.streaming_content).decode('utf-8')
+
+        self.assertTrue(response['Content-Type'].startswith('text/event-stream'))
+        events = [block for block in body.split('\n\n') if block]
+        self.assertEqual(len(events), 4)
+        self.assertTrue(events[0].startswith('event: correction'))
+        done = json.loads(events[-1].split('data: ', 1)[1])
+        self.assertTrue(done['success'])
+        self.assertIn('correction-span', done['corrected_text'])
+
+    def test_empty_text_returns_json_error(self):
+        """空テキストの場合は通常のJSONエラーが返ることをテスト"""
+        response = self.client.post(
+            reverse('proofreading_ai:proofread_stream'),
+            data=json.dumps({'text': ' '}),
+            content_type='application/json'
+        )
+        self.assertFalse(response.json()['success'])
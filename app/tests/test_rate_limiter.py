@@ -0,0 +1,215 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from proofreading_ai.services.bedrock_client import BedrockClient
+from proofreading_ai.services.mock_bedrock_client import MockBedrockRuntime
+from proofreading_ai.services.rate_limiter import (
+    AdaptiveConcurrencyLimiter, CacheLimiterStore, TokenBucket, backoff_delay, botocore_retry_config,
+    get_rate_limiter, is_retryable_error, rate_limiter_metrics, reset_rate_limiters
+)
+
+
+def client_error(code):
+    return ClientError({'Error': {'Code': code, 'Message': code}}, 'InvokeModel')
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class QuotaBedrockRuntime(MockBedrockRuntime):
+    """同時実行数がクォータを超えた呼び出しを ThrottlingException にするモック"""
+
+    def __init__(self, quota, **kwargs):
+        super().__init__(**kwargs)
+        self.quota = quota
+        self.active = 0
+        self.peak = 0
+        self.throttled = 0
+        self._active_lock = threading.Lock()
+
+    def invoke_model(self, modelId, body, **kwargs):
+        with self._active_lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            over_quota = self.active > self.quota
+            if over_quota:
+                self.throttled += 1
+        try:
+            if over_quota:
+                raise client_error('ThrottlingException')
+            return super().invoke_model(modelId, body, **kwargs)
+        finally:
+            with self._active_lock:
+                self.active -= 1
+
+
+class AdaptiveConcurrencyLimiterTest(SimpleTestCase):
+    """AIMDによる同時実行数の調整をテストするクラス"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.sleeps = []
+        self.limiter = AdaptiveConcurrencyLimiter('model', initial_limit=4, min_limit=1, max_limit=6,
+                                                  decrease_cooldown=2, clock=self.clock, sleep=self.sleeps.append)
+
+    def test_throttle_halves_limit_once_per_cooldown(self):
+        """スロットリングで上限が半分になり、冷却時間内は続けて下がらないことをテスト"""
+        self.assertTrue(self.limiter.record_throttle())
+        self.assertFalse(self.limiter.record_throttle())
+        self.assertEqual(self.limiter.concurrency, 2)
+
+        self.clock.now = 3
+        self.limiter.record_throttle()
+        self.clock.now = 6
+        self.limiter.record_throttle()
+        self.assertEqual(self.limiter.concurrency, 1)
+        self.assertEqual(self.limiter.metrics()['throttled_count'], 4)
+
+    def test_success_increases_limit_additively(self):
+        """成功ごとに上限が少しずつ増え、最大値で止まることをテスト"""
+        for _ in range(4):
+            self.limiter.record_success()
+        self.assertEqual(self.limiter.concurrency, 4)
+
+        for _ in range(100):
+            self.limiter.record_success()
+        self.assertEqual(self.limiter.limit, 6)
+
+    def test_acquire_blocks_at_limit(self):
+        """上限まで確保すると次の確保は待たされ、返却されると確保できることをテスト"""
+        for _ in range(4):
+            self.assertTrue(self.limiter.acquire(timeout=0))
+        self.assertFalse(self.limiter.acquire(timeout=0))
+
+        acquired = []
+        waiter = threading.Thread(target=lambda: acquired.append(self.limiter.acquire(timeout=5)))
+        waiter.start()
+        time.sleep(0.05)
+        self.limiter.release()
+        waiter.join(5)
+
+        self.assertEqual(acquired, [True])
+        metrics = self.limiter.metrics()
+        self.assertEqual(metrics['in_flight'], 4)
+        self.assertEqual(metrics['timeout_count'], 1)
+
+    def test_call_retries_throttling_with_backoff(self):
+        """スロットリングは待ってから再試行され、リクエスト内容の誤りは再試行しないことをテスト"""
+        errors = [client_error('ThrottlingException'), client_error('ThrottlingException')]
+
+        def flaky():
+            if errors:
+                raise errors.pop()
+            return 'ok'
+
+        self.assertEqual(self.limiter.call(flaky, max_retries=3, backoff_base=1, backoff_cap=10), 'ok')
+        self.assertEqual(len(self.sleeps), 2)
+        self.assertLessEqual(self.sleeps[1], 2)
+        self.assertEqual(self.limiter.metrics()['in_flight'], 0)
+
+        def invalid():
+            raise client_error('ValidationException')
+
+        with self.assertRaises(ClientError):
+            self.limiter.call(invalid, max_retries=3)
+        self.assertEqual(len(self.sleeps), 2)
+
+    def test_token_bucket_spaces_requests(self):
+        """トークンバケットがバーストを超えた分を1秒あたりの件数に合わせて待たせることをテスト"""
+        bucket = TokenBucket(rate=2, burst=2, clock=self.clock)
+
+        self.assertEqual([bucket.reserve() for _ in range(4)], [0.0, 0.0, 0.5, 1.0])
+        self.clock.now = 2
+        self.assertEqual(bucket.reserve(), 0.0)
+
+    def test_backoff_and_retryable_errors(self):
+        """バックオフの待ち時間が上限内に収まり、再試行対象のエラーが判定されることをテスト"""
+        rng = random.Random(0)
+        delays = [backoff_delay(attempt, 1, 8, rng) for attempt in range(10)]
+
+        self.assertTrue(all(0 <= delay <= min(8, 2 ** attempt) for attempt, delay in enumerate(delays)))
+        self.assertTrue(is_retryable_error(client_error('ThrottlingException')))
+        self.assertTrue(is_retryable_error(client_error('ServiceUnavailableException')))
+        self.assertFalse(is_retryable_error(client_error('AccessDeniedException')))
+
+    def test_shared_store_limits_across_workers(self):
+        """共有ストアを使うと別ワーカーのリミッターと枠と上限を共有することをテスト"""
+        cache = LocMemCache('rate-limiter-test', {})
+        worker_a = AdaptiveConcurrencyLimiter('model', initial_limit=2, clock=self.clock,
+                                              store=CacheLimiterStore(cache, 'test'))
+        worker_b = AdaptiveConcurrencyLimiter('model', initial_limit=2, clock=self.clock,
+                                              store=CacheLimiterStore(cache, 'test'))
+
+        self.assertTrue(worker_a.acquire(timeout=0))
+        self.assertTrue(worker_b.acquire(timeout=0))
+        self.assertFalse(worker_b.acquire(timeout=0))
+        worker_a.release()
+        self.assertTrue(worker_b.acquire(timeout=0))
+        self.assertEqual(worker_a.metrics()['shared_in_flight'], 2)
+
+        worker_a.record_throttle()
+        self.assertEqual(worker_b.concurrency, 1)
+
+
+@override_settings(PROOFREAD_CACHE_ENABLED=False, PROOFREAD_TOKEN_USAGE_RECORDING=False,
+                   PROOFREAD_BREAKER_ENABLED=False, PROOFREAD_RATE_LIMIT_BACKOFF_BASE=0.01,
+                   PROOFREAD_RATE_LIMIT_BACKOFF_CAP=0.05, PROOFREAD_RATE_LIMIT_DECREASE_COOLDOWN=0.05,
+                   PROOFREAD_RATE_LIMIT_MAX_RETRIES=10)
+class BedrockClientRateLimitTest(TestCase):
+    """BedrockClientの同時実行数制限をテストするクラス"""
+
+    def setUp(self):
+        reset_rate_limiters()
+        self.addCleanup(reset_rate_limiters)
+
+    def run_concurrently(self, quota, requests=24):
+        runtime = QuotaBedrockRuntime(quota, latency=0.02,
+                                      tool_input={'corrected_text': '本文', 'corrections': []})
+        client = BedrockClient(bedrock_runtime=runtime)
+        client.default_prompt = '{原文}'
+        with ThreadPoolExecutor(max_workers=requests) as executor:
+            results = list(executor.map(lambda i: client.proofread_text(f'本文{i}', use_cache=False),
+                                        range(requests)))
+        return client, runtime, results
+
+    def test_throttling_adapts_concurrency(self):
+        """クォータを超えた呼び出しが待って再試行され、全件成功することをテスト"""
+        client, runtime, results = self.run_concurrently(quota=3)
+
+        self.assertTrue(all('error' not in result for result in results))
+        metrics = rate_limiter_metrics()[client.model_id]
+        self.assertEqual(metrics['in_flight'], 0)
+        self.assertEqual(metrics['throttled_count'], runtime.throttled)
+        self.assertLessEqual(runtime.peak, 16)
+
+    @override_settings(PROOFREAD_RATE_LIMIT_ENABLED=False)
+    def test_unlimited_calls_fail_over_quota(self):
+        """リミッターを無効にするとクォータを超えた呼び出しが失敗することをテスト（比較用）"""
+        _, runtime, results = self.run_concurrently(quota=3)
+
+        self.assertGreater(runtime.throttled, 0)
+        self.assertGreater(sum(1 for result in results if 'error' in result), 0)
+
+    def test_botocore_retries_are_disabled(self):
+        """リミッターが有効な場合は botocore の即時再試行を行わないことをテスト"""
+        self.assertEqual(botocore_retry_config(), {'mode': 'standard', 'total_max_attempts': 1})
+        with override_settings(PROOFREAD_RATE_LIMIT_ENABLED=False):
+            self.assertEqual(botocore_retry_config(), {'max_attempts': 3})
+
+    @override_settings(PROOFREAD_RATE_LIMIT_INITIAL_CONCURRENCY=2)
+    def test_shared_limiter_per_model(self):
+        """モデルごとに同じリミッターが共有されることをテスト"""
+        self.assertIs(get_rate_limiter('model-a'), get_rate_limiter('model-a'))
+        self.assertIsNot(get_rate_limiter('model-a'), get_rate_limiter('model-b'))
+        self.assertEqual(get_rate_limiter('model-a').concurrency, 2)
@@ -0,0 +1,129 @@
+import io
+import json
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from proofreading_ai.models import TokenUsageRecord
+from proofreading_ai.services.bedrock_client import BedrockClient
+from proofreading_ai.services.mock_bedrock_client import MockBedrockRuntime
+from proofreading_ai.services.request_sizing import (
+    MODE_OUTPUT_LIMITS, plan_request, reset_output_ratios, round_up_timeout
+)
+from proofreading_ai.services.token_estimator import TokenEstimator, reset_token_estimator
+
+
+class TruncatingBedrockRuntime(MockBedrockRuntime):
+    """max_tokens がモードの上限未満の場合は出力が打ち切られたことにするモック"""
+
+    def invoke_model(self, modelId, body, **kwargs):
+        response = super().invoke_model(modelId, body, **kwargs)
+        if json.loads(body)['max_tokens'] >= MODE_OUTPUT_LIMITS['json']:
+            return response
+        response_body = json.loads(response['body'].read())
+        response_body['stop_reason'] = 'max_tokens'
+        return {'body': io.BytesIO(json.dumps(response_body).encode('utf-8'))}
+
+
+class RoundUpTimeoutTest(SimpleTestCase):
+    """タイムアウトの段階値への切り上げをテストするクラス"""
+
+    def test_round_up(self):
+        """段階値に切り上げ、上限を超えないことをテスト"""
+        self.assertEqual(round_up_timeout(12, 600), 30)
+        self.assertEqual(round_up_timeout(61, 600), 120)
+        self.assertEqual(round_up_timeout(250, 200), 200)
+        self.assertEqual(round_up_timeout(5000, 600), 600)
+
+
+@override_settings(PROOFREAD_TOKEN_CALIBRATION_MIN_SAMPLES=3, PROOFREAD_TOKEN_CALIBRATION_INTERVAL=0)
+class PlanRequestTest(TestCase):
+    """max_tokens・タイムアウトの決定をテストするクラス"""
+
+    def setUp(self):
+        TokenUsageRecord.objects.all().delete()
+        reset_output_ratios()
+        reset_token_estimator()
+        self.addCleanup(reset_output_ratios)
+        self.addCleanup(reset_token_estimator)
+        self.estimator = TokenEstimator(latency_coefficients=(1.0, 0.0, 0.02))
+
+    def test_short_text_fails_fast(self):
+        """短い原稿では max_tokens とタイムアウトが小さくなることをテスト"""
+        plan = plan_request('json', 200, 2500, 600, self.estimator)
+
+        # 200文字 × 2.0 × 1.5 + 1024
+        self.assertEqual(plan['max_tokens'], 1624)
+        self.assertEqual(plan['read_timeout'], 120)
+        self.assertTrue(plan['fits'])
+
+    def test_long_text_is_capped_and_flagged(self):
+        """長い原稿では上限で打ち切られ、分割が必要と判定されることをテスト"""
+        plan = plan_request('json', 20000, 30000, 600, self.estimator)
+
+        self.assertEqual(plan['max_tokens'], MODE_OUTPUT_LIMITS['json'])
+        self.assertEqual(plan['read_timeout'], 600)
+        self.assertFalse(plan['fits'])
+
+    def test_ratio_follows_recorded_history(self):
+        """実測の出力比率（95パーセンタイル）が max_tokens に反映されることをテスト"""
+        for output_tokens in (100, 110, 120, 130):
+            TokenUsageRecord.objects.create(mode='json', model_id='test', original_length=100,
+                                            input_tokens=1000, output_tokens=output_tokens)
+
+        plan = plan_request('json', 1000, 2000, 600, self.estimator)
+
+        self.assertEqual(plan['expected_output_tokens'], 1200)
+        self.assertEqual(plan['max_tokens'], 1200 * 3 // 2 + 1024)
+
+    @override_settings(PROOFREAD_ADAPTIVE_SIZING=False)
+    def test_disabled_uses_fixed_limits(self):
+        """無効時は従来どおりの固定値になることをテスト"""
+        plan = plan_request('text', 10, 100, 600, self.estimator)
+
+        self.assertEqual((plan['max_tokens'], plan['read_timeout']), (MODE_OUTPUT_LIMITS['text'], 600))
+
+
+class BedrockClientSizingTest(TestCase):
+    """BedrockClientでのリクエストごとのサイズ決定をテストするクラス"""
+
+    def setUp(self):
+        reset_output_ratios()
+        self.addCleanup(reset_output_ratios)
+
+    def test_json_mode_sends_sized_max_tokens(self):
+        """JSONモードのリクエストに原稿の長さに応じた max_tokens が設定されることをテスト"""
+        runtime = MockBedrockRuntime(tool_input={'corrected_text': '短い本文', 'corrections': []})
+        client = BedrockClient(bedrock_runtime=runtime)
+        client.default_prompt = '{原文}'
+
+        client.proofread_text('短い本文', use_cache=False)
+
+        self.assertLess(runtime.calls[0]['request']['max_tokens'], MODE_OUTPUT_LIMITS['json'])
+
+    def test_truncated_output_is_retried_with_limit(self):
+        """出力が打ち切られた場合は上限の max_tokens で再実行されることをテスト"""
+        runtime = TruncatingBedrockRuntime(tool_input={'corrected_text': '短い本文', 'corrections': []})
+        client = BedrockClient(bedrock_runtime=runtime)
+        client.default_prompt = '{原文}'
+
+        result = client.proofread_text('短い本文', use_cache=False)
+
+        self.assertNotIn('error', result)
+        self.assertEqual([call['request']['max_tokens'] for call in runtime.calls][-1], MODE_OUTPUT_LIMITS['json'])
+        self.assertEqual(len(runtime.calls), 2)
+
+    def test_oversized_text_switches_to_chunked(self):
+        """出力が上限に収まらない長さの原稿は分割校正に切り替わることをテスト"""
+        def responder(request):
+            return {'corrected_text': request['messages'][0]['content'], 'corrections': []}
+
+        runtime = MockBedrockRuntime(tool_input=responder)
+        client = BedrockClient(bedrock_runtime=runtime)
+        client.default_prompt = '{原文}'
+        text = ''.join(f'<p>{"本文" * 400}{i}</p>\n' for i in range(6))
+
+        result = client.proofread_text(text, use_cache=False)
+
+        self.assertEqual(result['mode'], 'chunked')
+        self.assertGreater(len(runtime.calls), 1)
+        self.assertEqual(result['corrected_text'], text)
@@ -0,0 +1,140 @@
+import json
+import os
+import shutil
+import subprocess
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.test import SimpleTestCase, TestCase, Client
+from django.urls import reverse
+
+from proofreading_ai.services.bedrock_client import BedrockClient
+from proofreading_ai.services.mock_bedrock_client import MockBedrockRuntime
+from proofreading_ai.utils import build_correction_spans, format_corrections
+from proofreading_ai.views import build_highlight_payload
+from tests.benchmark import benchmark
+from tests.test_format_corrections import build_article
+
+
+SPANS_SCRIPT = os.path.join(settings.BASE_DIR, 'static', 'js', 'proofreading-spans.js')
+
+
+def serialize_highlight_payload(text, corrections, response_format):
+    """/proofread/ と同じく、spans形式のみ ensure_ascii=False でシリアライズしたレスポンス本文を返す"""
+    return json.dumps(build_highlight_payload(text, corrections, response_format), cls=DjangoJSONEncoder,
+                      ensure_ascii=response_format != 'spans').encode('utf-8')
+
+
+class ProofreadResponseFormatTest(TestCase):
+    """校正APIのレスポンス形式の切り替えをテストするクラス"""
+
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_user(username='testuser', email='test@grapee.co.jp', password='testpassword')
+        self.client.login(username='testuser', password='testpassword')
+
+    def post(self, **data):
+        runtime = MockBedrockRuntime(tool_input={
+            'corrected_text': '経済的な理由',
+            'corrections': [{'line_number': 1, 'original': '経済敵', 'corrected': '経済的',
+                             'reason': '誤字', 'category': 'typo'}]
+        })
+        with mock.patch('proofreading_ai.views.get_bedrock_client',
+                        return_value=BedrockClient(bedrock_runtime=runtime)):
+            return self.client.post(
+                reverse('proofreading_ai:proofread'),
+                data=json.dumps({'text': '😀経済敵な理由', **data}),
+                content_type='application/json'
+            ).json()
+
+    def test_default_format_is_rendered_html(self):
+        """指定がない場合は従来どおりハイライト済みHTMLが返ることをテスト"""
+        data = self.post()
+        self.assertTrue(data['success'])
+        self.assertIn('correction-span', data['corrected_text'])
+        self.assertNotIn('spans', data)
+
+    def test_spans_format_returns_original_text_and_spans(self):
+        """spans形式では原文と修正箇所の配列だけが返り、位置はUTF-16単位であることをテスト"""
+        data = self.post(response_format='spans')
+        self.assertTrue(data['success'])
+        self.assertEqual(data['original_text'], '😀経済敵な理由')
+        # 絵文字はUTF-16で2単位
+        self.assertEqual(data['spans'], [[2, 5, '経済的', '誤字', 'typo']])
+        self.assertNotIn('corrected_text', data)
+
+    def test_unknown_format_is_rejected(self):
+        """未対応のレスポンス形式はエラーになることをテスト"""
+        data = self.post(response_format='xml')
+        self.assertFalse(data['success'])
+
+
+class CorrectionSpansTest(SimpleTestCase):
+    """修正箇所の配列と、そのクライアント側描画をテストするクラス"""
+
+    def test_spans_follow_format_corrections_selection(self):
+        """重なる修正の扱いが format_corrections と同じであることをテスト"""
+        corrections = [
+            {'original': '経済', 'corrected': 'けいざい', 'reason': 'a', 'category': 'tone'},
+            {'original': '経済敵', 'corrected': '経済的', 'reason': 'b', 'category': 'typo'},
+            {'original': '存在しない', 'corrected': 'x', 'reason': 'c', 'category': 'typo'},
+        ]
+        self.assertEqual(build_correction_spans('経済敵な理由', corrections),
+                         [[0, 2, 'けいざい', 'a', 'tone']])
+
+    def test_client_renderer_matches_server_html(self):
+        """ブラウザ側の描画結果がサーバー側の format_corrections と同じHTMLになることをテスト"""
+        node = shutil.which('node')
+        if node is None:
+            self.skipTest('node が利用できないため省略')
+
+        text, corrections = build_article(5_000, 100, seed=7)
+        text = '😀<b class="x">&\'</b>\n' + text
+        corrections.append({'original': '<b class="x">', 'corrected': '<b>', 'reason': '"属性"', 'category': 'dict'})
+        corrections.append({'original': "&'", 'corrected': '&amp;', 'reason': 'x', 'category': None})
+
+        script = (
+            'globalThis.window = globalThis;'
+            f'require({json.dumps(SPANS_SCRIPT)});'
+            'let input = "";'
+            'process.stdin.on("data", chunk => input += chunk);'
+            'process.stdin.on("end", () => {'
+            '  const data = JSON.parse(input);'
+            '  process.stdout.write(renderCorrectionSpans(data.text, data.spans));'
+            '});'
+        )
+        payload = json.dumps({'text': text, 'spans': build_correction_spans(text, corrections)})
+        rendered = subprocess.run([node, '-e', script], input=payload.encode('utf-8'),
+                                  capture_output=True, check=True).stdout.decode('utf-8')
+
+        self.assertEqual(rendered, format_corrections(text, corrections))
+
+    def test_spans_response_is_smaller(self):
+        """1万字の記事でspans形式のレスポンスが従来形式の3分の1未満の大きさになることをテスト"""
+        for count in (50, 200):
+            text, corrections = build_article(10_000, count)
+            html_bytes, spans_bytes = (len(serialize_highlight_payload(text, corrections, response_format))
+                                       for response_format in ('html', 'spans'))
+            self.assertLess(spans_bytes * 3, html_bytes)
+
+    @benchmark
+    def test_benchmark_against_html_format(self):
+        """1万字の記事でレスポンスサイズとサーバー側の処理時間を従来形式と比較するベンチマーク"""
+        def measure(response_format, rounds=20):
+            start = time.perf_counter()
+            for _ in range(rounds):
+                body = serialize_highlight_payload(text, corrections, response_format)
+            return (time.perf_counter() - start) / rounds, len(body)
+
+        print("\n[レスポンス形式ベンチマーク]")
+        for count in (50, 200):
+            text, corrections = build_article(10_000, count)
+            html_time, html_bytes = measure('html')
+            spans_time, spans_bytes = measure('spans')
+            print(f"  {len(text)}文字 / 修正{count}件: html {html_bytes:,}B {html_time * 1000:.2f}ms / "
+                  f"spans {spans_bytes:,}B {spans_time * 1000:.2f}ms "
+                  f"(サイズ {html_bytes / spans_bytes:.1f}倍・時間 {html_time / spans_time:.1f}倍)")
+            self.assertLess(spans_time, html_time)
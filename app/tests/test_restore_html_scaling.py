@@ -0,0 +1,206 @@
+import random
+import re
+import time
+from typing import Dict, List
+
+from django.test import SimpleTestCase
+
+from proofreading_ai.utils import protect_html_tags_advanced, restore_html_tags_advanced
+from tests.benchmark import benchmark
+
+
+# 比較用: 線形化する前の実装（タグごと・修正ごとにテキスト全体を置換する）
+def legacy_restore_html_tags_advanced(text: str, placeholders: Dict[str, str], html_tag_info: List[Dict], corrections: List[Dict]) -> str:
+    """
+    改善されたHTMLタグ復元機能（タグ名と属性内の修正も反映）
+
+    Args:
+        text: プレースホルダーを含むテキスト
+        placeholders: プレースホルダーとタグのマッピング辞書
+        html_tag_info: HTMLタグ詳細情報
+        corrections: 修正箇所リスト
+
+    Returns:
+        タグと修正を復元したテキスト
+    """
+    result = text
+
+    # HTMLタグ情報に基づいて修正を適用
+    for i, tag_info in enumerate(html_tag_info):
+        original_tag_name = tag_info['tag_name_original']
+        is_closing = tag_info['is_closing']
+        tag_placeholder = tag_info['tag_placeholder']
+        full_placeholder = tag_info['full_placeholder']
+        tag_counter = tag_info['tag_counter']
+        tag_end_marker = f"__TAG_END_{tag_counter}__"
+
+        # タグ名に対する修正を適用
+        corrected_tag_name = original_tag_name
+        for correction in corrections:
+            if correction['original'] == original_tag_name:
+                corrected_tag_name = correction['corrected']
+
+        if is_closing:
+            # 終了タグの場合
+            # パターン: __HTML_TAG_X__ tag_name __TAG_END_X__
+            pattern = f"{re.escape(full_placeholder)} {re.escape(original_tag_name)} {re.escape(tag_end_marker)}"
+            corrected_tag = f"</{corrected_tag_name}>"
+            result = re.sub(pattern, corrected_tag, result)
+
+        else:
+            # 開始タグの場合
+            original_attrs = tag_info['attributes_original']
+            attr_placeholder = tag_info.get('attr_placeholder', '')
+
+            if original_attrs:
+                # 属性ありの場合
+                tag_split_marker = f"__TAG_SPLIT_{tag_counter}__"
+
+                # 属性部分に対する修正を適用
+                corrected_attrs = original_attrs
+                for correction in corrections:
+                    if correction['original'] in original_attrs:
+                        corrected_attrs = corrected_attrs.replace(
+                            correction['original'],
+                            correction['corrected']
+                        )
+
+                # パターン: __HTML_TAG_X__ tag_name __TAG_SPLIT_X__ attributes __TAG_END_X__
+                pattern = f"{re.escape(full_placeholder)} {re.escape(original_tag_name)} {re.escape(tag_split_marker)} {re.escape(original_attrs)} {re.escape(tag_end_marker)}"
+                corrected_tag = f"<{corrected_tag_name} {corrected_attrs}>"
+                result = re.sub(pattern, corrected_tag, result)
+
+            else:
+                # 属性なしの場合
+                # パターン: __HTML_TAG_X__ tag_name __TAG_END_X__
+                pattern = f"{re.escape(full_placeholder)} {re.escape(original_tag_name)} {re.escape(tag_end_marker)}"
+                corrected_tag = f"<{corrected_tag_name}>"
+                result = re.sub(pattern, corrected_tag, result)
+
+    # 本文テキストに対する修正を適用
+    for correction in corrections:
+        original = correction['original']
+        corrected = correction['corrected']
+
+        # プレースホルダー以外の通常テキスト部分で修正を適用
+        if original in result and not original.startswith('__') and not original.endswith('__'):
+            result = result.replace(original, corrected)
+
+    # 残っているプレースホルダーを復元（通常は使われないはず）
+    sorted_placeholders = sorted(placeholders.items(), key=lambda x: len(x[0]), reverse=True)
+
+    for placeholder, tag in sorted_placeholders:
+        if placeholder in result:
+            result = result.replace(placeholder, tag)
+
+    return result
+
+
+SIZES = (1_000, 10_000, 100_000)
+TAG_COUNTS = (10, 100, 1_000)
+TAGS = (
+    ('<p>', '</p>'),
+    ('<strong>', '</strong>'),
+    ('<a href="https://grapee.jp/1480012" class="related-link">', '</a>'),
+    ('<span style="font-weight: 400;">', '</span>'),
+)
+WORDS = ('経済敵な理由で', '朝の通勤電車で', '高齢の女性が', '小銭を拾い集め', 'ありがとうと言い', '改札まで運んだ')
+
+
+def build_document(length, tag_count, seed=0):
+    """指定した文字数・タグ数の記事風HTMLと、それに対する修正箇所を作る"""
+    rng = random.Random(seed)
+    pairs = tag_count // 2
+    markup_length = sum(len(TAGS[i % len(TAGS)][0]) + len(TAGS[i % len(TAGS)][1]) for i in range(pairs))
+    text_per_pair = max(1, (length - markup_length) // max(pairs, 1))
+
+    parts = []
+    for i in range(pairs):
+        open_tag, close_tag = TAGS[i % len(TAGS)]
+        words = []
+        while sum(len(w) for w in words) < text_per_pair:
+            words.append(rng.choice(WORDS))
+        body = ''.join(words)[:text_per_pair]
+        parts.append(f"{open_tag}{body}{close_tag}")
+        if i % 5 == 4:
+            parts.append('\n')
+    document = ''.join(parts)
+
+    corrections = [
+        {'original': '経済敵', 'corrected': '経済的', 'reason': '誤字', 'category': 'typo'},
+        {'original': '通勤電車', 'corrected': '通勤列車', 'reason': '表記', 'category': 'dict'},
+        {'original': 'ありがとう', 'corrected': 'ありがとう。', 'reason': '句点', 'category': 'tone'},
+    ]
+    return document, corrections
+
+
+def simulate_model_output(protected_text, corrections):
+    """モデルが本文の修正を反映して返したテキストを模擬する"""
+    for correction in corrections:
+        protected_text = protected_text.replace(correction['original'], correction['corrected'])
+    return protected_text
+
+
+class RestoreHtmlTagsAdvancedTest(SimpleTestCase):
+    """restore_html_tags_advanced の線形化をテストするクラス"""
+
+    def test_matches_legacy_output(self):
+        """線形化前の実装と同じ結果になることをテスト"""
+        for length in (1_000, 10_000):
+            for tag_count in TAG_COUNTS:
+                document, corrections = build_document(length, tag_count, seed=tag_count)
+                protected, placeholders, html_tag_info = protect_html_tags_advanced(document)
+                model_output = simulate_model_output(protected, corrections)
+
+                expected = legacy_restore_html_tags_advanced(model_output, placeholders, html_tag_info, corrections)
+                actual = restore_html_tags_advanced(model_output, placeholders, html_tag_info, corrections)
+                self.assertEqual(actual, expected, f"{length}文字 / {tag_count}タグ")
+
+    def test_tag_name_and_attribute_corrections(self):
+        """タグ名・属性の修正と、書き換えられたタグの復元が従来と同じになることをテスト"""
+        document = '<dvi class="leed">本文</dvi><p>経済敵</p>'
+        corrections = [
+            {'original': 'dvi', 'corrected': 'div'},
+            {'original': 'leed', 'corrected': 'lead'},
+            {'original': '経済敵', 'corrected': '経済的'},
+        ]
+        protected, placeholders, html_tag_info = protect_html_tags_advanced(document)
+        # 2番目の開始タグはモデルがタグ名を書き換えたケース
+        model_output = protected.replace('__HTML_TAG_2__ p __TAG_END_2__', '__HTML_TAG_2__ P __TAG_END_2__')
+
+        for text in (protected, model_output):
+            self.assertEqual(
+                restore_html_tags_advanced(text, placeholders, html_tag_info, corrections),
+                legacy_restore_html_tags_advanced(text, placeholders, html_tag_info, corrections)
+            )
+        self.assertEqual(
+            restore_html_tags_advanced(protected, placeholders, html_tag_info, corrections),
+            '<div class="lead">本文</div><p>経済的</p>'
+        )
+
+    @benchmark
+    def test_scaling_benchmark(self):
+        """1k/10k/100k文字 × 10/100/1,000タグで処理時間を計測するベンチマーク（線形時間であることを確認）"""
+        print("\n[restore_html_tags_advanced スケーリング]")
+        print(f"{'文字数':>8} {'タグ数':>6} {'従来(ms)':>10} {'線形(ms)':>10} {'倍率':>6}")
+        timings = {}
+        for length in SIZES:
+            for tag_count in TAG_COUNTS:
+                document, corrections = build_document(length, tag_count)
+                protected, placeholders, html_tag_info = protect_html_tags_advanced(document)
+                model_output = simulate_model_output(protected, corrections)
+
+                start = time.perf_counter()
+                legacy_restore_html_tags_advanced(model_output, placeholders, html_tag_info, corrections)
+                legacy_time = time.perf_counter() - start
+
+                start = time.perf_counter()
+                restore_html_tags_advanced(model_output, placeholders, html_tag_info, corrections)
+                linear_time = time.perf_counter() - start
+
+                timings[(length, tag_count)] = linear_time
+                print(f"{len(document):>8} {tag_count:>6} {legacy_time * 1000:>10.2f} "
+                      f"{linear_time * 1000:>10.2f} {legacy_time / max(linear_time, 1e-9):>6.1f}")
+
+        # タグ数を10倍にしても処理時間がタグ数×長さのように100倍にはならないこと
+        self.assertLess(timings[(100_000, 1_000)], timings[(100_000, 10)] * 50 + 0.05)
@@ -0,0 +1,95 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from proofreading_ai.models import ProofreadingCacheEntry, ReplacementDictionary
+from proofreading_ai.services.bedrock_client import BedrockClient
+from proofreading_ai.services.dictionary_matcher import get_dictionary_version
+from proofreading_ai.services.mock_bedrock_client import MockBedrockRuntime
+from proofreading_ai.services.result_cache import ProofreadResultCache
+
+
+class ProofreadResultCacheTest(TestCase):
+    """校正結果キャッシュをテストするクラス"""
+
+    def test_hit_and_miss_are_counted(self):
+        """ヒット・ミスが統計に反映されることをテスト"""
+        cache = ProofreadResultCache(max_entries=10, ttl=60)
+        key = cache.make_key('本文', 'v1')
+
+        self.assertIsNone(cache.get(key))
+        cache.set(key, {'corrections': []})
+        self.assertEqual(cache.get(key), {'corrections': []})
+
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['total_hits'], 1)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """上限を超えると最終アクセスが最も古いエントリが削除されることをテスト"""
+        cache = ProofreadResultCache(max_entries=2, ttl=60)
+        keys = [cache.make_key(i) for i in range(3)]
+        cache.set(keys[0], {'n': 0})
+        cache.set(keys[1], {'n': 1})
+        ProofreadingCacheEntry.objects.filter(cache_key=keys[1]).update(
+            last_accessed_at=timezone.now() - timedelta(minutes=5)
+        )
+        cache.get(keys[0])
+        cache.set(keys[2], {'n': 2})
+
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertIsNotNone(cache.get(keys[0]))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_expired_entry_is_not_returned(self):
+        """期限切れのエントリは返されないことをテスト"""
+        cache = ProofreadResultCache(max_entries=10, ttl=60)
+        key = cache.make_key('本文')
+        cache.set(key, {'n': 1})
+        ProofreadingCacheEntry.objects.filter(cache_key=key).update(expires_at=timezone.now())
+
+        self.assertIsNone(cache.get(key))
+
+    def test_dictionary_version_changes_on_update(self):
+        """辞書を更新するとバージョンが変わることをテスト"""
+        before = get_dictionary_version()
+        ReplacementDictionary.objects.create(original_word='アマゾン', replacement_word='Amazon')
+        self.assertNotEqual(before, get_dictionary_version())
+
+
+class BedrockClientCacheTest(TestCase):
+    """BedrockClient.proofread_text のキャッシュ利用をテストするクラス"""
+
+    def test_identical_request_is_served_from_cache(self):
+        """同じテキストの2回目はBedrockを呼ばずに返ることをテスト"""
+        runtime = MockBedrockRuntime(tool_input={
+            'corrected_text': '経済的な理由',
+            'corrections': [{'line_number': 1, 'original': '経済敵', 'corrected': '経済的',
+                             'reason': '誤字', 'category': 'typo'}]
+        })
+        client = BedrockClient(bedrock_runtime=runtime)
+
+        first = client.proofread_text('経済敵な理由')
+        second = client.proofread_text('経済敵な理由')
+
+        self.assertEqual(len(runtime.calls), 1)
+        self.assertTrue(second['cache_hit'])
+        self.assertEqual(first['corrections'], second['corrections'])
+
+        client.proofread_text('経済敵な理由', use_cache=False)
+        self.assertEqual(len(runtime.calls), 2)
+
+    def test_cache_lookup_does_not_protect_html(self):
+        """キャッシュの参照ではHTML保護をせず、ヒット時は一度も保護しないことをテスト"""
+        runtime = MockBedrockRuntime(tool_input={'corrected_text': '<p>本文</p>', 'corrections': []})
+        client = BedrockClient(bedrock_runtime=runtime)
+        client.proofread_text('<p>本文</p>')
+
+        with mock.patch.object(client, '_protect_html', wraps=client._protect_html) as protect:
+            self.assertTrue(client.proofread_text('<p>本文</p>')['cache_hit'])
+            self.assertEqual(protect.call_count, 0)
+
+            client.proofread_text('<p>本文です</p>')
+            self.assertEqual(protect.call_count, 1)
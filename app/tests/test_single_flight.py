@@ -0,0 +1,300 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from proofreading_ai.models import ProofreadingInFlight, ProofreadingJob
+from proofreading_ai.services.bedrock_client import BedrockClient
+from proofreading_ai.services.mock_bedrock_client import FakeBedrockEndpoint, MockBedrockRuntime
+from proofreading_ai.services.rate_limiter import reset_rate_limiters
+from proofreading_ai.services.single_flight import (
+    SharedFlightLock, SingleFlight, get_single_flight, reset_single_flight, run_shared
+)
+from tests.test_async_bedrock import build_proofreader
+
+TOOL_INPUT = {
+    'corrected_text': '経済的な理由',
+    'corrections': [{'line_number': 1, 'original': '経済敵', 'corrected': '経済的', 'reason': '誤字', 'category': 'typo'}]
+}
+
+
+class SingleFlightTest(SimpleTestCase):
+    """同じキーの呼び出しを1回にまとめる処理をテストするクラス"""
+
+    def test_concurrent_calls_share_one_execution(self):
+        """実行中に来た同じキーの呼び出しが、1回の実行結果を共有することをテスト"""
+        flight = SingleFlight()
+        release = threading.Event()
+        executed = []
+
+        def work():
+            executed.append(1)
+            release.wait(5)
+            return 'result'
+
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            futures = [executor.submit(flight.do, 'key', work) for _ in range(5)]
+            while flight.stats()['coalesced'] < 4:
+                time.sleep(0.01)
+            release.set()
+            results = [future.result() for future in futures]
+
+        self.assertEqual(len(executed), 1)
+        self.assertEqual(sorted(shared for _, shared in results), [False, True, True, True, True])
+        self.assertTrue(all(result == 'result' for result, _ in results))
+        self.assertEqual(flight.stats(), {'executed': 1, 'coalesced': 4, 'in_flight': 0})
+
+        # 完了後の呼び出しは新しく実行する
+        self.assertEqual(flight.do('key', lambda: 'again'), ('again', False))
+
+    def test_error_is_shared(self):
+        """リーダーの例外が合流した呼び出しにも送出されることをテスト"""
+        flight = SingleFlight()
+        started = threading.Event()
+
+        def fail():
+            started.set()
+            time.sleep(0.1)
+            raise RuntimeError('ThrottlingException')
+
+        leader = ThreadPoolExecutor(max_workers=1)
+        future = leader.submit(flight.do, 'key', fail)
+        started.wait(5)
+        with self.assertRaises(RuntimeError):
+            flight.do('key', lambda: 'unused')
+        with self.assertRaises(RuntimeError):
+            future.result()
+        leader.shutdown()
+
+    def test_async_calls_join_thread_leader(self):
+        """イベントループ上の呼び出しがスレッドで実行中の呼び出しに合流できることをテスト"""
+        flight = SingleFlight()
+        release = threading.Event()
+        leader = ThreadPoolExecutor(max_workers=1)
+        future = leader.submit(flight.do, 'key', lambda: release.wait(5) and 'result')
+        while flight.stats()['in_flight'] == 0:
+            time.sleep(0.01)
+
+        async def join():
+            asyncio.get_running_loop().call_later(0.05, release.set)
+
+            async def unused():
+                return 'unused'
+            return await asyncio.gather(*(flight.do_async('key', unused) for _ in range(3)))
+
+        self.assertEqual(asyncio.run(join()), [('result', True)] * 3)
+        self.assertEqual(future.result(), ('result', False))
+        leader.shutdown()
+
+    def test_run_shared_waits_for_other_worker(self):
+        """他のワーカーがロックを持っている間は待ち、結果がなければ自分で実行することをテスト"""
+        lock = mock.Mock()
+        lock.acquire.side_effect = [False, False, True]
+        lock.held.side_effect = [True, False, True, False]
+        sleeps = []
+
+        result = run_shared(lock, 'key', run=lambda: {'source': 'self'}, lookup=lambda: None, sleep=sleeps.append)
+
+        self.assertEqual(result, ({'source': 'self'}, False))
+        self.assertEqual(len(sleeps), 2)
+        lock.release.assert_called_once_with('key')
+
+        lock = mock.Mock()
+        lock.acquire.return_value = False
+        lock.held.side_effect = [True, False]
+        result = run_shared(lock, 'key', run=lambda: {'source': 'self'}, lookup=lambda: {'source': 'other'},
+                            sleep=sleeps.append)
+        self.assertEqual(result, ({'source': 'other'}, True))
+
+
+class SharedFlightLockTest(TestCase):
+    """実行中の校正のロック表をテストするクラス"""
+
+    def test_only_one_worker_acquires(self):
+        """同じキーのロックは1つのワーカーだけが取得でき、解放後は取得できることをテスト"""
+        worker_a, worker_b = SharedFlightLock(ttl=60), SharedFlightLock(ttl=60)
+
+        self.assertTrue(worker_a.acquire('key'))
+        self.assertFalse(worker_b.acquire('key'))
+        self.assertTrue(worker_b.held('key'))
+
+        worker_b.release('key')
+        self.assertTrue(worker_a.held('key'))
+        worker_a.release('key')
+        self.assertFalse(worker_b.held('key'))
+        self.assertTrue(worker_b.acquire('key'))
+
+    def test_expired_lock_is_taken_over(self):
+        """異常終了したワーカーのロックは有効期限後に他のワーカーが取得できることをテスト"""
+        ProofreadingInFlight.objects.create(key='key', owner='dead', expires_at=timezone.now() - timedelta(seconds=1))
+        worker = SharedFlightLock(ttl=60)
+
+        self.assertFalse(worker.held('key'))
+        self.assertTrue(worker.acquire('key'))
+        self.assertEqual(ProofreadingInFlight.objects.get(key='key').owner, worker.owner)
+
+
+@override_settings(PROOFREAD_TOKEN_USAGE_RECORDING=False, PROOFREAD_RATE_LIMIT_ENABLED=False)
+class BedrockClientSingleFlightTest(TestCase):
+    """BedrockClientの同じ校正の同時実行をまとめる処理をテストするクラス"""
+
+    def setUp(self):
+        reset_single_flight()
+        reset_rate_limiters()
+        self.addCleanup(reset_single_flight)
+        self.addCleanup(reset_rate_limiters)
+
+    def build_client(self, latency=0.0):
+        client = BedrockClient(bedrock_runtime=MockBedrockRuntime(tool_input=TOOL_INPUT, latency=latency))
+        client.default_prompt = '{原文}'
+        return client
+
+    @override_settings(PROOFREAD_CACHE_ENABLED=False)
+    def test_duplicate_requests_call_model_once(self):
+        """同じ原稿の同時校正でモデル呼び出しが1回になり、合流分の使用量が0になることをテスト"""
+        client = self.build_client(latency=0.3)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: client.proofread_text('経済敵な理由'), range(8)))
+
+        self.assertEqual(len(client.bedrock_runtime.calls), 1)
+        coalesced = [result for result in results if result.get('coalesced')]
+        self.assertEqual(len(coalesced), 7)
+        self.assertTrue(all(result['corrected_text'] == '経済的な理由' for result in results))
+        self.assertTrue(all(result['estimated_cost'] == 0 for result in coalesced))
+        # 呼び出し元ごとに別の辞書を返す
+        self.assertIsNot(coalesced[0]['corrections'], coalesced[1]['corrections'])
+
+        with override_settings(PROOFREAD_SINGLE_FLIGHT_ENABLED=False):
+            client = self.build_client(latency=0.1)
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                list(executor.map(lambda _: client.proofread_text('経済敵な理由'), range(4)))
+            self.assertEqual(len(client.bedrock_runtime.calls), 4)
+
+    @override_settings(PROOFREAD_CACHE_ENABLED=False)
+    def test_different_options_are_not_coalesced(self):
+        """原稿か設定が違う校正はまとめないことをテスト"""
+        client = self.build_client(latency=0.2)
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            list(executor.map(lambda args: client.proofread_text(args[0], use_simple_prompt=args[1]),
+                              [('経済敵な理由', False), ('経済敵な理由', True), ('<p>経済敵な理由</p>', False)]))
+
+        self.assertEqual(len(client.bedrock_runtime.calls), 3)
+
+    @override_settings(PROOFREAD_CACHE_ENABLED=True, PROOFREAD_SINGLE_FLIGHT_POLL_INTERVAL=0.01)
+    def test_waits_for_same_proofread_on_other_worker(self):
+        """他のワーカーで実行中の同じ校正は、完了を待ってキャッシュから結果を受け取ることをテスト"""
+        client = self.build_client()
+        client.result_cache.clear()
+        text = '経済敵な理由'
+        other_worker = SharedFlightLock(ttl=60)
+        self.assertTrue(other_worker.acquire(client._make_flight_key(text, 'json')))
+
+        def finish_on_other_worker(lock, key):
+            # 待っている間に他のワーカーが結果を保存してロックを解放する
+            client.result_cache.set(client._make_result_cache_key(text, 'json'), dict(TOOL_INPUT, processing_time=3.0))
+            other_worker.release(key)
+            return False
+
+        with mock.patch.object(SharedFlightLock, 'held', autospec=True, side_effect=finish_on_other_worker):
+            result = client.proofread_text(text)
+
+        self.assertEqual(client.bedrock_runtime.calls, [])
+        self.assertTrue(result['coalesced'])
+        self.assertEqual(result['corrected_text'], '経済的な理由')
+        self.assertEqual(result['input_tokens'], 0)
+        self.assertFalse(ProofreadingInFlight.objects.exists())
+
+    @override_settings(PROOFREAD_CACHE_ENABLED=True)
+    def test_lock_is_released_after_proofread(self):
+        """校正の完了後はロック表に行が残らないことをテスト"""
+        client = self.build_client()
+        client.result_cache.clear()
+
+        result = client.proofread_text('経済敵な理由')
+
+        self.assertNotIn('coalesced', result)
+        self.assertEqual(len(client.bedrock_runtime.calls), 1)
+        self.assertFalse(ProofreadingInFlight.objects.exists())
+        self.assertEqual(get_single_flight().stats()['executed'], 1)
+
+
+@override_settings(PROOFREAD_CACHE_ENABLED=False, PROOFREAD_TOKEN_USAGE_RECORDING=False,
+                   PROOFREAD_RATE_LIMIT_ENABLED=False)
+class AsyncSingleFlightTest(TestCase):
+    """非同期版の同じ校正の同時実行をまとめる処理をテストするクラス"""
+
+    def setUp(self):
+        reset_single_flight()
+        self.addCleanup(reset_single_flight)
+
+    async def test_duplicate_async_requests_call_endpoint_once(self):
+        """イベントループ上の同じ原稿の同時校正でエンドポイントの呼び出しが1回になることをテスト"""
+        endpoint = FakeBedrockEndpoint(tool_input=TOOL_INPUT, latency=0.2)
+        proofreader = build_proofreader(await endpoint.start())
+        try:
+            results = await asyncio.gather(*(proofreader.proofread_text('経済敵な理由') for _ in range(10)))
+        finally:
+            await proofreader.runtime.close()
+            await endpoint.close()
+
+        self.assertEqual(len(endpoint.calls), 1)
+        self.assertEqual(sum(1 for result in results if result.get('coalesced')), 9)
+        self.assertTrue(all(result['corrected_text'] == '経済的な理由' for result in results))
+
+
+class ProofreadJobCoalescingTest(TestCase):
+    """非同期校正ジョブの重複投入をまとめる処理をテストするクラス"""
+
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_user(username='testuser', email='test@grapee.co.jp', password='testpassword')
+        self.client.login(username='testuser', password='testpassword')
+
+    def post_async(self, text):
+        return self.client.post(
+            reverse('proofreading_ai:proofread_async'),
+            data=json.dumps({'text': text}),
+            content_type='application/json'
+        ).json()
+
+    def test_duplicate_job_returns_running_job(self):
+        """同じ原稿のジョブが実行中なら、新しいジョブを投入せず同じ処理IDを返すことをテスト"""
+        executor = mock.Mock()
+        executor.submit.return_value = 1
+        with mock.patch('proofreading_ai.views.get_job_executor', return_value=executor):
+            first = self.post_async('経済敵な理由')
+            second = self.post_async('経済敵な理由')
+            other = self.post_async('別の原稿')
+
+        self.assertEqual(second['process_id'], first['process_id'])
+        self.assertTrue(second['coalesced'])
+        self.assertNotEqual(other['process_id'], first['process_id'])
+        self.assertEqual(executor.submit.call_count, 2)
+        self.assertEqual(ProofreadingJob.objects.count(), 2)
+
+        # 完了したジョブには合流しない
+        ProofreadingJob.objects.filter(job_id=first['process_id']).update(status='completed')
+        with mock.patch('proofreading_ai.views.get_job_executor', return_value=executor):
+            third = self.post_async('経済敵な理由')
+        self.assertNotEqual(third['process_id'], first['process_id'])
+        self.assertNotIn('coalesced', third)
+
+    @override_settings(PROOFREAD_SINGLE_FLIGHT_ENABLED=False)
+    def test_disabled_submits_every_job(self):
+        """無効の場合は同じ原稿でも毎回ジョブを投入することをテスト"""
+        executor = mock.Mock()
+        executor.submit.return_value = 1
+        with mock.patch('proofreading_ai.views.get_job_executor', return_value=executor):
+            first = self.post_async('経済敵な理由')
+            second = self.post_async('経済敵な理由')
+
+        self.assertNotEqual(second['process_id'], first['process_id'])
+        self.assertEqual(executor.submit.call_count, 2)
@@ -0,0 +1,156 @@
+import json
+import random
+from types import SimpleNamespace
+from unittest import mock
+
+from django.db import DatabaseError
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from proofreading_ai.models import TokenUsageRecord
+from proofreading_ai.services.bedrock_client import BedrockClient
+from proofreading_ai.services.mock_bedrock_client import MockBedrockRuntime
+from proofreading_ai.services.token_estimator import (
+    CHARACTER_CLASSES, TokenEstimator, count_character_classes, get_token_estimator, reset_token_estimator
+)
+
+# 較正で復元できるかを確かめるための「真の」係数
+TRUE_COEFFICIENTS = {'kanji': 1.1, 'kana': 0.8, 'ascii': 0.25, 'markup': 0.35, 'other': 0.9}
+
+
+def build_sample(rng):
+    counts = {name: rng.randint(0, 2000) for name in CHARACTER_CLASSES}
+    tokens = round(sum(TRUE_COEFFICIENTS[name] * counts[name] for name in CHARACTER_CLASSES))
+    return counts, tokens
+
+
+def build_records(count, seed=0):
+    rng = random.Random(seed)
+    records = []
+    for _ in range(count):
+        input_characters, input_tokens = build_sample(rng)
+        output_characters, output_tokens = build_sample(rng)
+        records.append(SimpleNamespace(
+            input_characters=input_characters, input_tokens=input_tokens,
+            output_characters=output_characters, output_tokens=output_tokens,
+            latency=0.5 + 0.0001 * input_tokens + 0.015 * output_tokens,
+        ))
+    return records
+
+
+class TokenEstimatorTest(SimpleTestCase):
+    """文字種別のトークン推定器をテストするクラス"""
+
+    def test_count_character_classes(self):
+        """漢字・かな・ASCII・タグ・その他の文字数が数えられることをテスト"""
+        counts = count_character_classes('<p class="a">漢字とカナabc、ｱ</p>')
+
+        self.assertEqual(counts, {'kanji': 2, 'kana': 4, 'ascii': 3, 'markup': 17, 'other': 1})
+
+    def test_calibration_recovers_coefficients(self):
+        """実測値から文字種別の係数と処理時間モデルが復元されることをテスト"""
+        records = build_records(60)
+        estimator = TokenEstimator.calibrate(records)
+
+        for name in CHARACTER_CLASSES:
+            self.assertAlmostEqual(estimator.coefficients[name], TRUE_COEFFICIENTS[name], places=2)
+        self.assertAlmostEqual(estimator.predict_latency(1000, 500), 0.5 + 0.1 + 7.5, places=1)
+
+        # 旧来の「文字数×1.5」との誤差比較
+        holdout = build_records(30, seed=1)
+        legacy_error = sum(abs(sum(r.input_characters.values()) * 1.5 - r.input_tokens) for r in holdout) / len(holdout)
+        calibrated_error = sum(
+            abs(estimator.estimate_from_counts(r.input_characters) - r.input_tokens) for r in holdout
+        ) / len(holdout)
+        self.assertLess(calibrated_error, legacy_error / 10)
+
+    def test_unseen_classes_keep_defaults(self):
+        """実測値に現れない文字種は既定の係数のままであることをテスト"""
+        records = [SimpleNamespace(input_characters={'kanji': 100}, input_tokens=120,
+                                   output_characters={}, output_tokens=0, latency=0)]
+        estimator = TokenEstimator.calibrate(records)
+
+        self.assertAlmostEqual(estimator.coefficients['kanji'], 1.2, places=2)
+        self.assertEqual(estimator.coefficients['ascii'], TokenEstimator().coefficients['ascii'])
+
+
+@override_settings(PROOFREAD_TOKEN_CALIBRATION_MIN_SAMPLES=3, PROOFREAD_TOKEN_CALIBRATION_INTERVAL=0)
+class TokenUsageRecordingTest(TestCase):
+    """実測トークン数の記録と推定器の較正をテストするクラス"""
+
+    def setUp(self):
+        # 並列校正のワーカースレッドはテストのトランザクション外で記録するため、先に消しておく
+        TokenUsageRecord.objects.all().delete()
+        reset_token_estimator()
+        self.addCleanup(reset_token_estimator)
+
+    def test_json_mode_uses_and_records_usage(self):
+        """JSONモードでレスポンスのusageが結果に使われ、記録されることをテスト"""
+        tool_input = {'corrected_text': '経済的な買い物', 'corrections': []}
+        runtime = MockBedrockRuntime(tool_input=tool_input)
+        client = BedrockClient(bedrock_runtime=runtime)
+        client.default_prompt = '{原文}'
+
+        result = client.proofread_text('経済敵な買い物', use_cache=False)
+
+        request = runtime.calls[0]['request']
+        prompt = request['messages'][0]['content']
+        # モックの usage はリクエストのメッセージと応答の content の文字数
+        usage = {'input_tokens': len(json.dumps(request['messages'], ensure_ascii=False)),
+                 'output_tokens': len(json.dumps(runtime._build_content(request), ensure_ascii=False))}
+        self.assertEqual(result['input_tokens'], usage['input_tokens'])
+        self.assertEqual(result['output_tokens'], usage['output_tokens'])
+        self.assertIn('predicted_processing_time', result)
+
+        record = TokenUsageRecord.objects.get()
+        self.assertEqual(record.mode, 'json')
+        self.assertEqual(record.input_tokens, usage['input_tokens'])
+        self.assertEqual(sum(record.output_characters.values()), len(json.dumps(tool_input, ensure_ascii=False)))
+        self.assertEqual(sum(record.input_characters.values()), len(prompt))
+        self.assertEqual(record.estimated_input_tokens, client.count_tokens(prompt))
+
+    def test_stream_records_usage(self):
+        """ストリーミングでも usage の実測値が記録されることをテスト"""
+        runtime = MockBedrockRuntime(tool_input={'corrections': []})
+        client = BedrockClient(bedrock_runtime=runtime)
+        client.default_prompt = '{原文}'
+
+        events = list(client.proofread_text_stream('本文'))
+
+        self.assertEqual(events[-1]['type'], 'done')
+        self.assertEqual(TokenUsageRecord.objects.get().mode, 'stream')
+
+    def test_recording_failure_is_logged(self):
+        """記録に失敗しても校正結果は返り、例外の種類が警告ログに残ることをテスト"""
+        runtime = MockBedrockRuntime(tool_input={'corrections': []})
+        client = BedrockClient(bedrock_runtime=runtime)
+        client.default_prompt = '{原文}'
+
+        with mock.patch.object(TokenUsageRecord.objects, 'create', side_effect=DatabaseError('disk full')), \
+                self.assertLogs('proofreading_ai.services.token_estimator', level='WARNING') as logs:
+            events = list(client.proofread_text_stream('本文'))
+
+        self.assertEqual(events[-1]['type'], 'done')
+        self.assertIn('DatabaseError: disk full', logs.output[0])
+
+    @override_settings(PROOFREAD_TOKEN_USAGE_RECORDING=False)
+    def test_recording_can_be_disabled(self):
+        """設定で記録を無効にできることをテスト"""
+        client = BedrockClient(bedrock_runtime=MockBedrockRuntime(tool_input={'corrected_text': '本文', 'corrections': []}))
+        client.default_prompt = '{原文}'
+        client.proofread_text('本文', use_cache=False)
+
+        self.assertFalse(TokenUsageRecord.objects.exists())
+
+    def test_shared_estimator_is_calibrated_from_records(self):
+        """記録が最小件数に達すると共有推定器が較正されることをテスト"""
+        self.assertFalse(get_token_estimator().calibrated)
+
+        for record in build_records(5):
+            TokenUsageRecord.objects.create(mode='json', model_id='test', latency=record.latency,
+                                            input_tokens=record.input_tokens, output_tokens=record.output_tokens,
+                                            input_characters=record.input_characters,
+                                            output_characters=record.output_characters)
+
+        estimator = get_token_estimator()
+        self.assertTrue(estimator.calibrated)
+        self.assertAlmostEqual(estimator.coefficients['kanji'], TRUE_COEFFICIENTS['kanji'], places=1)